@@ -37,6 +37,33 @@ def parse_deduction_text(text):
         '原因': reason_val
     }
 
+# parse_deduction_text 四个正则合并为一次扫描（每个可选前瞻组等价于一次独立的 re.search）
+DEDUCTION_PATTERN = re.compile(
+    r'^'
+    r'(?:(?=[\s\S]*?考核条件:(?P<item>[^，,（\s]+)))?'
+    r'(?:(?=[\s\S]*?得分:(?P<score>[\d.]+)))?'
+    r'(?:(?=[\s\S]*?总分(?P<total>[\d.]+)))?'
+    r'(?:(?=[\s\S]*?原因：(?P<reason>[^；;]+)))?'
+)
+
+def parse_deduction_series(texts):
+    """
+    parse_deduction_text 的向量化版本，返回与 texts 同索引的 考核项/扣分值/原因
+    """
+    codes, uniques = pd.factorize(texts)
+    parts = pd.Series(uniques, dtype=object).str.extract(DEDUCTION_PATTERN)
+    
+    score = pd.to_numeric(parts['score'], errors='coerce').fillna(0.0)
+    total = pd.to_numeric(parts['total'], errors='coerce').fillna(0.0)
+    parsed = pd.DataFrame({
+        '考核项': parts['item'].str.strip().fillna("未知考核项"),
+        '扣分值': (total - score).map(lambda v: round(v, 2)).astype(float),
+        '原因': parts['reason'].str.strip().fillna("未知原因"),
+    })
+    parsed = parsed.take(codes)
+    parsed.index = texts.index
+    return parsed
+
 def analyze(input_file, output_file="分析结果.xlsx"):
     print(f"正在读取文件: {input_file}")
     df = pd.read_csv(input_file, encoding='utf-8')
@@ -51,19 +78,21 @@ def analyze(input_file, output_file="分析结果.xlsx"):
     id_vars = ['厂站名', '日期', '统计类型']
     # 修正：列名格式为 "00:00扣分详情"，没有 "时刻" 字样
     value_vars = [c for c in df.columns if '扣分详情' in c]
+    # 先去掉各时刻均为空的行，减少逆透视产生的空记录
+    df = df[df[value_vars].notna().any(axis=1)]
     
     df_long = df.melt(id_vars=id_vars, value_vars=value_vars, var_name='时刻', value_name='扣分详情')
-    df_long['时刻'] = df_long['时刻'].str.extract(r'(\d{2}:\d{2})')
+    df_long = df_long[df_long['扣分详情'].notna()]
+    df_long['时刻'] = df_long['时刻'].str.extract(r'(\d{2}:\d{2})', expand=False)
     
     # 3. 过滤并解析
-    df_long = df_long[df_long['扣分详情'].notna()]
     df_long['扣分详情'] = df_long['扣分详情'].astype(str)
     df_long = df_long[df_long['扣分详情'].str.strip() != ""]
     
-    details = df_long['扣分详情'].apply(parse_deduction_text)
-    df_long['考核项'] = details.apply(lambda x: x['考核项'] if x else None)
-    df_long['扣分值'] = details.apply(lambda x: x['扣分值'] if x else 0.0)
-    df_long['具体原因'] = details.apply(lambda x: x['原因'] if x else None)
+    details = parse_deduction_series(df_long['扣分详情'])
+    df_long['考核项'] = details['考核项']
+    df_long['扣分值'] = details['扣分值']
+    df_long['具体原因'] = details['原因']
     
     df_long = df_long[df_long['扣分值'] > 0]
     
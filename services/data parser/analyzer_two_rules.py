@@ -2,6 +2,21 @@ import pandas as pd
 import os
 import re
 
+try:
+    import python_calamine  # optional: Rust-based reader, several times faster than openpyxl
+except ImportError:
+    python_calamine = None
+
+# Sheets read by the analyzer
+MAIN_SHEET = '数据表（两个细则系统）'
+SETTLEMENT_SHEET = '公示-表一、结算汇总表'
+COST_SHEET = '公示-表二、并网运行考核汇总表'
+COMP_SHEET = '公示-表四、辅助服务补偿汇总表'
+REQUIRED_SHEETS = [MAIN_SHEET, SETTLEMENT_SHEET, COST_SHEET, COMP_SHEET]
+
+# Header rows sit at the top of each sheet; only scan this many rows for them
+HEADER_SCAN_ROWS = 20
+
 # Standardize station names mapping
 STATION_MAPPING = {
     '樟木': '樟木风电场',
@@ -99,6 +114,38 @@ def find_and_rename(df, keywords):
             return c
     return None
 
+def read_workbook(filepath):
+    """
+    Open the workbook once and read every required sheet in a single pass
+    (calamine when installed, otherwise openpyxl in read-only mode).
+    Returns {sheet_name: DataFrame} for the sheets present in the file,
+    to be passed to load_main_table / load_summary_tables instead of the path.
+    """
+    engine = 'calamine' if python_calamine is not None else 'openpyxl'
+    with pd.ExcelFile(filepath, engine=engine) as xls:
+        names = [name for name in REQUIRED_SHEETS if name in xls.sheet_names]
+        return pd.read_excel(xls, sheet_name=names)
+
+def read_sheet(excel_file, sheet_name):
+    """Read one sheet from a path, or take a copy from the dict returned by read_workbook."""
+    if isinstance(excel_file, dict):
+        if sheet_name not in excel_file:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return excel_file[sheet_name].copy()
+    return pd.read_excel(excel_file, sheet_name=sheet_name, engine='openpyxl')
+
+def find_header_row(df, match):
+    """Return the position of the first of the top HEADER_SCAN_ROWS rows whose string values satisfy match, or None."""
+    for i, values in enumerate(df.head(HEADER_SCAN_ROWS).astype(str).values.tolist()):
+        if match(values):
+            return i
+    return None
+
+def promote_header(df, i):
+    """Use row i as the column header and keep the rows below it."""
+    df.columns = df.iloc[i].tolist()
+    return df.iloc[i+1:].reset_index(drop=True)
+
 def load_main_table(excel_file):
     """
     Load '数据表（两个细则系统）' handling multi-index headers.
@@ -111,7 +158,7 @@ def load_main_table(excel_file):
     try:
         # Read with header=0 to get the first row as columns, but it's multi-level.
         # Let's read a few rows to construct a clean dataframe manually.
-        df = pd.read_excel(excel_file, sheet_name='数据表（两个细则系统）', header=[0], engine='openpyxl')
+        df = read_sheet(excel_file, MAIN_SHEET)
         
         # The key columns we need are:
         # 厂站, 免考情况, and various "考核电量" columns.
@@ -154,13 +201,9 @@ def load_main_table(excel_file):
         # So `pd.read_excel(..., header=0)` might have put "名称" as the header for col 0.
         
         # Strategy: find the header row by looking for key markers
-        first_valid_row = -1
-        for i, row in df.iterrows():
-            row_str = " ".join([str(x) for x in row.tolist()])
-            if '厂站' in row_str and '年月' in row_str:
-                df.columns = row.tolist()
-                df = df.iloc[i+1:].reset_index(drop=True)
-                break
+        header_row = find_header_row(df, lambda vals: '厂站' in " ".join(vals) and '年月' in " ".join(vals))
+        if header_row is not None:
+            df = promote_header(df, header_row)
         
         # Now columns should be "厂站", "免考情况", etc.
         # Normalize columns
@@ -223,15 +266,13 @@ def load_summary_tables(excel_file):
     
     # 1. 结算汇总表 (Profit/Loss)
     try:
-        df_settlement = pd.read_excel(excel_file, sheet_name='公示-表一、结算汇总表', engine='openpyxl')
+        df_settlement = read_sheet(excel_file, SETTLEMENT_SHEET)
         # Row 0 might be header, check columns
         if '电厂名称' not in df_settlement.columns:
              # Try finding header row
-            for i, row in df_settlement.iterrows():
-                if '电厂名称' in row.astype(str).tolist():
-                    df_settlement.columns = row
-                    df_settlement = df_settlement.iloc[i+1:].reset_index(drop=True)
-                    break
+            header_row = find_header_row(df_settlement, lambda vals: '电厂名称' in vals)
+            if header_row is not None:
+                df_settlement = promote_header(df_settlement, header_row)
         
         df_settlement.columns = [str(c).strip() for c in df_settlement.columns]
         df_settlement = df_settlement.dropna(subset=['电厂名称'])
@@ -262,16 +303,13 @@ def load_summary_tables(excel_file):
     try:
         # 2a. Load Assessment Quantity (MWh) from '数据表（两个细则系统）'
         try:
-            df_mwh = pd.read_excel(excel_file, sheet_name='数据表（两个细则系统）', engine='openpyxl')
+            df_mwh = read_sheet(excel_file, MAIN_SHEET)
             
             # Header logic for '数据表'
             header_keys = ['厂站', '场站', '电厂名称', '名称']
-            for i, row in df_mwh.iterrows():
-                row_vals = [str(x) for x in row.tolist()]
-                if any(k in row_vals for k in header_keys):
-                    df_mwh.columns = row
-                    df_mwh = df_mwh.iloc[i+1:].reset_index(drop=True)
-                    break
+            header_row = find_header_row(df_mwh, lambda vals: any(k in vals for k in header_keys))
+            if header_row is not None:
+                df_mwh = promote_header(df_mwh, header_row)
             
             # Standardize
             df_mwh.columns = [str(c).replace('\n', '').strip() for c in df_mwh.columns]
@@ -304,7 +342,7 @@ def load_summary_tables(excel_file):
 
         # 2b. Load Assessment Cost (Yuan) from '公示-表二、并网运行考核汇总表'
         try:
-            df_cost = pd.read_excel(excel_file, sheet_name='公示-表二、并网运行考核汇总表', engine='openpyxl')
+            df_cost = read_sheet(excel_file, COST_SHEET)
             
             # Header logic (usually standard header)
             
@@ -339,13 +377,11 @@ def load_summary_tables(excel_file):
         print(f"Error in assessment loading block: {e}")
     # 3. 辅助服务补偿汇总表 (Compensation Breakdown)
     try:
-        df_comp = pd.read_excel(excel_file, sheet_name='公示-表四、辅助服务补偿汇总表', engine='openpyxl')
+        df_comp = read_sheet(excel_file, COMP_SHEET)
         if '电厂名称' not in df_comp.columns:
-            for i, row in df_comp.iterrows():
-                if '电厂名称' in row.astype(str).tolist():
-                    df_comp.columns = row
-                    df_comp = df_comp.iloc[i+1:].reset_index(drop=True)
-                    break
+            header_row = find_header_row(df_comp, lambda vals: '电厂名称' in vals)
+            if header_row is not None:
+                df_comp = promote_header(df_comp, header_row)
         
         df_comp.columns = [str(c).strip() for c in df_comp.columns]
         df_comp = df_comp.dropna(subset=['电厂名称'])
@@ -378,27 +414,50 @@ def load_summary_tables(excel_file):
 
     return results
 
-    return results
+def load_frames(excel_file):
+    """
+    Parse the workbook once into the cleaned frames analyze_excel works on:
+    main / settlement / assessment_cost / assessment_mwh / comp.
+    The result only depends on the file content, so it can be cached and
+    re-filtered by period/station without touching the Excel file again.
+    """
+    sheets = read_workbook(excel_file)
+    df_main = load_main_table(sheets) # From '数据表（两个细则系统）'
+    summary_data = load_summary_tables(sheets)
+    
+    frames = {
+        'main': df_main,
+        'settlement': summary_data.get('settlement', pd.DataFrame()),
+        'assessment_cost': summary_data.get('assessment_cost', pd.DataFrame()),
+        'assessment_mwh': summary_data.get('assessment_mwh', pd.DataFrame()),
+        'comp': summary_data.get('comp_detail', pd.DataFrame()),
+    }
+    for df_temp in frames.values():
+        if not df_temp.empty and 'Date' in df_temp.columns:
+            # Ensure every single date in the column is formatted
+            df_temp['Date'] = df_temp['Date'].apply(format_excel_date)
+    return frames
 
-def analyze_excel(filepath, output_path, period=None, station=None):
+def analyze_excel(filepath, output_path, period=None, station=None, frames=None):
     """
     Main analysis orchestrator.
+    frames: pre-parsed result of load_frames (e.g. from the workbook cache); parsed from filepath if omitted.
+    output_path: where to write the Excel report; None skips the report.
     """
     # Load data
-    df_main = load_main_table(filepath) # From '数据表（两个细则系统）'
-    summary_data = load_summary_tables(filepath)
+    if frames is None:
+        frames = load_frames(filepath)
     
-    df_settlement = summary_data.get('settlement', pd.DataFrame())
-    df_assessment_cost = summary_data.get('assessment_cost', pd.DataFrame())
-    df_assessment_mwh = summary_data.get('assessment_mwh', pd.DataFrame())
-    df_comp = summary_data.get('comp_detail', pd.DataFrame())
+    df_main = frames['main']
+    df_settlement = frames['settlement']
+    df_assessment_cost = frames['assessment_cost']
+    df_assessment_mwh = frames['assessment_mwh']
+    df_comp = frames['comp']
     
     # Collect all available periods from all dataframes
     all_dates = []
     for df_temp in [df_settlement, df_assessment_cost, df_assessment_mwh, df_comp, df_main]:
         if not df_temp.empty and 'Date' in df_temp.columns:
-            # Ensure every single date in the column is formatted
-            df_temp['Date'] = df_temp['Date'].apply(format_excel_date)
             all_dates.extend(df_temp['Date'].unique().tolist())
     
     # Final pass safety net
@@ -631,6 +690,9 @@ def analyze_excel(filepath, output_path, period=None, station=None):
             # For now, just return the MWh saved.
     
     # 4. Generate Excel Report
+    if output_path is None:
+        return analysis_results
+    
     with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
         if not df_settlement.empty:
             df_settlement.to_excel(writer, sheet_name='经营损益排名', index=False)
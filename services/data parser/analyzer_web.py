@@ -176,6 +176,77 @@ def parse_deduction_text(text):
     return {'考核项': item_val, '扣分值': deduction, '原因': reason_clean}
 
 
+# 单次扫描同时提取 parse_deduction_text 中的考核项/得分/总分：每个可选前瞻组等价于一次独立的 re.search
+DEDUCTION_PATTERN = re.compile(
+    r'^'
+    r'(?:(?=[\s\S]*?考核条件[:：]\s*(?P<item>.*?(?=\s*(?:得分|总分|原因|[，,；;]|（总分)|$))))?'
+    r'(?:(?=[\s\S]*?得分[:：]\s*(?P<score>[\d.]+)))?'
+    r'(?:(?=[\s\S]*?总分[:：]?\s*\(?(?P<total>[\d.]+)\)?))?'
+)
+# “扣除X分”只在缺少总分时才需要，单独对少量记录提取
+DEDUCT_HINT_PATTERN = re.compile(r'扣除?(?P<hint>[\d.]+)分')
+TIMESTAMP_PREFIX = r'^\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2}'
+
+# 没有“考核条件”时按关键词推断考核项（按顺序匹配）
+ITEM_KEYWORDS = [
+    ('限电', "限电记录考核"),
+    ('状态容量', "状态容量一致性"),
+    ('气象信息', "气象数据考核"),
+    ('预测数据', "预测数据质量"),
+]
+
+
+def parse_deduction_series(texts):
+    """
+    parse_deduction_text 的向量化版本，对整列扣分详情一次性解析。
+    texts: 已去除空值与空白的字符串 Series
+    返回与 texts 同索引的 DataFrame，列为 考核项 / 扣分值 / 原因
+    """
+    # 同一提示文本在不同时刻大量重复，只解析去重后的文本
+    codes, uniques = pd.factorize(texts)
+    uniques = pd.Series(uniques, dtype=object)
+    parts = uniques.str.extract(DEDUCTION_PATTERN)
+
+    item = parts['item'].str.strip().str.rstrip('，,：:')
+    missing = item.isna() | (item == '')
+    if missing.any():
+        untagged = uniques[missing]
+        fallback = pd.Series("专项业务考核", index=untagged.index)
+        for keyword, name in reversed(ITEM_KEYWORDS):
+            fallback = fallback.mask(untagged.str.contains(keyword, regex=False), name)
+        item = item.mask(missing, fallback)
+
+    score = pd.to_numeric(parts['score'], errors='coerce').fillna(0.0)
+    total = pd.to_numeric(parts['total'], errors='coerce').fillna(0.0)
+    # 与内置 round 保持一致（numpy 的 round 在 .xx5 附近结果不同）
+    deduction = (total - score).map(lambda v: round(v, 2))
+    need_hint = (deduction <= 0) & (total == 0)
+    if need_hint.any():
+        hint = pd.to_numeric(uniques[need_hint].str.extract(DEDUCT_HINT_PATTERN)['hint'], errors='coerce')
+        deduction.update(hint.dropna())
+
+    reason = uniques.str.replace(TIMESTAMP_PREFIX, '', regex=True).str.strip()
+
+    parsed = pd.DataFrame({'考核项': item, '扣分值': deduction.astype(float), '原因': reason})
+    parsed = parsed.take(codes)
+    parsed.index = texts.index
+    return parsed
+
+
+def melt_deductions(df, id_vars):
+    """
+    逆透视各时刻的扣分详情，只保留非空单元格。
+    先去掉所有时刻都为空的行再逆透视，避免生成大量空记录。
+    """
+    value_vars = [c for c in df.columns if '扣分详情' in c]
+    df = df[df[value_vars].notna().any(axis=1)]
+    df_long = df.melt(id_vars=id_vars, value_vars=value_vars, var_name='时刻', value_name='扣分详情')
+    df_long = df_long[df_long['扣分详情'].notna()]
+    df_long['时刻'] = df_long['时刻'].str.extract(r'(\d{2}:\d{2})', expand=False)
+    df_long['扣分详情'] = df_long['扣分详情'].astype(str).str.strip()
+    return df_long[df_long['扣分详情'] != ""]
+
+
 def analyze_file(input_path, output_dir, filter_ceec=False):
     # Detect file type
     # If the user uploaded an Excel file, try to read it as Excel first
@@ -230,17 +301,12 @@ def analyze_file(input_path, output_dir, filter_ceec=False):
 
     if df.empty: return None, "未找到目标场站数据"
 
-    value_vars = [c for c in df.columns if '扣分详情' in c]
-    df_long = df.melt(id_vars=['厂站名', '日期', '统计类型'], value_vars=value_vars, var_name='时刻', value_name='扣分详情')
-    df_long['时刻'] = df_long['时刻'].str.extract(r'(\d{2}:\d{2})')
-    df_long = df_long[df_long['扣分详情'].notna()]
-    df_long['扣分详情'] = df_long['扣分详情'].astype(str).str.strip()
-    df_long = df_long[df_long['扣分详情'] != ""]
+    df_long = melt_deductions(df, ['厂站名', '日期', '统计类型'])
     
-    details = df_long['扣分详情'].apply(parse_deduction_text)
-    df_long['考核项'] = details.apply(lambda x: x['考核项'] if x else None)
-    df_long['扣分值'] = details.apply(lambda x: x['扣分值'] if x else 0.0)
-    df_long['具体原因'] = details.apply(lambda x: x['原因'] if x else None)
+    details = parse_deduction_series(df_long['扣分详情'])
+    df_long['考核项'] = details['考核项']
+    df_long['扣分值'] = details['扣分值']
+    df_long['具体原因'] = details['原因']
     df_long = df_long[df_long['扣分值'] > 0]
     df_long['考核项'] = df_long['考核项'].astype(str).str.strip()
 
@@ -3,55 +3,42 @@ import os
 from analyzer_web import analyze_file
 from analyzer_compare import compare_records
 from daily_report_web import analyze_daily_report 
-from analyzer_two_rules import analyze_excel as analyze_two_rules
+from analyzer_two_rules import analyze_excel as analyze_two_rules, load_frames as load_two_rules_frames
+from frame_cache import FrameCache
+from history_store import HistoryStore, POWER, DAILY, TWO_RULES
+from job_queue import JobQueue, JobQueueFull
 
-import json
 from datetime import datetime
+import uuid
 
 app = Flask(__name__)
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
+HISTORY_DB = 'history.db'
+# 两细则工作簿解析结果缓存（按文件内容哈希）
+CACHE_FOLDER = os.path.join('cache', 'two_rules')
+# 旧版 JSON 历史文件，仅在首次启动时导入 HISTORY_DB
 HISTORY_FILE = 'history.json'
 DAILY_HISTORY_FILE = 'daily_history.json'
 TWO_RULES_HISTORY_FILE = 'two_rules_history.json'
+# 上传文件在分析完成前暂存于此，避免排队期间被同名上传覆盖
+INCOMING_FOLDER = os.path.join(UPLOAD_FOLDER, '.incoming')
+# 同时运行的分析任务数（其余任务排队）
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 2))
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(INCOMING_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-def save_history(history):
-    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, indent=4, ensure_ascii=False)
-
-def load_daily_history():
-    if os.path.exists(DAILY_HISTORY_FILE):
-        with open(DAILY_HISTORY_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-def save_daily_history(history):
-    with open(DAILY_HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, indent=4, ensure_ascii=False)
-
-def load_two_rules_history():
-    if os.path.exists(TWO_RULES_HISTORY_FILE):
-        try:
-            with open(TWO_RULES_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
-    return []
-
-def save_two_rules_history(history):
-    with open(TWO_RULES_HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, indent=4, ensure_ascii=False)
+history_store = HistoryStore(HISTORY_DB)
+two_rules_frames = FrameCache(CACHE_FOLDER)
+jobs = JobQueue(max_workers=ANALYSIS_WORKERS)
+# 迁移旧的 JSON 历史文件
+history_store.import_json(POWER, HISTORY_FILE)
+history_store.import_json(DAILY, DAILY_HISTORY_FILE)
+history_store.import_json(TWO_RULES, TWO_RULES_HISTORY_FILE)
 
 @app.route('/')
 def index():
@@ -71,7 +58,14 @@ def two_rules_page():
 
 @app.route('/history', methods=['GET'])
 def get_history():
-    return jsonify(load_history())
+    return jsonify(history_store.list(POWER))
+
+@app.route('/history/<file_id>', methods=['GET'])
+def get_history_record(file_id):
+    record = history_store.get(POWER, file_id)
+    if not record:
+        return jsonify({'success': False, 'error': 'Record not found'}), 404
+    return jsonify(record)
 
 @app.route('/compare', methods=['GET'])
 def compare_history():
@@ -81,9 +75,8 @@ def compare_history():
     if not id1 or not id2:
         return jsonify({'success': False, 'error': 'Missing file IDs'}), 400
         
-    history = load_history()
-    rec1 = next((item for item in history if item['file_id'] == id1), None)
-    rec2 = next((item for item in history if item['file_id'] == id2), None)
+    rec1 = history_store.get(POWER, id1)
+    rec2 = history_store.get(POWER, id2)
     
     if not rec1 or not rec2:
          return jsonify({'success': False, 'error': 'Records not found'}), 404
@@ -101,23 +94,19 @@ def delete_history(file_id):
     if password != 'yj666':
         return jsonify({'success': False, 'error': '密码错误，无权删除'}), 401
 
-    history = load_history()
-    # 过滤掉要删除的记录
-    new_history = [item for item in history if item['file_id'] != file_id]
+    target = history_store.delete(POWER, file_id)
     
     # 同时尝试删除物理文件
-    target = next((item for item in history if item['file_id'] == file_id), None)
     if target:
         for key in ['xlsx_filename', 'pdf_filename']:
             path = os.path.join(OUTPUT_FOLDER, target[key])
             if os.path.exists(path): os.remove(path)
             
-    save_history(new_history)
     return jsonify({'success': True})
 
 @app.route('/daily_report/history', methods=['GET'])
 def get_daily_history():
-    return jsonify(load_daily_history())
+    return jsonify(history_store.list(DAILY))
 
 @app.route('/daily_report/history/<file_id>', methods=['DELETE'])
 def delete_daily_history(file_id):
@@ -126,17 +115,70 @@ def delete_daily_history(file_id):
     if password != 'yj666':
         return jsonify({'success': False, 'error': '密码错误，无权删除'}), 401
 
-    history = load_daily_history()
-    target = next((item for item in history if item['file_id'] == file_id), None)
+    target = history_store.delete(DAILY, file_id)
     if target:
         for key in ['json_filename', 'pdf_filename']:
             path = os.path.join(OUTPUT_FOLDER, target[key])
             if os.path.exists(path): os.remove(path)
             
-    new_history = [item for item in history if item['file_id'] != file_id]
-    save_daily_history(new_history)
     return jsonify({'success': True})
 
+def stage_upload(file):
+    """
+    Save the upload to a job-private path so a queued job can't be overwritten by
+    a later upload with the same name; publish_upload moves it into UPLOAD_FOLDER afterwards.
+    """
+    staged = os.path.join(INCOMING_FOLDER, f"{uuid.uuid4().hex[:8]}_{file.filename}")
+    file.save(staged)
+    return staged
+
+def publish_upload(staged, filename):
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    os.replace(staged, filepath)
+    return filepath
+
+def submit_analysis(job_type, func, staged, *args):
+    try:
+        job_id = jobs.submit(job_type, func, staged, *args)
+    except JobQueueFull as e:
+        # 任务未入队，不会再有人处理暂存文件
+        os.remove(staged)
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+def run_power_prediction(progress, staged, filename, filter_ceec):
+    try:
+        progress(10, '解析扣分明细')
+        summary, error = analyze_file(staged, app.config['OUTPUT_FOLDER'], filter_ceec=filter_ceec)
+    finally:
+        publish_upload(staged, filename)
+    if error:
+        raise ValueError(error)
+    
+    # 记录到历史
+    progress(90, '保存历史记录')
+    history_store.add(POWER, {
+        'file_id': summary['file_id'],
+        'filename': filename,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_deduction': summary['total_deduction'],
+        'total_cases': summary['total_cases'],
+        'xlsx_filename': summary['xlsx_filename'],
+        'pdf_filename': summary['pdf_filename'],
+        'raw_details': summary['raw_details'],
+        'top_stations': summary['top_stations'],
+        'top_items': summary['top_items']
+    })
+    
+    return {'success': True, **summary}
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -146,36 +188,36 @@ def upload_file():
     if file.filename == '':
         return jsonify({'success': False, 'error': '未选择文件'})
     
-    if file:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-        
-        try:
-            filter_ceec = request.form.get('filter_ceec') == 'true'
-            summary, error = analyze_file(filepath, app.config['OUTPUT_FOLDER'], filter_ceec=filter_ceec)
-            if error:
-                return jsonify({'success': False, 'error': error})
-            
-            # 记录到历史
-            history = load_history()
-            history.insert(0, {
-                'file_id': summary['file_id'],
-                'filename': file.filename,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'total_deduction': summary['total_deduction'],
-                'total_cases': summary['total_cases'],
-                'xlsx_filename': summary['xlsx_filename'],
-                'pdf_filename': summary['pdf_filename'],
-                'raw_details': summary['raw_details'],
-                'top_stations': summary['top_stations'],
-                'top_items': summary['top_items']
-            })
-            # 限制历史记录数量，防止 JSON 过大
-            save_history(history[:50])
-            
-            return jsonify({'success': True, **summary})
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+    filter_ceec = request.form.get('filter_ceec') == 'true'
+    staged = stage_upload(file)
+    return submit_analysis('power_prediction', run_power_prediction, staged, file.filename, filter_ceec)
+
+def run_daily_report(progress, staged, filename):
+    try:
+        progress(10, '校验日报数据')
+        summary, error = analyze_daily_report(staged, app.config['OUTPUT_FOLDER'])
+    finally:
+        publish_upload(staged, filename)
+    if error:
+        raise ValueError(error)
+    
+    # 记录到历史
+    progress(90, '保存历史记录')
+    history_store.add(DAILY, {
+        'file_id': summary['file_id'],
+        'filename': filename,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_new_energy': summary['overview']['total_new_energy'],
+        'anomaly_count': len(summary['anomalies']),
+        'pdf_filename': summary['pdf_filename'],
+        'json_filename': summary['json_filename'],
+        'anomalies': summary['anomalies'],
+        'top_curtailment': summary['top_curtailment'],
+        'min_avail': summary['min_avail'],
+        'overview': summary['overview']
+    })
+    
+    return {'success': True, **summary}
 
 @app.route('/daily_report/upload', methods=['POST'])
 def upload_daily_report():
@@ -186,35 +228,8 @@ def upload_daily_report():
     if file.filename == '':
         return jsonify({'success': False, 'error': 'No file selected'})
 
-    if file:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-
-        try:
-            summary, error = analyze_daily_report(filepath, app.config['OUTPUT_FOLDER'])
-            if error:
-                return jsonify({'success': False, 'error': error})
-            
-            # 记录到历史
-            history = load_daily_history()
-            history.insert(0, {
-                'file_id': summary['file_id'],
-                'filename': file.filename,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'total_new_energy': summary['overview']['total_new_energy'],
-                'anomaly_count': len(summary['anomalies']),
-                'pdf_filename': summary['pdf_filename'],
-                'json_filename': summary['json_filename'],
-                'anomalies': summary['anomalies'],
-                'top_curtailment': summary['top_curtailment'],
-                'min_avail': summary['min_avail'],
-                'overview': summary['overview']
-            })
-            save_daily_history(history[:50])
-            
-            return jsonify({'success': True, **summary})
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+    staged = stage_upload(file)
+    return submit_analysis('daily_report', run_daily_report, staged, file.filename)
 
 @app.route('/download/<filename>')
 def download_file(filename):
@@ -224,6 +239,35 @@ def download_file(filename):
 def download_original(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+def run_two_rules(progress, staged, filename, period):
+    try:
+        progress(10, '读取工作簿')
+        frames = two_rules_frames.load(staged, load_two_rules_frames)
+    finally:
+        filepath = publish_upload(staged, filename)
+    
+    progress(60, '生成分析报告')
+    token = uuid.uuid4().hex[:4]
+    output_filename = f"两细则分析报告_{datetime.now().strftime('%Y%m%d%H%M%S')}_{token}.xlsx"
+    output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+    result = analyze_two_rules(filepath, output_path, period=period, frames=frames)
+    
+    # Save history
+    progress(90, '保存历史记录')
+    history_store.add(TWO_RULES, {
+        'file_id': f"tr_{int(datetime.now().timestamp())}_{token}",
+        'filename': filename,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'report_filename': output_filename,
+        'data': result # Store analysis data for quick reloading
+    })
+
+    return {
+        'success': True, 
+        'report_url': f"/download/{output_filename}",
+        'data': result
+    }
+
 @app.route('/upload_two_rules', methods=['POST'])
 def upload_two_rules():
     if 'file' not in request.files:
@@ -233,35 +277,9 @@ def upload_two_rules():
     if file.filename == '':
         return jsonify({'success': False, 'error': '未选择文件'})
     
-    if file:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-        
-        try:
-            output_filename = f"两细则分析报告_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-            output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-            
-            period = request.form.get('period', 'all')
-            result = analyze_two_rules(filepath, output_path, period=period)
-            
-            # Save history
-            history = load_two_rules_history()
-            history.insert(0, {
-                'file_id': f"tr_{int(datetime.now().timestamp())}",
-                'filename': file.filename,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'report_filename': output_filename,
-                'data': result # Store analysis data for quick reloading
-            })
-            save_two_rules_history(history[:50])
-
-            return jsonify({
-                'success': True, 
-                'report_url': f"/download/{output_filename}",
-                'data': result
-            })
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+    period = request.form.get('period', 'all')
+    staged = stage_upload(file)
+    return submit_analysis('two_rules', run_two_rules, staged, file.filename, period)
 
 @app.route('/reanalyze_two_rules', methods=['POST'])
 def reanalyze_two_rules():
@@ -281,7 +299,8 @@ def reanalyze_two_rules():
         output_filename = f"两细则分析报告_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
         output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
         
-        result = analyze_two_rules(filepath, output_path, period=period, station=station)
+        frames = two_rules_frames.load(filepath, load_two_rules_frames)
+        result = analyze_two_rules(filepath, output_path, period=period, station=station, frames=frames)
         return jsonify({
             'success': True,
             'report_url': f"/download/{output_filename}",
@@ -292,7 +311,14 @@ def reanalyze_two_rules():
 
 @app.route('/two_rules/history', methods=['GET'])
 def get_two_rules_history():
-    return jsonify(load_two_rules_history())
+    return jsonify(history_store.list(TWO_RULES))
+
+@app.route('/two_rules/history/<file_id>', methods=['GET'])
+def get_two_rules_record(file_id):
+    record = history_store.get(TWO_RULES, file_id)
+    if not record:
+        return jsonify({'success': False, 'error': 'Record not found'}), 404
+    return jsonify(record)
 
 @app.route('/two_rules/history/<file_id>', methods=['DELETE'])
 def delete_two_rules_history(file_id):
@@ -300,15 +326,12 @@ def delete_two_rules_history(file_id):
     if password != 'yj666':
         return jsonify({'success': False, 'error': '密码错误，无权删除'}), 401
         
-    history = load_two_rules_history()
-    target = next((item for item in history if item['file_id'] == file_id), None)
+    target = history_store.delete(TWO_RULES, file_id)
     
     if target:
         path = os.path.join(OUTPUT_FOLDER, target['report_filename'])
         if os.path.exists(path): os.remove(path)
         
-    new_history = [item for item in history if item['file_id'] != file_id]
-    save_two_rules_history(new_history)
     return jsonify({'success': True})
 
 @app.route('/two_rules/trends', methods=['GET'])
@@ -319,10 +342,9 @@ def get_two_rules_trends():
     year = request.args.get('year')
     indicator = request.args.get('indicator', 'overview')
     
-    history = load_two_rules_history()
+    history = list(history_store.iter_records(TWO_RULES))
     
     # Auto-patching older history entries that lack monthly_summary
-    history_updated = False
     for entry in history:
         if 'data' in entry and entry['data'].get('selected_period') == 'all' and 'monthly_summary' not in entry['data']:
             # Try to re-analyze to get the summary
@@ -331,19 +353,13 @@ def get_two_rules_trends():
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 if os.path.exists(filepath):
                     try:
-                        from analyzer_two_rules import analyze_excel
-                        # Use a dummy output path
-                        dummy_out = os.path.join(app.config['OUTPUT_FOLDER'], f"temp_{entry['file_id']}.xlsx")
-                        new_results = analyze_excel(filepath, dummy_out, period='all')
-                        entry['data'] = new_results
-                        history_updated = True
-                        if os.path.exists(dummy_out): os.remove(dummy_out)
+                        # Only the analysis data is needed, skip the Excel report
+                        frames = two_rules_frames.load(filepath, load_two_rules_frames)
+                        entry['data'] = analyze_two_rules(filepath, None, period='all', frames=frames)
+                        history_store.save(TWO_RULES, entry)
                     except Exception as e:
                         print(f"Auto-patch failed for {filename}: {e}")
     
-    if history_updated:
-        save_two_rules_history(history)
-    
     period_map = {}
     for entry in history:
         data = entry.get('data', {})
@@ -456,9 +472,8 @@ def export_compare_excel():
     id2 = request.args.get('id2')
     if not id1 or not id2: return "Missing IDs", 400
     
-    history = load_history()
-    rec1 = next((h for h in history if h['file_id'] == id1), None)
-    rec2 = next((h for h in history if h['file_id'] == id2), None)
+    rec1 = history_store.get(POWER, id1)
+    rec2 = history_store.get(POWER, id2)
     if not rec1 or not rec2: return "Records not found", 404
     
     from analyzer_compare import generate_compare_excel
@@ -473,9 +488,8 @@ def export_compare_pdf():
     id2 = request.args.get('id2')
     if not id1 or not id2: return "Missing IDs", 400
     
-    history = load_history()
-    rec1 = next((h for h in history if h['file_id'] == id1), None)
-    rec2 = next((h for h in history if h['file_id'] == id2), None)
+    rec1 = history_store.get(POWER, id1)
+    rec2 = history_store.get(POWER, id2)
     if not rec1 or not rec2: return "Records not found", 404
     
     from analyzer_compare import generate_compare_pdf
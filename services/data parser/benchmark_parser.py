@@ -0,0 +1,76 @@
+"""
+扣分详情解析基准测试：对比逐行 parse_deduction_text 与向量化 parse_deduction_series。
+用法: python benchmark_parser.py [文件 ...]   (默认使用 input/ 下的 GX 格式样例)
+"""
+import glob
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+from analyzer_web import parse_deduction_text, parse_deduction_series, melt_deductions
+
+ID_VARS = ['厂站名', '日期', '统计类型']
+
+
+def legacy_parse(df):
+    """原实现：全量逆透视后逐行解析，再三次 apply 拆分字段"""
+    value_vars = [c for c in df.columns if '扣分详情' in c]
+    df_long = df.melt(id_vars=ID_VARS, value_vars=value_vars, var_name='时刻', value_name='扣分详情')
+    df_long['时刻'] = df_long['时刻'].str.extract(r'(\d{2}:\d{2})')
+    df_long = df_long[df_long['扣分详情'].notna()]
+    df_long['扣分详情'] = df_long['扣分详情'].astype(str).str.strip()
+    df_long = df_long[df_long['扣分详情'] != ""]
+
+    details = df_long['扣分详情'].apply(parse_deduction_text)
+    df_long['考核项'] = details.apply(lambda x: x['考核项'] if x else None)
+    df_long['扣分值'] = details.apply(lambda x: x['扣分值'] if x else 0.0)
+    df_long['具体原因'] = details.apply(lambda x: x['原因'] if x else None)
+    return df_long
+
+
+def vectorized_parse(df):
+    df_long = melt_deductions(df, ID_VARS)
+    details = parse_deduction_series(df_long['扣分详情'])
+    df_long['考核项'] = details['考核项']
+    df_long['扣分值'] = details['扣分值']
+    df_long['具体原因'] = details['原因']
+    return df_long
+
+
+def best_of(func, df, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(path, repeat=3):
+    df = pd.read_excel(path)
+    df.columns = df.columns.astype(str).str.strip()
+    if '扣分详情' not in ''.join(df.columns):
+        print(f"跳过（非 GX 格式）: {path}")
+        return
+
+    legacy_time, legacy = best_of(legacy_parse, df, repeat)
+    vector_time, vector = best_of(vectorized_parse, df, repeat)
+
+    # 两种实现的结果必须完全一致
+    columns = ['厂站名', '日期', '时刻', '考核项', '扣分值', '具体原因']
+    expected = legacy[columns].astype(object).reset_index(drop=True)
+    actual = vector[columns].astype(object).reset_index(drop=True)
+    assert expected.equals(actual), f"解析结果不一致: {path}"
+
+    print(f"{path}: {len(df)} 行 x {sum('扣分详情' in c for c in df.columns)} 时刻, 非空单元格 {len(vector)}")
+    print(f"  逐行解析 {legacy_time * 1000:8.1f} ms")
+    print(f"  向量解析 {vector_time * 1000:8.1f} ms  ({legacy_time / vector_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    warnings.simplefilter('ignore')
+    for path in sys.argv[1:] or sorted(glob.glob('input/GX-*.xlsx')):
+        run(path)
@@ -85,7 +85,8 @@ def main():
                 
                 import_map = {
                     "python-magic": "magic",
-                    "fpdf2": "fpdf"
+                    "fpdf2": "fpdf",
+                    "python-calamine": "python_calamine"
                 }
                 import_name = import_map.get(pkg_base, pkg_base)
                 
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# 解析/清洗逻辑变化时递增，使旧缓存失效
+CACHE_VERSION = 1
+
+
+class FrameCache:
+    """
+    按文件内容哈希缓存解析后的 DataFrame 字典（如 analyzer_two_rules.load_frames 的结果）。
+    最近使用的若干份保存在内存中，同时以 pickle 落盘，服务重启后无需重新读取 Excel；
+    磁盘上最多保留 max_files 份，超出时删除最久未使用的。
+    """
+
+    def __init__(self, cache_dir, max_memory=8, max_files=32, max_digests=256):
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory
+        self.max_files = max_files
+        self.max_digests = max_digests
+        self._memory = OrderedDict()
+        # path -> ((size, mtime), 内容哈希)，避免每次都重新读取整个文件计算哈希；
+        # 同一路径只保留一条，总数按 LRU 限制（每次上传的暂存路径都不同）
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def content_key(self, filepath):
+        stat = os.stat(filepath)
+        path = os.path.abspath(filepath)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._digests.get(path)
+            if cached is not None and cached[0] == signature:
+                self._digests.move_to_end(path)
+                return cached[1]
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._digests[path] = (signature, digest)
+            self._digests.move_to_end(path)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.v{CACHE_VERSION}.pkl")
+
+    def _remember(self, key, frames):
+        with self._lock:
+            self._memory[key] = frames
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def _prune(self):
+        """按修改时间删除最旧的缓存文件，只保留 max_files 份"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_files, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def load(self, filepath, loader):
+        """
+        返回 filepath 解析后的 DataFrame 字典；未命中缓存时调用 loader(filepath) 并写入缓存。
+        返回的 DataFrame 为共享对象，调用方不应原地修改。
+        """
+        key = self.content_key(filepath)
+        with self._lock:
+            frames = self._memory.get(key)
+            if frames is not None:
+                self._memory.move_to_end(key)
+                return frames
+
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                frames = pd.read_pickle(path)
+            except Exception as e:
+                print(f"Workbook cache unreadable, re-parsing {filepath}: {e}")
+                frames = None
+            else:
+                # 刷新修改时间，清理时按最近使用顺序淘汰
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+        if frames is None:
+            frames = loader(filepath)
+            # 先写临时文件再替换，避免并发请求读到半个文件
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            pd.to_pickle(frames, tmp_path)
+            os.replace(tmp_path, path)
+            self._prune()
+
+        self._remember(key, frames)
+        return frames
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import zlib
+from contextlib import closing
+
+# 历史记录类型
+POWER = 'power'
+DAILY = 'daily'
+TWO_RULES = 'two_rules'
+
+# 体积较大的字段，压缩后存入 details BLOB，仅在查看单条记录时加载
+DETAIL_FIELDS = {
+    POWER: ('raw_details',),
+    DAILY: (),
+    TWO_RULES: ('data',),
+}
+
+# 大字段中列表页仍需要的少量键（两细则历史列表用于初始化趋势筛选项）
+PREVIEW_KEYS = {
+    'data': ('available_periods', 'available_stations', 'selected_period', 'selected_station',
+             'assessment_composition', 'comp_composition'),
+}
+
+
+class HistoryStore:
+    """
+    SQLite 历史记录库，替代 history.json / daily_history.json / two_rules_history.json。
+    摘要字段以 JSON 文本保存并按 (kind, file_id)、(kind, timestamp) 建索引，
+    raw_details 等大字段经 zlib 压缩后单独存放，列表接口不读取。
+    """
+
+    def __init__(self, db_path, limit=50):
+        self.db_path = db_path
+        self.limit = limit
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS history (
+                    kind TEXT NOT NULL,
+                    file_id TEXT NOT NULL,
+                    filename TEXT,
+                    timestamp TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    details BLOB,
+                    PRIMARY KEY (kind, file_id)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_history_kind_time ON history (kind, timestamp)')
+            conn.commit()
+
+    def _connect(self):
+        # 每次操作独立连接，多线程/多进程写入由 SQLite 加锁串行化
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _split(self, kind, record):
+        """拆分为摘要 JSON 与压缩后的大字段"""
+        detail_keys = DETAIL_FIELDS.get(kind, ())
+        summary = {k: v for k, v in record.items() if k not in detail_keys}
+        details = {k: record[k] for k in detail_keys if k in record}
+        for key, value in details.items():
+            preview = PREVIEW_KEYS.get(key)
+            if preview and isinstance(value, dict):
+                summary[key] = {k: value[k] for k in preview if k in value}
+        blob = zlib.compress(json.dumps(details, ensure_ascii=False).encode('utf-8')) if details else None
+        return json.dumps(summary, ensure_ascii=False), blob
+
+    @staticmethod
+    def _merge(summary, blob):
+        record = json.loads(summary)
+        if blob:
+            record.update(json.loads(zlib.decompress(blob).decode('utf-8')))
+        return record
+
+    def save(self, kind, record):
+        """写入或覆盖一条记录（按 file_id）"""
+        summary, blob = self._split(kind, record)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO history (kind, file_id, filename, timestamp, summary, details) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, record['file_id'], record.get('filename'), record.get('timestamp', ''), summary, blob)
+            )
+
+    def add(self, kind, record):
+        """新增记录，并只保留最近 limit 条"""
+        self.save(kind, record)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'DELETE FROM history WHERE kind = ? AND file_id NOT IN ('
+                'SELECT file_id FROM history WHERE kind = ? ORDER BY timestamp DESC, rowid DESC LIMIT ?)',
+                (kind, kind, self.limit)
+            )
+
+    def list(self, kind):
+        """按时间倒序列出摘要（不含大字段）"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT summary FROM history WHERE kind = ? ORDER BY timestamp DESC, rowid DESC', (kind,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, kind, file_id):
+        """读取完整记录，不存在时返回 None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT summary, details FROM history WHERE kind = ? AND file_id = ?', (kind, file_id)
+            ).fetchone()
+        return self._merge(*row) if row else None
+
+    def iter_records(self, kind):
+        """按时间倒序逐条读取完整记录"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT summary, details FROM history WHERE kind = ? ORDER BY timestamp DESC, rowid DESC', (kind,)
+            )
+            for summary, blob in rows:
+                yield self._merge(summary, blob)
+
+    def delete(self, kind, file_id):
+        """删除记录，返回被删除记录的摘要（不存在时返回 None）"""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                'SELECT summary FROM history WHERE kind = ? AND file_id = ?', (kind, file_id)
+            ).fetchone()
+            conn.execute('DELETE FROM history WHERE kind = ? AND file_id = ?', (kind, file_id))
+        return json.loads(row[0]) if row else None
+
+    def import_json(self, kind, path):
+        """首次启动时导入旧的 JSON 历史文件（该类型已有记录时跳过）"""
+        if not os.path.exists(path):
+            return 0
+        with closing(self._connect()) as conn:
+            if conn.execute('SELECT 1 FROM history WHERE kind = ? LIMIT 1', (kind,)).fetchone():
+                return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except json.JSONDecodeError:
+            return 0
+        # JSON 文件按新到旧排列，倒序写入以保持同一时间戳下的先后顺序
+        for record in reversed(history[:self.limit]):
+            if record.get('file_id'):
+                self.save(kind, record)
+        return len(history[:self.limit])
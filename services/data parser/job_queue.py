@@ -0,0 +1,96 @@
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class JobQueueFull(Exception):
+    """排队中的任务过多"""
+
+
+class JobQueue:
+    """
+    后台分析任务队列。
+    上传接口保存文件后提交任务并立即返回任务 ID，前端轮询 /jobs/<id> 获取进度与结果；
+    同时运行的分析数由 max_workers 限制，其余任务排队等待。
+    """
+
+    def __init__(self, max_workers=2, max_pending=20, keep=200):
+        self.max_pending = max_pending
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job_type, func, *args, **kwargs):
+        """
+        提交任务，返回任务 ID。
+        func 以 func(progress, *args, **kwargs) 调用，progress(percent, message) 用于上报进度，
+        返回值作为任务结果；抛出的异常信息作为任务错误。
+        """
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job['status'] == 'queued')
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"当前排队任务过多（{pending} 个），请稍后再试")
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                'id': job_id,
+                'type': job_type,
+                'status': 'queued',
+                'progress': 0,
+                'message': '排队中',
+                'error': None,
+                'result': None,
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'finished_at': None,
+            }
+            self._prune()
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status='running', message='开始分析')
+
+        def progress(percent, message):
+            self._update(job_id, progress=int(percent), message=message)
+
+        try:
+            result = func(progress, *args, **kwargs)
+        except ValueError as e:
+            # 分析器对无效文件给出的提示，无需打印堆栈
+            print(f"Job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), message='分析失败',
+                         finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status='failed', error=str(e), message='分析失败',
+                         finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            self._update(job_id, status='done', progress=100, message='分析完成', result=result,
+                         finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    def _prune(self):
+        # 只保留最近 keep 个任务，未结束的任务不清理
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(len(self._jobs) - self.keep, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """返回任务状态快照（排队中的任务附带 queue_position），不存在时返回 None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            if job['status'] == 'queued':
+                queued = [jid for jid, j in self._jobs.items() if j['status'] == 'queued']
+                snapshot['queue_position'] = queued.index(job_id)
+        return snapshot
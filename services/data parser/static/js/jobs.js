@@ -0,0 +1,40 @@
+// 后台分析任务：上传接口返回任务 ID，轮询 /jobs/<id> 直到完成
+const JOB_POLL_INTERVAL = 1000;
+
+async function waitForJob(jobId, onProgress) {
+  while (true) {
+    const res = await fetch(`/jobs/${jobId}`);
+    const json = await res.json();
+    if (!json.success) return json;
+
+    const job = json.job;
+    if (onProgress) onProgress(job);
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") return { success: false, error: job.error };
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL));
+  }
+}
+
+// 提交上传并等待分析结果，返回值与原同步接口的响应一致
+async function submitJob(url, formData, onProgress) {
+  const res = await fetch(url, { method: "POST", body: formData });
+  const json = await res.json();
+  if (!json.success || !json.job_id) return json;
+  return waitForJob(json.job_id, onProgress);
+}
+
+// 在提示文字中显示排队位置/进度，reset 恢复原文字
+function jobProgressReporter(el) {
+  const original = el.innerText;
+  return {
+    update(job) {
+      el.innerText =
+        job.status === "queued"
+          ? `排队中，前面还有 ${job.queue_position} 个任务...`
+          : `${job.message}... ${job.progress}%`;
+    },
+    reset() {
+      el.innerText = original;
+    },
+  };
+}
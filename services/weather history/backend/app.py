@@ -2,6 +2,7 @@
 Flask应用主入口
 初始化所有服务并启动Web服务器
 """
+import atexit
 import logging
 import os
 import sys
@@ -16,19 +17,32 @@ from flask_cors import CORS
 
 # 导入配置
 from backend.config import (
-    DATABASE_PATH, OPEN_METEO_BASE_URL, CACHE_EXPIRE_HOURS,
-    FLASK_HOST, FLASK_PORT, FLASK_DEBUG, LOG_DIR, LOG_FILE
+    DATABASE_PATH, DB_POOL_SIZE, DB_MMAP_SIZE, OPEN_METEO_BASE_URL, CACHE_EXPIRE_HOURS,
+    CACHE_MEMORY_MAX_BYTES, CACHE_COMPRESS_LEVEL,
+    OPEN_METEO_RATE_PER_MINUTE, OPEN_METEO_BURST, OPEN_METEO_MAX_CONCURRENCY, DOWNLOAD_MAX_WORKERS,
+    JOB_WORKERS, JOB_RETENTION_DAYS, DEFAULT_FIELDS,
+    AUTO_UPDATE_ENABLED, AUTO_UPDATE_SCHEDULE, AUTO_UPDATE_SPREAD_MINUTES, AUTO_UPDATE_INITIAL_DAYS,
+    RATE_LIMIT_BACKEND, RATE_LIMIT_EVICT_SECONDS, SETTINGS_CACHE_SECONDS,
+    FLASK_HOST, FLASK_PORT, FLASK_DEBUG, LOG_DIR, LOG_FILE,
+    LOG_SINK_QUEUE_SIZE, LOG_SINK_BATCH_SIZE, LOG_SINK_FLUSH_MS
 )
 
 # 导入模型和服务
 from backend.models.database import DatabaseManager
+from backend.models.log_sink import LogSink
 from backend.models.city import CityManager
 from backend.services.cache_manager import CacheManager
+from backend.services.throttle import HostThrottle
+from backend.services.download_engine import DownloadEngine
 from backend.services.weather_service import WeatherService
 from backend.services.data_exporter import DataExporter
 from backend.services.data_analyzer import DataAnalyzer
+from backend.services.aggregation import WeatherAggregator
+from backend.services.anomaly_engine import AnomalyEngine
 from backend.services.data_manager import DataManager
-from backend.services.rate_limiter import RateLimiter
+from backend.services.rate_limiter import RateLimiter, create_rate_store
+from backend.services.job_queue import JobQueue
+from backend.services.auto_update_scheduler import AutoUpdateScheduler
 
 # 导入路由
 from backend.routes.api import api_bp, init_api_services
@@ -103,7 +117,13 @@ def create_app():
         return response
     
     # 初始化数据库管理器
-    db_manager = DatabaseManager(DATABASE_PATH)
+    db_manager = DatabaseManager(
+        DATABASE_PATH,
+        pool_size=DB_POOL_SIZE,
+        mmap_size=DB_MMAP_SIZE,
+        settings_ttl=SETTINGS_CACHE_SECONDS
+    )
+    atexit.register(db_manager.close)
     
     # 【新增】自动初始化数据库表 (Item 51)
     try:
@@ -112,6 +132,16 @@ def create_app():
     except Exception as e:
         logger.error(f"数据库自动初始化失败: {e}")
     
+    # 启动异步日志写入器，请求线程只负责入队
+    log_sink = LogSink(
+        db_manager,
+        max_queue=LOG_SINK_QUEUE_SIZE,
+        batch_size=LOG_SINK_BATCH_SIZE,
+        flush_interval_ms=LOG_SINK_FLUSH_MS
+    )
+    log_sink.start()
+    db_manager.attach_log_sink(log_sink)
+    
     # 初始化城市管理器
     city_manager = CityManager(db_manager)
     
@@ -151,31 +181,61 @@ def create_app():
         logger.error(f"自动初始化城市数据失败: {e}")
     
     # 初始化缓存管理器
-    cache_manager = CacheManager(db_manager, CACHE_EXPIRE_HOURS)
+    cache_manager = CacheManager(
+        db_manager,
+        CACHE_EXPIRE_HOURS,
+        memory_max_bytes=CACHE_MEMORY_MAX_BYTES,
+        compress_level=CACHE_COMPRESS_LEVEL
+    )
     
-    # 初始化天气服务
+    # 初始化天气服务（出站请求共享同一个节流器）
+    throttle = HostThrottle(
+        OPEN_METEO_RATE_PER_MINUTE,
+        OPEN_METEO_BURST,
+        OPEN_METEO_MAX_CONCURRENCY
+    )
     weather_service = WeatherService(
         OPEN_METEO_BASE_URL,
         cache_manager,
         city_manager,
-        db_manager
+        db_manager,
+        throttle=throttle
     )
     
     # 初始化数据导出器
     data_exporter = DataExporter()
     
-    # 初始化数据分析器
-    data_analyzer = DataAnalyzer()
+    # 初始化数据分析器（统计摘要在数据库中分组聚合）
+    data_analyzer = DataAnalyzer(WeatherAggregator(db_manager), AnomalyEngine(db_manager))
     
     # 初始化数据管理器
     data_manager = DataManager(
         weather_service,
         db_manager,
-        city_manager
+        city_manager,
+        download_engine=DownloadEngine(weather_service, max_workers=DOWNLOAD_MAX_WORKERS)
     )
     
     # 初始化频率限制器
-    rate_limiter = RateLimiter(db_manager)
+    rate_limiter = RateLimiter(
+        db_manager,
+        store=create_rate_store(RATE_LIMIT_BACKEND, db_manager),
+        evict_interval=RATE_LIMIT_EVICT_SECONDS
+    )
+    
+    # 初始化后台任务队列（耗时操作在请求线程之外执行）
+    job_queue = JobQueue(db_manager, workers=JOB_WORKERS, retention_days=JOB_RETENTION_DAYS)
+    
+    # 初始化定时增量更新（按字段水位只下载新数据）
+    auto_update_scheduler = AutoUpdateScheduler(
+        data_manager,
+        db_manager,
+        city_manager,
+        AUTO_UPDATE_SCHEDULE,
+        DEFAULT_FIELDS,
+        spread_minutes=AUTO_UPDATE_SPREAD_MINUTES,
+        initial_days=AUTO_UPDATE_INITIAL_DAYS
+    )
     
     # 初始化API服务
     init_api_services(
@@ -183,9 +243,23 @@ def create_app():
         data_exporter,
         data_analyzer,
         city_manager,
-        data_manager
+        data_manager,
+        job_queue,
+        auto_update_scheduler
     )
     
+    # 调试模式下重载器的监控进程不启动任务队列与调度，避免两个进程重复执行同一任务
+    serving_process = not FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+    # 注册任务处理函数后再启动，以便恢复上次未完成的任务
+    if serving_process:
+        job_queue.start()
+        atexit.register(job_queue.stop)
+
+    if AUTO_UPDATE_ENABLED and serving_process:
+        auto_update_scheduler.start()
+        atexit.register(auto_update_scheduler.stop)
+    
     # 注册蓝图
     app.register_blueprint(api_bp)
     
@@ -10,13 +10,57 @@ BASE_DIR = Path(__file__).parent.parent
 
 # 数据库配置
 DATABASE_PATH = os.path.join(BASE_DIR, 'data', 'weather.db')
+DB_POOL_SIZE = 8  # 连接池最大连接数
+DB_MMAP_SIZE = 256 * 1024 * 1024  # 每个连接的内存映射大小（字节）
+
+# 异步日志写入配置
+LOG_SINK_QUEUE_SIZE = 10000  # 日志队列最大长度，满后丢弃并计数
+LOG_SINK_BATCH_SIZE = 200  # 单批最大写入条数
+LOG_SINK_FLUSH_MS = 500  # 最长写入间隔（毫秒）
 
 # Open-Meteo API配置
 OPEN_METEO_BASE_URL = 'https://archive-api.open-meteo.com/v1/archive'
 OPEN_METEO_FORECAST_URL = 'https://api.open-meteo.com/v1/forecast'
+OPEN_METEO_GEOCODING_URL = 'https://geocoding-api.open-meteo.com/v1/search'
+
+# 城市搜索配置
+GEOCODING_CACHE_HOURS = 168  # 地名解析结果缓存时间（小时），包括无结果的查询
+GEOCODING_MIN_QUERY_LENGTH = 2  # 关键词短于此长度时只搜索本地城市
+
+# 出站请求限流 (Open-Meteo 免费接口: 600次/分钟, 5000次/小时)
+OPEN_METEO_RATE_PER_MINUTE = 80  # 持续请求速率，按小时限额折算
+OPEN_METEO_BURST = 20  # 允许的突发请求数
+OPEN_METEO_MAX_CONCURRENCY = 4  # 单个主机的最大并发请求数
+DOWNLOAD_MAX_WORKERS = 8  # 多城市下载的线程数
+OPEN_METEO_BATCH_SIZE = 20  # 多坐标请求中每次最多包含的坐标数
+FORECAST_CACHE_MINUTES = 10  # 预报与实时天气的缓存时间（分钟）
+
+# 入站 API 频率限制
+RATE_LIMIT_BACKEND = 'memory'  # 'memory'：进程内；'sqlite'：多个 worker 进程共享同一限额
+RATE_LIMIT_EVICT_SECONDS = 60  # 清理空闲客户端的间隔（秒）
+SETTINGS_CACHE_SECONDS = 30  # 系统设置缓存有效期（秒）
+
+# 后台任务配置
+JOB_WORKERS = 2  # 后台任务工作线程数
+JOB_RETENTION_DAYS = 7  # 已结束任务（及其导出文件）的保留天数
+EXPORT_DIR = os.path.join(BASE_DIR, 'data', 'exports')  # 导出任务生成文件的存放目录
+
+# 定时增量更新配置
+AUTO_UPDATE_ENABLED = True  # 是否启动内置定时更新
+AUTO_UPDATE_SCHEDULE = '30 3 * * *'  # cron 表达式（分 时 日 月 周），默认每天 03:30
+AUTO_UPDATE_SPREAD_MINUTES = 30  # 各城市的更新在该时长内均匀错开，平滑上游请求
+AUTO_UPDATE_INITIAL_DAYS = 7  # 本地没有数据的城市/字段首次更新时向前追溯的天数
+AUTO_UPDATE_CHUNK_DAYS = 31  # 落后较多时每次请求的最大天数
+ARCHIVE_DELAY_DAYS = 5  # 历史数据接口的发布延迟（天），只更新到该天数之前
 
 # 缓存配置
 CACHE_EXPIRE_HOURS = 720  # 30天（历史数据不会改变）
+CACHE_MEMORY_MAX_BYTES = 64 * 1024 * 1024  # 内存LRU缓存容量上限（字节）
+CACHE_COMPRESS_LEVEL = 6  # SQLite缓存数据压缩级别（zstd可用时使用zstd，否则zlib）
+
+# 列式查询响应配置
+RESPONSE_GZIP_MIN_BYTES = 1024  # 列式/Arrow 响应超过该大小且客户端支持时使用 gzip 压缩
+RESPONSE_GZIP_LEVEL = 5  # gzip 压缩级别
 
 # 日志配置
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
@@ -68,7 +112,7 @@ AVAILABLE_FIELDS = {
         'snowfall': {'name': '降雪量', 'unit': 'cm', 'description': '小时降雪量'},
         'surface_pressure': {'name': '地面气压', 'unit': 'hPa', 'description': '地面气压'},
         'cloud_cover': {'name': '云量', 'unit': '%', 'description': '总云量'},
-        'weather_code': {'name': '天气情况', 'unit': '代码', 'description': 'WMO天气代码'},
+        'weather_code': {'name': '天气情况', 'unit': '代码', 'description': 'WMO天气代码', 'label': '天气代码'},
     },
     'wind': {
         'wind_speed_10m': {'name': '10米风速', 'unit': 'km/h', 'description': '10米高度风速'},
@@ -95,6 +139,15 @@ AVAILABLE_FIELDS = {
     }
 }
 
+# 支持 15 分钟精度 (minutely_15) 的 Open-Meteo 参数
+MINUTELY_15_PARAMS = [
+    'temperature_2m', 'relative_humidity_2m', 'dew_point_2m', 'apparent_temperature',
+    'precipitation', 'rain', 'snowfall', 'weather_code',
+    'wind_speed_10m', 'wind_direction_10m', 'wind_gusts_10m',
+    'shortwave_radiation', 'direct_radiation', 'diffuse_radiation',
+    'direct_normal_irradiance', 'global_tilted_irradiance', 'terrestrial_radiation',
+]
+
 # 默认查询字段
 DEFAULT_FIELDS = [
     'temperature_2m',
@@ -4,8 +4,10 @@
 遵循单一职责原则
 """
 import logging
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from backend.models.database import DatabaseManager
+from backend.models.city_index import CitySearchIndex
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +26,31 @@ class CityManager:
             db_manager: 数据库管理器实例（依赖注入）
         """
         self.db_manager = db_manager
+        self._search_index: Optional[CitySearchIndex] = None
+        self._index_lock = threading.Lock()
         logger.info("城市管理器初始化完成")
+
+    def search_index(self) -> CitySearchIndex:
+        """
+        获取城市搜索索引（首次使用时由 city_config 构建，城市变更后重建）
+
+        Returns:
+            城市搜索索引
+        """
+        index = self._search_index
+        if index is None:
+            with self._index_lock:
+                if self._search_index is None:
+                    cities = self.db_manager.execute_query(
+                        "SELECT id, city_name, longitude, latitude, region, is_active FROM city_config ORDER BY id"
+                    )
+                    self._search_index = CitySearchIndex(cities)
+                index = self._search_index
+        return index
+
+    def invalidate_index(self):
+        """城市配置变更后使搜索索引失效"""
+        self._search_index = None
     
     def init_cities(self, cities: List[Dict[str, Any]]):
         """
@@ -36,6 +62,7 @@ class CityManager:
         try:
             # 批量插入城市数据
             inserted = self.db_manager.bulk_insert('city_config', cities)
+            self.invalidate_index()
             logger.info(f"初始化城市数据成功，插入 {inserted} 个城市")
         except Exception as e:
             logger.error(f"初始化城市数据失败: {e}")
@@ -154,6 +181,7 @@ class CityManager:
         
         try:
             self.db_manager.bulk_insert('city_config', [city_data])
+            self.invalidate_index()
             logger.info(f"添加城市成功: {name} (ID: {next_id})")
             return next_id
         except Exception as e:
@@ -174,6 +202,7 @@ class CityManager:
         sql = "UPDATE city_config SET is_active = ? WHERE id = ?"
         try:
             affected = self.db_manager.execute_update(sql, (1 if is_active else 0, city_id))
+            self.invalidate_index()
             if affected > 0:
                 logger.info(f"更新城市状态成功: ID {city_id}, 启用: {is_active}")
                 return True
@@ -0,0 +1,198 @@
+"""
+城市搜索索引
+内存中的名称后缀数组（支持任意位置的子串匹配，二分查找，无需全表扫描）
+与经纬度网格索引（最近站点查询）。由 city_config 全量构建，城市变更后重建
+"""
+import logging
+import math
+from bisect import bisect_left
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 可选依赖，未安装时仅按中文名称匹配
+    lazy_pinyin = None
+
+logger = logging.getLogger(__name__)
+
+# 地球平均半径（公里）
+EARTH_RADIUS_KM = 6371.0
+
+# 后缀之后的分隔符，排在所有可见字符之后，用于确定前缀匹配的结束位置
+_PREFIX_END = '\uffff'
+
+
+def normalize(text: str) -> str:
+    """统一大小写并去除空白"""
+    return ''.join(text.split()).lower()
+
+
+def name_keys(name: str) -> List[str]:
+    """
+    城市名称的检索键：名称本身，安装 pypinyin 时追加全拼与首字母
+
+    Args:
+        name: 城市名称
+
+    Returns:
+        去重后的检索键列表
+    """
+    keys = [normalize(name)]
+    if lazy_pinyin is not None:
+        syllables = lazy_pinyin(name)
+        keys.append(''.join(syllables).lower())
+        keys.append(''.join(s[0] for s in syllables if s).lower())
+    return [key for i, key in enumerate(keys) if key and key not in keys[:i]]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """两点间的大圆距离（公里）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class CitySearchIndex:
+    """
+    城市搜索索引（构建后只读，可在多线程间共享）
+    """
+
+    def __init__(self, cities: List[Dict[str, Any]], cell_degrees: float = 0.5):
+        """
+        构建索引
+
+        Args:
+            cities: city_config 中的城市记录
+            cell_degrees: 网格索引的单元大小（度）
+        """
+        self.cities = [city for city in cities if city.get('city_name')]
+        self.cell_degrees = cell_degrees
+
+        # (后缀, 城市序号, 后缀在检索键中的起始位置, 检索键长度)
+        suffixes: List[Tuple[str, int, int, int]] = []
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        for index, city in enumerate(self.cities):
+            for key in name_keys(city['city_name']):
+                for start in range(len(key)):
+                    suffixes.append((key[start:], index, start, len(key)))
+            if city.get('latitude') is not None and city.get('longitude') is not None:
+                self.grid.setdefault(self._cell(city['latitude'], city['longitude']), []).append(index)
+
+        suffixes.sort()
+        self._suffixes = suffixes
+        self._suffix_keys = [item[0] for item in suffixes]
+        logger.info(f"城市搜索索引构建完成: {len(self.cities)} 个城市, {len(suffixes)} 个后缀")
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """坐标所在的网格单元"""
+        return (
+            math.floor(latitude / self.cell_degrees),
+            math.floor(longitude / self.cell_degrees)
+        )
+
+    @staticmethod
+    def _ring_cells(center_lat: int, center_lon: int, ring: int):
+        """以中心网格为圆心、切比雪夫距离为 ring 的一圈网格"""
+        if ring == 0:
+            yield center_lat, center_lon
+            return
+        for dlon in range(-ring, ring + 1):
+            yield center_lat - ring, center_lon + dlon
+            yield center_lat + ring, center_lon + dlon
+        for dlat in range(-ring + 1, ring):
+            yield center_lat + dlat, center_lon - ring
+            yield center_lat + dlat, center_lon + ring
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        按名称（或拼音）子串搜索城市
+
+        排序规则：完全匹配 > 前缀匹配 > 其他位置匹配，同级按名称长度、ID 排序
+
+        Args:
+            query: 搜索关键词
+            limit: 最大返回数量
+
+        Returns:
+            城市记录列表
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        lo = bisect_left(self._suffix_keys, query)
+        hi = bisect_left(self._suffix_keys, query + _PREFIX_END, lo)
+
+        best: Dict[int, Tuple[int, int, int]] = {}
+        for _, index, start, key_length in self._suffixes[lo:hi]:
+            if start == 0:
+                rank = 0 if key_length == len(query) else 1
+            else:
+                rank = 2
+            score = (rank, len(self.cities[index]['city_name']), self.cities[index].get('id') or 0)
+            if index not in best or score < best[index]:
+                best[index] = score
+
+        ordered = sorted(best, key=best.get)
+        return [self.cities[index] for index in ordered[:limit]]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = 5,
+        max_km: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        查询距离给定坐标最近的城市/场站
+
+        从坐标所在网格开始逐圈向外扩展，直到已找到的第 limit 个城市比下一圈更近
+
+        Args:
+            latitude: 纬度
+            longitude: 经度
+            limit: 最大返回数量
+            max_km: 最大距离（公里），None 表示不限
+
+        Returns:
+            城市记录列表（附带 distance_km 字段），按距离升序
+        """
+        if not self.grid or limit <= 0:
+            return []
+
+        center_lat, center_lon = self._cell(latitude, longitude)
+        lat_cells = [key[0] for key in self.grid]
+        lon_cells = [key[1] for key in self.grid]
+        max_ring = max(
+            abs(center_lat - min(lat_cells)), abs(center_lat - max(lat_cells)),
+            abs(center_lon - min(lon_cells)), abs(center_lon - max(lon_cells))
+        )
+        cell_km = math.radians(self.cell_degrees) * EARTH_RADIUS_KM
+
+        found: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(center_lat, center_lon, ring):
+                for index in self.grid.get(cell, ()):
+                    city = self.cities[index]
+                    distance = haversine_km(latitude, longitude, city['latitude'], city['longitude'])
+                    if max_km is None or distance <= max_km:
+                        found.append((distance, index))
+            found.sort()
+
+            # 更外圈的点至少相隔 ring 个网格单元；经度方向按外圈可能到达的最高纬度缩小
+            farthest_lat = min(abs(latitude) + (ring + 1) * self.cell_degrees, 89.0)
+            next_ring_km = ring * cell_km * max(math.cos(math.radians(farthest_lat)), 0.01)
+            if len(found) >= limit and found[limit - 1][0] <= next_ring_km:
+                break
+            if max_km is not None and next_ring_km > max_km:
+                break
+
+        return [
+            {**self.cities[index], 'distance_km': round(distance, 3)}
+            for distance, index in found[:limit]
+        ]
@@ -0,0 +1,244 @@
+"""
+列式时序存储
+按 城市/月份 将 weather_data 物化为 float32 列数组（NumPy .npz 文件），
+并使用 SQLite 中的 weather_chunks 表作为目录
+范围读取与统计分析直接得到 DataFrame，无需逐行构造字典
+"""
+import os
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# weather_data 中的数值列（与建表语句保持一致）
+WEATHER_VALUE_COLUMNS = [
+    'temperature_2m', 'relative_humidity_2m', 'dew_point_2m',
+    'precipitation', 'rain', 'snowfall', 'surface_pressure', 'cloud_cover',
+    'wind_speed_10m', 'wind_direction_10m', 'wind_gusts_10m',
+    'wind_speed_80m', 'wind_speed_120m', 'wind_speed_180m',
+    'shortwave_radiation', 'direct_radiation', 'diffuse_radiation',
+    'direct_normal_irradiance', 'visibility', 'evapotranspiration',
+    'soil_temperature_0_to_7cm', 'soil_moisture_0_to_7cm',
+    'weather_code', 'wind_speed_100m', 'wind_direction_100m',
+]
+
+
+def month_key(datetime_str: str) -> str:
+    """从 'YYYY-MM-DD...' 格式的时间字符串中提取月份键 'YYYY-MM'"""
+    return datetime_str[:7]
+
+
+def iter_months(start: str, end: str) -> List[str]:
+    """
+    列出 [start, end] 覆盖的所有月份键
+
+    Args:
+        start: 开始时间字符串 (YYYY-MM-DD...)
+        end: 结束时间字符串 (YYYY-MM-DD...)
+
+    Returns:
+        月份键列表，如 ['2024-01', '2024-02']
+    """
+    year, month = int(start[:4]), int(start[5:7])
+    end_year, end_month = int(end[:4]), int(end[5:7])
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+def _next_month(key: str) -> str:
+    """返回下一个月份键"""
+    year, month = int(key[:4]), int(key[5:7])
+    month += 1
+    if month > 12:
+        year, month = year + 1, 1
+    return f"{year:04d}-{month:02d}"
+
+
+class ColumnarStore:
+    """
+    列式存储类
+    SQLite 中的 weather_data 仍是唯一的权威数据源，本类维护其按月切分的列式副本：
+    读取时按需从 SQLite 构建分块，写入/删除时使对应分块失效
+    """
+
+    def __init__(self, db_manager, store_dir: str, dtype: str = 'float32'):
+        """
+        初始化列式存储
+
+        Args:
+            db_manager: 数据库管理器实例
+            store_dir: 分块文件存放目录
+            dtype: 数值列存储类型
+        """
+        self.db_manager = db_manager
+        self.store_dir = store_dir
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        logger.info(f"列式存储初始化完成: {store_dir}")
+
+    def _chunk_path(self, city_id: int, month: str) -> str:
+        """获取分块文件路径"""
+        return os.path.join(self.store_dir, str(city_id), f"{month}.npz")
+
+    def _build_chunk(self, city_id: int, month: str) -> Dict[str, np.ndarray]:
+        """
+        从 SQLite 读取一个月的数据并构建列数组
+
+        Args:
+            city_id: 城市ID
+            month: 月份键 (YYYY-MM)
+
+        Returns:
+            列名 -> 数组 的字典，包含 datetime 列
+        """
+        column_sql = ', '.join(WEATHER_VALUE_COLUMNS)
+        sql = (
+            f"SELECT datetime, {column_sql} FROM weather_data "
+            f"WHERE city_id = ? AND datetime >= ? AND datetime < ? ORDER BY datetime"
+        )
+        with self.db_manager.connection() as conn:
+            # 使用普通元组游标，避免构造 sqlite3.Row
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(sql, (city_id, month, _next_month(month))).fetchall()
+
+        if rows:
+            datetimes, *values = zip(*rows)
+        else:
+            datetimes, values = (), [() for _ in WEATHER_VALUE_COLUMNS]
+
+        chunk = {'datetime': np.array(datetimes, dtype='U19')}
+        for column, column_values in zip(WEATHER_VALUE_COLUMNS, values):
+            # None -> NaN，一次性转换为定长数组
+            chunk[column] = np.array(column_values, dtype=np.float64).astype(self.dtype)
+        return chunk
+
+    def _load_chunk(self, city_id: int, month: str) -> Dict[str, np.ndarray]:
+        """
+        加载分块，不存在时从 SQLite 构建并写入目录
+
+        Args:
+            city_id: 城市ID
+            month: 月份键
+
+        Returns:
+            列名 -> 数组 的字典
+        """
+        path = self._chunk_path(city_id, month)
+        if os.path.exists(path):
+            try:
+                with np.load(path) as npz:
+                    return {key: npz[key] for key in npz.files}
+            except Exception as e:
+                logger.warning(f"读取列式分块失败，重新构建: {path}, {e}")
+
+        # 构建与写入在同一把锁内完成，保证并发写入后的失效操作不会被旧分块覆盖
+        with self._lock:
+            chunk = self._build_chunk(city_id, month)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(tmp_path, **chunk)
+            os.replace(tmp_path, path)
+            self.db_manager.execute_update(
+                "INSERT OR REPLACE INTO weather_chunks (city_id, month, path, row_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (city_id, month, path, len(chunk['datetime']), datetime.now().isoformat())
+            )
+        logger.debug(f"构建列式分块: 城市ID={city_id}, {month}, {len(chunk['datetime'])} 行")
+        return chunk
+
+    def read_frame(
+        self,
+        city_id: int,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> pd.DataFrame:
+        """
+        读取指定城市、时间范围的数据
+
+        Args:
+            city_id: 城市ID
+            start: 开始时间（含），与 SQL 过滤一样按字符串比较
+            end: 结束时间（含）
+            fields: 需要的字段，None 表示全部
+
+        Returns:
+            按 datetime 排序的 DataFrame（datetime 列 + 数值列）
+        """
+        columns = [f for f in (fields or WEATHER_VALUE_COLUMNS) if f in WEATHER_VALUE_COLUMNS]
+
+        if start is None or end is None:
+            bounds = self.db_manager.execute_query(
+                "SELECT MIN(datetime) as first, MAX(datetime) as last FROM weather_data WHERE city_id = ?",
+                (city_id,)
+            )
+            if not bounds or bounds[0]['first'] is None:
+                return pd.DataFrame(columns=['datetime'] + columns)
+            start = start or bounds[0]['first']
+            end = end or bounds[0]['last']
+
+        parts = {name: [] for name in ['datetime'] + columns}
+        for month in iter_months(start, end):
+            chunk = self._load_chunk(city_id, month)
+            times = chunk['datetime']
+            if len(times) == 0:
+                continue
+            # 分块内已按 datetime 排序，二分定位范围
+            lo = np.searchsorted(times, start, side='left')
+            hi = np.searchsorted(times, end, side='right')
+            if lo >= hi:
+                continue
+            parts['datetime'].append(times[lo:hi])
+            for column in columns:
+                parts[column].append(chunk[column][lo:hi])
+
+        if not parts['datetime']:
+            return pd.DataFrame(columns=['datetime'] + columns)
+
+        return pd.DataFrame({
+            name: np.concatenate(arrays) for name, arrays in parts.items()
+        })
+
+    def invalidate(self, city_id: int, months: Iterable[str]) -> int:
+        """
+        使指定月份的分块失效（数据写入或删除后调用）
+
+        Args:
+            city_id: 城市ID
+            months: 月份键集合
+
+        Returns:
+            删除的分块数量
+        """
+        removed = 0
+        with self._lock:
+            for month in set(months):
+                path = self._chunk_path(city_id, month)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+                self.db_manager.execute_update(
+                    "DELETE FROM weather_chunks WHERE city_id = ? AND month = ?",
+                    (city_id, month)
+                )
+        if removed:
+            logger.debug(f"列式分块失效: 城市ID={city_id}, {removed} 个")
+        return removed
+
+    def invalidate_city(self, city_id: int) -> int:
+        """使某城市的全部分块失效"""
+        rows = self.db_manager.execute_query(
+            "SELECT month FROM weather_chunks WHERE city_id = ?", (city_id,)
+        )
+        return self.invalidate(city_id, [row['month'] for row in rows])
@@ -0,0 +1,198 @@
+"""
+SQLite 连接池
+复用长连接，避免每次查询都重新打开/关闭数据库文件
+连接统一启用 WAL 日志、synchronous=NORMAL、mmap 和预编译语句缓存
+"""
+import sqlite3
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from queue import LifoQueue, Empty, Full
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    有界 SQLite 连接池
+    连接按需创建，最多 max_size 个；用完归还池中供其他线程复用
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 8,
+        timeout: float = 30.0,
+        mmap_size: int = 256 * 1024 * 1024,
+        cached_statements: int = 256
+    ):
+        """
+        初始化连接池
+
+        Args:
+            db_path: 数据库文件路径
+            max_size: 最大连接数
+            timeout: 获取连接与等待写锁的超时时间（秒）
+            mmap_size: 内存映射读取的字节数上限
+            cached_statements: 每个连接的预编译语句缓存数量
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._idle = LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            'acquired': 0,
+            'waits': 0,
+            'wait_ms_total': 0.0,
+            'rollbacks': 0,
+            'discarded': 0,
+        }
+
+    def create_connection(self) -> sqlite3.Connection:
+        """
+        创建一个已配置好的新连接（不受连接池管理）
+
+        Returns:
+            sqlite3连接
+        """
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """从池中取出连接，池为空且未达上限时新建，否则等待归还"""
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.max_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self.create_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except Empty:
+                    raise sqlite3.OperationalError(
+                        f"获取数据库连接超时 ({self.timeout}s, 连接池上限 {self.max_size})"
+                    )
+                with self._lock:
+                    self._stats['waits'] += 1
+                    self._stats['wait_ms_total'] += (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self._in_use += 1
+            self._stats['acquired'] += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, broken: bool = False):
+        """归还连接；未提交的事务会被回滚，与关闭连接时的语义一致"""
+        with self._lock:
+            self._in_use -= 1
+
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                    with self._lock:
+                        self._stats['rollbacks'] += 1
+            except sqlite3.Error:
+                broken = True
+
+        if broken or self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        """关闭并丢弃连接"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._stats['discarded'] += 1
+
+    @contextmanager
+    def connection(self):
+        """
+        借出一个连接的上下文管理器
+
+        Yields:
+            sqlite3连接
+        """
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except (sqlite3.DatabaseError, sqlite3.InterfaceError) as e:
+            # 数据库损坏/接口错误时不再复用该连接
+            broken = not isinstance(e, (sqlite3.OperationalError, sqlite3.IntegrityError))
+            raise
+        finally:
+            self._release(conn, broken)
+
+    def close_all(self):
+        """关闭池中所有空闲连接（正在使用的连接归还时关闭）"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            waits = self._stats['waits']
+            return {
+                'max_size': self.max_size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'acquired': self._stats['acquired'],
+                'waits': waits,
+                'avg_wait_ms': round(self._stats['wait_ms_total'] / waits, 2) if waits else 0.0,
+                'rollbacks': self._stats['rollbacks'],
+                'discarded': self._stats['discarded'],
+                'journal_mode': 'wal',
+            }
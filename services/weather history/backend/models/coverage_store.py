@@ -0,0 +1,251 @@
+"""
+数据覆盖位图
+按 城市/月份/字段组 为每个 15 分钟时间点保存 1 位（该时刻的记录存在且组内字段均非空），
+位图压缩存放在 weather_coverage 表中（每月每组不超过 372 字节）。写入/删除原始数据时在同一事务中重算受影响的月份，
+完整性检查、缺失区间与覆盖热力图只读取位图，不扫描原始记录
+"""
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.config import AVAILABLE_FIELDS
+from backend.models.columnar_store import WEATHER_VALUE_COLUMNS, iter_months
+
+logger = logging.getLogger(__name__)
+
+# 每天的时间点数（15 分钟精度）
+SLOTS_PER_DAY = 96
+
+# 只要求记录存在的字段组
+GROUP_ROWS = 'rows'
+
+
+def default_groups() -> Dict[str, List[str]]:
+    """字段组：记录存在 + 按 AVAILABLE_FIELDS 分类（只包含 weather_data 中存储的字段）"""
+    groups = {GROUP_ROWS: []}
+    for category, fields in AVAILABLE_FIELDS.items():
+        stored = [field for field in fields if field in WEATHER_VALUE_COLUMNS]
+        if stored:
+            groups[category] = stored
+    return groups
+
+
+def _month_days(month: str) -> int:
+    """月份的天数"""
+    first = date(int(month[:4]), int(month[5:7]), 1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return (following - first).days
+
+
+def _month_end(month: str) -> str:
+    """月份下一个月的第一天（作为不含的结束边界）"""
+    year, mon = int(month[:4]), int(month[5:7]) + 1
+    if mon > 12:
+        year, mon = year + 1, 1
+    return f"{year:04d}-{mon:02d}"
+
+
+class CoverageStore:
+    """
+    覆盖位图维护与查询类
+    weather_data 仍是唯一的权威数据源，weather_coverage 是其派生数据
+    """
+
+    TABLE = 'weather_coverage'
+
+    def __init__(self, db_manager, groups: Optional[Dict[str, List[str]]] = None):
+        """
+        初始化覆盖位图
+
+        Args:
+            db_manager: 数据库管理器实例
+            groups: 字段组 {组名: 字段列表}，空列表表示只要求记录存在；默认见 default_groups
+        """
+        self.db_manager = db_manager
+        self.groups = groups if groups is not None else default_groups()
+
+    def create_tables(self, cursor):
+        """
+        创建位图表
+
+        Args:
+            cursor: 建表所用的游标（由 DatabaseManager 在同一事务中调用）
+        """
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                city_id INTEGER NOT NULL,
+                month TEXT NOT NULL,
+                field_group TEXT NOT NULL,
+                bits BLOB NOT NULL,
+                slot_count INTEGER NOT NULL,
+                PRIMARY KEY (city_id, field_group, month)
+            )
+        ''')
+
+    def _group_select(self) -> str:
+        """每个字段组是否完整的 SELECT 表达式"""
+        parts = []
+        for fields in self.groups.values():
+            if fields:
+                parts.append('(' + ' AND '.join(f"{field} IS NOT NULL" for field in fields) + ')')
+            else:
+                parts.append('1')
+        return ', '.join(parts)
+
+    def _refresh_month(self, conn, city_id: int, month: str):
+        """重算单个城市、单个月份所有字段组的位图"""
+        rows = conn.execute(
+            f"SELECT datetime, {self._group_select()} FROM weather_data "
+            "WHERE city_id = ? AND datetime >= ? AND datetime < ?",
+            (city_id, month, _month_end(month))
+        ).fetchall()
+
+        conn.execute(f"DELETE FROM {self.TABLE} WHERE city_id = ? AND month = ?", (city_id, month))
+        if not rows:
+            return
+
+        size = _month_days(month) * SLOTS_PER_DAY
+        slots = np.array([
+            (int(dt[8:10]) - 1) * SLOTS_PER_DAY + int(dt[11:13]) * 4 + int(dt[14:16]) // 15
+            for dt, *_ in rows
+        ])
+        flags = np.array([row[1:] for row in rows], dtype=bool)
+        bitmaps = np.zeros((len(self.groups), size), dtype=bool)
+        for g in range(len(self.groups)):
+            np.logical_or.at(bitmaps[g], slots, flags[:, g])
+
+        conn.executemany(
+            f"INSERT INTO {self.TABLE} (city_id, month, field_group, bits, slot_count) VALUES (?, ?, ?, ?, ?)",
+            [
+                (city_id, month, group, np.packbits(bits).tobytes(), int(bits.sum()))
+                for group, bits in zip(self.groups, bitmaps) if bits.any()
+            ]
+        )
+
+    def refresh_range(self, conn, city_id: Optional[int], start_date: Optional[str], end_date: Optional[str]):
+        """
+        在给定连接（调用方的事务）中重算 [start_date, end_date] 所在月份的位图
+
+        Args:
+            conn: 数据库连接，由调用方提交
+            city_id: 城市ID，None 表示所有城市
+            start_date: 开始日期 (YYYY-MM-DD)，None 表示不限
+            end_date: 结束日期 (YYYY-MM-DD)，None 表示不限
+        """
+        if city_id is None:
+            cities = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT city_id FROM weather_data UNION SELECT DISTINCT city_id FROM {self.TABLE}"
+            )]
+        else:
+            cities = [city_id]
+
+        for city in cities:
+            start, end = start_date, end_date
+            if start is None or end is None:
+                # 不限边界时取原始数据与已有位图的并集范围（删除后需要清除旧位图）
+                data_first, data_last = conn.execute(
+                    "SELECT MIN(datetime), MAX(datetime) FROM weather_data WHERE city_id = ?", (city,)
+                ).fetchone()
+                bits_first, bits_last = conn.execute(
+                    f"SELECT MIN(month), MAX(month) FROM {self.TABLE} WHERE city_id = ?", (city,)
+                ).fetchone()
+                firsts = [v[:7] for v in (data_first, bits_first) if v]
+                lasts = [v[:7] for v in (data_last, bits_last) if v]
+                if not firsts:
+                    continue
+                start = start or min(firsts)
+                end = end or max(lasts)
+                if start[:7] > end[:7]:
+                    continue
+            for month in iter_months(start, end):
+                self._refresh_month(conn, city, month)
+
+    def refresh_records(self, conn, keys: Iterable[Tuple[int, str]]):
+        """
+        根据写入记录的 (city_id, datetime) 重算其所在月份的位图
+
+        Args:
+            conn: 数据库连接，由调用方提交
+            keys: 写入记录的 (city_id, datetime) 键
+        """
+        months: Dict[int, set] = {}
+        for city_id, dt in keys:
+            if city_id is None or not dt:
+                continue
+            months.setdefault(city_id, set()).add(dt[:7])
+
+        for city_id, touched in months.items():
+            for month in sorted(touched):
+                self._refresh_month(conn, city_id, month)
+
+    def rebuild_if_empty(self):
+        """位图表为空而原始数据存在时（旧数据库升级）全量构建"""
+        with self.db_manager.connection() as conn:
+            has_bits = conn.execute(f"SELECT 1 FROM {self.TABLE} LIMIT 1").fetchone()
+            has_raw = conn.execute("SELECT 1 FROM weather_data LIMIT 1").fetchone()
+            if has_bits or not has_raw:
+                return
+            logger.info("首次构建数据覆盖位图...")
+            try:
+                self.refresh_range(conn, None, None, None)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        logger.info("数据覆盖位图构建完成")
+
+    def slots(self, city_id: int, start_date: str, end_date: str, group: str = GROUP_ROWS) -> np.ndarray:
+        """
+        读取 [start_date, end_date] 每个 15 分钟时间点的覆盖情况
+
+        Args:
+            city_id: 城市ID
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD，含)
+            group: 字段组
+
+        Returns:
+            长度为 天数 × 96 的布尔数组
+
+        Raises:
+            ValueError: 未知的字段组
+        """
+        if group not in self.groups:
+            raise ValueError(f"未知的字段组: {group}")
+
+        rows = self.db_manager.execute_query(
+            f"SELECT month, bits FROM {self.TABLE} "
+            "WHERE city_id = ? AND field_group = ? AND month >= ? AND month <= ?",
+            (city_id, group, start_date[:7], end_date[:7])
+        )
+        stored = {row['month']: row['bits'] for row in rows}
+
+        parts = []
+        for month in iter_months(start_date, end_date):
+            size = _month_days(month) * SLOTS_PER_DAY
+            bits = stored.get(month)
+            if bits is None:
+                parts.append(np.zeros(size, dtype=bool))
+            else:
+                parts.append(np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=size).astype(bool))
+        covered = np.concatenate(parts) if parts else np.zeros(0, dtype=bool)
+
+        # 去掉首月开始日之前与末月结束日之后的部分
+        head = (int(start_date[8:10]) - 1) * SLOTS_PER_DAY
+        tail = (int(end_date[8:10])) * SLOTS_PER_DAY - _month_days(end_date[:7]) * SLOTS_PER_DAY
+        return covered[head:len(covered) + tail]
+
+    def daily_counts(self, city_id: int, start_date: str, end_date: str, group: str = GROUP_ROWS) -> np.ndarray:
+        """
+        每天已覆盖的时间点数
+
+        Args:
+            同 slots
+
+        Returns:
+            长度为天数的整数数组（0~96），第 i 个元素对应 start_date 之后第 i 天
+        """
+        covered = self.slots(city_id, start_date, end_date, group)
+        return covered.reshape(-1, SLOTS_PER_DAY).sum(axis=1)
@@ -5,9 +5,17 @@
 """
 import sqlite3
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple
+from datetime import datetime, timedelta
 import os
+import pandas as pd
+from backend.models.columnar_store import ColumnarStore, WEATHER_VALUE_COLUMNS, month_key
+from backend.models.connection_pool import ConnectionPool
+from backend.models.rollup_store import RollupStore
+from backend.models.coverage_store import CoverageStore
+from backend.models.log_sink import LogSink
 
 # 配置日志
 logging.basicConfig(
@@ -17,21 +25,48 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _weather_keys(records: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    """提取记录的 (city_id, datetime) 键"""
+    return [(record.get('city_id'), record.get('datetime')) for record in records]
+
+
 class DatabaseManager:
     """
     数据库管理器类
     负责SQLite数据库的所有操作
     """
     
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        columnar_dir: Optional[str] = None,
+        pool_size: int = 8,
+        mmap_size: int = 256 * 1024 * 1024,
+        settings_ttl: float = 30.0
+    ):
         """
         初始化数据库管理器
         
         Args:
             db_path: 数据库文件路径
+            columnar_dir: 列式分块目录，默认为数据库文件旁的 <name>_columnar 目录
+            pool_size: 连接池最大连接数
+            mmap_size: 每个连接的内存映射大小（字节）
+            settings_ttl: 系统设置缓存的有效期（秒），其他进程修改设置后最迟在此时间内生效
         """
         self.db_path = db_path
         self._ensure_db_directory()
+        self.pool = ConnectionPool(db_path, max_size=pool_size, mmap_size=mmap_size)
+        self.log_sink: Optional[LogSink] = None
+        if columnar_dir is None:
+            columnar_dir = f"{os.path.splitext(db_path)[0]}_columnar"
+        self.columnar = ColumnarStore(self, columnar_dir)
+        self.rollups = RollupStore(self)
+        self.coverage = CoverageStore(self)
+        self.settings_ttl = settings_ttl
+        self._settings: Optional[Dict[str, str]] = None
+        self._settings_loaded = 0.0
+        self._settings_lock = threading.Lock()
         logger.info(f"数据库管理器初始化完成: {db_path}")
     
     def _ensure_db_directory(self):
@@ -42,20 +77,47 @@ class DatabaseManager:
             logger.info(f"创建数据库目录: {db_dir}")
     
     def get_connection(self):
-        """获取新的数据库连接"""
+        """获取新的数据库连接（调用方负责关闭；内部查询请使用连接池）"""
         try:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
-            return conn
+            return self.pool.create_connection()
         except sqlite3.Error as e:
             logger.error(f"数据库连接失败: {e}")
             raise
     
+    def connection(self):
+        """从连接池借出连接的上下文管理器"""
+        return self.pool.connection()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        return self.pool.stats()
+    
+    def attach_log_sink(self, sink: LogSink):
+        """
+        挂载异步日志写入器，之后 log_request/log_event 改为入队批量写入
+        
+        Args:
+            sink: 已启动的日志写入器
+        """
+        self.log_sink = sink
+    
+    def close(self):
+        """写入剩余日志并关闭连接池中的所有连接"""
+        if self.log_sink is not None:
+            self.log_sink.stop()
+        self.pool.close_all()
+    
     def init_database(self):
         """
         初始化数据库，创建所有必要的表
         """
-        conn = self.get_connection()
+        with self.connection() as conn:
+            self._create_tables(conn)
+        self.rollups.rebuild_if_empty()
+        self.coverage.rebuild_if_empty()
+    
+    def _create_tables(self, conn):
+        """在给定连接上执行建表与字段迁移"""
         cursor = conn.cursor()
         
         try:
@@ -142,7 +204,7 @@ class DatabaseManager:
                 CREATE TABLE IF NOT EXISTS api_cache (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     cache_key TEXT NOT NULL UNIQUE,
-                    response_data TEXT NOT NULL,
+                    response_data BLOB NOT NULL,
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     expired_at TEXT NOT NULL
                 )
@@ -186,6 +248,60 @@ class DatabaseManager:
                 )
             ''')
 
+            # 创建列式分块目录表 (weather_data 的按月列式副本)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS weather_chunks (
+                    city_id INTEGER NOT NULL,
+                    month TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    row_count INTEGER DEFAULT 0,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (city_id, month)
+                )
+            ''')
+
+            # 创建日/月汇总表 (weather_data 的派生统计)
+            self.rollups.create_tables(cursor)
+
+            # 创建数据覆盖位图表 (每个 15 分钟时间点 1 位)
+            self.coverage.create_tables(cursor)
+
+            # 创建后台任务表 (批量下载、导出等耗时操作)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending', -- pending, running, succeeded, failed, cancelled
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER DEFAULT 0,
+                    owner_pid INTEGER, -- 执行该任务的进程
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            try:
+                cursor.execute('ALTER TABLE jobs ADD COLUMN owner_pid INTEGER')
+                logger.info("添加 jobs.owner_pid 列成功")
+            except sqlite3.OperationalError:
+                pass
+
+            # 创建增量更新水位表 (每个城市、字段已完整入库的最后日期)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_watermarks (
+                    city_id INTEGER NOT NULL,
+                    field TEXT NOT NULL,
+                    last_complete TEXT NOT NULL,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (city_id, field)
+                )
+            ''')
+
             # 创建索引以提升查询性能
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_weather_city_datetime 
@@ -209,48 +325,38 @@ class DatabaseManager:
             logger.error(f"数据库初始化失败: {e}")
             conn.rollback()
             raise
-        finally:
-            conn.close()
     
     def execute_query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """
         执行查询SQL语句
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-            # 转换为字典列表
-            result = [dict(row) for row in rows]
-            logger.debug(f"查询成功，返回 {len(result)} 条记录")
-            return result
-        except sqlite3.Error as e:
-            logger.error(f"查询执行失败: {e}")
-            raise
-        finally:
-            conn.close()
+        with self.connection() as conn:
+            try:
+                cursor = conn.execute(sql, params)
+                rows = cursor.fetchall()
+                # 转换为字典列表
+                result = [dict(row) for row in rows]
+                logger.debug(f"查询成功，返回 {len(result)} 条记录")
+                return result
+            except sqlite3.Error as e:
+                logger.error(f"查询执行失败: {e}")
+                raise
     
     def execute_update(self, sql: str, params: tuple = ()) -> int:
         """
         执行更新SQL语句（INSERT, UPDATE, DELETE）
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(sql, params)
-            conn.commit()
-            affected_rows = cursor.rowcount
-            logger.debug(f"更新成功，影响 {affected_rows} 行")
-            return affected_rows
-        except sqlite3.Error as e:
-            logger.error(f"更新执行失败: {e}")
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        with self.connection() as conn:
+            try:
+                cursor = conn.execute(sql, params)
+                conn.commit()
+                affected_rows = cursor.rowcount
+                logger.debug(f"更新成功，影响 {affected_rows} 行")
+                return affected_rows
+            except sqlite3.Error as e:
+                logger.error(f"更新执行失败: {e}")
+                conn.rollback()
+                raise
     
     def bulk_insert(self, table: str, data_list: List[Dict[str, Any]]) -> int:
         """
@@ -259,34 +365,119 @@ class DatabaseManager:
         if not data_list:
             return 0
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        # 获取列名
+        columns = list(data_list[0].keys())
+        placeholders = ','.join(['?' for _ in columns])
+        column_names = ','.join(columns)
         
-        try:
-            # 获取列名
-            columns = list(data_list[0].keys())
-            placeholders = ','.join(['?' for _ in columns])
-            column_names = ','.join(columns)
-            
-            sql = f"INSERT OR REPLACE INTO {table} ({column_names}) VALUES ({placeholders})"
-            
-            # 准备数据
-            values_list = [tuple(item[col] for col in columns) for item in data_list]
-            
-            cursor.executemany(sql, values_list)
-            conn.commit()
-            
-            inserted_rows = cursor.rowcount
-            logger.info(f"批量插入成功，插入 {inserted_rows} 行到表 {table}")
-            return inserted_rows
-            
-        except sqlite3.Error as e:
-            logger.error(f"批量插入失败: {e}")
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
-    
+        sql = f"INSERT OR REPLACE INTO {table} ({column_names}) VALUES ({placeholders})"
+        
+        # 准备数据
+        values_list = [tuple(item[col] for col in columns) for item in data_list]
+        
+        with self.connection() as conn:
+            try:
+                cursor = conn.executemany(sql, values_list)
+                inserted_rows = cursor.rowcount
+                if table == 'weather_data':
+                    # 汇总表、覆盖位图与原始数据在同一事务中更新
+                    self.rollups.refresh_records(conn, _weather_keys(data_list))
+                    self.coverage.refresh_records(conn, _weather_keys(data_list))
+                conn.commit()
+                
+                logger.info(f"批量插入成功，插入 {inserted_rows} 行到表 {table}")
+            except sqlite3.Error as e:
+                logger.error(f"批量插入失败: {e}")
+                conn.rollback()
+                raise
+        
+        # 在归还连接后再处理分块失效，避免同一线程同时占用两个连接
+        if table == 'weather_data':
+            self._invalidate_weather_chunks(_weather_keys(data_list))
+        return inserted_rows
+
+    def upsert_weather_data(self, data_list: List[Dict[str, Any]]) -> int:
+        """
+        合并写入天气数据
+        与 bulk_insert 的 INSERT OR REPLACE 不同，已存在的记录只更新本次提供的非空字段，
+        用于只下载部分字段的补缺请求
+
+        Args:
+            data_list: 记录列表，必须包含 city_id 与 datetime
+
+        Returns:
+            写入的行数
+        """
+        if not data_list:
+            return 0
+
+        columns = list(data_list[0].keys())
+        values_list = [tuple(item.get(col) for col in columns) for item in data_list]
+        return self._write_weather_rows(columns, values_list, merge=True)
+
+    def write_weather_columns(self, city_id: int, columns: Dict[str, List[Any]], merge: bool = True) -> int:
+        """
+        按列写入单个城市的天气数据（解析器输出的列式结果），不构造逐条字典
+
+        Args:
+            city_id: 城市ID
+            columns: {'datetime': [...], field: [...]}，各列长度一致
+            merge: 是否合并写入（只更新非空字段）；False 时整行替换
+
+        Returns:
+            写入的行数
+        """
+        if not columns.get('datetime'):
+            return 0
+
+        names = list(columns.keys())
+        length = len(columns['datetime'])
+        values_list = list(zip([city_id] * length, *(columns[name] for name in names)))
+        return self._write_weather_rows(['city_id'] + names, values_list, merge=merge)
+
+    def _write_weather_rows(self, columns: List[str], values_list: List[tuple], merge: bool) -> int:
+        """
+        写入 weather_data 行并在同一事务中更新汇总表与覆盖位图
+
+        Args:
+            columns: 列名，必须包含 city_id 与 datetime
+            values_list: 与列名对应的值元组列表
+            merge: 是否合并写入
+
+        Returns:
+            写入的行数
+        """
+        placeholders = ','.join(['?' for _ in columns])
+        sql = f"INSERT INTO weather_data ({','.join(columns)}) VALUES ({placeholders})"
+        if merge:
+            value_columns = [c for c in columns if c not in ('city_id', 'datetime')]
+            updates = ', '.join(f"{c} = COALESCE(excluded.{c}, weather_data.{c})" for c in value_columns)
+            if updates:
+                sql += f" ON CONFLICT(city_id, datetime) DO UPDATE SET {updates}"
+            else:
+                sql += " ON CONFLICT(city_id, datetime) DO NOTHING"
+        else:
+            sql = "INSERT OR REPLACE" + sql[len("INSERT"):]
+
+        city_index, time_index = columns.index('city_id'), columns.index('datetime')
+        touched = [(row[city_index], row[time_index]) for row in values_list]
+
+        with self.connection() as conn:
+            try:
+                cursor = conn.executemany(sql, values_list)
+                affected = cursor.rowcount
+                self.rollups.refresh_records(conn, touched)
+                self.coverage.refresh_records(conn, touched)
+                conn.commit()
+                logger.info(f"{'合并' if merge else '覆盖'}写入天气数据成功，{affected} 行")
+            except sqlite3.Error as e:
+                logger.error(f"写入天气数据失败: {e}")
+                conn.rollback()
+                raise
+
+        self._invalidate_weather_chunks(touched)
+        return affected
+
     def insert_weather_data(self, data: Dict[str, Any]) -> int:
         """
         插入单条天气数据
@@ -297,21 +488,21 @@ class DatabaseManager:
         
         sql = f"INSERT OR REPLACE INTO weather_data ({columns}) VALUES ({placeholders})"
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.connection() as conn:
+            try:
+                cursor = conn.execute(sql, values)
+                record_id = cursor.lastrowid
+                self.rollups.refresh_records(conn, _weather_keys([data]))
+                self.coverage.refresh_records(conn, _weather_keys([data]))
+                conn.commit()
+                logger.debug(f"插入天气数据成功，ID: {record_id}")
+            except sqlite3.Error as e:
+                logger.error(f"插入天气数据失败: {e}")
+                conn.rollback()
+                raise
         
-        try:
-            cursor.execute(sql, values)
-            conn.commit()
-            record_id = cursor.lastrowid
-            logger.debug(f"插入天气数据成功，ID: {record_id}")
-            return record_id
-        except sqlite3.Error as e:
-            logger.error(f"插入天气数据失败: {e}")
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        self._invalidate_weather_chunks(_weather_keys([data]))
+        return record_id
     
     def get_weather_data(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -337,6 +528,84 @@ class DatabaseManager:
         
         return self.execute_query(sql, tuple(params))
 
+    def iter_weather_records(self, city_id: int, start_date: str, end_date: str,
+                             columns: Optional[List[str]] = None,
+                             batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """
+        按时间顺序分批读取天气数据（生成器），用于导出等大数据量场景
+        使用 datetime 键集分页，每批单独借还连接，不会长时间占用连接池
+
+        Args:
+            city_id: 城市ID
+            start_date: 开始时间 (含)
+            end_date: 结束时间 (含)
+            columns: 需要的列，None 表示全部列；datetime 总会包含在内
+            batch_size: 每批读取的行数
+
+        Yields:
+            单条记录字典
+        """
+        if columns:
+            valid = {row['name'] for row in self.execute_query("PRAGMA table_info(weather_data)")}
+            selected = ['datetime'] + [c for c in columns if c in valid and c != 'datetime']
+            select_clause = ", ".join(selected)
+        else:
+            select_clause = "*"
+        sql = (
+            f"SELECT {select_clause} FROM weather_data "
+            "WHERE city_id = ? AND datetime {op} ? AND datetime <= ? "
+            "ORDER BY datetime LIMIT ?"
+        )
+        # 首批包含 start_date 本身，之后从上一批最后一条之后继续
+        first_sql = sql.format(op='>=')
+        next_sql = sql.format(op='>')
+
+        query, last = first_sql, start_date
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(query, (city_id, last, end_date, batch_size)).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < batch_size:
+                return
+            query, last = next_sql, rows[-1]['datetime']
+
+    def get_weather_frame(self, filters: Dict[str, Any], fields: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        根据过滤条件获取天气数据（列式 DataFrame）
+        与 get_weather_data 过滤语义一致，但直接返回列数组，不构造逐行字典
+        
+        Args:
+            filters: 过滤条件 (city_id 必填, start_date/end_date 可选)
+            fields: 需要的字段列表，None 表示全部数值字段
+            
+        Returns:
+            按 datetime 排序的 DataFrame
+        """
+        if 'city_id' not in filters:
+            return pd.DataFrame(self.get_weather_data(filters))
+        
+        return self.columnar.read_frame(
+            filters['city_id'],
+            filters.get('start_date'),
+            filters.get('end_date'),
+            fields
+        )
+
+    def _invalidate_weather_chunks(self, keys: Iterable[Tuple[int, str]]):
+        """使写入记录所在月份的列式分块失效"""
+        touched = {}
+        for city_id, dt in keys:
+            if city_id is None or not dt:
+                continue
+            touched.setdefault(city_id, set()).add(month_key(dt))
+        
+        for city_id, months in touched.items():
+            try:
+                self.columnar.invalidate(city_id, months)
+            except Exception as e:
+                logger.warning(f"列式分块失效失败: 城市ID={city_id}, {e}")
+
     def delete_weather_data(self, filters: Dict[str, Any]) -> int:
         """
         根据过滤条件删除天气数据
@@ -369,7 +638,30 @@ class DatabaseManager:
         where_clause = " AND ".join(conditions)
         sql = f"DELETE FROM weather_data WHERE {where_clause}"
         
-        return self.execute_update(sql, tuple(params))
+        with self.connection() as conn:
+            try:
+                deleted = conn.execute(sql, tuple(params)).rowcount
+                if deleted:
+                    span = (
+                        filters.get('city_id'),
+                        filters['start_date'][:10] if 'start_date' in filters else None,
+                        filters['end_date'][:10] if 'end_date' in filters else None
+                    )
+                    self.rollups.refresh_range(conn, *span)
+                    self.coverage.refresh_range(conn, *span)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"删除天气数据失败: {e}")
+                conn.rollback()
+                raise
+        
+        if deleted and 'city_id' in filters:
+            self._rewind_watermarks(filters['city_id'], filters.get('start_date'))
+            try:
+                self.columnar.invalidate_city(filters['city_id'])
+            except Exception as e:
+                logger.warning(f"列式分块失效失败: 城市ID={filters['city_id']}, {e}")
+        return deleted
 
     def get_weather_data_stats(self, filters: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -413,12 +705,133 @@ class DatabaseManager:
             return dict(result[0])
         return {'count': 0, 'start_date': None, 'end_date': None}
 
+    def get_city_record_stats(self) -> Dict[int, Dict[str, Any]]:
+        """
+        一次查询获取所有城市的记录数与时间范围
+        
+        Returns:
+            {city_id: {count, earliest, latest}}，没有数据的城市不包含在内
+        """
+        sql = '''
+            SELECT city_id, COUNT(*) as count, MIN(datetime) as earliest, MAX(datetime) as latest
+            FROM weather_data
+            GROUP BY city_id
+        '''
+        return {row.pop('city_id'): row for row in self.execute_query(sql)}
 
+    def get_daily_record_counts(self, city_id: int, start_date: str, end_date: str) -> Dict[str, int]:
+        """
+        从日汇总表读取某城市每日的记录数
+        
+        Args:
+            city_id: 城市ID
+            start_date: 开始日期 (YYYY-MM-DD，含)
+            end_date: 结束日期 (YYYY-MM-DD，含)
+            
+        Returns:
+            {date: record_count}，没有数据的日期不包含在内
+        """
+        rows = self.execute_query(
+            f"SELECT date, record_count FROM {RollupStore.DAILY_TABLE} "
+            "WHERE city_id = ? AND date >= ? AND date <= ?",
+            (city_id, start_date, end_date)
+        )
+        return {row['date']: row['record_count'] for row in rows}
+
+
+
+    def get_watermarks(self, city_id: int, fields: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        获取城市各字段的增量更新水位（已完整入库的最后日期）
+        没有水位记录的字段按已有数据推断：最后一个非空值所在日期（该日不完整时取前一天）
+
+        Args:
+            city_id: 城市ID
+            fields: 字段列表
+
+        Returns:
+            {field: 'YYYY-MM-DD'}，本地没有该字段任何数据时为 None
+        """
+        fields = list(fields)
+        rows = self.execute_query(
+            "SELECT field, last_complete FROM ingest_watermarks WHERE city_id = ?", (city_id,)
+        )
+        stored = {row['field']: row['last_complete'] for row in rows}
+
+        marks = {}
+        for field in fields:
+            if field in stored:
+                marks[field] = stored[field]
+                continue
+            if field not in WEATHER_VALUE_COLUMNS:
+                marks[field] = None
+                continue
+            # 按 (city_id, datetime) 索引倒序扫描到第一个非空值即停止
+            latest = self.execute_query(
+                f"SELECT datetime FROM weather_data WHERE city_id = ? AND {field} IS NOT NULL "
+                "ORDER BY datetime DESC LIMIT 1",
+                (city_id,)
+            )
+            if not latest:
+                marks[field] = None
+                continue
+            last = datetime.fromisoformat(latest[0]['datetime'])
+            if (last.hour, last.minute) < (23, 45):
+                last -= timedelta(days=1)
+            marks[field] = last.strftime('%Y-%m-%d')
+        return marks
+
+    def set_watermarks(self, city_id: int, marks: Dict[str, str]) -> int:
+        """
+        保存城市各字段的增量更新水位
+
+        Args:
+            city_id: 城市ID
+            marks: {field: 'YYYY-MM-DD'}
+
+        Returns:
+            写入的行数
+        """
+        if not marks:
+            return 0
+        now = datetime.now().isoformat()
+        with self.connection() as conn:
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO ingest_watermarks (city_id, field, last_complete, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(city_id, field, mark, now) for field, mark in marks.items()]
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"保存更新水位失败: {e}")
+                conn.rollback()
+                raise
+        return len(marks)
+
+    def _rewind_watermarks(self, city_id: int, start: Optional[str]):
+        """删除数据后回退水位，使被删除的日期在下次增量更新时重新下载"""
+        try:
+            if start is None:
+                self.execute_update("DELETE FROM ingest_watermarks WHERE city_id = ?", (city_id,))
+                return
+            previous_day = (datetime.fromisoformat(start[:10]) - timedelta(days=1)).strftime('%Y-%m-%d')
+            self.execute_update(
+                "UPDATE ingest_watermarks SET last_complete = ?, updated_at = ? "
+                "WHERE city_id = ? AND last_complete > ?",
+                (previous_day, datetime.now().isoformat(), city_id, previous_day)
+            )
+        except Exception as e:
+            logger.warning(f"回退更新水位失败: 城市ID={city_id}, {e}")
 
     def log_request(self, ip: str, ua: str, path: str, method: str, status: int, latency: float, host_name: str = None):
         """
         记录系统日志 (访问日志)
+        挂载了异步写入器时仅入队，由后台线程批量写入
         """
+        if self.log_sink is not None and self.log_sink.running:
+            self.log_sink.submit('system_logs', (ip, host_name, ua, path, method, status, latency))
+            return
         try:
             sql = '''
                 INSERT INTO system_logs (ip_address, host_name, user_agent, path, method, status_code, latency_ms)
@@ -429,10 +842,58 @@ class DatabaseManager:
             # 日志记录失败不应该影响主流程，仅打印错误
             logger.error(f"记录请求日志失败: {e}")
 
+    def get_settings(self) -> Dict[str, str]:
+        """
+        获取全部系统设置（带缓存，过期或本进程修改后重新读取）
+
+        Returns:
+            设置键值字典（调用方不应修改）
+        """
+        now = time.monotonic()
+        settings = self._settings
+        if settings is not None and now - self._settings_loaded < self.settings_ttl:
+            return settings
+        with self._settings_lock:
+            if self._settings is None or now - self._settings_loaded >= self.settings_ttl:
+                rows = self.execute_query("SELECT key, value FROM system_settings")
+                self._settings = {row['key']: row['value'] for row in rows}
+                self._settings_loaded = time.monotonic()
+            return self._settings
+
+    def get_setting(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """获取单个系统设置"""
+        return self.get_settings().get(key, default)
+
+    def update_settings(self, values: Dict[str, Any]):
+        """
+        更新系统设置并使缓存失效
+
+        Args:
+            values: 设置键值字典，值统一保存为字符串
+        """
+        with self.connection() as conn:
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO system_settings (key, value, updated_at) "
+                    "VALUES (?, ?, CURRENT_TIMESTAMP)",
+                    [(key, str(value)) for key, value in values.items()]
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"更新系统设置失败: {e}")
+                conn.rollback()
+                raise
+        with self._settings_lock:
+            self._settings = None
+
     def log_event(self, level: str, source: str, message: str, details: str = None):
         """
         记录事件日志 (系统告警等)
+        挂载了异步写入器时仅入队，由后台线程批量写入
         """
+        if self.log_sink is not None and self.log_sink.running:
+            self.log_sink.submit('event_logs', (level, source, message, details))
+            return
         try:
             sql = '''
                 INSERT INTO event_logs (level, source, message, details)
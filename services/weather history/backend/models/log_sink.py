@@ -0,0 +1,210 @@
+"""
+异步日志写入器
+访问日志、事件日志先进入有界内存队列，由后台线程按批次 executemany 写入，
+请求线程不再等待 INSERT + COMMIT
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from queue import Queue, Empty, Full
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 各日志表的插入语句（created_at 在入队时确定，保证时间准确）
+LOG_INSERT_SQL = {
+    'system_logs': '''
+        INSERT INTO system_logs (ip_address, host_name, user_agent, path, method, status_code, latency_ms, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'event_logs': '''
+        INSERT INTO event_logs (level, source, message, details, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+}
+
+
+def utc_timestamp() -> str:
+    """返回与 SQLite CURRENT_TIMESTAMP 相同格式的 UTC 时间字符串"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class LogSink:
+    """
+    批量日志写入器
+    每 flush_interval_ms 毫秒或累计 batch_size 条记录写入一次；
+    队列满时最多等待 put_timeout 秒，仍无空位则丢弃并计数
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval_ms: int = 500,
+        put_timeout: float = 0.0
+    ):
+        """
+        初始化日志写入器
+
+        Args:
+            db_manager: 数据库管理器实例
+            max_queue: 队列最大长度
+            batch_size: 单批最大写入条数
+            flush_interval_ms: 最长写入间隔（毫秒）
+            put_timeout: 队列满时的最长等待时间（秒），0 表示立即丢弃
+        """
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout
+
+        self._queue: Queue = Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        # 统计计数由请求线程与写入线程共同更新
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'errors': 0,
+        }
+
+    def _count(self, key: str, amount: int = 1) -> int:
+        """累加统计计数，返回累加后的值"""
+        with self._stats_lock:
+            self._stats[key] += amount
+            return self._stats[key]
+
+    @property
+    def running(self) -> bool:
+        """后台线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台写入线程"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self._thread.start()
+        logger.info(f"异步日志写入器已启动: 批量 {self.batch_size} 条 / {int(self.flush_interval * 1000)}ms")
+
+    def submit(self, table: str, row: Tuple) -> bool:
+        """
+        提交一条日志
+
+        Args:
+            table: 目标表 (system_logs / event_logs)
+            row: 与 LOG_INSERT_SQL 中列顺序一致的值元组（不含 created_at）
+
+        Returns:
+            是否成功入队（队列满被丢弃时返回 False）
+        """
+        item = (table, tuple(row) + (utc_timestamp(),))
+        try:
+            if self.put_timeout > 0:
+                self._queue.put(item, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except Full:
+            dropped = self._count('dropped')
+            if dropped % 1000 == 1:
+                logger.warning(f"日志队列已满，已丢弃 {dropped} 条日志")
+            return False
+        self._count('enqueued')
+        return True
+
+    def _drain(self, batch: List[Tuple[str, Tuple]] = None) -> List[Tuple[str, Tuple]]:
+        """从队列取出日志，补足到 batch_size 条"""
+        batch = batch if batch is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Tuple[str, Tuple]]):
+        """按表分组后使用 executemany 在同一事务中写入"""
+        if not batch:
+            return
+        grouped: Dict[str, List[Tuple]] = {}
+        for table, row in batch:
+            grouped.setdefault(table, []).append(row)
+
+        try:
+            with self.db_manager.connection() as conn:
+                for table, rows in grouped.items():
+                    conn.executemany(LOG_INSERT_SQL[table], rows)
+                conn.commit()
+            with self._stats_lock:
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+        except Exception as e:
+            # 日志写入失败不应该影响主流程，仅打印错误
+            self._count('errors')
+            logger.error(f"批量写入日志失败 ({len(batch)} 条): {e}")
+
+    def _run(self):
+        """后台线程主循环"""
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                continue
+
+            # 攒批：直到达到批量上限或超过写入间隔
+            deadline = time.monotonic() + self.flush_interval
+            batch = self._drain([first])
+            while len(batch) < self.batch_size and time.monotonic() < deadline:
+                if self._stop_event.wait(min(0.05, max(0.0, deadline - time.monotonic()))):
+                    break
+                self._drain(batch)
+
+            with self._flush_lock:
+                self._write(batch)
+
+    def flush(self) -> int:
+        """
+        同步写入队列中的全部日志
+
+        Returns:
+            本次写入的条数
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._write(batch)
+                written += len(batch)
+        return written
+
+    def stop(self, timeout: float = 5.0):
+        """停止后台线程并写入剩余日志"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取写入器统计信息
+
+        Returns:
+            统计字典
+        """
+        with self._stats_lock:
+            counters = dict(self._stats)
+        return {
+            **counters,
+            'pending': self._queue.qsize(),
+            'running': self.running,
+        }
@@ -0,0 +1,221 @@
+"""
+日/月汇总表
+按 城市/日期 与 城市/月份 物化 weather_data 中各数值字段的样本数、总和、极值、平方和与正值计数，
+以及每日天气代码频次。写入/删除原始数据时只重算受影响的日期，统计查询按天数而非样本数扩展
+"""
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.models.columnar_store import WEATHER_VALUE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 每个字段在汇总表中保存的统计量（列名为 <field>_<suffix>）
+ROLLUP_SUFFIXES = ('count', 'sum', 'min', 'max', 'sumsq', 'pos')
+
+
+def rollup_columns(field: str) -> List[str]:
+    """返回字段在汇总表中的全部列名"""
+    return [f"{field}_{suffix}" for suffix in ROLLUP_SUFFIXES]
+
+
+def _next_month(month: str) -> str:
+    """返回下一个月份键 (YYYY-MM)"""
+    year, mon = int(month[:4]), int(month[5:7]) + 1
+    if mon > 12:
+        year, mon = year + 1, 1
+    return f"{year:04d}-{mon:02d}"
+
+
+class RollupStore:
+    """
+    汇总表维护类
+    weather_data 仍是唯一的权威数据源，weather_daily / weather_monthly / weather_daily_codes
+    是其派生数据，在与原始数据相同的事务中增量更新
+    """
+
+    DAILY_TABLE = 'weather_daily'
+    MONTHLY_TABLE = 'weather_monthly'
+    CODES_TABLE = 'weather_daily_codes'
+
+    def __init__(self, db_manager):
+        """
+        初始化汇总表维护类
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
+        self.db_manager = db_manager
+        value_columns = []
+        for field in WEATHER_VALUE_COLUMNS:
+            value_columns.extend(rollup_columns(field))
+        self.value_columns = value_columns
+
+    def create_tables(self, cursor):
+        """
+        创建汇总表，并为新增的数值字段补齐列
+
+        Args:
+            cursor: 建表所用的游标（由 DatabaseManager 在同一事务中调用）
+        """
+        value_ddl = ",\n                ".join(f"{column} REAL" for column in self.value_columns)
+        for table, key, extra in (
+            (self.DAILY_TABLE, 'date', ''),
+            (self.MONTHLY_TABLE, 'month', 'day_count INTEGER NOT NULL DEFAULT 0,'),
+        ):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    city_id INTEGER NOT NULL,
+                    {key} TEXT NOT NULL,
+                    record_count INTEGER NOT NULL DEFAULT 0,
+                    {extra}
+                    {value_ddl},
+                    PRIMARY KEY (city_id, {key})
+                )
+            ''')
+            existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+            for column in self.value_columns:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} REAL")
+                    logger.info(f"添加 {table}.{column} 列成功")
+
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.CODES_TABLE} (
+                city_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                code INTEGER NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (city_id, date, code)
+            )
+        ''')
+
+    def _daily_select(self) -> str:
+        """从原始数据按日聚合的 SELECT 列表"""
+        parts = ["city_id", "substr(datetime, 1, 10)", "COUNT(*)"]
+        for field in WEATHER_VALUE_COLUMNS:
+            parts.extend([
+                f"COUNT({field})", f"SUM({field})", f"MIN({field})", f"MAX({field})",
+                f"SUM({field} * {field})", f"SUM(CASE WHEN {field} > 0 THEN 1 ELSE 0 END)"
+            ])
+        return ", ".join(parts)
+
+    def _monthly_select(self) -> str:
+        """从日汇总按月合并的 SELECT 列表"""
+        parts = ["city_id", "substr(date, 1, 7)", "SUM(record_count)", "COUNT(*)"]
+        for field in WEATHER_VALUE_COLUMNS:
+            count, total, low, high, sumsq, pos = rollup_columns(field)
+            parts.extend([
+                f"SUM({count})", f"SUM({total})", f"MIN({low})", f"MAX({high})",
+                f"SUM({sumsq})", f"SUM({pos})"
+            ])
+        return ", ".join(parts)
+
+    @staticmethod
+    def _range_condition(
+        column: str,
+        city_id: Optional[int],
+        start: Optional[str],
+        end: Optional[str],
+        end_op: str = '<='
+    ) -> Tuple[str, list]:
+        """生成城市与时间范围条件"""
+        conditions, params = [], []
+        if city_id is not None:
+            conditions.append("city_id = ?")
+            params.append(city_id)
+        if start:
+            conditions.append(f"{column} >= ?")
+            params.append(start)
+        if end:
+            conditions.append(f"{column} {end_op} ?")
+            params.append(end)
+        return (" AND ".join(conditions) or "1=1"), params
+
+    def refresh_range(self, conn, city_id: Optional[int], start_date: Optional[str], end_date: Optional[str]):
+        """
+        在给定连接（调用方的事务）中重算 [start_date, end_date] 内各日及所在月份的汇总
+
+        Args:
+            conn: 数据库连接，由调用方提交
+            city_id: 城市ID，None 表示所有城市
+            start_date: 开始日期 (YYYY-MM-DD)，None 表示不限
+            end_date: 结束日期 (YYYY-MM-DD)，None 表示不限
+        """
+        # 原始数据按时间字符串比较，结束条件取次日零点（不含）以覆盖当天所有时刻
+        next_day = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat() if end_date else None
+        raw_where, raw_params = self._range_condition('datetime', city_id, start_date, next_day, '<')
+        day_where, day_params = self._range_condition('date', city_id, start_date, end_date)
+
+        conn.execute(f"DELETE FROM {self.DAILY_TABLE} WHERE {day_where}", day_params)
+        conn.execute(
+            f"INSERT INTO {self.DAILY_TABLE} (city_id, date, record_count, {', '.join(self.value_columns)}) "
+            f"SELECT {self._daily_select()} FROM weather_data WHERE {raw_where} "
+            f"GROUP BY city_id, substr(datetime, 1, 10)",
+            raw_params
+        )
+
+        conn.execute(f"DELETE FROM {self.CODES_TABLE} WHERE {day_where}", day_params)
+        conn.execute(
+            f"INSERT INTO {self.CODES_TABLE} (city_id, date, code, n) "
+            f"SELECT city_id, substr(datetime, 1, 10), CAST(weather_code AS INTEGER), COUNT(*) "
+            f"FROM weather_data WHERE {raw_where} AND weather_code IS NOT NULL "
+            f"GROUP BY city_id, substr(datetime, 1, 10), CAST(weather_code AS INTEGER)",
+            raw_params
+        )
+
+        # 月汇总由日汇总合并，范围扩展到受影响的整月
+        start_month = start_date[:7] if start_date else None
+        end_month = end_date[:7] if end_date else None
+        month_where, month_params = self._range_condition('month', city_id, start_month, end_month)
+        source_where, source_params = self._range_condition(
+            'date', city_id, start_month, _next_month(end_month) if end_month else None, '<'
+        )
+        conn.execute(f"DELETE FROM {self.MONTHLY_TABLE} WHERE {month_where}", month_params)
+        conn.execute(
+            f"INSERT INTO {self.MONTHLY_TABLE} "
+            f"(city_id, month, record_count, day_count, {', '.join(self.value_columns)}) "
+            f"SELECT {self._monthly_select()} FROM {self.DAILY_TABLE} "
+            f"WHERE {source_where} GROUP BY city_id, substr(date, 1, 7)",
+            source_params
+        )
+
+    def refresh_records(self, conn, keys: Iterable[Tuple[int, str]]):
+        """
+        根据写入记录的 (city_id, datetime) 重算其所在日期的汇总（每个城市重算一个连续日期区间）
+
+        Args:
+            conn: 数据库连接，由调用方提交
+            keys: 写入记录的 (city_id, datetime) 键
+        """
+        spans: Dict[int, List[str]] = {}
+        for city_id, dt in keys:
+            if city_id is None or not dt:
+                continue
+            day = dt[:10]
+            span = spans.get(city_id)
+            if span is None:
+                spans[city_id] = [day, day]
+            elif day < span[0]:
+                span[0] = day
+            elif day > span[1]:
+                span[1] = day
+
+        for city_id, (start, end) in spans.items():
+            self.refresh_range(conn, city_id, start, end)
+
+    def rebuild_if_empty(self):
+        """汇总表为空而原始数据存在时（旧数据库升级）全量重建"""
+        with self.db_manager.connection() as conn:
+            has_rollup = conn.execute(f"SELECT 1 FROM {self.DAILY_TABLE} LIMIT 1").fetchone()
+            has_raw = conn.execute("SELECT 1 FROM weather_data LIMIT 1").fetchone()
+            if has_rollup or not has_raw:
+                return
+            logger.info("首次构建日/月汇总表...")
+            try:
+                self.refresh_range(conn, None, None, None)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        logger.info("日/月汇总表构建完成")
@@ -2,16 +2,26 @@
 API路由
 定义所有RESTful API接口
 """
+import json
 import logging
-from flask import Blueprint, request, jsonify, send_file
-from typing import Dict, Any
-from io import BytesIO
+import os
+import tempfile
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+from typing import Dict, Any, Iterator, List
+from urllib.parse import quote
 from datetime import datetime
 from backend.services.weather_service import WeatherService
 from backend.services.data_exporter import DataExporter
 from backend.services.data_analyzer import DataAnalyzer
+from backend.services.job_queue import JobQueue, JobContext, JOB_SUCCEEDED
+from backend.services.field_registry import FIELD_REGISTRY
+from backend.services.columnar_response import (
+    FORMAT_RECORDS, FORMAT_ARROW, RESPONSE_FORMATS, JSON_MIMETYPE, ARROW_MIMETYPE,
+    arrow_available, encode_columns, encode_arrow, dumps_json, maybe_gzip
+)
 from backend.models.city import CityManager
-from backend.config import AVAILABLE_FIELDS, DEFAULT_FIELDS
+from backend.models.coverage_store import GROUP_ROWS
+from backend.config import DEFAULT_FIELDS, EXPORT_DIR, RESPONSE_GZIP_MIN_BYTES, RESPONSE_GZIP_LEVEL
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +34,8 @@ data_exporter: DataExporter = None
 data_analyzer: DataAnalyzer = None
 city_manager: CityManager = None
 data_manager = None  # 数据管理器
+job_queue: JobQueue = None  # 后台任务队列
+auto_update_scheduler = None  # 定时增量更新调度器
 
 
 def init_api_services(
@@ -31,7 +43,9 @@ def init_api_services(
     de: DataExporter,
     da: DataAnalyzer,
     cm: CityManager,
-    dm=None  # 数据管理器
+    dm=None,  # 数据管理器
+    jq: JobQueue = None,  # 后台任务队列
+    us=None  # 定时增量更新调度器
 ):
     """
     初始化API服务
@@ -42,16 +56,208 @@ def init_api_services(
         da: 数据分析器实例
         cm: 城市管理器实例
         dm: 数据管理器实例
+        jq: 后台任务队列实例
+        us: 定时增量更新调度器实例
     """
-    global weather_service, data_exporter, data_analyzer, city_manager, data_manager
+    global weather_service, data_exporter, data_analyzer, city_manager, data_manager, job_queue, \
+        auto_update_scheduler
     weather_service = ws
     data_exporter = de
     data_analyzer = da
     city_manager = cm
     data_manager = dm
+    job_queue = jq
+    auto_update_scheduler = us
+    if jq is not None:
+        jq.register('batch_download', _job_batch_download)
+        jq.register('batch_download_all', _job_batch_download_all)
+        jq.register('auto_update', _job_auto_update)
+        jq.register('auto_update_all', _job_auto_update_all)
+        jq.register('export_bulk', _job_export_bulk)
     logger.info("API服务初始化完成")
 
 
+# ========== 后台任务处理函数 ==========
+
+def _job_batch_download(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """后台任务：下载单个城市的数据"""
+    result = data_manager.batch_download(
+        params['city_id'],
+        params['start_date'],
+        params['end_date'],
+        params['fields'],
+        progress_callback=ctx.update_progress,
+        should_cancel=lambda: ctx.cancelled
+    )
+    ctx.check_cancelled()
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    return result
+
+
+def _job_batch_download_all(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """后台任务：下载所有城市的数据"""
+    def report(cities):
+        ctx.update_progress({
+            'total_chunks': sum(c['total_chunks'] for c in cities),
+            'done_chunks': sum(c['done_chunks'] for c in cities),
+            'failed_chunks': sum(c['failed_chunks'] for c in cities),
+            'cities': cities
+        })
+
+    result = data_manager.batch_download_all_cities(
+        params['start_date'],
+        params['end_date'],
+        params['fields'],
+        progress_callback=report,
+        should_cancel=lambda: ctx.cancelled
+    )
+    ctx.check_cancelled()
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    return result
+
+
+def _job_auto_update(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """后台任务：自动更新最近的数据"""
+    result = data_manager.auto_update_latest_data(
+        params['city_id'],
+        params['fields'],
+        params['days_back'],
+        progress_callback=ctx.update_progress,
+        should_cancel=lambda: ctx.cancelled
+    )
+    ctx.check_cancelled()
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    return result
+
+
+def _job_auto_update_all(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """后台任务：立即为所有城市执行一轮增量更新"""
+    result = auto_update_scheduler.run_once(
+        should_cancel=lambda: ctx.cancelled,
+        progress_callback=ctx.update_progress
+    )
+    ctx.check_cancelled()
+    if result.get('skipped'):
+        raise RuntimeError('已有一轮增量更新正在运行')
+    return result
+
+
+def _job_export_bulk(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """后台任务：导出多个城市的完整天气数据，文件保存在 EXPORT_DIR 中供下载"""
+    city_ids = params['city_ids']
+    start_date = params['start_date']
+    end_date = params['end_date']
+    export_format = params.get('format', 'excel')
+    
+    # 获取所有可能的字段
+    all_fields = list(FIELD_REGISTRY.fields)
+    
+    cities = []
+    for index, city_id in enumerate(city_ids):
+        ctx.check_cancelled()
+        ctx.update_progress({'stage': 'fetching', 'done_cities': index, 'total_cities': len(city_ids)})
+        
+        city_info = city_manager.get_city_by_id(city_id)
+        if not city_info: continue
+        
+        # 先补齐本地数据库中缺失的日期/字段，随后直接从数据库流式读取
+        weather_service.sync_local_data(
+            city_id,
+            city_info['longitude'],
+            city_info['latitude'],
+            start_date,
+            end_date,
+            all_fields
+        )
+        cities.append(city_info)
+    
+    ctx.check_cancelled()
+    ctx.update_progress({'stage': 'writing', 'done_cities': len(city_ids), 'total_cities': len(city_ids)})
+    filename = f"广西天气数据_批量_{start_date}_{end_date}"
+    
+    if export_format == 'csv':
+        mimetype = 'text/csv'
+        filename += '.csv'
+    else:
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        filename += '.xlsx'
+    
+    written = [0]
+    
+    def records():
+        # 逐城市读取数据库并附加城市名称，任意时刻只保留一批记录在内存中
+        for city_info in cities:
+            for record in _iter_city_records(city_info['id'], start_date, end_date, all_fields):
+                if written[0] % 5000 == 0:
+                    ctx.check_cancelled()
+                written[0] += 1
+                record['city'] = city_info['city_name']
+                yield record
+    
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    file_path = os.path.join(EXPORT_DIR, f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{filename}")
+    try:
+        with open(file_path, 'wb') as f:
+            if export_format == 'csv':
+                for chunk in data_exporter.stream_csv(records(), all_fields):
+                    f.write(chunk)
+            else:
+                data_exporter.write_excel(records(), f, all_fields, include_summary=True)
+    except BaseException:
+        os.remove(file_path)
+        raise
+    
+    if not written[0]:
+        os.remove(file_path)
+        raise ValueError('选定范围内暂无数据，请先点击下载到数据库')
+    
+    return {
+        'filename': filename,
+        'file_path': file_path,
+        'mimetype': mimetype,
+        'size': os.path.getsize(file_path),
+        'total_records': written[0]
+    }
+
+
+def _iter_city_records(city_id: int, start_date: str, end_date: str, fields: List[str]) -> Iterator[Dict[str, Any]]:
+    """按时间顺序分批读取单个城市在日期范围内的记录"""
+    return weather_service.db_manager.iter_weather_records(
+        city_id, f"{start_date}T00:00", f"{end_date}T23:59", columns=fields
+    )
+
+
+def _attachment_headers(filename: str) -> Dict[str, str]:
+    """生成下载文件的 Content-Disposition 头，非 ASCII 文件名按 RFC 5987 编码"""
+    ascii_name = filename.encode('ascii', 'ignore').decode('ascii').strip() or 'download'
+    return {
+        'Content-Disposition': f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+    }
+
+
+def _job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """转换为对外的任务信息（隐藏服务器文件路径，附加下载地址）"""
+    result = job.get('result')
+    if isinstance(result, dict) and 'file_path' in result:
+        result = {k: v for k, v in result.items() if k != 'file_path'}
+        if job['status'] == JOB_SUCCEEDED:
+            result['download_url'] = f"/api/jobs/{job['id']}/download"
+    return {**job, 'result': result}
+
+
+def _submit_job(job_type: str, params: Dict[str, Any]):
+    """提交后台任务并立即返回任务信息"""
+    job = job_queue.submit(job_type, params)
+    return jsonify({
+        'code': 202,
+        'message': '任务已提交',
+        'data': _job_response(job)
+    }), 202
+
+
 @api_bp.route('/cities', methods=['GET'])
 def get_cities():
     """
@@ -103,6 +309,22 @@ def search_cities():
         logger.error(f"搜索城市失败: {e}")
         return jsonify({'code': 500, 'message': str(e), 'data': []})
 
+@api_bp.route('/cities/nearest', methods=['GET'])
+def nearest_cities():
+    """查询距离给定坐标最近的城市/场站"""
+    try:
+        latitude = float(request.args.get('lat', ''))
+        longitude = float(request.args.get('lon', ''))
+        limit = int(request.args.get('limit', 5))
+    except ValueError:
+        return jsonify({'code': 400, 'message': '请提供有效的 lat、lon 参数', 'data': []}), 400
+    try:
+        results = weather_service.nearest_cities(latitude, longitude, limit)
+        return jsonify({'code': 200, 'message': '查询成功', 'data': results})
+    except Exception as e:
+        logger.error(f"查询最近城市失败: {e}")
+        return jsonify({'code': 500, 'message': str(e), 'data': []})
+
 @api_bp.route('/cities/add', methods=['POST'])
 def add_city():
     """添加城市到默认列表"""
@@ -166,7 +388,7 @@ def get_fields():
             'code': 200,
             'message': '获取字段列表成功',
             'data': {
-                'available_fields': AVAILABLE_FIELDS,
+                'available_fields': FIELD_REGISTRY.catalog,
                 'default_fields': DEFAULT_FIELDS
             }
         })
@@ -282,26 +504,22 @@ def query_forecast():
                 'data': None
             }), 400
         
+        cities = [city for city in (city_manager.get_city_by_id(cid) for cid in city_ids) if city]
+        # 预报与实时天气按多坐标合并请求，每个城市单独缓存
+        batch = weather_service.get_forecast_batch(cities, days)
+        
         results = []
-        for city_id in city_ids:
-            # 获取城市信息
-            city_info = city_manager.get_city_by_id(city_id)
-            if not city_info:
-                continue
-                
-            # 获取预测数据
-            forecast_data = weather_service.get_forecast(city_id, days)
-            
-            # 获取实时数据
-            try:
-                current_weather = weather_service.get_current_weather(city_id)
-                # 补充坐标信息用于前端展示
-                if current_weather:
-                    current_weather['longitude'] = city_info['longitude']
-                    current_weather['latitude'] = city_info['latitude']
-            except Exception as e:
-                logger.warning(f"获取实时天气失败 (City ID: {city_id}): {e}")
-                current_weather = None
+        for city_info in cities:
+            city_id = city_info['id']
+            forecast_data = batch[city_id]['forecast']
+            current_weather = batch[city_id]['current']
+            if current_weather:
+                # 补充坐标信息用于前端展示（复制一份，避免修改缓存中的对象）
+                current_weather = {
+                    **current_weather,
+                    'longitude': city_info['longitude'],
+                    'latitude': city_info['latitude']
+                }
             
             # 转换 minutely_15_forecast 为 records 格式（与历史数据查询一致）
             minutely_data = forecast_data.get('minutely_15_forecast', [])
@@ -382,11 +600,15 @@ def query_weather():
             "city_id": 1,
             "start_date": "2024-01-01",
             "end_date": "2024-01-31",
-            "fields": ["temperature_2m", "wind_speed_10m"]
+            "fields": ["temperature_2m", "wind_speed_10m"],
+            "format": "records"  // 可选: records(默认) / columns / arrow
         }
     
     Returns:
-        JSON响应
+        records: JSON响应，data.records 为逐条记录
+        columns: JSON响应，data.columns 为 {"datetime": [...], 字段: [...]}
+        arrow: Arrow IPC 流，城市信息与统计摘要在 schema 元数据 weather_meta 中
+        列式格式在客户端支持时使用 gzip 压缩
     """
     try:
         # 获取请求参数
@@ -397,6 +619,7 @@ def query_weather():
         end_date = data.get('end_date')
         fields = data.get('fields', DEFAULT_FIELDS)
         force_refresh = data.get('force_refresh', False)
+        response_format = data.get('format') or FORMAT_RECORDS
         
         # 参数验证
         if not all([city_id, start_date, end_date]):
@@ -406,6 +629,20 @@ def query_weather():
                 'data': None
             }), 400
         
+        if response_format not in RESPONSE_FORMATS:
+            return jsonify({
+                'code': 400,
+                'message': f'不支持的响应格式: {response_format}',
+                'data': None
+            }), 400
+        
+        if response_format == FORMAT_ARROW and not arrow_available():
+            return jsonify({
+                'code': 400,
+                'message': '服务器未安装 pyarrow，不支持 arrow 格式，请使用 columns 格式',
+                'data': None
+            }), 400
+        
         # 获取城市信息
         city_info = city_manager.get_city_by_id(city_id)
         if not city_info:
@@ -415,6 +652,11 @@ def query_weather():
                 'data': None
             }), 404
         
+        if response_format != FORMAT_RECORDS:
+            return _query_weather_columnar(
+                city_info, city_id, start_date, end_date, fields, force_refresh, response_format
+            )
+        
         # 获取天气数据
         weather_data = weather_service.get_historical_weather(
             longitude=city_info['longitude'],
@@ -426,8 +668,11 @@ def query_weather():
             force_refresh=force_refresh
         )
         
-        # 计算统计摘要
-        summary = data_analyzer.calculate_summary(weather_data['hourly_data'])
+        # 计算统计摘要：数据已落库时直接在数据库中聚合
+        if force_refresh:
+            summary = data_analyzer.calculate_summary(weather_data['hourly_data'])
+        else:
+            summary = data_analyzer.summarize_cities([city_id], start_date, end_date, fields)[city_id]
         
         # 构建响应
         response_data = {
@@ -458,6 +703,75 @@ def query_weather():
         }), 500
 
 
+def _query_weather_columnar(
+    city_info: Dict[str, Any],
+    city_id: int,
+    start_date: str,
+    end_date: str,
+    fields: List[str],
+    force_refresh: bool,
+    response_format: str
+) -> Response:
+    """
+    以列式 JSON 或 Arrow IPC 返回查询结果（不构造逐条记录）
+
+    Args:
+        city_info: 城市信息
+        city_id: 城市ID
+        start_date: 开始日期
+        end_date: 结束日期
+        fields: 字段列表
+        force_refresh: 是否跳过本地数据库
+        response_format: columns 或 arrow
+
+    Returns:
+        Flask 响应（客户端支持时 gzip 压缩）
+    """
+    weather_data = weather_service.get_historical_columns(
+        longitude=city_info['longitude'],
+        latitude=city_info['latitude'],
+        start_date=start_date,
+        end_date=end_date,
+        fields=fields,
+        city_id=city_id,
+        force_refresh=force_refresh
+    )
+    columns = weather_data['columns']
+    
+    if force_refresh:
+        summary = data_analyzer.calculate_summary(columns)
+    else:
+        summary = data_analyzer.summarize_cities([city_id], start_date, end_date, fields)[city_id]
+    
+    response_data = {
+        'city_id': city_id,
+        'city_name': city_info['city_name'],
+        'longitude': weather_data['longitude'],
+        'latitude': weather_data['latitude'],
+        'timezone': weather_data['timezone'],
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_records': len(columns.get('datetime', [])),
+        'format': response_format,
+        'summary': summary
+    }
+    
+    if response_format == FORMAT_ARROW:
+        body, mimetype = encode_arrow(columns, response_data), ARROW_MIMETYPE
+    else:
+        response_data['columns'] = encode_columns(columns)
+        body, mimetype = dumps_json({'code': 200, 'message': '查询成功', 'data': response_data}), JSON_MIMETYPE
+    
+    body, content_encoding = maybe_gzip(
+        body, request.headers.get('Accept-Encoding'), RESPONSE_GZIP_MIN_BYTES, RESPONSE_GZIP_LEVEL
+    )
+    response = Response(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    return response
+
+
 @api_bp.route('/weather/export', methods=['POST'])
 def export_weather():
     """
@@ -502,44 +816,48 @@ def export_weather():
                 'data': None
             }), 404
         
-        # 获取天气数据
-        weather_data = weather_service.get_historical_weather(
-            longitude=city_info['longitude'],
-            latitude=city_info['latitude'],
-            start_date=start_date,
-            end_date=end_date,
-            fields=fields,
-            city_id=city_id
+        # 补齐本地数据库缺失的部分，导出内容直接从数据库分批读取
+        weather_service.sync_local_data(
+            city_id,
+            city_info['longitude'],
+            city_info['latitude'],
+            start_date,
+            end_date,
+            fields
         )
+        records = _iter_city_records(city_id, start_date, end_date, fields)
         
         # 生成文件名
         filename = f"{city_info['city_name']}_天气数据_{start_date}_{end_date}"
         
         # 导出数据
         if export_format == 'csv':
-            file_bytes = data_exporter.export_to_csv(
-                weather_data['hourly_data'],
-                filename,
-                fields,
-                city_name=city_info['city_name']
-            )
-            mimetype = 'text/csv'
+            # CSV 边读边发送，不在内存中拼接完整文件
             filename += '.csv'
-        else:
-            file_bytes = data_exporter.export_to_excel(
-                weather_data['hourly_data'],
-                filename,
+            return Response(
+                stream_with_context(data_exporter.stream_csv(records, fields, city_name=city_info['city_name'])),
+                mimetype='text/csv',
+                headers=_attachment_headers(filename)
+            )
+        
+        # xlsx 是 zip 格式，需要在末尾写入目录，先流式写入临时文件再发送
+        filename += '.xlsx'
+        tmp = tempfile.TemporaryFile()
+        try:
+            data_exporter.write_excel(
+                records,
+                tmp,
                 fields,
                 city_name=city_info['city_name'],
                 include_summary=True
             )
-            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filename += '.xlsx'
-        
-        # 返回文件
+            tmp.seek(0)
+        except Exception:
+            tmp.close()
+            raise
         return send_file(
-            BytesIO(file_bytes),
-            mimetype=mimetype,
+            tmp,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
             download_name=filename
         )
@@ -591,17 +909,15 @@ def compare_cities():
             city_ids, start_date, end_date, fields
         )
         
-        # 准备对比数据
-        comparison_data = [
-            {
-                'city_name': city_data['city_name'],
-                'data': city_data['hourly_data']
-            }
-            for city_data in cities_data
-        ]
-        
-        # 计算对比结果
-        comparison = data_analyzer.compare_cities(comparison_data)
+        # 计算对比结果：所有城市的统计摘要由一次分组聚合查询得到
+        summaries = data_analyzer.summarize_cities(
+            [cd['city_id'] for cd in cities_data], start_date, end_date, fields
+        )
+        comparison = {
+            cd['city_name']: summaries[cd['city_id']]
+            for cd in cities_data
+            if cd['hourly_data']
+        }
         
         return jsonify({
             'code': 200,
@@ -621,10 +937,128 @@ def compare_cities():
             'data': None
         }), 500
 
+@api_bp.route('/weather/daily', methods=['POST'])
+def daily_statistics():
+    """
+    按日（或按月）统计多个城市的天气数据（读取日/月汇总表，仅统计已下载的数据）
+    
+    Request Body:
+        {
+            "city_ids": [1, 2, 3],
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+            "fields": ["temperature_2m", "wind_speed_10m"],
+            "granularity": "day"  // or "month"
+        }
+    
+    Returns:
+        JSON响应，每项包含 city_id、city_name、date (或 month)、record_count 以及各字段的 avg/min/max/sum/std/count
+    """
+    try:
+        data = request.get_json()
+        
+        city_ids = data.get('city_ids', [])
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        fields = data.get('fields', DEFAULT_FIELDS)
+        granularity = data.get('granularity', 'day')
+        
+        if not all([city_ids, start_date, end_date]):
+            return jsonify({
+                'code': 400,
+                'message': '缺少必要参数：city_ids, start_date, end_date',
+                'data': None
+            }), 400
+        
+        if granularity == 'month':
+            rows = data_analyzer.calculate_monthly_stats(city_ids, start_date[:7], end_date[:7], fields)
+        else:
+            rows = data_analyzer.calculate_daily_stats(city_ids, start_date, end_date, fields)
+        city_names = {city['id']: city['city_name'] for city in city_manager.get_all_cities()}
+        for row in rows:
+            row['city_name'] = city_names.get(row['city_id'])
+        
+        return jsonify({
+            'code': 200,
+            'message': '统计成功',
+            'data': rows
+        })
+        
+    except Exception as e:
+        logger.error(f"按日统计失败: {e}")
+        return jsonify({
+            'code': 500,
+            'message': f'统计失败: {str(e)}',
+            'data': None
+        }), 500
+
+
+@api_bp.route('/weather/anomalies', methods=['POST'])
+def scan_anomalies():
+    """
+    扫描多个城市、多个字段的异常点与趋势（仅分析已下载的数据）
+    
+    Request Body:
+        {
+            "city_ids": [1, 2, 3],
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+            "fields": ["temperature_2m", "shortwave_radiation"],
+            "method": "seasonal",  // rolling / seasonal / mad
+            "threshold": 3.0,
+            "window": 96  // rolling 方法的窗口（时间点数）
+        }
+    
+    Returns:
+        NDJSON 流，每行一个对象：{"type": "trend", ...} 或 {"type": "anomaly", ...}
+    """
+    try:
+        data = request.get_json()
+        
+        city_ids = data.get('city_ids', [])
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        fields = data.get('fields', DEFAULT_FIELDS)
+        
+        if not all([city_ids, start_date, end_date]):
+            return jsonify({
+                'code': 400,
+                'message': '缺少必要参数：city_ids, start_date, end_date',
+                'data': None
+            }), 400
+        
+        # 参数校验与数据读取在此完成（错误返回 JSON），分数在输出时逐城市生成
+        items = data_analyzer.scan_anomalies(
+            city_ids,
+            start_date,
+            end_date,
+            fields,
+            method=data.get('method', 'seasonal'),
+            threshold=float(data.get('threshold', 3.0)),
+            window=int(data.get('window', 96))
+        )
+        
+        def generate():
+            for item in items:
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    except Exception as e:
+        logger.error(f"异常扫描失败: {e}")
+        return jsonify({
+            'code': 500,
+            'message': f'异常扫描失败: {str(e)}',
+            'data': None
+        }), 500
+
+
 @api_bp.route('/data/export-bulk', methods=['POST'])
 def export_bulk_data():
     """
-    导出多个城市的完整天气数据
+    导出多个城市的完整天气数据（后台任务，完成后通过 /api/jobs/<id>/download 下载）
     """
     try:
         data = request.get_json()
@@ -640,53 +1074,12 @@ def export_bulk_data():
                 'data': None
             }), 400
             
-        all_data = []
-        # 获取所有可能的字段
-        all_fields = []
-        for cat in AVAILABLE_FIELDS.values():
-            all_fields.extend(cat.keys())
-            
-        for city_id in city_ids:
-            city_info = city_manager.get_city_by_id(city_id)
-            if not city_info: continue
-            
-            # 使用 weather_service 获取数据，触发“缺失字段自动下载”逻辑
-            weather_data = weather_service.get_historical_weather(
-                longitude=city_info['longitude'],
-                latitude=city_info['latitude'],
-                start_date=start_date,
-                end_date=end_date,
-                fields=all_fields,
-                city_id=city_id
-            )
-            
-            records = weather_data['hourly_data']
-            # 为每条记录添加城市名称
-            for r in records:
-                r['city'] = city_info['city_name']
-            
-            all_data.extend(records)
-            
-        if not all_data:
-            return jsonify({'code': 404, 'message': '选定范围内暂无数据，请先点击下载到数据库', 'data': None}), 404
-            
-        filename = f"广西天气数据_批量_{start_date}_{end_date}"
-        
-        if export_format == 'csv':
-            file_bytes = data_exporter.export_to_csv(all_data, filename, all_fields)
-            mimetype = 'text/csv'
-            filename += '.csv'
-        else:
-            file_bytes = data_exporter.export_to_excel(all_data, filename, all_fields, include_summary=True)
-            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filename += '.xlsx'
-            
-        return send_file(
-            BytesIO(file_bytes),
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
-        )
+        return _submit_job('export_bulk', {
+            'city_ids': city_ids,
+            'start_date': start_date,
+            'end_date': end_date,
+            'format': export_format
+        })
     except Exception as e:
         logger.error(f"批量导出数据失败: {e}")
         return jsonify({'code': 500, 'message': f'导出失败: {str(e)}', 'data': None}), 500
@@ -735,13 +1128,31 @@ def health_check():
     Returns:
         JSON响应
     """
+    health = {
+        'status': 'healthy',
+        'service': 'Guangxi Weather History API'
+    }
+    
+    # 数据库连接池状态
+    try:
+        health['db_pool'] = weather_service.db_manager.get_pool_stats()
+    except Exception as e:
+        logger.warning(f"获取连接池状态失败: {e}")
+        health['db_pool'] = None
+    
+    # 异步日志写入器与出站请求节流器状态
+    sink = getattr(weather_service.db_manager, 'log_sink', None) if weather_service else None
+    health['log_sink'] = sink.stats() if sink else None
+    throttle = getattr(weather_service, 'throttle', None)
+    health['throttle'] = throttle.stats() if throttle else None
+    single_flight = getattr(weather_service, 'single_flight', None)
+    health['single_flight'] = single_flight.stats() if single_flight else None
+    health['jobs'] = job_queue.stats() if job_queue else None
+    
     return jsonify({
         'code': 200,
         'message': 'API服务运行正常',
-        'data': {
-            'status': 'healthy',
-            'service': 'Guangxi Weather History API'
-        }
+        'data': health
     })
 
 
@@ -778,12 +1189,11 @@ def batch_download():
                 'data': None
             }), 400
         
-        result = data_manager.batch_download(city_id, start_date, end_date, fields)
-        
-        return jsonify({
-            'code': 200 if result['success'] else 500,
-            'message': result['message'],
-            'data': result
+        return _submit_job('batch_download', {
+            'city_id': city_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'fields': fields
         })
         
     except Exception as e:
@@ -824,12 +1234,10 @@ def batch_download_all():
                 'data': None
             }), 400
         
-        result = data_manager.batch_download_all_cities(start_date, end_date, fields)
-        
-        return jsonify({
-            'code': 200,
-            'message': result['message'],
-            'data': result
+        return _submit_job('batch_download_all', {
+            'start_date': start_date,
+            'end_date': end_date,
+            'fields': fields
         })
         
     except Exception as e:
@@ -850,7 +1258,8 @@ def check_completeness():
         {
             "city_id": 1,
             "start_date": "2022-01-01",
-            "end_date": "2022-12-31"
+            "end_date": "2022-12-31",
+            "group": "rows"  // 可选，字段组：rows(记录存在) / basic / wind / radiation / other
         }
     
     Returns:
@@ -862,6 +1271,7 @@ def check_completeness():
         city_id = data.get('city_id')
         start_date = data.get('start_date')
         end_date = data.get('end_date')
+        group = data.get('group') or GROUP_ROWS
         
         if not all([city_id, start_date, end_date]):
             return jsonify({
@@ -870,7 +1280,14 @@ def check_completeness():
                 'data': None
             }), 400
         
-        result = data_manager.check_data_completeness(city_id, start_date, end_date)
+        if group not in data_manager.db_manager.coverage.groups:
+            return jsonify({
+                'code': 400,
+                'message': f'未知的字段组: {group}',
+                'data': None
+            }), 400
+        
+        result = data_manager.check_data_completeness(city_id, start_date, end_date, group)
         
         return jsonify({
             'code': 200,
@@ -887,6 +1304,59 @@ def check_completeness():
         }), 500
 
 
+@api_bp.route('/data/coverage', methods=['POST'])
+def data_coverage():
+    """
+    多城市逐日数据覆盖率（热力图），只读取覆盖位图
+    
+    Request Body:
+        {
+            "city_ids": [1, 2],
+            "start_date": "2020-01-01",
+            "end_date": "2024-12-31",
+            "group": "rows"
+        }
+    
+    Returns:
+        JSON响应，data.cities[i].coverage 为与 data.dates 对应的 0~1 覆盖率
+    """
+    try:
+        data = request.get_json()
+        
+        city_ids = data.get('city_ids') or []
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        group = data.get('group') or GROUP_ROWS
+        
+        if not all([city_ids, start_date, end_date]):
+            return jsonify({
+                'code': 400,
+                'message': '缺少必要参数：city_ids, start_date, end_date',
+                'data': None
+            }), 400
+        
+        if group not in data_manager.db_manager.coverage.groups:
+            return jsonify({
+                'code': 400,
+                'message': f'未知的字段组: {group}',
+                'data': None
+            }), 400
+        
+        return jsonify({
+            'code': 200,
+            'message': '查询成功',
+            'data': data_manager.coverage_heatmap(city_ids, start_date, end_date, group)
+        })
+        
+    except Exception as e:
+        logger.error(f"查询数据覆盖率失败: {e}")
+        return jsonify({
+            'code': 500,
+            'message': f'查询失败: {str(e)}',
+            'data': None
+        }), 500
+
+
 @api_bp.route('/data/auto-update', methods=['POST'])
 def auto_update():
     """
@@ -916,12 +1386,10 @@ def auto_update():
                 'data': None
             }), 400
         
-        result = data_manager.auto_update_latest_data(city_id, fields, days_back)
-        
-        return jsonify({
-            'code': 200 if result['success'] else 500,
-            'message': result['message'],
-            'data': result
+        return _submit_job('auto_update', {
+            'city_id': city_id,
+            'fields': fields,
+            'days_back': days_back
         })
         
     except Exception as e:
@@ -933,6 +1401,44 @@ def auto_update():
         }), 500
 
 
+@api_bp.route('/data/auto-update/status', methods=['GET'])
+def auto_update_status():
+    """
+    获取定时增量更新的调度状态与上一轮运行指标
+    
+    Returns:
+        JSON响应
+    """
+    if auto_update_scheduler is None:
+        return jsonify({
+            'code': 503,
+            'message': '定时增量更新未初始化',
+            'data': None
+        }), 503
+    return jsonify({
+        'code': 200,
+        'message': '获取成功',
+        'data': auto_update_scheduler.status()
+    })
+
+
+@api_bp.route('/data/auto-update/run', methods=['POST'])
+def auto_update_run():
+    """
+    立即为所有城市执行一轮增量更新（后台任务，不错开）
+    
+    Returns:
+        JSON响应
+    """
+    if auto_update_scheduler is None:
+        return jsonify({
+            'code': 503,
+            'message': '定时增量更新未初始化',
+            'data': None
+        }), 503
+    return _submit_job('auto_update_all', {})
+
+
 @api_bp.route('/data/delete/preview', methods=['POST'])
 def preview_delete_data():
     """
@@ -1075,9 +1581,7 @@ def get_system_events():
 def get_settings():
     """获取系统设置"""
     try:
-        settings = weather_service.db_manager.execute_query("SELECT key, value FROM system_settings")
-        # Convert list of dicts to a single dict
-        settings_dict = {s['key']: s['value'] for s in settings}
+        settings_dict = dict(weather_service.db_manager.get_settings())
         return jsonify({'code': 200, 'data': settings_dict})
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
@@ -1090,11 +1594,8 @@ def update_settings():
         if not data:
             return jsonify({'code': 400, 'message': 'No data provided'}), 400
         
-        for key, value in data.items():
-            weather_service.db_manager.execute_update(
-                "INSERT OR REPLACE INTO system_settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
-                (key, str(value))
-            )
+        # 写入后清除设置缓存，频率限制等读取设置的组件立即生效
+        weather_service.db_manager.update_settings(data)
         return jsonify({'code': 200, 'message': '设置更新成功'})
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
@@ -1107,3 +1608,64 @@ def create_test_event():
         return jsonify({'code': 200, 'message': '已发送测试告警'})
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
+
+
+# ========== 后台任务API ==========
+
+@api_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """获取最近的后台任务列表"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        jobs = [_job_response(job) for job in job_queue.list_jobs(limit)]
+        return jsonify({'code': 200, 'message': '获取任务列表成功', 'data': jobs})
+    except Exception as e:
+        logger.error(f"获取任务列表失败: {e}")
+        return jsonify({'code': 500, 'message': f'获取任务列表失败: {str(e)}', 'data': None}), 500
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """获取后台任务的状态与进度"""
+    try:
+        job = job_queue.get(job_id)
+        if not job:
+            return jsonify({'code': 404, 'message': '任务不存在', 'data': None}), 404
+        return jsonify({'code': 200, 'message': '获取任务成功', 'data': _job_response(job)})
+    except Exception as e:
+        logger.error(f"获取任务失败: {e}")
+        return jsonify({'code': 500, 'message': f'获取任务失败: {str(e)}', 'data': None}), 500
+
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """取消后台任务"""
+    try:
+        job = job_queue.cancel(job_id)
+        if not job:
+            return jsonify({'code': 404, 'message': '任务不存在', 'data': None}), 404
+        return jsonify({'code': 200, 'message': '已请求取消任务', 'data': _job_response(job)})
+    except Exception as e:
+        logger.error(f"取消任务失败: {e}")
+        return jsonify({'code': 500, 'message': f'取消任务失败: {str(e)}', 'data': None}), 500
+
+
+@api_bp.route('/jobs/<job_id>/download', methods=['GET'])
+def download_job_file(job_id):
+    """下载导出任务生成的文件"""
+    try:
+        job = job_queue.get(job_id)
+        result = job.get('result') if job else None
+        if not job or job['status'] != JOB_SUCCEEDED or not isinstance(result, dict) or 'file_path' not in result:
+            return jsonify({'code': 404, 'message': '文件不存在或任务尚未完成', 'data': None}), 404
+        if not os.path.exists(result['file_path']):
+            return jsonify({'code': 410, 'message': '文件已过期被清理', 'data': None}), 410
+        return send_file(
+            result['file_path'],
+            mimetype=result['mimetype'],
+            as_attachment=True,
+            download_name=result['filename']
+        )
+    except Exception as e:
+        logger.error(f"下载任务文件失败: {e}")
+        return jsonify({'code': 500, 'message': f'下载失败: {str(e)}', 'data': None}), 500
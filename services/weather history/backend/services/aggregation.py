@@ -0,0 +1,287 @@
+"""
+聚合查询服务
+将均值/极值/总和/标准差等统计下推到 SQLite 中执行，
+读取写入时增量维护的日/月汇总表，查询代价与天数（月数）相关而与原始样本数无关
+"""
+import logging
+import math
+from calendar import monthrange
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from backend.models.columnar_store import WEATHER_VALUE_COLUMNS
+from backend.models.rollup_store import RollupStore, rollup_columns
+
+logger = logging.getLogger(__name__)
+
+
+def finalize_stats(base: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    由基础聚合量计算均值与样本标准差（与 pandas 的 mean/std 语义一致）
+
+    Args:
+        base: 包含 count/sum/min/max/sumsq/positive 的字典
+
+    Returns:
+        增加 avg/std 后的统计字典，count 为 0 时 avg/std 为 None
+    """
+    count = base['count']
+    stats = dict(base)
+    if not count:
+        stats['avg'] = None
+        stats['std'] = None
+        return stats
+
+    mean = base['sum'] / count
+    stats['avg'] = mean
+    if count > 1:
+        # 样本方差，浮点误差可能导致极小的负数
+        variance = (base['sumsq'] - base['sum'] * mean) / (count - 1)
+        stats['std'] = math.sqrt(max(variance, 0.0))
+    else:
+        stats['std'] = None
+    return stats
+
+
+def _shift_month(month: str, delta: int) -> str:
+    """月份键 (YYYY-MM) 前后移动 delta 个月"""
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def full_month_span(start_date: str, end_date: str) -> Optional[Tuple[str, str]]:
+    """
+    [start_date, end_date] 中完整覆盖的月份范围
+
+    Returns:
+        (首个完整月, 最后一个完整月)，没有完整月时返回 None
+    """
+    first = start_date[:7] if start_date[8:10] == '01' else _shift_month(start_date[:7], 1)
+    last_day = monthrange(int(end_date[:4]), int(end_date[5:7]))[1]
+    last = end_date[:7] if int(end_date[8:10]) == last_day else _shift_month(end_date[:7], -1)
+    return (first, last) if first <= last else None
+
+
+class WeatherAggregator:
+    """
+    天气数据聚合器
+    负责按城市、按日期、按月份分组的统计查询
+    """
+
+    def __init__(self, db_manager):
+        """
+        初始化聚合器
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
+        self.db_manager = db_manager
+        logger.info("聚合查询服务初始化完成")
+
+    @staticmethod
+    def _valid_fields(fields: Iterable[str]) -> List[str]:
+        """过滤出汇总表中存在的数值字段，字段名会直接拼入 SQL"""
+        result = []
+        for field in fields:
+            if field in WEATHER_VALUE_COLUMNS and field not in result:
+                result.append(field)
+        return result
+
+    @staticmethod
+    def _select_rollups(fields: List[str], combine: bool) -> str:
+        """
+        生成读取汇总列的表达式
+
+        Args:
+            fields: 字段列表
+            combine: 是否需要再次合并（跨行求和/极值）
+        """
+        parts = []
+        for i, field in enumerate(fields):
+            count, total, low, high, sumsq, pos = rollup_columns(field)
+            if combine:
+                parts.append(
+                    f"SUM(c{i}) AS c{i}, SUM(s{i}) AS s{i}, MIN(mn{i}) AS mn{i}, "
+                    f"MAX(mx{i}) AS mx{i}, SUM(sq{i}) AS sq{i}, SUM(p{i}) AS p{i}"
+                )
+            else:
+                parts.append(
+                    f"{count} AS c{i}, {total} AS s{i}, {low} AS mn{i}, "
+                    f"{high} AS mx{i}, {sumsq} AS sq{i}, {pos} AS p{i}"
+                )
+        return ",\n                ".join(parts)
+
+    @staticmethod
+    def _read_aggregates(row: Dict[str, Any], fields: List[str]) -> Dict[str, Dict[str, Any]]:
+        """从查询结果行中取出各字段的统计量"""
+        result = {}
+        for i, field in enumerate(fields):
+            count = row[f'c{i}'] or 0
+            result[field] = finalize_stats({
+                'count': count,
+                'sum': row[f's{i}'] or 0.0,
+                'min': row[f'mn{i}'],
+                'max': row[f'mx{i}'],
+                'sumsq': row[f'sq{i}'] or 0.0,
+                'positive': row[f'p{i}'] or 0
+            })
+        return result
+
+    @staticmethod
+    def _city_condition(city_ids: List[int]) -> str:
+        """城市过滤条件"""
+        return f"city_id IN ({', '.join('?' for _ in city_ids)})"
+
+    def field_stats(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        fields: List[str]
+    ) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        """
+        按城市计算各字段在日期范围内的统计量
+        完整月份读取月汇总，首尾不足一月的部分读取日汇总
+
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期 (YYYY-MM-DD，含)
+            end_date: 结束日期 (YYYY-MM-DD，含)
+            fields: 字段列表，不存在的字段会被忽略
+
+        Returns:
+            {city_id: {field: {count, sum, min, max, sumsq, positive, avg, std}}}
+        """
+        fields = self._valid_fields(fields)
+        if not city_ids or not fields:
+            return {}
+
+        city_where = self._city_condition(city_ids)
+        columns = self._select_rollups(fields, combine=False)
+        daily_sql = (
+            f"SELECT city_id, {columns} FROM {RollupStore.DAILY_TABLE} "
+            f"WHERE {city_where} AND date >= ? AND date <= ?"
+        )
+        params: List[Any] = [*city_ids, start_date, end_date]
+
+        span = full_month_span(start_date, end_date)
+        if span:
+            # 'YYYY-MM' 是该月日期的前缀，按字符串比较恰好排在该月所有日期之前
+            source = (
+                f"SELECT city_id, {columns} FROM {RollupStore.MONTHLY_TABLE} "
+                f"WHERE {city_where} AND month >= ? AND month <= ? "
+                f"UNION ALL {daily_sql} AND (date < ? OR date >= ?)"
+            )
+            params = [*city_ids, span[0], span[1], *params, span[0], _shift_month(span[1], 1)]
+        else:
+            source = daily_sql
+
+        sql = f'''
+            SELECT city_id,
+                {self._select_rollups(fields, combine=True)}
+            FROM ({source})
+            GROUP BY city_id
+        '''
+        rows = self.db_manager.execute_query(sql, tuple(params))
+        return {row['city_id']: self._read_aggregates(row, fields) for row in rows}
+
+    def weather_modes(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str
+    ) -> Dict[int, int]:
+        """
+        按城市统计出现次数最多的天气代码（次数相同时取较小的代码，与 pandas mode 一致）
+
+        Returns:
+            {city_id: weather_code}
+        """
+        if not city_ids:
+            return {}
+
+        sql = f'''
+            SELECT city_id, code, SUM(n) AS n
+            FROM {RollupStore.CODES_TABLE}
+            WHERE {self._city_condition(city_ids)} AND date >= ? AND date <= ?
+            GROUP BY city_id, code
+            ORDER BY city_id, n DESC, code
+        '''
+        modes = {}
+        for row in self.db_manager.execute_query(sql, (*city_ids, start_date, end_date)):
+            modes.setdefault(row['city_id'], row['code'])
+        return modes
+
+    def _period_stats(
+        self,
+        table: str,
+        key: str,
+        city_ids: List[int],
+        start: str,
+        end: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """读取日或月汇总表中的逐行统计"""
+        fields = self._valid_fields(fields)
+        if not city_ids or not fields:
+            return []
+
+        sql = f'''
+            SELECT city_id, {key}, record_count,
+                {self._select_rollups(fields, combine=False)}
+            FROM {table}
+            WHERE {self._city_condition(city_ids)} AND {key} >= ? AND {key} <= ?
+            ORDER BY city_id, {key}
+        '''
+        result = []
+        for row in self.db_manager.execute_query(sql, (*city_ids, start, end)):
+            item = {'city_id': row['city_id'], key: row[key], 'record_count': row['record_count']}
+            for field, stats in self._read_aggregates(row, fields).items():
+                item[field] = {name: stats[name] for name in ('avg', 'min', 'max', 'sum', 'std', 'count')}
+            result.append(item)
+        return result
+
+    def daily_stats(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (城市, 日期) 读取各字段的日统计
+
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期 (YYYY-MM-DD，含)
+            end_date: 结束日期 (YYYY-MM-DD，含)
+            fields: 字段列表，不存在的字段会被忽略
+
+        Returns:
+            按城市、日期排序的列表，每项为 {city_id, date, record_count, field: {avg, min, max, sum, std, count}}
+        """
+        return self._period_stats(
+            RollupStore.DAILY_TABLE, 'date', city_ids, start_date, end_date, fields
+        )
+
+    def monthly_stats(
+        self,
+        city_ids: List[int],
+        start_month: str,
+        end_month: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (城市, 月份) 读取各字段的月统计
+
+        Args:
+            city_ids: 城市ID列表
+            start_month: 开始月份 (YYYY-MM，含)
+            end_month: 结束月份 (YYYY-MM，含)
+            fields: 字段列表，不存在的字段会被忽略
+
+        Returns:
+            按城市、月份排序的列表，每项为 {city_id, month, record_count, field: {...}}
+        """
+        return self._period_stats(
+            RollupStore.MONTHLY_TABLE, 'month', city_ids, start_month, end_month, fields
+        )
@@ -0,0 +1,287 @@
+"""
+异常检测与趋势分析引擎
+将多个城市的数据对齐为 城市 × 时间 × 字段 的三维数组，
+一次向量化计算所有城市、所有字段的滚动/同时段基线 z 分数、MAD 稳健分数与线性趋势斜率
+"""
+import logging
+import warnings
+from typing import List, Dict, Any, Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 支持的异常检测方法
+METHOD_ROLLING = 'rolling'  # 与前 window 个时间点的均值/标准差比较
+METHOD_SEASONAL = 'seasonal'  # 与窗口内同一时刻（时段）的均值/标准差比较，消除日变化
+METHOD_MAD = 'mad'  # 中位数绝对偏差，对离群值本身不敏感
+METHODS = (METHOD_ROLLING, METHOD_SEASONAL, METHOD_MAD)
+
+# MAD 换算为正态分布标准差的系数
+MAD_SCALE = 1.4826
+
+
+class WeatherCube:
+    """
+    对齐后的多城市数据
+    values[c, t, f] 为城市 city_ids[c] 在 times[t] 时刻字段 fields[f] 的值，缺失为 NaN
+    """
+
+    def __init__(self, city_ids: List[int], times: np.ndarray, fields: List[str], values: np.ndarray):
+        self.city_ids = city_ids
+        self.times = times
+        self.fields = fields
+        self.values = values
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """分母为 0 或 NaN 时结果为 NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def rolling_zscores(values: np.ndarray, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+    """
+    滚动 z 分数：每个点与其之前 window 个点（不含自身）的均值、样本标准差比较
+
+    Args:
+        values: 时间位于第 1 维的数组 (城市, 时间, 字段)
+        window: 窗口长度（时间点数）
+        min_periods: 窗口内至少需要的有效点数，默认为 window 的四分之一（至少 2）
+
+    Returns:
+        与 values 同形状的 z 分数，无法计算处为 NaN
+    """
+    if min_periods is None:
+        min_periods = max(2, window // 4)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    # 前缀和在时间维度前补 0，窗口 [t-window, t) 的和为 cs[t] - cs[t-window]
+    def prefix(array):
+        cs = np.cumsum(array, axis=1)
+        return np.concatenate([np.zeros_like(cs[:, :1]), cs], axis=1)
+
+    cs_sum, cs_sq, cs_n = prefix(filled), prefix(filled * filled), prefix(valid.astype(np.float64))
+    length = values.shape[1]
+    end = np.arange(length)
+    start = np.maximum(end - window, 0)
+
+    total = cs_sum[:, end] - cs_sum[:, start]
+    total_sq = cs_sq[:, end] - cs_sq[:, start]
+    count = cs_n[:, end] - cs_n[:, start]
+
+    mean = _safe_divide(total, count)
+    variance = _safe_divide(total_sq - total * mean, count - 1)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    scores = _safe_divide(values - mean, std)
+    scores[count < min_periods] = np.nan
+    return scores
+
+
+def seasonal_zscores(values: np.ndarray, times: np.ndarray, slot_minutes: int = 60) -> np.ndarray:
+    """
+    同时段基线 z 分数：以窗口内同一时段（如每天 14:00）的均值、标准差为基线
+
+    Args:
+        values: (城市, 时间, 字段) 数组
+        times: datetime64 时间轴
+        slot_minutes: 时段长度（分钟）
+
+    Returns:
+        与 values 同形状的 z 分数
+    """
+    minutes = (times - times.astype('datetime64[D]')).astype('timedelta64[m]').astype(np.int64)
+    slots = minutes // slot_minutes
+    scores = np.full(values.shape, np.nan)
+    for slot in np.unique(slots):
+        mask = slots == slot
+        subset = values[:, mask, :]
+        count = np.sum(~np.isnan(subset), axis=1, keepdims=True)
+        if not np.any(count > 1):
+            continue
+        with warnings.catch_warnings():
+            # 全为 NaN 的序列（如城市无该字段）返回 NaN，忽略警告
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(subset, axis=1, keepdims=True)
+            std = np.nanstd(subset, axis=1, ddof=1, keepdims=True)
+        scores[:, mask, :] = _safe_divide(subset - mean, std)
+    return scores
+
+
+def mad_scores(values: np.ndarray) -> np.ndarray:
+    """
+    稳健 z 分数：(x - 中位数) / (1.4826 × MAD)，按城市、字段分别计算
+
+    Args:
+        values: (城市, 时间, 字段) 数组
+
+    Returns:
+        与 values 同形状的分数
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(values, axis=1, keepdims=True)
+        mad = np.nanmedian(np.abs(values - median), axis=1, keepdims=True)
+    return _safe_divide(values - median, MAD_SCALE * mad)
+
+
+def trend_slopes(values: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """
+    最小二乘线性趋势斜率（每天的变化量），忽略缺失值
+
+    Args:
+        values: (城市, 时间, 字段) 数组
+        times: datetime64 时间轴
+
+    Returns:
+        (城市, 字段) 斜率数组，有效点少于 2 个时为 NaN
+    """
+    if values.shape[1] == 0:
+        return np.full((values.shape[0], values.shape[2]), np.nan)
+    days = (times - times[0]).astype('timedelta64[m]').astype(np.float64) / 1440.0
+    x = days[None, :, None]
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=1)
+    x_mean = _safe_divide(np.where(valid, x, 0.0).sum(axis=1), count)
+    y_mean = _safe_divide(np.where(valid, values, 0.0).sum(axis=1), count)
+    dx = np.where(valid, x - x_mean[:, None, :], 0.0)
+    dy = np.where(valid, values - y_mean[:, None, :], 0.0)
+    slopes = _safe_divide((dx * dy).sum(axis=1), (dx * dx).sum(axis=1))
+    slopes[count < 2] = np.nan
+    return slopes
+
+
+def compute_scores(cube: WeatherCube, method: str, window: int = 96, slot_minutes: int = 60) -> np.ndarray:
+    """
+    按指定方法计算整个数据立方体的异常分数
+
+    Args:
+        cube: 对齐后的数据
+        method: rolling / seasonal / mad
+        window: 滚动窗口长度（时间点数，仅 rolling）
+        slot_minutes: 时段长度（仅 seasonal）
+
+    Returns:
+        与 cube.values 同形状的分数
+    """
+    if method == METHOD_ROLLING:
+        return rolling_zscores(cube.values, window)
+    if method == METHOD_SEASONAL:
+        return seasonal_zscores(cube.values, cube.times, slot_minutes)
+    if method == METHOD_MAD:
+        return mad_scores(cube.values)
+    raise ValueError(f"不支持的异常检测方法: {method}")
+
+
+class AnomalyEngine:
+    """
+    异常检测与趋势分析引擎
+    从列式分块读取多个城市的数据并对齐为三维数组
+    """
+
+    def __init__(self, db_manager):
+        """
+        初始化分析引擎
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
+        self.db_manager = db_manager
+
+    def load_cube(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        fields: List[str]
+    ) -> WeatherCube:
+        """
+        读取多个城市的数据并按时间对齐
+
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 字段列表
+
+        Returns:
+            对齐后的数据立方体（时间轴为各城市时间点的并集）
+        """
+        frames = [
+            self.db_manager.get_weather_frame(
+                {'city_id': city_id, 'start_date': f"{start_date}T00:00", 'end_date': f"{end_date}T23:59"},
+                fields
+            )
+            for city_id in city_ids
+        ]
+        fields = [f for f in fields if any(f in frame.columns for frame in frames)]
+
+        city_times = [frame['datetime'].to_numpy().astype('datetime64[m]') for frame in frames]
+        times = np.unique(np.concatenate(city_times)) if city_times else np.array([], dtype='datetime64[m]')
+
+        values = np.full((len(city_ids), len(times), len(fields)), np.nan)
+        for c, (frame, own_times) in enumerate(zip(frames, city_times)):
+            if len(own_times) == 0:
+                continue
+            positions = np.searchsorted(times, own_times)
+            for f, field in enumerate(fields):
+                if field in frame.columns:
+                    values[c, positions, f] = frame[field].to_numpy(dtype=np.float64)
+        return WeatherCube(list(city_ids), times, fields, values)
+
+    def scan(
+        self,
+        cube: WeatherCube,
+        method: str = METHOD_SEASONAL,
+        threshold: float = 3.0,
+        window: int = 96,
+        slot_minutes: int = 60
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        逐城市输出趋势与异常点（生成器，便于流式响应）
+
+        Args:
+            cube: 对齐后的数据
+            method: 异常检测方法
+            threshold: 异常阈值（|分数| 超过该值视为异常）
+            window: 滚动窗口长度（时间点数）
+            slot_minutes: 同时段基线的时段长度（分钟）
+
+        Yields:
+            {'type': 'trend', city_id, slopes: {field: 每天变化量}} 与
+            {'type': 'anomaly', city_id, datetime, field, value, score}
+        """
+        if cube.empty:
+            return
+        scores = compute_scores(cube, method, window, slot_minutes)
+        slopes = trend_slopes(cube.values, cube.times)
+        labels = np.datetime_as_string(cube.times, unit='m')
+
+        with np.errstate(invalid='ignore'):
+            flagged = np.abs(scores) > threshold
+        for c, city_id in enumerate(cube.city_ids):
+            yield {
+                'type': 'trend',
+                'city_id': city_id,
+                'slopes': {
+                    field: None if np.isnan(slopes[c, f]) else float(slopes[c, f])
+                    for f, field in enumerate(cube.fields)
+                }
+            }
+            rows, cols = np.nonzero(flagged[c])
+            for t, f in zip(rows.tolist(), cols.tolist()):
+                yield {
+                    'type': 'anomaly',
+                    'city_id': city_id,
+                    'datetime': str(labels[t]),
+                    'field': cube.fields[f],
+                    'value': float(cube.values[c, t, f]),
+                    'score': round(float(scores[c, t, f]), 3)
+                }
@@ -0,0 +1,278 @@
+"""
+定时增量更新
+按 cron 表达式定期为所有启用的城市执行水位增量更新（只下载各字段水位之后的数据），
+各城市在 spread 时长内均匀错开以平滑上游请求，每轮的运行指标写入 event_logs
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Set
+
+logger = logging.getLogger(__name__)
+
+# 各字段的取值范围：分 时 日 月 周（0 为周日，7 也视为周日）
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(text: str, low: int, high: int) -> Set[int]:
+    """解析单个 cron 字段，支持 *、*/n、a-b、a-b/n 以及逗号分隔的列表"""
+    values = set()
+    for part in text.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if expr == '*':
+            first, last = low, high
+        elif '-' in expr:
+            first, last = (int(v) for v in expr.split('-', 1))
+        else:
+            first = int(expr)
+            last = high if step > 1 else first
+        if first < low or last > high or first > last or step < 1:
+            raise ValueError(f"cron 字段超出范围: {part}")
+        values.update(range(first, last + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    五段式 cron 表达式（分 时 日 月 周）
+    日与周同时受限时按 cron 惯例满足其一即可
+    """
+
+    def __init__(self, expression: str):
+        """
+        解析表达式
+
+        Args:
+            expression: 如 '30 3 * * *'（每天 03:30）、'0 */6 * * *'（每 6 小时）
+
+        Raises:
+            ValueError: 表达式格式错误
+        """
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 表达式应包含 5 个字段: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(part, low, high) for part, (low, high) in zip(parts, _CRON_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self._day_restricted = parts[2] != '*'
+        self._weekday_restricted = parts[4] != '*'
+
+    def _day_matches(self, moment: datetime) -> bool:
+        """日期是否满足日/周字段"""
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        计算严格晚于 moment 的下一次触发时间
+
+        Args:
+            moment: 基准时间
+
+        Returns:
+            下一次触发时间（精确到分钟）
+
+        Raises:
+            ValueError: 五年内没有匹配的时间（如 2 月 30 日）
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                candidate = candidate.replace(year=year, month=candidate.month % 12 + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron 表达式没有可触发的时间: {self.expression}")
+
+
+class AutoUpdateScheduler:
+    """
+    定时增量更新调度器
+    后台线程在每个触发时间执行一轮更新；同一时刻只运行一轮
+    """
+
+    def __init__(
+        self,
+        data_manager,
+        db_manager,
+        city_manager,
+        schedule: str,
+        fields: List[str],
+        spread_minutes: float = 30,
+        initial_days: int = 7
+    ):
+        """
+        初始化调度器
+
+        Args:
+            data_manager: 数据管理器实例（执行单个城市的增量更新）
+            db_manager: 数据库管理器实例（记录运行指标）
+            city_manager: 城市管理器实例
+            schedule: cron 表达式
+            fields: 需要保持最新的字段
+            spread_minutes: 各城市的更新在该时长内均匀错开
+            initial_days: 本地没有数据时向前追溯的天数
+        """
+        self.data_manager = data_manager
+        self.db_manager = db_manager
+        self.city_manager = city_manager
+        self.schedule = CronSchedule(schedule)
+        self.fields = list(fields)
+        self.spread_seconds = max(spread_minutes, 0) * 60
+        self.initial_days = initial_days
+
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        """是否正在执行一轮更新"""
+        return self._run_lock.locked()
+
+    def start(self):
+        """启动后台调度线程"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='auto-update', daemon=True)
+        self._thread.start()
+        logger.info(f"定时增量更新已启动: {self.schedule.expression}")
+
+    def stop(self, timeout: float = 5.0):
+        """停止调度线程（进行中的一轮在当前城市完成后退出）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        """等待下一个触发时间并执行"""
+        while not self._stop_event.is_set():
+            self.next_run = self.schedule.next_after(datetime.now())
+            delay = (self.next_run - datetime.now()).total_seconds()
+            if self._stop_event.wait(max(delay, 0)):
+                break
+            try:
+                self.run_once(spread_seconds=self.spread_seconds)
+            except Exception as e:
+                logger.error(f"定时增量更新失败: {e}")
+
+    def run_once(
+        self,
+        spread_seconds: float = 0,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        为所有启用的城市执行一轮增量更新
+
+        Args:
+            spread_seconds: 各城市在该时长内均匀错开开始
+            should_cancel: 返回 True 时停止
+            progress_callback: 每个城市完成后回调当前指标
+
+        Returns:
+            本轮运行指标；已有一轮在运行时返回 {'skipped': True}
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("上一轮增量更新仍在运行，跳过本次触发")
+            return {'skipped': True}
+
+        try:
+            cities = self.city_manager.get_all_cities()
+            started = time.monotonic()
+            metrics = {
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'total_cities': len(cities),
+                'updated_cities': 0,
+                'failed_cities': 0,
+                'up_to_date_cities': 0,
+                'requests': 0,
+                'saved_records': 0,
+                'lagging': {},
+                'cancelled': False
+            }
+            interval = spread_seconds / len(cities) if cities else 0
+
+            for index, city in enumerate(cities):
+                # 按序号错开开始时间，等待期间可被停止/取消
+                wait = started + index * interval - time.monotonic()
+                if wait > 0 and self._stop_event.wait(wait):
+                    metrics['cancelled'] = True
+                    break
+                if self._stop_event.is_set() or (should_cancel and should_cancel()):
+                    metrics['cancelled'] = True
+                    break
+
+                try:
+                    result = self.data_manager.update_incremental(
+                        city['id'], self.fields, initial_days=self.initial_days, should_cancel=should_cancel
+                    )
+                except Exception as e:
+                    logger.warning(f"城市 {city['city_name']} 增量更新失败: {e}")
+                    metrics['failed_cities'] += 1
+                    continue
+
+                metrics['requests'] += result['requests']
+                metrics['saved_records'] += result['saved_records']
+                if not result['success']:
+                    metrics['failed_cities'] += 1
+                elif result['requests']:
+                    metrics['updated_cities'] += 1
+                else:
+                    metrics['up_to_date_cities'] += 1
+                if result['lagging_fields']:
+                    metrics['lagging'][city['id']] = result['lagging_fields']
+                if progress_callback:
+                    progress_callback(dict(metrics))
+
+            metrics['duration_seconds'] = round(time.monotonic() - started, 1)
+            self.last_run = metrics
+            self._record(metrics)
+            return metrics
+        finally:
+            self._run_lock.release()
+
+    def _record(self, metrics: Dict[str, Any]):
+        """将运行指标写入事件日志"""
+        level = 'WARNING' if metrics['failed_cities'] else 'INFO'
+        message = (
+            f"增量更新完成: {metrics['updated_cities']}/{metrics['total_cities']} 个城市有新数据，"
+            f"失败 {metrics['failed_cities']} 个，请求 {metrics['requests']} 次，"
+            f"写入 {metrics['saved_records']} 条，耗时 {metrics['duration_seconds']} 秒"
+        )
+        logger.info(message)
+        self.db_manager.log_event(level, 'AUTO_UPDATE', message, json.dumps(metrics, ensure_ascii=False))
+
+    def status(self) -> Dict[str, Any]:
+        """
+        获取调度状态
+
+        Returns:
+            {'schedule', 'enabled', 'running', 'next_run', 'last_run'}
+        """
+        return {
+            'schedule': self.schedule.expression,
+            'enabled': self._thread is not None,
+            'running': self.running,
+            'next_run': self.next_run.isoformat(timespec='minutes') if self.next_run else None,
+            'last_run': self.last_run
+        }
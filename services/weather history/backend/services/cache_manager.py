@@ -1,17 +1,180 @@
 """
 缓存管理器
 负责API响应的缓存管理
+两级缓存：进程内按字节数限制的 LRU（保存已解析对象）+ SQLite api_cache（压缩后的 BLOB）
 遵循单一职责原则和开闭原则
 """
 import logging
 import json
 import hashlib
-from typing import Optional, Dict, Any
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from backend.models.database import DatabaseManager
 
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时使用 zlib
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
+# zstd 帧头魔数，用于区分压缩格式
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# 解析后对象占用内存与 JSON 字节数之比的上界：
+# 数值列中每个值在 JSON 中至少约 4 字节（如 "0.0,"），解析后占 8 字节列表槽位 + 24 字节 float
+JSON_MEMORY_FACTOR = 8
+
+
+def _dump_json(value: Any) -> bytes:
+    """序列化为紧凑的 UTF-8 JSON"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _compress_json(raw: bytes, level: int) -> bytes:
+    """压缩 JSON 字节串（zstd 可用时使用 zstd，否则使用 zlib）"""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(raw)
+    return zlib.compress(raw, level)
+
+
+def _decompress_json(data: Any) -> bytes:
+    """解压为 JSON 字节串，兼容旧版本保存的未压缩 JSON 文本"""
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    data = bytes(data)
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("缓存数据为 zstd 格式，但未安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def compress_payload(value: Any, level: int = 6) -> bytes:
+    """
+    序列化并压缩缓存数据
+
+    Args:
+        value: 要缓存的数据
+        level: 压缩级别
+
+    Returns:
+        压缩后的字节串（zstd 可用时使用 zstd，否则使用 zlib）
+    """
+    return _compress_json(_dump_json(value), level)
+
+
+def decompress_payload(data: Any) -> Any:
+    """
+    解压并反序列化缓存数据，兼容旧版本保存的未压缩 JSON 文本
+
+    Args:
+        data: api_cache.response_data 中读取的值
+
+    Returns:
+        反序列化后的数据
+    """
+    return json.loads(_decompress_json(data))
+
+
+class MemoryLRU:
+    """
+    按字节数限制容量的内存 LRU 缓存
+    保存已解析的对象，命中时无需再访问磁盘或解析 JSON
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        初始化内存缓存
+
+        Args:
+            max_bytes: 容量上限（按解析后对象的估算内存字节数），0 表示禁用
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, datetime, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取未过期的对象，命中时移到队尾"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expired_at, size = entry
+            if datetime.now() > expired_at:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def contains(self, key: str) -> bool:
+        """是否存在未过期的条目（不计入命中统计，也不调整 LRU 顺序）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and datetime.now() <= entry[1]
+
+    def put(self, key: str, value: Any, expired_at: datetime, size: int):
+        """放入对象，超出容量时按最近最少使用淘汰"""
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expired_at, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """删除条目（调用方持有锁）"""
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def delete(self, key: str):
+        """删除指定条目"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear_expired(self) -> int:
+        """清理过期条目"""
+        now = datetime.now()
+        with self._lock:
+            expired = [k for k, (_, expired_at, _) in self._entries.items() if now > expired_at]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+
+    def clear(self):
+        """清空"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
 
 class CacheManager:
     """
@@ -19,16 +182,27 @@ class CacheManager:
     负责API响应的缓存存储和检索
     """
     
-    def __init__(self, db_manager: DatabaseManager, expire_hours: int = 720):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        expire_hours: int = 720,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        compress_level: int = 6
+    ):
         """
         初始化缓存管理器
         
         Args:
             db_manager: 数据库管理器实例（依赖注入）
             expire_hours: 缓存过期时间（小时），默认720小时（30天）
+            memory_max_bytes: 内存 LRU 容量上限（字节），0 表示只使用 SQLite
+            compress_level: SQLite 中缓存数据的压缩级别
         """
         self.db_manager = db_manager
         self.expire_hours = expire_hours
+        self.compress_level = compress_level
+        self.memory = MemoryLRU(memory_max_bytes)
+        self._disk_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
         logger.info(f"缓存管理器初始化完成，过期时间: {expire_hours}小时")
     
     def generate_cache_key(self, params: Dict[str, Any]) -> str:
@@ -58,13 +232,22 @@ class CacheManager:
             
         Returns:
             缓存的数据字典，如果不存在或已过期返回None
+            内存层命中时返回共享对象，调用方不应原地修改
         """
+        # 1. 内存层
+        data = self.memory.get(key)
+        if data is not None:
+            logger.debug(f"内存缓存命中: {key}")
+            return data
+        
+        # 2. SQLite 层
         sql = "SELECT response_data, expired_at FROM api_cache WHERE cache_key = ?"
         
         try:
             result = self.db_manager.execute_query(sql, (key,))
             
             if not result:
+                self._disk_stats['misses'] += 1
                 logger.debug(f"缓存未命中: {key}")
                 return None
             
@@ -73,13 +256,17 @@ class CacheManager:
             
             # 检查是否过期
             if datetime.now() > expired_at:
+                self._disk_stats['misses'] += 1
                 logger.debug(f"缓存已过期: {key}")
                 # 删除过期缓存
                 self._delete_cache(key)
                 return None
             
-            # 解析JSON数据
-            data = json.loads(cache_data['response_data'])
+            # 解压并解析数据，回填内存层
+            raw = _decompress_json(cache_data['response_data'])
+            data = json.loads(raw)
+            self._disk_stats['hits'] += 1
+            self.memory.put(key, data, expired_at, self._estimate_size(raw))
             logger.debug(f"缓存命中: {key}")
             return data
             
@@ -105,18 +292,20 @@ class CacheManager:
         # 计算过期时间
         expired_at = datetime.now() + timedelta(hours=expire_hours)
         
-        # 序列化数据
-        response_data = json.dumps(value, ensure_ascii=False)
-        
-        # 准备插入数据
-        cache_data = {
-            'cache_key': key,
-            'response_data': response_data,
-            'expired_at': expired_at.isoformat()
-        }
-        
         try:
+            # 序列化并压缩数据 (以 BLOB 形式存储)
+            raw = _dump_json(value)
+            response_data = _compress_json(raw, self.compress_level)
+            
+            # 准备插入数据
+            cache_data = {
+                'cache_key': key,
+                'response_data': response_data,
+                'expired_at': expired_at.isoformat()
+            }
+            
             self.db_manager.bulk_insert('api_cache', [cache_data])
+            self.memory.put(key, value, expired_at, self._estimate_size(raw))
             logger.debug(f"缓存设置成功: {key}, 过期时间: {expired_at}")
             return True
         except Exception as e:
@@ -133,6 +322,9 @@ class CacheManager:
         Returns:
             是否过期（不存在也返回True）
         """
+        if self.memory.contains(key):
+            return False
+        
         sql = "SELECT expired_at FROM api_cache WHERE cache_key = ?"
         
         try:
@@ -159,10 +351,12 @@ class CacheManager:
             是否删除成功
         """
         sql = "DELETE FROM api_cache WHERE cache_key = ?"
+        self.memory.delete(key)
         
         try:
             affected = self.db_manager.execute_update(sql, (key,))
             if affected > 0:
+                self._disk_stats['evictions'] += 1
                 logger.debug(f"删除缓存成功: {key}")
                 return True
             return False
@@ -178,9 +372,11 @@ class CacheManager:
             清理的缓存数量
         """
         sql = "DELETE FROM api_cache WHERE expired_at < ?"
+        self.memory.clear_expired()
         
         try:
             affected = self.db_manager.execute_update(sql, (datetime.now().isoformat(),))
+            self._disk_stats['evictions'] += affected
             logger.info(f"清理过期缓存成功，删除 {affected} 条记录")
             return affected
         except Exception as e:
@@ -195,6 +391,7 @@ class CacheManager:
             清理的缓存数量
         """
         sql = "DELETE FROM api_cache"
+        self.memory.clear()
         
         try:
             affected = self.db_manager.execute_update(sql)
@@ -229,7 +426,8 @@ class CacheManager:
                 'total': total,
                 'valid': valid,
                 'expired': expired,
-                'expire_hours': self.expire_hours
+                'expire_hours': self.expire_hours,
+                'tiers': self._tier_stats()
             }
             
             logger.debug(f"缓存统计: {stats}")
@@ -241,5 +439,24 @@ class CacheManager:
                 'total': 0,
                 'valid': 0,
                 'expired': 0,
-                'expire_hours': self.expire_hours
+                'expire_hours': self.expire_hours,
+                'tiers': self._tier_stats()
+            }
+    
+    def _tier_stats(self) -> Dict[str, Any]:
+        """各层命中/未命中/淘汰统计"""
+        return {
+            'memory': self.memory.stats(),
+            'sqlite': {
+                **self._disk_stats,
+                'compression': 'zstd' if zstandard is not None else 'zlib'
             }
+        }
+    
+    @staticmethod
+    def _estimate_size(raw: bytes) -> int:
+        """
+        估算解析后对象在内存中的大小
+        以未压缩 JSON 长度乘以 JSON_MEMORY_FACTOR 估算，压缩率高的数据（夜间辐射为 0 等）也不会低估
+        """
+        return len(raw) * JSON_MEMORY_FACTOR
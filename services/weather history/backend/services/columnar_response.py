@@ -0,0 +1,172 @@
+"""
+列式查询响应编码
+/api/weather/query 的可选响应格式：字段名只出现一次的列式 JSON（orjson 直接序列化 NumPy 数组），
+以及 Apache Arrow IPC 二进制流；两者在客户端支持时再做 gzip 压缩
+"""
+import gzip
+import json
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json（较慢）
+    orjson = None
+
+try:
+    import pyarrow
+except ImportError:  # 可选依赖，未安装时不支持 arrow 格式
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# 支持的响应格式
+FORMAT_RECORDS = 'records'  # 逐条记录（默认，兼容旧前端）
+FORMAT_COLUMNS = 'columns'  # 列式 JSON
+FORMAT_ARROW = 'arrow'  # Arrow IPC 流
+RESPONSE_FORMATS = (FORMAT_RECORDS, FORMAT_COLUMNS, FORMAT_ARROW)
+
+JSON_MIMETYPE = 'application/json'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Arrow 模式下，非列数据（城市信息、统计摘要等）以 JSON 形式存放在 schema 元数据的该键下
+ARROW_META_KEY = b'weather_meta'
+
+
+def arrow_available() -> bool:
+    """是否安装了 pyarrow"""
+    return pyarrow is not None
+
+
+def _plain_list(values) -> list:
+    """标准库 json 回退路径：NumPy 数组转列表，NaN 转为 null，float32 保留其有效位数"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == 'f':
+            digits = 7 if values.dtype.itemsize <= 4 else 15
+            return [None if v != v else float(f"{v:.{digits}g}") for v in values.tolist()]
+        return values.tolist()
+    return list(values)
+
+
+def dumps_json(payload: Dict[str, Any]) -> bytes:
+    """
+    序列化包含列数组的响应
+
+    Args:
+        payload: 响应字典，列可以是 NumPy 数组（float 列中的 NaN 输出为 null）或列表
+
+    Returns:
+        UTF-8 JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+    def default(value):
+        if isinstance(value, np.ndarray):
+            return _plain_list(value)
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"无法序列化的类型: {type(value)}")
+
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=default).encode('utf-8')
+
+
+def encode_columns(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    整理列数据以便序列化：orjson 不支持字符串/对象数组，datetime 列转为列表；其余数值数组保持原样
+
+    Args:
+        columns: {'datetime': [...], 字段: 数组或列表}
+
+    Returns:
+        可直接交给 dumps_json 的列字典
+    """
+    encoded = {}
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'USO':
+            encoded[name] = values.tolist()
+        elif isinstance(values, np.ndarray) and not values.flags.c_contiguous:
+            encoded[name] = np.ascontiguousarray(values)
+        else:
+            encoded[name] = values
+    return encoded
+
+
+def encode_arrow(columns: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    编码为 Arrow IPC 流（单个 RecordBatch）
+
+    Args:
+        columns: {'datetime': [...], 字段: 数组或列表}；datetime 为字符串列，其余为 float32 列
+        meta: 附加信息，JSON 序列化后存入 schema 元数据
+
+    Returns:
+        IPC 流字节串
+
+    Raises:
+        RuntimeError: 未安装 pyarrow
+    """
+    if pyarrow is None:
+        raise RuntimeError("未安装 pyarrow，不支持 arrow 响应格式")
+
+    arrays, names = [], []
+    for name, values in columns.items():
+        if name == 'datetime':
+            values = values.tolist() if isinstance(values, np.ndarray) else values
+            arrays.append(pyarrow.array(values, type=pyarrow.string()))
+        elif isinstance(values, np.ndarray):
+            # NumPy 数组零拷贝转换，NaN 标记为缺失
+            arrays.append(pyarrow.array(values.astype(np.float32, copy=False), from_pandas=True))
+        else:
+            arrays.append(pyarrow.array(values, type=pyarrow.float32()))
+        names.append(name)
+
+    metadata = {ARROW_META_KEY: dumps_json(meta)} if meta else None
+    batch = pyarrow.RecordBatch.from_arrays(arrays, names=names)
+    schema = batch.schema.with_metadata(metadata) if metadata else batch.schema
+
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """解析 Accept-Encoding，判断客户端是否接受 gzip（q=0 视为拒绝）"""
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() not in ('gzip', '*'):
+            continue
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def maybe_gzip(
+    body: bytes,
+    accept_encoding: Optional[str],
+    min_bytes: int = 1024,
+    level: int = 5
+) -> Tuple[bytes, Optional[str]]:
+    """
+    按客户端能力压缩响应体
+
+    Args:
+        body: 原始响应体
+        accept_encoding: 请求的 Accept-Encoding 头
+        min_bytes: 小于该大小时不压缩
+        level: gzip 压缩级别
+
+    Returns:
+        (响应体, Content-Encoding)；未压缩时 Content-Encoding 为 None
+    """
+    if len(body) < min_bytes or not accepts_gzip(accept_encoding):
+        return body, None
+    return gzip.compress(body, compresslevel=level), 'gzip'
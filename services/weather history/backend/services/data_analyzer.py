@@ -4,9 +4,11 @@
 遵循单一职责原则
 """
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Union
 import pandas as pd
 import numpy as np
+from backend.services.aggregation import WeatherAggregator, finalize_stats
+from backend.services.anomaly_engine import AnomalyEngine, METHODS, METHOD_SEASONAL
 
 logger = logging.getLogger(__name__)
 
@@ -34,116 +36,288 @@ def convert_to_python_types(obj):
     return obj
 
 
+# 统计摘要涉及的数值字段
+SUMMARY_FIELDS = [
+    'temperature_2m', 'precipitation', 'wind_speed_10m',
+    'shortwave_radiation', 'relative_humidity_2m', 'surface_pressure'
+]
+
+
+def build_summary(stats: Dict[str, Dict[str, Any]], weather_mode: Optional[int] = None) -> Dict[str, Any]:
+    """
+    由各字段的聚合统计量生成统计摘要（内存计算与 SQL 聚合共用）
+    
+    Args:
+        stats: {field: {count, sum, min, max, avg, std, positive}}
+        weather_mode: 出现次数最多的天气代码
+        
+    Returns:
+        统计摘要字典
+    """
+    def present(field):
+        item = stats.get(field)
+        return item if item and item['count'] else None
+    
+    summary = {}
+    
+    # 温度统计
+    temp = present('temperature_2m')
+    if temp:
+        summary['temperature'] = {
+            'avg': round(temp['avg'], 2),
+            'max': round(temp['max'], 2),
+            'min': round(temp['min'], 2),
+            'std': round(temp['std'], 2) if temp['std'] is not None else None
+        }
+    
+    # 降水统计
+    precip = present('precipitation')
+    if precip:
+        summary['precipitation'] = {
+            'total': round(precip['sum'], 2),
+            'avg': round(precip['avg'], 2),
+            'max': round(precip['max'], 2),
+            'rainy_hours': int(precip['positive'])
+        }
+    
+    # 风速统计
+    wind = present('wind_speed_10m')
+    if wind:
+        summary['wind_speed'] = {
+            'avg': round(wind['avg'], 2),
+            'max': round(wind['max'], 2),
+            'min': round(wind['min'], 2)
+        }
+    
+    # 辐照度统计
+    radiation = present('shortwave_radiation')
+    if radiation:
+        total_sum = radiation['sum']
+        summary['solar_radiation'] = {
+            'total': round(total_sum, 2),
+            'total_mj': round(total_sum * 0.0036, 2),  # Wh/m² 转换为 MJ/m²
+            'total_kwh': round(total_sum / 1000, 2),  # 转换为kWh/m²
+            'avg': round(radiation['avg'], 2),
+            'max': round(radiation['max'], 2)
+        }
+    
+    # 湿度统计
+    humidity = present('relative_humidity_2m')
+    if humidity:
+        summary['humidity'] = {
+            'avg': round(humidity['avg'], 2),
+            'max': round(humidity['max'], 2),
+            'min': round(humidity['min'], 2)
+        }
+    
+    # 气压统计
+    pressure = present('surface_pressure')
+    if pressure:
+        summary['pressure'] = {
+            'avg': round(pressure['avg'], 2),
+            'max': round(pressure['max'], 2),
+            'min': round(pressure['min'], 2)
+        }
+    
+    # 天气代码统计 (最频繁出现的天气)
+    if weather_mode is not None:
+        summary['weather'] = {
+            'most_frequent': int(weather_mode)
+        }
+    
+    return convert_to_python_types(summary)
+
+
 class DataAnalyzer:
     """
     数据分析器类
     负责天气数据的统计和分析
     """
     
-    def __init__(self):
-        """初始化数据分析器"""
+    def __init__(
+        self,
+        aggregator: Optional[WeatherAggregator] = None,
+        engine: Optional[AnomalyEngine] = None
+    ):
+        """
+        初始化数据分析器
+        
+        Args:
+            aggregator: SQL 聚合查询服务，提供时可直接在数据库中按城市/日期统计
+            engine: 异常检测与趋势分析引擎，提供时支持多城市、多字段的批量扫描
+        """
+        self.aggregator = aggregator
+        self.engine = engine
         logger.info("数据分析器初始化完成")
     
-    def calculate_summary(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def calculate_summary(
+        self,
+        data: Union[List[Dict[str, Any]], Dict[str, List[Any]], pd.DataFrame]
+    ) -> Dict[str, Any]:
         """
         计算数据统计摘要
         
         Args:
-            data: 天气数据列表
+            data: 天气数据列表、解析器输出的列式字典，或列式存储返回的 DataFrame
             
         Returns:
             统计摘要字典
         """
-        if not data:
+        if data is None or len(data) == 0:
             return {}
         
         try:
-            df = pd.DataFrame(data)
-            summary = {}
-            
-            # 温度统计
-            if 'temperature_2m' in df.columns:
-                temp_data = df['temperature_2m'].dropna()
-                if len(temp_data) > 0:
-                    summary['temperature'] = {
-                        'avg': round(temp_data.mean(), 2),
-                        'max': round(temp_data.max(), 2),
-                        'min': round(temp_data.min(), 2),
-                        'std': round(temp_data.std(), 2)
-                    }
-            
-            # 降水统计
-            if 'precipitation' in df.columns:
-                precip_data = df['precipitation'].dropna()
-                if len(precip_data) > 0:
-                    summary['precipitation'] = {
-                        'total': round(precip_data.sum(), 2),
-                        'avg': round(precip_data.mean(), 2),
-                        'max': round(precip_data.max(), 2),
-                        'rainy_hours': int((precip_data > 0).sum())
-                    }
-            
-            # 风速统计
-            if 'wind_speed_10m' in df.columns:
-                wind_data = df['wind_speed_10m'].dropna()
-                if len(wind_data) > 0:
-                    summary['wind_speed'] = {
-                        'avg': round(wind_data.mean(), 2),
-                        'max': round(wind_data.max(), 2),
-                        'min': round(wind_data.min(), 2)
-                    }
-            
-            # 辐照度统计
-            if 'shortwave_radiation' in df.columns:
-                radiation_data = df['shortwave_radiation'].dropna()
-                if len(radiation_data) > 0:
-                    total_sum = radiation_data.sum()
-                    summary['solar_radiation'] = {
-                        'total': round(total_sum, 2),
-                        'total_mj': round(total_sum * 0.0036, 2),  # Wh/m² 转换为 MJ/m²
-                        'total_kwh': round(total_sum / 1000, 2),  # 转换为kWh/m²
-                        'avg': round(radiation_data.mean(), 2),
-                        'max': round(radiation_data.max(), 2)
-                    }
-            
-            # 湿度统计
-            if 'relative_humidity_2m' in df.columns:
-                humidity_data = df['relative_humidity_2m'].dropna()
-                if len(humidity_data) > 0:
-                    summary['humidity'] = {
-                        'avg': round(humidity_data.mean(), 2),
-                        'max': round(humidity_data.max(), 2),
-                        'min': round(humidity_data.min(), 2)
-                    }
-            
-            # 气压统计
-            if 'surface_pressure' in df.columns:
-                pressure_data = df['surface_pressure'].dropna()
-                if len(pressure_data) > 0:
-                    summary['pressure'] = {
-                        'avg': round(pressure_data.mean(), 2),
-                        'max': round(pressure_data.max(), 2),
-                        'min': round(pressure_data.min(), 2)
-                    }
-            
-            # 天气代码统计 (最频繁出现的天气)
+            df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+            if df.empty:
+                return {}
+            
+            stats = {}
+            for field in SUMMARY_FIELDS:
+                if field not in df.columns:
+                    continue
+                values = pd.to_numeric(df[field], errors='coerce').dropna().to_numpy(dtype=float)
+                if len(values) == 0:
+                    continue
+                stats[field] = finalize_stats({
+                    'count': len(values),
+                    'sum': float(values.sum()),
+                    'min': float(values.min()),
+                    'max': float(values.max()),
+                    'sumsq': float(np.dot(values, values)),
+                    'positive': int((values > 0).sum())
+                })
+            
+            weather_mode = None
             if 'weather_code' in df.columns:
-                weather_data = df['weather_code'].dropna()
-                if len(weather_data) > 0:
-                    # 获取最频繁出现的值 (众数)
-                    mode_val = weather_data.mode()
-                    if not mode_val.empty:
-                        summary['weather'] = {
-                            'most_frequent': int(mode_val.iloc[0])
-                        }
+                # 获取最频繁出现的值 (众数)
+                mode_val = df['weather_code'].dropna().mode()
+                if not mode_val.empty:
+                    weather_mode = mode_val.iloc[0]
             
             logger.debug(f"计算统计摘要成功: {len(data)} 条记录")
-            return convert_to_python_types(summary)
+            return build_summary(stats, weather_mode)
             
         except Exception as e:
             logger.error(f"计算统计摘要失败: {e}")
             return {}
     
+    def summarize_cities(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        fields: Optional[List[str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        从日/月汇总表一次性计算多个城市的统计摘要，不读取原始记录
+        
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 只统计这些字段（与 calculate_summary 对查询结果统计时一致），None 表示全部
+            
+        Returns:
+            {city_id: 统计摘要}，没有数据的城市摘要为空字典
+        """
+        if self.aggregator is None:
+            raise RuntimeError('未配置聚合查询服务')
+        
+        summary_fields = [f for f in SUMMARY_FIELDS if fields is None or f in fields]
+        stats = self.aggregator.field_stats(city_ids, start_date, end_date, summary_fields)
+        if fields is None or 'weather_code' in fields:
+            modes = self.aggregator.weather_modes(city_ids, start_date, end_date)
+        else:
+            modes = {}
+        return {
+            city_id: build_summary(stats.get(city_id, {}), modes.get(city_id))
+            for city_id in city_ids
+        }
+    
+    def calculate_daily_stats(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        读取按 (城市, 日期) 汇总的日均值/极值/总和/标准差
+        
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 需要统计的字段
+            
+        Returns:
+            每日统计列表
+        """
+        if self.aggregator is None:
+            raise RuntimeError('未配置聚合查询服务')
+        
+        return self.aggregator.daily_stats(city_ids, start_date, end_date, fields)
+    
+    def calculate_monthly_stats(
+        self,
+        city_ids: List[int],
+        start_month: str,
+        end_month: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        读取按 (城市, 月份) 汇总的月均值/极值/总和/标准差
+        
+        Args:
+            city_ids: 城市ID列表
+            start_month: 开始月份 (YYYY-MM)
+            end_month: 结束月份 (YYYY-MM)
+            fields: 需要统计的字段
+            
+        Returns:
+            每月统计列表
+        """
+        if self.aggregator is None:
+            raise RuntimeError('未配置聚合查询服务')
+        
+        return self.aggregator.monthly_stats(city_ids, start_month, end_month, fields)
+    
+    def scan_anomalies(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        fields: List[str],
+        method: str = METHOD_SEASONAL,
+        threshold: float = 3.0,
+        window: int = 96
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        一次扫描多个城市、多个字段的异常点与趋势斜率
+        
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 需要分析的字段
+            method: 异常检测方法 (rolling / seasonal / mad)
+            threshold: 异常阈值
+            window: 滚动窗口长度（时间点数）
+            
+        Returns:
+            逐城市输出趋势与异常点的生成器（见 AnomalyEngine.scan）
+        """
+        if self.engine is None:
+            raise RuntimeError('未配置异常检测引擎')
+        if method not in METHODS:
+            raise ValueError(f"不支持的异常检测方法: {method}")
+        
+        cube = self.engine.load_cube(city_ids, start_date, end_date, fields)
+        logger.info(
+            f"异常扫描: {len(cube.city_ids)} 个城市 × {len(cube.times)} 个时间点 × {len(cube.fields)} 个字段, 方法={method}"
+        )
+        return self.engine.scan(cube, method=method, threshold=threshold, window=window)
+    
     def calculate_daily_avg(self, hourly_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         计算每日平均值
@@ -1,29 +1,145 @@
 """
 数据导出服务
 负责将天气数据导出为Excel和CSV格式
+逐行流式写出（CSV 分块输出，Excel 使用 openpyxl write_only 模式），内存占用与数据量无关
 遵循单一职责原则和接口隔离原则
 """
+import csv
 import logging
-import pandas as pd
-from io import BytesIO
-from typing import List, Dict, Any
+from collections import Counter
+from datetime import date
+from io import BytesIO, StringIO
+from itertools import chain, islice
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Optional, Tuple, BinaryIO
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.utils import get_column_letter
+
+from backend.services.field_registry import FIELD_REGISTRY
 
 logger = logging.getLogger(__name__)
 
+# 天气代码转换 (Item 17)
+WEATHER_CODE_NAMES = {
+    0: '晴朗', 1: '晴到多云', 2: '多云', 3: '阴天', 45: '雾',
+    48: '沉积雾', 51: '小毛毛雨', 53: '毛毛雨', 55: '大毛毛雨',
+    61: '小雨', 63: '中雨', 65: '大雨', 71: '小雪', 73: '中雪',
+    75: '大雪', 80: '阵雨', 81: '中阵雨', 82: '大阵雨', 95: '雷阵雨'
+}
+
+# 按照固定顺序排列核心字段，增加导出的整齐度 (Item 2 改进)
+# 严格限制字段：只导出此处定义的字段，不导出数据库中多余的空闲字段（如已弃用的 80m 风速等）(Item 2 & 13)
+EXPORT_FIELD_ORDER = [
+    'temperature_2m', 'relative_humidity_2m', 'dew_point_2m',
+    'precipitation', 'rain', 'snowfall', 'surface_pressure', 'cloud_cover',
+    'wind_speed_10m', 'wind_direction_10m', 'wind_gusts_10m',
+    'wind_speed_100m', 'wind_direction_100m',
+    'shortwave_radiation', 'direct_radiation', 'diffuse_radiation', 'direct_normal_irradiance',
+    'evapotranspiration', 'soil_temperature_0_to_7cm', 'soil_moisture_0_to_7cm',
+    'weather_code'
+]
+
+# 每日汇总中取总和（而非均值）的字段：降水量、辐射和蒸发量
+DAILY_SUM_FIELDS = {
+    'precipitation', 'rain', 'evapotranspiration',
+    'shortwave_radiation', 'direct_radiation', 'diffuse_radiation',
+    'direct_normal_irradiance'
+}
+
+
+class _DailySummary:
+    """
+    每日汇总累加器
+    逐行累加 (日期, 城市) 分组的总和/计数与天气代码频次，内存占用只与天数 × 城市数相关
+    """
+
+    def __init__(self, value_fields: List[str]):
+        self.numeric_fields = [f for f in value_fields if f != 'weather_code']
+        self.has_weather = 'weather_code' in value_fields
+        self.groups: Dict[Tuple, Dict[str, Any]] = {}
+        self.seen = set()
+
+    def add(self, group_key: Tuple, record: Dict[str, Any], weather_name: Optional[str]):
+        """累加一行数据"""
+        group = self.groups.get(group_key)
+        if group is None:
+            group = {
+                'sums': [0.0] * len(self.numeric_fields),
+                'counts': [0] * len(self.numeric_fields),
+                'weather': Counter()
+            }
+            self.groups[group_key] = group
+        sums, counts = group['sums'], group['counts']
+        for i, field in enumerate(self.numeric_fields):
+            value = record.get(field)
+            if value is not None and value == value:  # 排除 None 与 NaN
+                sums[i] += value
+                counts[i] += 1
+                self.seen.add(field)
+        if weather_name is not None:
+            group['weather'][weather_name] += 1
+
+    def rows(self, mapping: Dict[str, str], with_city: bool) -> Tuple[List[str], List[List[Any]]]:
+        """
+        生成汇总表
+
+        Returns:
+            (表头, 数据行)
+        """
+        # 全部为空的字段不参与汇总
+        fields = [f for f in self.numeric_fields if f in self.seen]
+        index = {f: self.numeric_fields.index(f) for f in fields}
+
+        derived = []
+        if self.has_weather:
+            derived.append('主要天气')
+        if 'shortwave_radiation' in fields:
+            derived.append('日辐照量(MJ/m²)')
+        if 'wind_speed_10m' in fields:
+            derived.append('日平均风速(m/s)')
+
+        # 调整列顺序，将重要字段提前
+        header = ['日期'] + (['城市'] if with_city else []) + derived + [mapping.get(f, f) for f in fields]
+
+        rows = []
+        for group_key in sorted(self.groups):
+            group = self.groups[group_key]
+            values = {}
+            for field in fields:
+                i = index[field]
+                if field in DAILY_SUM_FIELDS:
+                    values[field] = group['sums'][i]
+                else:
+                    values[field] = group['sums'][i] / group['counts'][i] if group['counts'][i] else None
+
+            row = list(group_key)
+            if self.has_weather:
+                # 取当日最常见的天气，频次相同时取排序靠前者
+                weather = group['weather']
+                row.append(min(weather, key=lambda name: (-weather[name], name)) if weather else None)
+            if 'shortwave_radiation' in fields:
+                # 日辐照量 (MJ/m²) = Sum(W/m²) * 3600 / 1,000,000
+                row.append(round(values['shortwave_radiation'] * 0.0036, 2))
+            if 'wind_speed_10m' in fields:
+                # 日平均风速 (m/s) = mean(km/h) / 3.6
+                mean_speed = values['wind_speed_10m']
+                row.append(round(mean_speed / 3.6, 2) if mean_speed is not None else None)
+            row.extend(values[f] for f in fields)
+            rows.append(row)
+        return header, rows
+
 
 class DataExporter:
     """
     数据导出器类
     负责将数据导出为不同格式
     """
-    
+
     def __init__(self):
         """初始化数据导出器"""
         logger.info("数据导出器初始化完成")
-    
+
     def export_to_excel(
         self,
         data: List[Dict[str, Any]],
@@ -34,72 +150,26 @@ class DataExporter:
     ) -> bytes:
         """
         导出数据为Excel格式
-        
+
         Args:
             data: 数据列表
             filename: 文件名
             fields: 要导出的字段列表，None表示导出所有字段
             include_summary: 是否包含汇总表
-            
+
         Returns:
             Excel文件的字节流
         """
         try:
-            # 转换为DataFrame
-            df = self._format_data(data, fields, city_name)
-            
-            # 创建Excel工作簿
-            wb = Workbook()
-            
-            # 删除默认的工作表
-            if 'Sheet' in wb.sheetnames:
-                wb.remove(wb['Sheet'])
-            
-            # 添加数据表
-            ws_data = wb.create_sheet('天气数据')
-            
-            # 写入数据
-            for r in dataframe_to_rows(df, index=False, header=True):
-                ws_data.append(r)
-            
-            # 设置表头样式
-            header_fill = PatternFill(start_color='1F4E78', end_color='1F4E78', fill_type='solid')
-            header_font = Font(color='FFFFFF', bold=True)
-            
-            for cell in ws_data[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # 自动调整列宽
-            for column in ws_data.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws_data.column_dimensions[column_letter].width = adjusted_width
-            
-            # 添加汇总表
-            if include_summary and len(df) > 0:
-                self._add_summary_sheet(wb, df)
-            
-            # 保存到字节流
             output = BytesIO()
-            wb.save(output)
-            output.seek(0)
-            
-            logger.info(f"导出Excel成功: {filename}, 共 {len(df)} 条记录")
+            count = self.write_excel(data, output, fields, include_summary, city_name)
+            logger.info(f"导出Excel成功: {filename}, 共 {count} 条记录")
             return output.getvalue()
-            
+
         except Exception as e:
             logger.error(f"导出Excel失败: {e}")
             raise
-    
+
     def export_to_csv(
         self,
         data: List[Dict[str, Any]],
@@ -109,227 +179,246 @@ class DataExporter:
     ) -> bytes:
         """
         导出数据为CSV格式
-        
+
         Args:
             data: 数据列表
             filename: 文件名
             fields: 要导出的字段列表，None表示导出所有字段
-            
+
         Returns:
             CSV文件的字节流
         """
         try:
-            # 转换为DataFrame
-            df = self._format_data(data, fields, city_name)
-            
-            # 转换为CSV
-            output = BytesIO()
-            df.to_csv(output, index=False, encoding='utf-8-sig')  # utf-8-sig支持Excel打开中文
-            output.seek(0)
-            
-            logger.info(f"导出CSV成功: {filename}, 共 {len(df)} 条记录")
-            return output.getvalue()
-            
+            file_bytes = b''.join(self.stream_csv(data, fields, city_name))
+            logger.info(f"导出CSV成功: {filename}, 共 {len(data)} 条记录")
+            return file_bytes
+
         except Exception as e:
             logger.error(f"导出CSV失败: {e}")
             raise
-    
-    def _format_data(
+
+    def resolve_fields(self, fields: List[str] = None, available: Iterable[str] = None) -> List[str]:
+        """
+        确定导出的数据字段及顺序
+
+        Args:
+            fields: 请求的字段列表，None表示全部
+            available: 数据中实际存在的字段，None表示不限制
+
+        Returns:
+            按 EXPORT_FIELD_ORDER 排序的字段列表
+        """
+        available = set(available) if available is not None else None
+        return [
+            f for f in EXPORT_FIELD_ORDER
+            if (fields is None or f in fields) and (available is None or f in available)
+        ]
+
+    def stream_csv(
         self,
-        data: List[Dict[str, Any]],
+        records: Iterable[Dict[str, Any]],
         fields: List[str] = None,
-        city_name: str = None
-    ) -> pd.DataFrame:
+        city_name: str = None,
+        chunk_rows: int = 2000
+    ) -> Iterator[bytes]:
         """
-        格式化数据为DataFrame
-        
+        逐块生成CSV内容
+
         Args:
-            data: 数据列表
-            fields: 要包含的字段列表
-            
+            records: 记录迭代器（可以是数据库游标生成器）
+            fields: 要导出的字段列表，None表示导出所有字段
+            city_name: 城市名称（记录中没有 city 字段时填充）
+            chunk_rows: 每块的行数
+
+        Yields:
+            UTF-8 (带BOM，支持Excel打开中文) 编码的CSV数据块
+        """
+        layout = self._layout(records, fields, city_name)
+        if layout is None:
+            yield '\ufeff\n'.encode('utf-8')
+            return
+        records, helpers, value_fields = layout
+
+        buffer = StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        buffer.write('\ufeff')
+        writer.writerow(self._header(helpers, value_fields))
+
+        rows = 0
+        for record in records:
+            writer.writerow(self._format_row(record, helpers, value_fields, city_name, as_text=True))
+            rows += 1
+            if rows % chunk_rows == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def write_excel(
+        self,
+        records: Iterable[Dict[str, Any]],
+        output: BinaryIO,
+        fields: List[str] = None,
+        include_summary: bool = True,
+        city_name: str = None,
+        sample_rows: int = 200
+    ) -> int:
+        """
+        以 write_only 模式将记录写入Excel文件
+
+        Args:
+            records: 记录迭代器（可以是数据库游标生成器）
+            output: 输出的二进制文件对象
+            fields: 要导出的字段列表，None表示导出所有字段
+            include_summary: 是否包含每日汇总表
+            city_name: 城市名称（记录中没有 city 字段时填充）
+            sample_rows: 用于计算列宽的采样行数
+
         Returns:
-            格式化后的DataFrame
+            写入的记录数
         """
-        if not data:
-            return pd.DataFrame()
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        # 添加城市信息
-        if city_name:
-            df['city'] = city_name
-        
-        # 拆分日期和时间
-        if 'datetime' in df.columns:
-            df['datetime_dt'] = pd.to_datetime(df['datetime'])
-            df['date'] = df['datetime_dt'].dt.date
-            df['time'] = df['datetime_dt'].dt.strftime('%H:%M')
-        
-        # 天气代码转换 (Item 17)
-        if 'weather_code' in df.columns:
-            weather_map = {
-                0: '晴朗', 1: '晴到多云', 2: '多云', 3: '阴天', 45: '雾', 
-                48: '沉积雾', 51: '小毛毛雨', 53: '毛毛雨', 55: '大毛毛雨',
-                61: '小雨', 63: '中雨', 65: '大雨', 71: '小雪', 73: '中雪', 
-                75: '大雪', 80: '阵雨', 81: '中阵雨', 82: '大阵雨', 95: '雷阵雨'
-            }
-            df['weather_code'] = df['weather_code'].map(lambda x: f"{int(x)} ({weather_map.get(int(x), '未知')})" if pd.notnull(x) else x)
-        
-        # 如果指定了字段，确保包含我们新增的辅助字段
-        # 按照固定顺序排列核心字段，增加导出的整齐度 (Item 2 改进)
-        helper_cols = ['city', 'date', 'time']
-        core_order = [
-            'temperature_2m', 'relative_humidity_2m', 'dew_point_2m',
-            'precipitation', 'rain', 'snowfall', 'surface_pressure', 'cloud_cover',
-            'wind_speed_10m', 'wind_direction_10m', 'wind_gusts_10m',
-            'wind_speed_100m', 'wind_direction_100m',
-            'shortwave_radiation', 'direct_radiation', 'diffuse_radiation', 'direct_normal_irradiance',
-            'evapotranspiration', 'soil_temperature_0_to_7cm', 'soil_moisture_0_to_7cm',
-            'weather_code'
-        ]
-        
-        final_cols = [c for c in helper_cols if c in df.columns]
-        for c in core_order:
-            if c in df.columns:
-                if fields is None or c in fields:
-                    final_cols.append(c)
-        
-        # 严格限制字段：只导出 core_order 中定义的或明确请求的字段 (Item 2 & 13)
-        # 不再通过循环 df.columns 来添加数据库中多余的空闲字段（如已弃用的 80m 风速等）
-        
-        df = df[final_cols]
-        
-        # 重命名列为中文
-        column_mapping = self._get_column_mapping()
-        df = df.rename(columns=column_mapping)
-        
-        # 删除临时的辅助列
-        if 'datetime_dt' in df.columns:
-            df = df.drop(columns=['datetime_dt'])
-        
-        return df
-    def _get_column_mapping(self) -> Dict[str, str]:
+        wb = Workbook(write_only=True)
+        ws_data = wb.create_sheet('天气数据')
+
+        layout = self._layout(records, fields, city_name)
+        if layout is None:
+            wb.save(output)
+            return 0
+        records, helpers, value_fields = layout
+
+        header = self._header(helpers, value_fields)
+        summary = _DailySummary(value_fields) if include_summary and 'date' in helpers else None
+        with_city = 'city' in helpers
+        date_index = helpers.index('date') if 'date' in helpers else None
+        weather_index = len(helpers) + value_fields.index('weather_code') if 'weather_code' in value_fields else None
+
+        def rows():
+            for record in records:
+                row = self._format_row(record, helpers, value_fields, city_name)
+                if summary is not None:
+                    key = (row[date_index], row[0]) if with_city else (row[date_index],)
+                    summary.add(key, record, row[weather_index] if weather_index is not None else None)
+                yield row
+
+        row_iter = rows()
+        # 按采样行计算列宽（write_only 模式下必须在写入数据前设置）
+        sample = list(islice(row_iter, sample_rows))
+        for index, column_header in enumerate(header):
+            max_length = max([len(column_header)] + [len(str(r[index])) for r in sample if r[index] is not None])
+            ws_data.column_dimensions[get_column_letter(index + 1)].width = min(max_length + 2, 50)
+
+        # 设置表头样式
+        ws_data.append(self._styled_header(ws_data, header, '1F4E78'))
+
+        count = 0
+        for row in chain(sample, row_iter):
+            ws_data.append(row)
+            count += 1
+
+        # 添加汇总表 (按照用户需求，取消整体数据汇总，仅保留每日汇总)
+        if summary is not None and count > 0:
+            try:
+                summary_header, summary_rows = summary.rows(self._get_column_mapping(), with_city)
+                ws_daily = wb.create_sheet('每日汇总')
+                for index in range(len(summary_header)):
+                    ws_daily.column_dimensions[get_column_letter(index + 1)].width = 15
+                ws_daily.append(self._styled_header(ws_daily, summary_header, '70AD47'))
+                for row in summary_rows:
+                    ws_daily.append(row)
+                logger.debug("添加每日汇总表成功")
+            except Exception as e:
+                logger.error(f"添加每日汇总表失败: {e}")
+
+        wb.save(output)
+        return count
+
+    def _layout(
+        self,
+        records: Iterable[Dict[str, Any]],
+        fields: Optional[List[str]],
+        city_name: Optional[str]
+    ) -> Optional[Tuple[Iterator[Dict[str, Any]], List[str], List[str]]]:
         """
-        获取列名映射（英文到中文）
-        
+        根据第一条记录确定导出列
+
         Returns:
-            列名映射字典
+            (包含第一条记录的记录迭代器, 辅助列, 数据列)，没有记录时返回None
         """
-        return {
-            'city': '城市',
-            'date': '日期',
-            'time': '时间',
-            'datetime': '日期时间',
-            'temperature_2m': '温度(°C)',
-            'relative_humidity_2m': '相对湿度(%)',
-            'dew_point_2m': '露点温度(°C)',
-            'precipitation': '降水量(mm)',
-            'rain': '降雨量(mm)',
-            'snowfall': '降雪量(cm)',
-            'surface_pressure': '地面气压(hPa)',
-            'cloud_cover': '云量(%)',
-            'wind_speed_10m': '10米风速(km/h)',
-            'wind_direction_10m': '10米风向(°)',
-            'wind_gusts_10m': '10米阵风(km/h)',
-            'wind_speed_100m': '100米风速(km/h)',
-            'wind_direction_100m': '100米风向(°)',
-            'shortwave_radiation': '短波辐射(W/m²)',
-            'direct_radiation': '直接辐射(W/m²)',
-            'diffuse_radiation': '散射辐射(W/m²)',
-            'direct_normal_irradiance': '直接法向辐照度(W/m²)',
-            'evapotranspiration': '蒸发蒸腾量(mm)',
-            'soil_temperature_0_to_7cm': '土壤温度(°C)',
-            'soil_moisture_0_to_7cm': '土壤湿度(m³/m³)',
-            'weather_code': '天气代码',
-        }
-    
-    def _add_summary_sheet(self, workbook: Workbook, df: pd.DataFrame):
+        iterator = iter(records)
+        first = next(iterator, None)
+        if first is None:
+            return None
+
+        helpers = []
+        if city_name or 'city' in first:
+            helpers.append('city')
+        if 'datetime' in first:
+            helpers.extend(['date', 'time'])
+        value_fields = self.resolve_fields(fields, first.keys())
+        return chain([first], iterator), helpers, value_fields
+
+    def _header(self, helpers: List[str], value_fields: List[str]) -> List[str]:
+        """生成中文表头"""
+        column_mapping = self._get_column_mapping()
+        return [column_mapping.get(c, c) for c in helpers + value_fields]
+
+    def _styled_header(self, worksheet, header: List[str], color: str) -> List[WriteOnlyCell]:
+        """生成带样式的表头单元格"""
+        header_fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+        header_font = Font(color='FFFFFF', bold=True)
+        cells = []
+        for value in header:
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+            cells.append(cell)
+        return cells
+
+    def _format_row(
+        self,
+        record: Dict[str, Any],
+        helpers: List[str],
+        value_fields: List[str],
+        city_name: Optional[str],
+        as_text: bool = False
+    ) -> List[Any]:
         """
-        添加汇总表到Excel工作簿
-        
+        格式化一行数据
+
         Args:
-            workbook: Excel工作簿对象
-            df: 数据DataFrame
+            record: 原始记录
+            helpers: 辅助列 (city, date, time)
+            value_fields: 数据列
+            city_name: 城市名称
+            as_text: 日期是否保留为文本（CSV），否则转换为日期对象（Excel）
+
+        Returns:
+            单元格值列表
         """
-        try:
-            # 按照用户需求，取消整体数据汇总，仅保留每日汇总
-            if '日期' in df.columns:
-                self._add_daily_summary_sheet(workbook, df)
-            
-            logger.debug("添加每日汇总表成功")
-            
-        except Exception as e:
-            logger.error(f"添加汇总表失败: {e}")
-            
-    def _add_daily_summary_sheet(self, workbook: Workbook, df: pd.DataFrame):
-        """添加每日汇总表"""
-        try:
-            ws_daily = workbook.create_sheet('每日汇总')
-            
-            # 基础分组字段
-            group_cols = ['日期']
-            if '城市' in df.columns:
-                group_cols.append('城市')
-            
-            # 数值列（排除日期和城市）
-            numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
-            
-            # 按日基础汇总（均值）
-            daily_df = df.groupby(group_cols)[numeric_cols].mean().reset_index()
-            
-            # 特殊处理：降水量、辐射和蒸发量应该是总和
-            sum_cols = [
-                '降水量(mm)', '降雨量(mm)', '蒸发蒸腾量(mm)',
-                '短波辐射(W/m²)', '直接辐射(W/m²)', '散射辐射(W/m²)', 
-                '直接法向辐照度(W/m²)'
-            ]
-            for col in sum_cols:
-                if col in daily_df.columns:
-                    daily_sum = df.groupby(group_cols)[col].sum().reset_index()
-                    daily_df[col] = daily_sum[col]
-
-            # 增强功能：增加计算项 (主要天气, 日辐照量, 日平均风速)
-            
-            # 1. 主要天气 (取当日常见天气)
-            if '天气代码' in df.columns:
-                def get_mode_weather(x):
-                    modes = x.mode()
-                    return modes.iloc[0] if not modes.empty else None
-                
-                weather_mode = df.groupby(group_cols)['天气代码'].agg(get_mode_weather).reset_index()
-                daily_df['主要天气'] = weather_mode['天气代码']
-            
-            # 2. 日辐照量 (MJ/m²) = Sum(W/m²) * 3600 / 1,000,000
-            if '短波辐射(W/m²)' in df.columns:
-                daily_df['日辐照量(MJ/m²)'] = (daily_df['短波辐射(W/m²)'] * 0.0036).round(2)
-                
-            # 3. 日平均风速 (m/s) = mean(km/h) / 3.6
-            if '10米风速(km/h)' in df.columns:
-                # 注意：此时 daily_df['10米风速(km/h)'] 已经是均值了
-                daily_df['日平均风速(m/s)'] = (daily_df['10米风速(km/h)'] / 3.6).round(2)
-            
-            # 调整列顺序，将重要字段提前
-            cols = daily_df.columns.tolist()
-            priority_cols = ['日期', '城市', '主要天气', '日辐照量(MJ/m²)', '日平均风速(m/s)']
-            new_order = [c for c in priority_cols if c in cols] + [c for c in cols if c not in priority_cols]
-            daily_df = daily_df[new_order]
-            
-            # 写入数据
-            for r in dataframe_to_rows(daily_df, index=False, header=True):
-                ws_daily.append(r)
-                
-            # 设置样式
-            header_fill = PatternFill(start_color='70AD47', end_color='70AD47', fill_type='solid')
-            header_font = Font(color='FFFFFF', bold=True)
-            for cell in ws_daily[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-            # 自动列宽
-            for column in ws_daily.columns:
-                ws_daily.column_dimensions[column[0].column_letter].width = 15
+        row = []
+        if 'city' in helpers:
+            row.append(city_name or record.get('city'))
+        if 'date' in helpers:
+            # 拆分日期和时间 (YYYY-MM-DDTHH:MM)
+            dt = record['datetime']
+            row.append(dt[:10] if as_text else date(int(dt[:4]), int(dt[5:7]), int(dt[8:10])))
+            row.append(dt[11:16])
+        for field in value_fields:
+            value = record.get(field)
+            if value is not None and value != value:  # NaN 视为空值
+                value = None
+            if field == 'weather_code' and value is not None:
+                value = f"{int(value)} ({WEATHER_CODE_NAMES.get(int(value), '未知')})"
+            row.append(value)
+        return row
 
-        except Exception as e:
-            logger.error(f"添加每日汇总表失败: {e}")
+    def _get_column_mapping(self) -> Mapping[str, str]:
+        """
+        获取列名映射（英文到中文）
+
+        Returns:
+            列名映射（字段注册表中预先构建的只读映射）
+        """
+        return FIELD_REGISTRY.column_labels
@@ -3,14 +3,67 @@
 负责批量下载、自动更新和数据完整性检查
 """
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Callable, Optional
 from datetime import datetime, timedelta
+
+import numpy as np
+
 from backend.services.weather_service import WeatherService
+from backend.services.fetch_planner import group_consecutive_dates
+from backend.services.download_engine import DownloadEngine
 from backend.models.database import DatabaseManager
 from backend.models.city import CityManager
+from backend.models.coverage_store import GROUP_ROWS
+from backend.config import ARCHIVE_DELAY_DAYS, AUTO_UPDATE_CHUNK_DAYS
 
 logger = logging.getLogger(__name__)
 
+# 15 分钟精度下每天的时间点数
+STEPS_PER_DAY = 96
+
+
+def complete_through(columns: Dict[str, List[Any]], fields: List[str]) -> Dict[str, Optional[str]]:
+    """
+    计算解析结果中每个字段从第一天起连续完整（每天 96 个非空值）的最后日期
+
+    上游完全不提供的字段（整段均为空）视为与其他字段同样完整，避免其水位永远停滞、每次都重新下载；
+    所有字段都为空时（上游尚未发布）不推进
+
+    Args:
+        columns: 列式数据 {'datetime': [...], field: [...]}
+        fields: 字段列表
+
+    Returns:
+        {field: 'YYYY-MM-DD'}，第一天就不完整时为 None
+    """
+    times = columns.get('datetime') or []
+    if not times:
+        return {field: None for field in fields}
+
+    days = np.array([t[:10] for t in times])
+    labels, starts, counts = np.unique(days, return_index=True, return_counts=True)
+
+    marks, empty = {}, []
+    for field in fields:
+        values = np.asarray(columns.get(field) or [np.nan] * len(times), dtype=float)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            empty.append(field)
+            marks[field] = None
+            continue
+        full = (np.add.reduceat(valid, starts) == STEPS_PER_DAY) & (counts == STEPS_PER_DAY)
+        if full.all():
+            marks[field] = str(labels[-1])
+        else:
+            first_gap = int(np.argmin(full))
+            marks[field] = str(labels[first_gap - 1]) if first_gap > 0 else None
+
+    reached = [mark for mark in marks.values() if mark]
+    if reached:
+        for field in empty:
+            marks[field] = max(reached)
+    return marks
+
 
 class DataManager:
     """
@@ -22,7 +75,8 @@ class DataManager:
         self,
         weather_service: WeatherService,
         db_manager: DatabaseManager,
-        city_manager: CityManager
+        city_manager: CityManager,
+        download_engine: Optional[DownloadEngine] = None
     ):
         """
         初始化数据管理器
@@ -31,10 +85,12 @@ class DataManager:
             weather_service: 天气服务实例
             db_manager: 数据库管理器实例
             city_manager: 城市管理器实例
+            download_engine: 并发下载引擎（可选，默认按天气服务创建）
         """
         self.weather_service = weather_service
         self.db_manager = db_manager
         self.city_manager = city_manager
+        self.download_engine = download_engine or DownloadEngine(weather_service)
         logger.info("数据管理器初始化完成")
     
     def batch_download(
@@ -42,16 +98,21 @@ class DataManager:
         city_id: int,
         start_date: str,
         end_date: str,
-        fields: List[str]
+        fields: List[str],
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
     ) -> Dict[str, Any]:
         """
         批量下载指定时间段的数据并保存到数据库
+        按月切分后并发下载
         
         Args:
             city_id: 城市ID
             start_date: 开始日期 (YYYY-MM-DD)
             end_date: 结束日期 (YYYY-MM-DD)
             fields: 数据字段列表
+            progress_callback: 进度回调，参数为该城市的进度字典
+            should_cancel: 返回 True 时停止下载
             
         Returns:
             下载结果字典
@@ -64,30 +125,15 @@ class DataManager:
             if not city_info:
                 raise ValueError(f"城市ID {city_id} 不存在")
             
-            # 获取天气数据
-            weather_data = self.weather_service.get_historical_weather(
-                longitude=city_info['longitude'],
-                latitude=city_info['latitude'],
-                start_date=start_date,
-                end_date=end_date,
-                fields=fields
-            )
-            
-            # 保存到数据库
-            saved_count = self.weather_service.save_to_database(
-                city_id,
-                weather_data
-            )
-            
-            result = {
-                'success': True,
-                'city_name': city_info['city_name'],
-                'start_date': start_date,
-                'end_date': end_date,
-                'total_records': len(weather_data['hourly_data']),
-                'saved_records': saved_count,
-                'message': f"成功下载并保存 {saved_count} 条记录"
-            }
+            # 获取天气数据并保存到数据库
+            result = self.download_engine.run(
+                [city_info],
+                start_date,
+                end_date,
+                fields,
+                progress_callback=(lambda progress: progress_callback(progress[0])) if progress_callback else None,
+                should_cancel=should_cancel
+            )[0]
             
             logger.info(f"批量下载完成: {result['message']}")
             return result
@@ -103,34 +149,35 @@ class DataManager:
         self,
         start_date: str,
         end_date: str,
-        fields: List[str]
+        fields: List[str],
+        progress_callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
     ) -> Dict[str, Any]:
         """
         批量下载所有城市的数据
+        按 城市 × 月份 切分后并发下载，请求与数据库写入流水线进行
         
         Args:
             start_date: 开始日期
             end_date: 结束日期
             fields: 数据字段列表
+            progress_callback: 进度回调，参数为各城市的进度列表
+            should_cancel: 返回 True 时停止下载
             
         Returns:
             下载结果字典
         """
         try:
             cities = self.city_manager.get_all_cities()
-            results = []
-            total_saved = 0
-            
-            for city in cities:
-                result = self.batch_download(
-                    city['id'],
-                    start_date,
-                    end_date,
-                    fields
-                )
-                results.append(result)
-                if result['success']:
-                    total_saved += result['saved_records']
+            results = self.download_engine.run(
+                cities,
+                start_date,
+                end_date,
+                fields,
+                progress_callback=progress_callback,
+                should_cancel=should_cancel
+            )
+            total_saved = sum(r['saved_records'] for r in results)
             
             success_count = sum(1 for r in results if r['success'])
             
@@ -154,15 +201,18 @@ class DataManager:
         self,
         city_id: int,
         start_date: str,
-        end_date: str
+        end_date: str,
+        group: str = GROUP_ROWS
     ) -> Dict[str, Any]:
         """
         检查数据完整性，找出缺失的日期
+        只读取覆盖位图（每月每个字段组一行），不扫描原始记录
         
         Args:
             city_id: 城市ID
             start_date: 开始日期
             end_date: 结束日期
+            group: 字段组，默认只要求记录存在；传入分类名（如 radiation）时要求组内字段均非空
             
         Returns:
             完整性检查结果
@@ -175,51 +225,36 @@ class DataManager:
             if not city_info:
                 raise ValueError(f"城市ID {city_id} 不存在")
             
-            # 查询数据库中已有的数据
-            filters = {
-                'city_id': city_id,
-                'start_date': start_date,
-                'end_date': end_date + ' 23:59:59'
-            }
-            existing_data = self.db_manager.get_weather_data(filters)
-            
-            # 提取已有的日期
-            existing_dates = set()
-            for record in existing_data:
-                date_str = record['datetime'][:10]  # 提取日期部分 YYYY-MM-DD
-                existing_dates.add(date_str)
-            
-            # 生成期望的日期范围
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            expected_dates = set()
-            current = start
-            while current <= end:
-                expected_dates.add(current.strftime('%Y-%m-%d'))
-                current += timedelta(days=1)
+            daily_counts = self.db_manager.coverage.daily_counts(city_id, start_date, end_date, group)
+            dates = np.arange(
+                np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1
+            ).astype(str)
+            existing = daily_counts > 0
             
             # 计算总期望记录数 (15分钟一个点 -> 24 * 4 = 96)
-            total_records_expected = len(expected_dates) * 96
+            total_records_expected = len(dates) * STEPS_PER_DAY
+            actual_records_count = int(daily_counts.sum())
+            missing_count = total_records_expected - actual_records_count
             
-            # 找出缺失的日期
-            missing_dates = sorted(expected_dates - existing_dates)
-            existing_dates_list = sorted(existing_dates)
+            existing_dates_list = dates[existing].tolist()
+            missing_dates = dates[~existing].tolist()
             
-            # 计算缺失的记录数
-            # 实际缺失 = 总期望 - 实际
-            actual_records_count = len(existing_data)
-            missing_count = max(0, total_records_expected - actual_records_count)
-            
-            # 按连续性分组缺失日期
-            missing_ranges = self._group_consecutive_dates(missing_dates)
+            # 按连续性分组缺失日期（在布尔数组上找连续段的起止位置）
+            edges = np.diff(np.concatenate(([0], (~existing).astype(np.int8), [0])))
+            run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+            missing_ranges = [
+                {'start': dates[first], 'end': dates[last - 1], 'days': int(last - first)}
+                for first, last in zip(run_starts.tolist(), run_ends.tolist())
+            ]
             
             result = {
                 'city_name': city_info['city_name'],
                 'start_date': start_date,
                 'end_date': end_date,
-                'total_days': len(expected_dates),
-                'total_hours': total_hours,
-                'existing_days': len(existing_dates),
+                'field_group': group,
+                'total_days': len(dates),
+                'total_hours': len(dates) * 24,
+                'existing_days': len(existing_dates_list),
                 'missing_days': len(missing_dates),
                 'missing_count': missing_count,
                 'completeness_rate': round(actual_records_count / total_records_expected * 100, 2) if total_records_expected > 0 else 0,
@@ -236,6 +271,37 @@ class DataManager:
             logger.error(f"检查数据完整性失败: {e}")
             raise
     
+    def coverage_heatmap(
+        self,
+        city_ids: List[int],
+        start_date: str,
+        end_date: str,
+        group: str = GROUP_ROWS
+    ) -> Dict[str, Any]:
+        """
+        多个城市逐日的数据覆盖率（热力图数据），只读取覆盖位图
+        
+        Args:
+            city_ids: 城市ID列表
+            start_date: 开始日期
+            end_date: 结束日期
+            group: 字段组
+            
+        Returns:
+            {'dates': [...], 'field_group', 'cities': [{'city_id', 'coverage': [0~1, ...], 'completeness_rate'}]}
+        """
+        dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1).astype(str)
+        cities = []
+        for city_id in city_ids:
+            counts = self.db_manager.coverage.daily_counts(city_id, start_date, end_date, group)
+            cities.append({
+                'city_id': city_id,
+                'coverage': np.round(counts / STEPS_PER_DAY, 4).tolist(),
+                'completeness_rate': round(float(counts.sum()) / (len(counts) * STEPS_PER_DAY) * 100, 2)
+                if len(counts) else 0
+            })
+        return {'dates': dates.tolist(), 'field_group': group, 'cities': cities}
+    
     def _group_consecutive_dates(self, dates: List[str]) -> List[Dict[str, str]]:
         """
         将连续的日期分组为范围
@@ -246,69 +312,148 @@ class DataManager:
         Returns:
             日期范围列表
         """
-        if not dates:
-            return []
-        
-        ranges = []
-        start = dates[0]
-        prev = datetime.strptime(dates[0], '%Y-%m-%d')
-        
-        for i in range(1, len(dates)):
-            current = datetime.strptime(dates[i], '%Y-%m-%d')
-            if (current - prev).days > 1:
-                # 不连续，保存当前范围
-                ranges.append({
-                    'start': start,
-                    'end': dates[i-1],
-                    'days': (datetime.strptime(dates[i-1], '%Y-%m-%d') - datetime.strptime(start, '%Y-%m-%d')).days + 1
-                })
-                start = dates[i]
-            prev = current
-        
-        # 添加最后一个范围
-        ranges.append({
-            'start': start,
-            'end': dates[-1],
-            'days': (datetime.strptime(dates[-1], '%Y-%m-%d') - datetime.strptime(start, '%Y-%m-%d')).days + 1
-        })
-        
-        return ranges
+        return group_consecutive_dates(dates)
     
     def auto_update_latest_data(
         self,
         city_id: int,
         fields: List[str],
-        days_back: int = 7
+        days_back: int = 7,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
     ) -> Dict[str, Any]:
         """
-        自动更新最近几天的数据
+        自动更新最近的数据（只下载各字段水位之后的部分）
         
         Args:
             city_id: 城市ID
             fields: 数据字段列表
-            days_back: 向前追溯的天数
+            days_back: 本地没有该字段数据时向前追溯的天数
+            progress_callback: 进度回调
+            should_cancel: 返回 True 时停止下载
             
         Returns:
             更新结果
         """
         try:
-            # 计算日期范围（考虑Open-Meteo有5天延迟）
-            end_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=days_back + 5)).strftime('%Y-%m-%d')
-            
-            logger.info(f"自动更新数据: 城市ID={city_id}, {start_date} 至 {end_date}")
-            
-            # 下载数据
-            result = self.batch_download(city_id, start_date, end_date, fields)
-            
-            return result
-            
+            return self.update_incremental(
+                city_id, fields,
+                initial_days=days_back,
+                progress_callback=progress_callback,
+                should_cancel=should_cancel
+            )
         except Exception as e:
             logger.error(f"自动更新失败: {e}")
             return {
                 'success': False,
                 'message': f"更新失败: {str(e)}"
             }
+
+    def update_incremental(
+        self,
+        city_id: int,
+        fields: List[str],
+        initial_days: int = 7,
+        target_end: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        按水位增量更新单个城市：每个字段只请求其"已完整入库的最后日期"之后的数据，
+        请求结果中连续完整的部分推进水位，不完整的尾部（上游尚未发布）下次继续请求
+        
+        Args:
+            city_id: 城市ID
+            fields: 数据字段列表
+            initial_days: 没有水位且本地没有数据时向前追溯的天数
+            target_end: 更新截止日期，默认为 ARCHIVE_DELAY_DAYS 天前
+            progress_callback: 进度回调，参数为 {'city_id', 'total_chunks', 'done_chunks', 'failed_chunks'}
+            should_cancel: 返回 True 时停止下载
+            
+        Returns:
+            {'success', 'requests', 'saved_records', 'watermarks', 'lagging_fields', 'message'}
+        """
+        city_info = self.city_manager.get_city_by_id(city_id)
+        if not city_info:
+            raise ValueError(f"城市ID {city_id} 不存在")
+        
+        end = datetime.strptime(
+            target_end or (datetime.now() - timedelta(days=ARCHIVE_DELAY_DAYS)).strftime('%Y-%m-%d'),
+            '%Y-%m-%d'
+        )
+        bootstrap_start = end - timedelta(days=max(initial_days, 1) - 1)
+        marks = self.db_manager.get_watermarks(city_id, fields)
+        
+        # 水位相同的字段合并为一次请求（通常所有字段水位一致，每个城市只请求一次）
+        groups: Dict[datetime, List[str]] = {}
+        for field in fields:
+            mark = marks.get(field)
+            start = datetime.strptime(mark, '%Y-%m-%d') + timedelta(days=1) if mark else bootstrap_start
+            if start <= end:
+                groups.setdefault(start, []).append(field)
+        
+        chunk_days = max(AUTO_UPDATE_CHUNK_DAYS, 1)
+        progress = {
+            'city_id': city_id,
+            'total_chunks': sum(
+                -(-((end - start).days + 1) // chunk_days) for start in groups
+            ),
+            'done_chunks': 0,
+            'failed_chunks': 0
+        }
+        requests_made = saved = 0
+        
+        for start, group_fields in sorted(groups.items()):
+            chunk_start = start
+            while group_fields and chunk_start <= end:
+                if should_cancel and should_cancel():
+                    break
+                chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+                first, last = chunk_start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')
+                try:
+                    # 水位之后的数据本地没有，快照缓存中的也可能是上游补齐前的旧结果，直接请求上游
+                    parsed = self.weather_service.fetch_range(
+                        city_info['longitude'], city_info['latitude'], first, last, group_fields,
+                        use_cache=False
+                    )
+                    requests_made += 1
+                    saved += self.weather_service.save_to_database(city_id, parsed, merge=True)
+                except Exception as e:
+                    logger.warning(f"增量更新请求失败: 城市ID={city_id}, {first} 至 {last}, {e}")
+                    progress['failed_chunks'] += 1
+                    if progress_callback:
+                        progress_callback(dict(progress))
+                    break
+                
+                reached = complete_through(parsed.get('columns') or {}, group_fields)
+                advanced = {field: mark for field, mark in reached.items() if mark}
+                self.db_manager.set_watermarks(city_id, advanced)
+                marks.update(advanced)
+                
+                # 只有完整到本段末尾的字段继续请求下一段
+                group_fields = [field for field in group_fields if reached.get(field) == last]
+                chunk_start = chunk_end + timedelta(days=1)
+                progress['done_chunks'] += 1
+                if progress_callback:
+                    progress_callback(dict(progress))
+        
+        target = end.strftime('%Y-%m-%d')
+        lagging = [field for field in fields if (marks.get(field) or '') < target]
+        message = (
+            f"请求 {requests_made} 次，写入 {saved} 条记录"
+            + (f"，{len(lagging)} 个字段未更新到 {target}" if lagging else f"，已更新到 {target}")
+        )
+        logger.info(f"增量更新完成: 城市ID={city_id}, {message}")
+        return {
+            'success': progress['failed_chunks'] == 0,
+            'city_id': city_id,
+            'target_end': target,
+            'requests': requests_made,
+            'saved_records': saved,
+            'watermarks': {field: marks.get(field) for field in fields},
+            'lagging_fields': lagging,
+            'message': message
+        }
     
     def get_data_statistics(self) -> Dict[str, Any]:
         """
@@ -321,16 +466,15 @@ class DataManager:
             # 获取所有城市
             cities = self.city_manager.get_all_cities()
             
+            # 单条 GROUP BY 查询获取所有城市的记录数与时间范围
+            record_stats = self.db_manager.get_city_record_stats()
+            
             city_stats = []
             total_records = 0
             
             for city in cities:
-                # 查询该城市的数据
-                sql = "SELECT COUNT(*) as count, MIN(datetime) as earliest, MAX(datetime) as latest FROM weather_data WHERE city_id = ?"
-                result = self.db_manager.execute_query(sql, (city['id'],))
-                
-                if result and result[0]['count'] > 0:
-                    row = result[0]
+                row = record_stats.get(city['id'])
+                if row:
                     city_stats.append({
                         'city_name': city['city_name'],
                         'record_count': row['count'],
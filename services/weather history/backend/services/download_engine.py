@@ -0,0 +1,167 @@
+"""
+并发下载引擎
+将多城市、长时间段的下载任务按 城市 × 月份 切分，由线程池并发请求 API，
+主线程按完成顺序写入数据库，请求与写入流水线并行
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+from backend.services.response_parser import count_records
+
+logger = logging.getLogger(__name__)
+
+
+def split_by_month(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+    """
+    将日期范围按自然月切分
+
+    Args:
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+
+    Returns:
+        [(开始日期, 结束日期)] 列表
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    chunks = []
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(end, next_month - timedelta(days=1))
+        chunks.append((start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')))
+        start = next_month
+    return chunks
+
+
+class DownloadEngine:
+    """
+    并发下载引擎类
+    请求速率与单主机并发由 WeatherService 的节流器控制，本类只负责调度与写入
+    """
+
+    def __init__(self, weather_service, max_workers: int = 8):
+        """
+        初始化下载引擎
+
+        Args:
+            weather_service: 天气服务实例
+            max_workers: 请求线程数
+        """
+        self.weather_service = weather_service
+        self.max_workers = max_workers
+        # 同时在途的任务数上限，避免已下载未写入的数据堆积在内存中
+        self.max_in_flight = max_workers * 2
+
+    def _fetch(self, city: Dict[str, Any], start_date: str, end_date: str, fields: List[str]) -> Dict[str, Any]:
+        """在工作线程中获取一个分块的数据（列式解析结果，直接按列写入数据库）"""
+        return self.weather_service.fetch_range(
+            city['longitude'],
+            city['latitude'],
+            start_date,
+            end_date,
+            fields
+        )
+
+    def run(
+        self,
+        cities: List[Dict[str, Any]],
+        start_date: str,
+        end_date: str,
+        fields: List[str],
+        progress_callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        下载多个城市的数据并写入数据库
+
+        Args:
+            cities: 城市信息列表（需包含 id, city_name, longitude, latitude）
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 数据字段列表
+            progress_callback: 每个分块完成后回调，参数为各城市的进度列表
+            should_cancel: 返回 True 时停止提交新的分块（已在途的分块仍会写入）
+
+        Returns:
+            各城市的下载结果列表（格式与 DataManager.batch_download 一致）
+        """
+        chunks = split_by_month(start_date, end_date)
+        progress = {
+            city['id']: {
+                'city_id': city['id'],
+                'city_name': city['city_name'],
+                'total_chunks': len(chunks),
+                'done_chunks': 0,
+                'failed_chunks': 0,
+                'total_records': 0,
+                'saved_records': 0,
+                'errors': []
+            }
+            for city in cities
+        }
+        tasks = iter([(city, chunk) for city in cities for chunk in chunks])
+        logger.info(
+            f"并发下载开始: {len(cities)} 个城市, {len(chunks)} 个月度分块, "
+            f"{self.max_workers} 个线程"
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='download') as executor:
+            pending: Dict[Any, Tuple[Dict[str, Any], Tuple[str, str]]] = {}
+            while True:
+                if should_cancel and should_cancel():
+                    tasks = iter(())
+
+                # 补充在途任务
+                while len(pending) < self.max_in_flight:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    city, (chunk_start, chunk_end) = task
+                    future = executor.submit(self._fetch, city, chunk_start, chunk_end, fields)
+                    pending[future] = task
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    city, (chunk_start, chunk_end) = pending.pop(future)
+                    city_progress = progress[city['id']]
+                    try:
+                        weather_data = future.result()
+                        # 写入在主线程串行进行，与其他分块的网络请求并行
+                        saved = self.weather_service.save_to_database(city['id'], weather_data, merge=True)
+                        city_progress['total_records'] += count_records(weather_data)
+                        city_progress['saved_records'] += saved
+                    except Exception as e:
+                        logger.error(f"下载分块失败: {city['city_name']} {chunk_start} 至 {chunk_end}: {e}")
+                        city_progress['failed_chunks'] += 1
+                        city_progress['errors'].append(f"{chunk_start} 至 {chunk_end}: {e}")
+                    city_progress['done_chunks'] += 1
+
+                if progress_callback:
+                    progress_callback([{**p, 'errors': list(p['errors'])} for p in progress.values()])
+
+        results = []
+        for city in cities:
+            city_progress = progress[city['id']]
+            success = city_progress['failed_chunks'] == 0
+            if success:
+                message = f"成功下载并保存 {city_progress['saved_records']} 条记录"
+            else:
+                message = (
+                    f"{city_progress['failed_chunks']}/{city_progress['total_chunks']} 个分块下载失败: "
+                    f"{city_progress['errors'][0]}"
+                )
+            results.append({
+                'success': success,
+                'city_name': city['city_name'],
+                'start_date': start_date,
+                'end_date': end_date,
+                'total_records': city_progress['total_records'],
+                'saved_records': city_progress['saved_records'],
+                'failed_chunks': city_progress['failed_chunks'],
+                'message': message
+            })
+        return results
@@ -0,0 +1,220 @@
+"""
+增量补缺规划器
+根据 weather_data 中已有的数据，找出缺失的 (日期范围 × 字段集合) 区块，
+并合并为最少的 API 请求，只下载缺失部分
+"""
+import logging
+from typing import Dict, Any, List
+from datetime import datetime, timedelta
+
+from backend.services.field_registry import FIELD_REGISTRY
+from backend.models.columnar_store import WEATHER_VALUE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 15分钟精度下每天的记录数
+RECORDS_PER_DAY = 96
+
+
+def group_consecutive_dates(dates: List[str]) -> List[Dict[str, Any]]:
+    """
+    将连续的日期分组为范围
+
+    Args:
+        dates: 日期列表（已排序，YYYY-MM-DD）
+
+    Returns:
+        日期范围列表 [{'start', 'end', 'days'}]
+    """
+    if not dates:
+        return []
+
+    ranges = []
+    start = dates[0]
+    prev = datetime.strptime(dates[0], '%Y-%m-%d')
+
+    for i in range(1, len(dates)):
+        current = datetime.strptime(dates[i], '%Y-%m-%d')
+        if (current - prev).days > 1:
+            # 不连续，保存当前范围
+            ranges.append({
+                'start': start,
+                'end': dates[i-1],
+                'days': (datetime.strptime(dates[i-1], '%Y-%m-%d') - datetime.strptime(start, '%Y-%m-%d')).days + 1
+            })
+            start = dates[i]
+        prev = current
+
+    # 添加最后一个范围
+    ranges.append({
+        'start': start,
+        'end': dates[-1],
+        'days': (datetime.strptime(dates[-1], '%Y-%m-%d') - datetime.strptime(start, '%Y-%m-%d')).days + 1
+    })
+
+    return ranges
+
+
+class FetchPlanner:
+    """
+    补缺规划器类
+    按天统计本地记录数与各字段的非空数量：
+    记录数不足的日期需要下载全部字段，记录齐全但某字段整天为空的日期只需下载该字段
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        day_complete_ratio: float = 0.95,
+        merge_gap_days: int = 3,
+        max_days_per_call: int = 366
+    ):
+        """
+        初始化补缺规划器
+
+        Args:
+            db_manager: 数据库管理器实例
+            day_complete_ratio: 单日记录数达到期望值的比例即视为完整
+            merge_gap_days: 两个缺口间隔不超过该天数时合并为一次请求
+            max_days_per_call: 单次请求覆盖的最大天数
+        """
+        self.db_manager = db_manager
+        self.day_complete_ratio = day_complete_ratio
+        self.merge_gap_days = merge_gap_days
+        self.max_days_per_call = max_days_per_call
+
+        # 记录缺失时需要补齐的全部字段
+        self.all_fields = list(FIELD_REGISTRY.fields)
+
+    def _day_stats(self, city_id: int, start_date: str, end_date: str, fields: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        按天统计记录数与字段非空数
+
+        Returns:
+            日期 -> {'row_count': 记录数, 字段: 非空数}
+        """
+        count_sql = ''.join(f", COUNT({f}) AS {f}" for f in fields)
+        sql = (
+            f"SELECT substr(datetime, 1, 10) AS day, COUNT(*) AS row_count{count_sql} "
+            f"FROM weather_data WHERE city_id = ? AND datetime >= ? AND datetime <= ? "
+            f"GROUP BY day"
+        )
+        rows = self.db_manager.execute_query(
+            sql, (city_id, f"{start_date}T00:00", f"{end_date}T23:59")
+        )
+        return {row['day']: dict(row) for row in rows}
+
+    def find_gaps(
+        self,
+        city_id: int,
+        start_date: str,
+        end_date: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        找出缺失的 (日期范围 × 字段集合) 区块
+
+        Args:
+            city_id: 城市ID
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 用户请求的字段列表
+
+        Returns:
+            缺口列表 [{'start', 'end', 'days', 'fields'}]，按开始日期排序
+        """
+        check_fields = [f for f in dict.fromkeys(fields) if f in WEATHER_VALUE_COLUMNS]
+        stats = self._day_stats(city_id, start_date, end_date, check_fields)
+        min_rows = RECORDS_PER_DAY * self.day_complete_ratio
+        full_fields = sorted(set(self.all_fields) | set(check_fields))
+
+        # 每天缺失的字段集合
+        missing_by_set: Dict[tuple, List[str]] = {}
+        current = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        while current <= end:
+            day = current.strftime('%Y-%m-%d')
+            day_stats = stats.get(day)
+            if day_stats is None or day_stats['row_count'] < min_rows:
+                missing = tuple(full_fields)
+            else:
+                missing = tuple(f for f in check_fields if day_stats[f] == 0)
+            if missing:
+                missing_by_set.setdefault(missing, []).append(day)
+            current += timedelta(days=1)
+
+        gaps = []
+        for missing, days in missing_by_set.items():
+            for date_range in group_consecutive_dates(days):
+                gaps.append({**date_range, 'fields': list(missing)})
+        gaps.sort(key=lambda g: g['start'])
+        return gaps
+
+    def merge_gaps(self, gaps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        将缺口合并为尽量少的 API 请求
+        相邻或间隔较小的缺口合并，字段取并集；单次请求不超过 max_days_per_call 天
+
+        Args:
+            gaps: find_gaps 返回的缺口列表
+
+        Returns:
+            请求列表 [{'start', 'end', 'days', 'fields'}]
+        """
+        calls: List[Dict[str, Any]] = []
+        for gap in sorted(gaps, key=lambda g: g['start']):
+            gap_start = datetime.strptime(gap['start'], '%Y-%m-%d')
+            gap_end = datetime.strptime(gap['end'], '%Y-%m-%d')
+            if calls:
+                last = calls[-1]
+                last_start = datetime.strptime(last['start'], '%Y-%m-%d')
+                last_end = datetime.strptime(last['end'], '%Y-%m-%d')
+                merged_end = max(last_end, gap_end)
+                if ((gap_start - last_end).days <= self.merge_gap_days + 1
+                        and (merged_end - last_start).days + 1 <= self.max_days_per_call):
+                    last['end'] = merged_end.strftime('%Y-%m-%d')
+                    last['days'] = (merged_end - last_start).days + 1
+                    last['fields'] = sorted(set(last['fields']) | set(gap['fields']))
+                    continue
+
+            # 超长缺口按 max_days_per_call 切分
+            chunk_start = gap_start
+            while chunk_start <= gap_end:
+                chunk_end = min(gap_end, chunk_start + timedelta(days=self.max_days_per_call - 1))
+                calls.append({
+                    'start': chunk_start.strftime('%Y-%m-%d'),
+                    'end': chunk_end.strftime('%Y-%m-%d'),
+                    'days': (chunk_end - chunk_start).days + 1,
+                    'fields': sorted(gap['fields'])
+                })
+                chunk_start = chunk_end + timedelta(days=1)
+        return calls
+
+    def plan(
+        self,
+        city_id: int,
+        start_date: str,
+        end_date: str,
+        fields: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        生成补缺请求计划
+
+        Args:
+            city_id: 城市ID
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 用户请求的字段列表
+
+        Returns:
+            需要发出的 API 请求列表，为空表示本地数据已完整
+        """
+        gaps = self.find_gaps(city_id, start_date, end_date, fields)
+        calls = self.merge_gaps(gaps)
+        if calls:
+            missing_days = sum(g['days'] for g in gaps)
+            logger.info(
+                f"补缺计划: 城市ID={city_id}, {start_date} 至 {end_date}, "
+                f"缺口 {len(gaps)} 个 ({missing_days} 天), 合并为 {len(calls)} 次请求"
+            )
+        return calls
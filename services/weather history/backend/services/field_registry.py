@@ -0,0 +1,119 @@
+"""
+字段注册表
+模块加载时由 AVAILABLE_FIELDS 一次性构建只读索引，提供字段名、API 参数名、
+15 分钟精度支持、存储列序号与中文列名的 O(1) 查询，替代各处对嵌套字典的重复遍历
+"""
+import logging
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Mapping
+
+from backend.config import AVAILABLE_FIELDS, MINUTELY_15_PARAMS
+from backend.models.columnar_store import WEATHER_VALUE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 导出时的辅助列名（不属于天气字段）
+HELPER_COLUMN_LABELS = {
+    'city': '城市',
+    'date': '日期',
+    'time': '时间',
+    'datetime': '日期时间',
+}
+
+
+class FieldRegistry:
+    """
+    天气字段注册表
+    构建后不再修改，所有查询表均为只读映射
+    """
+
+    def __init__(
+        self,
+        available_fields: Dict[str, Dict[str, Dict[str, Any]]],
+        storage_columns: Iterable[str],
+        minutely_15_params: Iterable[str]
+    ):
+        """
+        构建注册表
+
+        Args:
+            available_fields: 按分类组织的字段定义（同 AVAILABLE_FIELDS）
+            storage_columns: weather_data 中数值列的顺序
+            minutely_15_params: 支持 15 分钟精度的 API 参数名
+        """
+        column_index = {column: i for i, column in enumerate(storage_columns)}
+        minutely_15 = frozenset(minutely_15_params)
+
+        fields, categories, api_params, param_fields, labels = [], {}, {}, {}, {}
+        for category, group in available_fields.items():
+            for field, info in group.items():
+                api_param = info.get('api_param', field)
+                fields.append(field)
+                categories[field] = category
+                api_params[field] = api_param
+                param_fields[api_param] = field
+                labels[field] = info.get('label') or f"{info['name']}({info['unit']})"
+
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.minutely_15_params = minutely_15
+        self.minutely_15_fields = frozenset(f for f in fields if api_params[f] in minutely_15)
+        self.categories: Mapping[str, str] = MappingProxyType(categories)
+        self.api_params: Mapping[str, str] = MappingProxyType(api_params)
+        self.param_fields: Mapping[str, str] = MappingProxyType(param_fields)
+        self.column_index: Mapping[str, int] = MappingProxyType(
+            {f: column_index[f] for f in fields if f in column_index}
+        )
+        self.column_labels: Mapping[str, str] = MappingProxyType({**HELPER_COLUMN_LABELS, **labels})
+
+        # /api/fields 返回的字段目录（附带解析后的参数名与精度），仅供序列化，不应修改
+        self.catalog: Dict[str, Dict[str, Dict[str, Any]]] = {
+            category: {
+                field: {**info, 'api_param': api_params[field], 'minutely_15': field in self.minutely_15_fields}
+                for field, info in group.items()
+            }
+            for category, group in available_fields.items()
+        }
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.categories
+
+    def api_param(self, field: str) -> str:
+        """字段名 -> Open-Meteo 参数名（未注册字段原样返回）"""
+        return self.api_params.get(field, field)
+
+    def field_for_param(self, api_param: str) -> str:
+        """Open-Meteo 参数名 -> 字段名（未注册参数原样返回）"""
+        return self.param_fields.get(api_param, api_param)
+
+    def supports_15min(self, field: str) -> bool:
+        """字段是否可按 15 分钟精度请求"""
+        return self.api_param(field) in self.minutely_15_params
+
+    def storage_index(self, field: str) -> Optional[int]:
+        """字段在 weather_data 数值列中的序号，未存储的字段返回 None"""
+        return self.column_index.get(field)
+
+    def label(self, field: str) -> str:
+        """导出用中文列名"""
+        return self.column_labels.get(field, field)
+
+    def split_api_params(self, fields: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        生成请求参数列表
+
+        Args:
+            fields: 字段列表
+
+        Returns:
+            (hourly 参数列表, minutely_15 参数列表)；所有字段都放入 hourly 作为兜底
+        """
+        hourly, minutely_15 = [], []
+        for field in fields:
+            api_param = self.api_param(field.strip())
+            hourly.append(api_param)
+            if api_param in self.minutely_15_params:
+                minutely_15.append(api_param)
+        return hourly, minutely_15
+
+
+FIELD_REGISTRY = FieldRegistry(AVAILABLE_FIELDS, WEATHER_VALUE_COLUMNS, MINUTELY_15_PARAMS)
@@ -0,0 +1,423 @@
+"""
+后台任务队列
+耗时操作（批量下载、自动更新、批量导出）以任务形式提交，由工作线程在请求线程之外执行
+任务状态持久化在 SQLite jobs 表中，服务重启后未完成的任务会重新排队
+运行中的任务记录执行进程的 PID，只有该进程已退出时才会被重新排队
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from queue import Queue, Empty
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否仍在运行"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在但属于其他用户
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+
+class JobContext:
+    """
+    任务执行上下文
+    处理函数通过它上报进度、检查取消请求
+    """
+
+    def __init__(self, job_queue: 'JobQueue', job_id: str):
+        self.job_queue = job_queue
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消"""
+        return self.job_queue.is_cancel_requested(self.job_id)
+
+    def check_cancelled(self):
+        """已请求取消时抛出 JobCancelled"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def update_progress(self, progress: Dict[str, Any]):
+        """上报进度"""
+        self.job_queue.update_progress(self.job_id, progress)
+
+
+class JobQueue:
+    """
+    后台任务队列类
+    通过 register 注册任务类型与处理函数，处理函数签名为 handler(params, ctx) -> result
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        workers: int = 2,
+        progress_interval: float = 1.0,
+        retention_days: int = 7
+    ):
+        """
+        初始化任务队列
+
+        Args:
+            db_manager: 数据库管理器实例
+            workers: 工作线程数
+            progress_interval: 进度写入数据库的最小间隔（秒），期间的进度只保存在内存中
+            retention_days: 已结束任务的保留天数
+        """
+        self.db_manager = db_manager
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self.retention_days = retention_days
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any], JobContext], Dict[str, Any]]] = {}
+        self._queue: Queue = Queue()
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._cancel_requested = set()
+        # 本实例正在执行的任务
+        self._active = set()
+        # 运行中任务的最新进度及上次写入时间
+        self._progress: Dict[str, Dict[str, Any]] = {}
+        self._progress_written: Dict[str, float] = {}
+
+    def register(self, job_type: str, handler: Callable[[Dict[str, Any], JobContext], Dict[str, Any]]):
+        """
+        注册任务处理函数
+
+        Args:
+            job_type: 任务类型
+            handler: 处理函数
+        """
+        self._handlers[job_type] = handler
+
+    def start(self):
+        """恢复未完成的任务并启动工作线程"""
+        if self._threads:
+            return
+        self._stop_event.clear()
+        self.purge_finished()
+        self.recover()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"后台任务队列已启动: {self.workers} 个工作线程")
+
+    def stop(self, timeout: float = 5.0):
+        """停止工作线程（运行中的任务保持 running 状态，下次启动时重新排队）"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def recover(self) -> int:
+        """
+        将上次退出时未完成的任务重新排队
+        只回收执行进程已退出的 running 任务，其他进程（如调试模式下的另一个进程）仍在执行的任务保持不变
+
+        Returns:
+            重新排队的任务数
+        """
+        pid = os.getpid()
+        running = self.db_manager.execute_query(
+            "SELECT id, owner_pid FROM jobs WHERE status = ?", (JOB_RUNNING,)
+        )
+        for row in running:
+            owner = row['owner_pid']
+            with self._lock:
+                if row['id'] in self._active:
+                    continue
+            # 同一 PID 但不在本实例执行中，说明是上次运行遗留（如容器内 PID 复用）
+            if owner is not None and owner != pid and _pid_alive(owner):
+                continue
+            self.db_manager.execute_update(
+                "UPDATE jobs SET status = ?, owner_pid = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner_pid IS ?",
+                (JOB_PENDING, datetime.now().isoformat(), row['id'], JOB_RUNNING, owner)
+            )
+        rows = self.db_manager.execute_query(
+            "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (JOB_PENDING,)
+        )
+        for row in rows:
+            self._queue.put(row['id'])
+        if rows:
+            logger.info(f"恢复未完成的后台任务 {len(rows)} 个")
+        return len(rows)
+
+    def purge_finished(self) -> int:
+        """
+        删除超过保留期的已结束任务及其导出文件
+
+        Returns:
+            删除的任务数
+        """
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        placeholders = ','.join('?' for _ in FINISHED_STATUSES)
+        rows = self.db_manager.execute_query(
+            f"SELECT id, result FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+            FINISHED_STATUSES + (cutoff,)
+        )
+        for row in rows:
+            result = json.loads(row['result']) if row['result'] else {}
+            file_path = result.get('file_path') if isinstance(result, dict) else None
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            self.db_manager.execute_update("DELETE FROM jobs WHERE id = ?", (row['id'],))
+        return len(rows)
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提交任务
+
+        Args:
+            job_type: 任务类型（必须已注册）
+            params: 任务参数（需可 JSON 序列化）
+
+        Returns:
+            任务信息字典
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"未知的任务类型: {job_type}")
+
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        self.db_manager.execute_update(
+            "INSERT INTO jobs (id, job_type, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, job_type, json.dumps(params, ensure_ascii=False), JOB_PENDING, now, now)
+        )
+        self._queue.put(job_id)
+        logger.info(f"提交后台任务: {job_type} ({job_id})")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务信息
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务信息字典，不存在时返回None
+        """
+        rows = self.db_manager.execute_query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        return self._to_dict(rows[0])
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        获取最近的任务列表
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            任务信息列表
+        """
+        rows = self.db_manager.execute_query(
+            "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取消任务：排队中的任务直接取消，运行中的任务在下一个检查点停止
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务信息字典，不存在时返回None
+        """
+        job = self.get(job_id)
+        if job is None or job['status'] in FINISHED_STATUSES:
+            return job
+
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._cancel_requested.add(job_id)
+        self.db_manager.execute_update(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?", (now, job_id)
+        )
+        self.db_manager.execute_update(
+            "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (JOB_CANCELLED, now, now, job_id, JOB_PENDING)
+        )
+        logger.info(f"请求取消后台任务: {job_id}")
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """是否已请求取消"""
+        with self._lock:
+            return job_id in self._cancel_requested
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]):
+        """
+        更新任务进度，按 progress_interval 节流写入数据库
+
+        Args:
+            job_id: 任务ID
+            progress: 进度字典
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._progress[job_id] = progress
+            if now - self._progress_written.get(job_id, 0.0) < self.progress_interval:
+                return
+            self._progress_written[job_id] = now
+        self._write_progress(job_id, progress)
+
+    def _write_progress(self, job_id: str, progress: Dict[str, Any]):
+        """将进度写入数据库"""
+        self.db_manager.execute_update(
+            "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(progress, ensure_ascii=False), datetime.now().isoformat(), job_id)
+        )
+
+    def _to_dict(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """将数据库行转换为任务信息字典（运行中的任务使用内存中的最新进度）"""
+        job_id = row['id']
+        with self._lock:
+            progress = self._progress.get(job_id)
+        if progress is None and row['progress']:
+            progress = json.loads(row['progress'])
+        return {
+            'id': job_id,
+            'job_type': row['job_type'],
+            'params': json.loads(row['params']),
+            'status': row['status'],
+            'progress': progress,
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'cancel_requested': bool(row['cancel_requested']),
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+        }
+
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """将排队中的任务标记为运行中，任务已被取消或不存在时返回None"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._active.add(job_id)
+        affected = self.db_manager.execute_update(
+            "UPDATE jobs SET status = ?, owner_pid = ?, started_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (JOB_RUNNING, os.getpid(), now, now, job_id, JOB_PENDING)
+        )
+        if not affected:
+            with self._lock:
+                self._active.discard(job_id)
+            return None
+        rows = self.db_manager.execute_query(
+            "SELECT job_type, params, cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        )
+        if rows[0]['cancel_requested']:
+            with self._lock:
+                self._cancel_requested.add(job_id)
+        return rows[0]
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: str = None):
+        """记录任务结束状态"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            progress = self._progress.pop(job_id, None)
+            self._progress_written.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+            self._active.discard(job_id)
+        self.db_manager.execute_update(
+            "UPDATE jobs SET status = ?, progress = COALESCE(?, progress), result = ?, error = ?, "
+            "finished_at = ?, updated_at = ? WHERE id = ?",
+            (
+                status,
+                json.dumps(progress, ensure_ascii=False) if progress is not None else None,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error,
+                now,
+                now,
+                job_id
+            )
+        )
+
+    def _execute(self, job_id: str):
+        """执行单个任务"""
+        job = self._claim(job_id)
+        if job is None:
+            return
+
+        handler = self._handlers.get(job['job_type'])
+        if handler is None:
+            self._finish(job_id, JOB_FAILED, error=f"未知的任务类型: {job['job_type']}")
+            return
+
+        ctx = JobContext(self, job_id)
+        started = time.perf_counter()
+        try:
+            ctx.check_cancelled()
+            result = handler(json.loads(job['params']), ctx)
+            ctx.check_cancelled()
+        except JobCancelled:
+            self._finish(job_id, JOB_CANCELLED)
+            logger.info(f"后台任务已取消: {job['job_type']} ({job_id})")
+        except Exception as e:
+            logger.error(f"后台任务失败: {job['job_type']} ({job_id}): {e}")
+            self._finish(job_id, JOB_FAILED, error=str(e))
+        else:
+            self._finish(job_id, JOB_SUCCEEDED, result=result)
+            logger.info(
+                f"后台任务完成: {job['job_type']} ({job_id}), 耗时 {time.perf_counter() - started:.1f}s"
+            )
+
+    def _run(self):
+        """工作线程主循环"""
+        while not self._stop_event.is_set():
+            try:
+                job_id = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+            try:
+                self._execute(job_id)
+            except Exception as e:
+                logger.error(f"执行后台任务异常 ({job_id}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取任务队列统计信息
+
+        Returns:
+            统计字典
+        """
+        rows = self.db_manager.execute_query(
+            "SELECT status, COUNT(*) as count FROM jobs GROUP BY status"
+        )
+        return {
+            'workers': len(self._threads),
+            'queued': self._queue.qsize(),
+            'by_status': {row['status']: row['count'] for row in rows},
+        }
@@ -1,30 +1,164 @@
+"""
+API 请求频率限制
+使用 GCRA（通用信元速率算法，等价于令牌桶）：每个客户端只保存一个"理论到达时间"，
+内存占用与请求次数无关；限流状态可放在进程内或 SQLite 中（多个 worker 共享同一限额）
+"""
+import math
+import sqlite3
+import threading
 import time
 import logging
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-class RateLimiter:
+
+class MemoryRateStore:
+    """
+    进程内限流状态
+    仅对当前进程有效，适用于单进程部署
+    """
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, now: float, interval: float, tolerance: float) -> Optional[float]:
+        """
+        尝试为 key 记录一次请求
+
+        Args:
+            key: 客户端标识
+            now: 当前时间（秒）
+            interval: 两次请求的理论间隔（限流周期 / 限额）
+            tolerance: 允许提前到达的时间（突发容量）
+
+        Returns:
+            允许时返回新的理论到达时间，拒绝时返回 None
+        """
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+            if tat - now > tolerance:
+                return None
+            self._tat[key] = tat + interval
+            return tat + interval
+
+    def evict(self, now: float) -> int:
+        """清除已完全恢复的空闲客户端，返回清除数量"""
+        with self._lock:
+            idle = [key for key, tat in self._tat.items() if tat <= now]
+            for key in idle:
+                del self._tat[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class SqliteRateStore:
     """
-    简单的 API 请求频率限制器
+    SQLite 限流状态
+    多个 worker 进程共用同一个数据库文件时，通过写事务串行化更新，共享同一限额
     """
+
+    TABLE = 'rate_limit_state'
+
     def __init__(self, db_manager):
+        """
+        初始化并建表
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
         self.db = db_manager
-        self.visits: Dict[str, list] = {} # {ip: [timestamp1, timestamp2, ...]}
-        self.default_limit = 60 # 每分钟默认 60 次
-        self.limit_period = 60 # 60 秒
-        
+        self.db.execute_update(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+
+    def acquire(self, key: str, now: float, interval: float, tolerance: float) -> Optional[float]:
+        """参数与返回值同 MemoryRateStore.acquire"""
+        with self.db.connection() as conn:
+            try:
+                # 立即获取写锁，保证读-改-写在多进程间是原子的
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(f"SELECT tat FROM {self.TABLE} WHERE key = ?", (key,)).fetchone()
+                tat = max(row[0], now) if row else now
+                if tat - now > tolerance:
+                    conn.rollback()
+                    return None
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.TABLE} (key, tat) VALUES (?, ?)", (key, tat + interval)
+                )
+                conn.commit()
+                return tat + interval
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+    def evict(self, now: float) -> int:
+        """清除已完全恢复的空闲客户端，返回清除数量"""
+        return self.db.execute_update(f"DELETE FROM {self.TABLE} WHERE tat <= ?", (now,))
+
+
+def create_rate_store(backend: str, db_manager):
+    """
+    按配置创建限流状态存储
+
+    Args:
+        backend: 'memory' 或 'sqlite'
+        db_manager: 数据库管理器实例
+    """
+    if backend == 'sqlite':
+        return SqliteRateStore(db_manager)
+    if backend != 'memory':
+        logger.warning(f"未知的限流存储类型 {backend}，使用进程内存储")
+    return MemoryRateStore()
+
+
+class RateLimiter:
+    """
+    API 请求频率限制器
+    每个限流周期内最多 limit 次请求，允许在周期内一次性用完（与滑动窗口的突发行为一致）
+    """
+
+    def __init__(self, db_manager, store=None, evict_interval: float = 60.0):
+        """
+        初始化频率限制器
+
+        Args:
+            db_manager: 数据库管理器实例（读取 api_rate_limit 设置、记录告警事件）
+            store: 限流状态存储，默认为进程内存储
+            evict_interval: 清理空闲客户端的间隔（秒）
+        """
+        self.db = db_manager
+        self.store = store if store is not None else MemoryRateStore()
+        self.default_limit = 60  # 每分钟默认 60 次
+        self.limit_period = 60  # 60 秒
+        self.evict_interval = evict_interval
+        self._next_evict = time.time() + evict_interval
+
     def get_limit_config(self) -> int:
-        """从数据库获取频率限制设置"""
+        """获取频率限制设置（系统设置带缓存，修改后自动失效）"""
         try:
-            sql = "SELECT value FROM system_settings WHERE key = 'api_rate_limit'"
-            res = self.db.execute_query(sql)
-            if res:
-                return int(res[0]['value'])
+            value = self.db.get_setting('api_rate_limit')
+            if value is not None:
+                return int(value)
         except Exception:
             pass
         return self.default_limit
 
+    def _maybe_evict(self, now: float):
+        """定期清理空闲客户端，保证状态数量只与活跃客户端数相关"""
+        if now < self._next_evict:
+            return
+        self._next_evict = now + self.evict_interval
+        try:
+            removed = self.store.evict(now)
+            if removed:
+                logger.debug(f"清理空闲限流记录 {removed} 条")
+        except Exception as e:
+            logger.warning(f"清理限流记录失败: {e}")
+
     def is_allowed(self, ip: str) -> Tuple[bool, int]:
         """
         检查指定 IP 是否允许访问
@@ -32,19 +166,18 @@ class RateLimiter:
         """
         limit = self.get_limit_config()
         now = time.time()
-        
-        if ip not in self.visits:
-            self.visits[ip] = [now]
-            return True, limit - 1
-            
-        # 移除过期的 visit
-        self.visits[ip] = [t for t in self.visits[ip] if now - t < self.limit_period]
-        
-        if len(self.visits[ip]) >= limit:
+        self._maybe_evict(now)
+
+        if limit <= 0:
+            return False, 0
+
+        interval = self.limit_period / limit
+        tat = self.store.acquire(ip, now, interval, self.limit_period - interval)
+        if tat is None:
             logger.warning(f"IP {ip} 触发频率限制: {limit} requests/min")
             # 记录到事件日志
             self.db.log_event("WARNING", "RATE_LIMITER", f"IP {ip} 触发频率限制", f"限制值: {limit}/min")
             return False, 0
-            
-        self.visits[ip].append(now)
-        return True, limit - len(self.visits[ip])
+
+        used = math.ceil((tat - now) / interval - 1e-9)
+        return True, max(limit - used, 0)
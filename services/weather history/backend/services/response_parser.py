@@ -0,0 +1,108 @@
+"""
+Open-Meteo 响应解析
+将 minutely_15 / hourly 数组一次性转换为 NumPy 列，按列补齐 15 分钟缺口，
+输出列式结果 {'datetime': [...], field: [...]}，不再逐时间点构造字典
+"""
+import logging
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from backend.services.field_registry import FIELD_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# 小时数据对齐到 15 分钟时间轴时每小时的点数
+STEPS_PER_HOUR = 4
+
+def _as_float_array(values: List[Any], length: int) -> np.ndarray:
+    """将可能含 None 的列表转为长度为 length 的 float 数组，缺失处为 NaN"""
+    result = np.full(length, np.nan)
+    if values:
+        source = np.asarray(values[:length], dtype=float)
+        result[:len(source)] = source
+    return result
+
+
+def _to_list(values: np.ndarray) -> List[Optional[float]]:
+    """NaN 转为 None 后输出 Python 列表（可直接写入数据库或序列化为 JSON）"""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    result = values.astype(object)
+    result[missing] = None
+    return result.tolist()
+
+
+def parse_columns(response: Dict[str, Any], fields: List[str]) -> Dict[str, List[Any]]:
+    """
+    解析 Open-Meteo 响应为列式数据
+
+    Args:
+        response: API响应字典
+        fields: 请求的字段列表
+
+    Returns:
+        {'datetime': 时间列表, field: 数值列表}，没有时间轴时返回空字典
+    """
+    minutely_15 = response.get('minutely_15') or {}
+    hourly = response.get('hourly') or {}
+
+    # 确定主时间轴 (优先使用 15 分钟)
+    times = minutely_15.get('time') or []
+    is_15min_source = bool(times)
+    if not is_15min_source:
+        times = hourly.get('time') or []
+    if not times:
+        return {}
+
+    length = len(times)
+    columns: Dict[str, List[Any]] = {'datetime': list(times)}
+    for field in fields:
+        api_key = FIELD_REGISTRY.api_param(field)
+        values = _as_float_array(minutely_15.get(api_key), length) if is_15min_source \
+            else np.full(length, np.nan)
+
+        hourly_values = hourly.get(api_key)
+        if hourly_values:
+            source = np.asarray(hourly_values, dtype=float)
+            if is_15min_source:
+                # 15分钟精度下，小时数据每个值覆盖随后的 4 个点
+                source = np.repeat(source, STEPS_PER_HOUR)
+            source = source[:length]
+            head = values[:len(source)]
+            missing = np.isnan(head)
+            head[missing] = source[missing]
+
+        columns[field] = _to_list(values)
+
+    logger.info(f"解析响应: 时间点数量={length}, 精度={'15分钟' if is_15min_source else '1小时'}")
+    return columns
+
+
+def columns_to_records(columns: Dict[str, List[Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    将列式数据转换为逐条记录（仅在需要返回 JSON 记录列表时使用）
+
+    Args:
+        columns: 列式数据，必须包含 datetime
+        fields: 需要保留的字段，None 表示全部
+
+    Returns:
+        记录字典列表
+    """
+    if not columns:
+        return []
+    names = ['datetime'] + [
+        name for name in columns
+        if name != 'datetime' and (fields is None or name in fields)
+    ]
+    return [dict(zip(names, row)) for row in zip(*(columns[name] for name in names))]
+
+
+def count_records(weather_data: Dict[str, Any]) -> int:
+    """统计解析结果中的记录数（兼容列式与逐条记录两种格式）"""
+    columns = weather_data.get('columns')
+    if columns is not None:
+        return len(columns.get('datetime', []))
+    return len(weather_data.get('hourly_data', []))
@@ -0,0 +1,90 @@
+"""
+请求合并 (single-flight)
+相同键的并发调用只执行一次，其余调用等待并共享同一结果（或同一异常），
+用于避免多个用户同时查询同一城市/日期范围时重复请求上游接口
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    线程安全的请求合并器
+    结果在调用方之间共享，调用方不应修改返回的对象
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        执行 fn，若相同 key 的调用正在进行则等待其结果
+
+        Args:
+            key: 合并键（如缓存键）
+            fn: 实际执行的函数
+
+        Returns:
+            fn 的返回值；fn 抛出异常时所有等待者收到同一异常
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"合并进行中的请求: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"{call.waiters} 个并发请求共享了同一次上游调用")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        Returns:
+            统计字典（calls: 总调用数，executions: 实际执行数，coalesced: 被合并的调用数）
+        """
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._calls)}
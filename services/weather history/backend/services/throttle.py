@@ -0,0 +1,135 @@
+"""
+出站请求限流
+令牌桶控制请求速率，按主机的信号量控制并发数，
+多线程下载时共享同一实例，保证整体不超过 Open-Meteo 的频率限制
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+    以 rate 个/秒的速度补充令牌，最多积累 capacity 个
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """按经过的时间补充令牌（调用方持有锁）"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        尝试立即取出令牌
+
+        Returns:
+            是否取到令牌
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        取出令牌，不足时阻塞等待
+
+        Returns:
+            等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostThrottle:
+    """
+    出站请求节流器
+    所有主机共享一个令牌桶（Open-Meteo 按调用方统计频率），每个主机单独限制并发数
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_concurrency_per_host: int):
+        """
+        初始化节流器
+
+        Args:
+            rate_per_minute: 每分钟允许的请求数
+            burst: 允许的突发请求数
+            max_concurrency_per_host: 每个主机的最大并发请求数
+        """
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        """获取主机对应的信号量"""
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency_per_host)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, url: str):
+        """
+        获取一次请求许可的上下文管理器
+
+        Args:
+            url: 请求地址（用于区分主机）
+        """
+        semaphore = self._semaphore(urlparse(url).netloc)
+        with semaphore:
+            waited = self.bucket.acquire()
+            with self._lock:
+                self._stats['requests'] += 1
+                if waited > 0:
+                    self._stats['throttled'] += 1
+                    self._stats['wait_seconds'] += waited
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            return {
+                **self._stats,
+                'wait_seconds': round(self._stats['wait_seconds'], 2),
+                'rate_per_minute': self.bucket.rate * 60,
+                'max_concurrency_per_host': self.max_concurrency_per_host,
+            }
@@ -4,19 +4,37 @@
 遵循单一职责原则
 """
 import logging
+import time
+import numpy as np
 import requests
+from email.utils import parsedate_to_datetime
 from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
 from urllib3.util.retry import Retry
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone as dt_timezone
 from backend.services.cache_manager import CacheManager
+from backend.services.fetch_planner import FetchPlanner
+from backend.services.throttle import HostThrottle
+from backend.services.single_flight import SingleFlight
+from backend.services.field_registry import FIELD_REGISTRY
+from backend.services.response_parser import parse_columns, columns_to_records, count_records
 from backend.models.city import CityManager
 from backend.models.database import DatabaseManager
 
-from backend.config import AVAILABLE_FIELDS, OPEN_METEO_FORECAST_URL
+from backend.config import (
+    OPEN_METEO_FORECAST_URL, OPEN_METEO_GEOCODING_URL, OPEN_METEO_BATCH_SIZE, FORECAST_CACHE_MINUTES,
+    GEOCODING_CACHE_HOURS, GEOCODING_MIN_QUERY_LENGTH
+)
 
 logger = logging.getLogger(__name__)
 
+# 请求重试策略
+API_MAX_RETRIES = 5
+API_RETRY_BACKOFF = 0.5  # 指数退避的初始间隔 (0.5s, 1s, 2s...)
+API_RETRY_MAX_DELAY = 60.0
+API_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
 
 class WeatherService:
     """
@@ -27,16 +45,14 @@ class WeatherService:
     def search_city(self, query: str) -> List[Dict[str, Any]]:
         """
         搜索城市 (支持本地库优先)
+        本地城市通过内存索引匹配；本地结果较少时查询地名解析接口，结果按关键词缓存
         """
         results = []
         try:
-            # 1. 先尝试从本地数据库匹配 (Item: 提升搜索体验)
-            local_sql = "SELECT city_name as name, latitude, longitude, region FROM city_config WHERE city_name LIKE ?"
-            local_matches = self.db_manager.execute_query(local_sql, (f"%{query}%",))
-            
-            for match in local_matches:
+            # 1. 先从本地城市索引匹配 (Item: 提升搜索体验)
+            for match in self.city_manager.search_index().search(query):
                 results.append({
-                    'name': match['name'],
+                    'name': match['city_name'],
                     'latitude': match['latitude'],
                     'longitude': match['longitude'],
                     'region': match['region'],
@@ -46,47 +62,87 @@ class WeatherService:
                     'admin3': ''
                 })
             
-            # 2. 如果本地结果较少，再调用外部 API
-            if len(results) < 5:
-                url = f"https://geocoding-api.open-meteo.com/v1/search?name={query}&language=zh&count=10"
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                for item in data.get('results', []):
-                    name = item.get('name')
+            # 2. 如果本地结果较少，再查询外部地名解析（带缓存）
+            if len(results) < 5 and len(query.strip()) >= GEOCODING_MIN_QUERY_LENGTH:
+                local_names = {r['name'] for r in results}
+                for item in self._geocode(query.strip()):
                     # 避免与本地结果重复
-                    if any(r['name'] == name for r in results):
-                        continue
-                        
-                    admin1 = item.get('admin1', '')
-                    admin2 = item.get('admin2', '')
-                    admin3 = item.get('admin3', '')
-                    country = item.get('country', '')
-                    region_parts = [r for r in [country, admin1, admin2, admin3] if r]
-                    region = " > ".join(region_parts)
-                    
-                    results.append({
-                        'name': name,
-                        'latitude': item.get('latitude'),
-                        'longitude': item.get('longitude'),
-                        'region': region,
-                        'country': country,
-                        'admin1': admin1,
-                        'admin2': admin2,
-                        'admin3': admin3
-                    })
+                    if item['name'] not in local_names:
+                        results.append(item)
             return results
         except Exception as e:
             logger.error(f"查询城市失败: {e}")
             return results # 返回已有的本地结果
 
+    def _geocode(self, query: str) -> List[Dict[str, Any]]:
+        """
+        调用 Open-Meteo 地名解析接口，结果（包括空结果）缓存 GEOCODING_CACHE_HOURS 小时，
+        并发的相同查询只调用一次接口
+
+        Args:
+            query: 搜索关键词
+
+        Returns:
+            地名列表
+        """
+        cache_key = self.cache.generate_cache_key({'geocode': query.lower(), 'language': 'zh'})
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached['results']
+
+        def request_geocode() -> List[Dict[str, Any]]:
+            response = self.session.get(
+                OPEN_METEO_GEOCODING_URL,
+                params={'name': query, 'language': 'zh', 'count': 10},
+                timeout=10
+            )
+            response.raise_for_status()
+            
+            items = []
+            for item in response.json().get('results', []):
+                admin1 = item.get('admin1', '')
+                admin2 = item.get('admin2', '')
+                admin3 = item.get('admin3', '')
+                country = item.get('country', '')
+                region_parts = [r for r in [country, admin1, admin2, admin3] if r]
+                items.append({
+                    'name': item.get('name'),
+                    'latitude': item.get('latitude'),
+                    'longitude': item.get('longitude'),
+                    'region': " > ".join(region_parts),
+                    'country': country,
+                    'admin1': admin1,
+                    'admin2': admin2,
+                    'admin3': admin3
+                })
+            self.cache.set(cache_key, {'results': items}, expire_hours=GEOCODING_CACHE_HOURS)
+            return items
+
+        return self.single_flight.do(cache_key, request_geocode)
+
+    def nearest_cities(self, latitude: float, longitude: float, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        查询距离给定坐标最近的本地城市/场站
+
+        Args:
+            latitude: 纬度
+            longitude: 经度
+            limit: 最大返回数量
+
+        Returns:
+            城市列表（附带 distance_km），按距离升序
+        """
+        return self.city_manager.search_index().nearest(latitude, longitude, limit)
+
     def __init__(
         self, 
         base_url: str,
         cache_manager: CacheManager,
         city_manager: CityManager,
-        db_manager: DatabaseManager
+        db_manager: DatabaseManager,
+        throttle: Optional[HostThrottle] = None,
+        single_flight: Optional[SingleFlight] = None,
+        batch_size: int = OPEN_METEO_BATCH_SIZE
     ):
         """
         初始化天气服务
@@ -96,12 +152,19 @@ class WeatherService:
             cache_manager: 缓存管理器实例（依赖注入）
             city_manager: 城市管理器实例（依赖注入）
             db_manager: 数据库管理器实例（依赖注入）
+            throttle: 出站请求节流器（可选，多线程下载时共享）
+            single_flight: 请求合并器（可选），相同请求并发时只调用一次上游接口
+            batch_size: 多坐标请求中每次最多包含的坐标数
         """
         self.base_url = base_url
         self.forecast_url = OPEN_METEO_FORECAST_URL
         self.cache = cache_manager
         self.city_manager = city_manager
         self.db_manager = db_manager
+        self.fetch_planner = FetchPlanner(db_manager)
+        self.throttle = throttle
+        self.single_flight = single_flight or SingleFlight()
+        self.batch_size = max(1, batch_size)
         self.weather_code_map = {
             0: '晴朗', 1: '晴到多云', 2: '多云', 3: '阴天', 45: '雾', 
             48: '沉积雾', 51: '小毛毛雨', 53: '毛毛雨', 55: '大毛毛雨', 
@@ -110,29 +173,88 @@ class WeatherService:
             82: '大阵雨', 95: '雷阵雨'
         }
         
-        # 支持15分钟级精度的字段列表
-        self.fields_15_min = {
-            'temperature_2m', 'relative_humidity_2m', 'dew_point_2m', 'apparent_temperature',
-            'precipitation', 'rain', 'snowfall', 'weather_code',
-            'wind_speed_10m', 'wind_direction_10m', 'wind_gusts_10m',
-            'shortwave_radiation', 'direct_radiation', 'diffuse_radiation', 
-            'direct_normal_irradiance', 'global_tilted_irradiance', 'terrestrial_radiation'
-        }
+        # 支持15分钟级精度的 API 参数（由字段注册表统一维护）
+        self.fields_15_min = FIELD_REGISTRY.minutely_15_params
         
         # 初始化请求 Session 并配置重试策略 (Item: 提高网络请求可靠性)
         self.session = requests.Session()
         retry_strategy = Retry(
-            total=5, # 增加总重试次数
-            backoff_factor=0.5, # 较短的初始重试间隔 (0.5s, 1s, 2s...)
-            status_forcelist=[429, 500, 502, 503, 504], # 触发重试的状态码
+            total=API_MAX_RETRIES, # 增加总重试次数
+            backoff_factor=API_RETRY_BACKOFF, # 较短的初始重试间隔 (0.5s, 1s, 2s...)
+            status_forcelist=list(API_RETRY_STATUSES), # 触发重试的状态码
             allowed_methods=["HEAD", "GET", "OPTIONS"],
             raise_on_status=False # 避免在多次尝试后抛出异常，让业务代码处理响应
         )
         adapter = HTTPAdapter(max_retries=retry_strategy)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
+        if self.throttle:
+            # 受节流的主机不在 urllib3 内部重试，由 _get 重试，每次尝试都经过 throttle.slot
+            no_retry = HTTPAdapter(max_retries=Retry(total=0, raise_on_status=False))
+            for url in (self.base_url, self.forecast_url):
+                parts = urlparse(url)
+                self.session.mount(f"{parts.scheme}://{parts.netloc}/", no_retry)
         
         logger.info("天气服务初始化完成")
+
+    def _get(self, url: str, timeout: float) -> requests.Response:
+        """
+        请求 Open-Meteo 接口
+        配置了节流器时在这里重试：每次尝试都重新获取 throttle.slot，
+        429/5xx 响应按 Retry-After（没有时按指数退避）等待后重试，等待期间不占用并发名额
+
+        Args:
+            url: 请求地址
+            timeout: 超时时间（秒）
+
+        Returns:
+            最后一次尝试的响应
+        """
+        if not self.throttle:
+            return self.session.get(url, timeout=timeout)
+
+        for attempt in range(API_MAX_RETRIES + 1):
+            try:
+                with self.throttle.slot(url):
+                    response = self.session.get(url, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= API_MAX_RETRIES:
+                    raise
+                delay = self._retry_delay(None, attempt)
+                logger.warning(f"请求失败，{delay:.1f}s 后重试 ({attempt + 1}/{API_MAX_RETRIES}): {e}")
+            else:
+                if response.status_code not in API_RETRY_STATUSES or attempt >= API_MAX_RETRIES:
+                    return response
+                delay = self._retry_delay(response, attempt)
+                logger.warning(
+                    f"上游返回 {response.status_code}，{delay:.1f}s 后重试 ({attempt + 1}/{API_MAX_RETRIES})"
+                )
+            time.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(response: Optional[requests.Response], attempt: int) -> float:
+        """
+        计算重试前的等待时间：优先使用响应的 Retry-After（秒数或 HTTP 日期），否则指数退避
+
+        Args:
+            response: 上次尝试的响应（连接失败时为None）
+            attempt: 已尝试次数减一
+
+        Returns:
+            等待秒数（不超过 API_RETRY_MAX_DELAY）
+        """
+        delay = API_RETRY_BACKOFF * (2 ** attempt)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    when = parsedate_to_datetime(retry_after)
+                    delay = (when - datetime.now(dt_timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    pass
+        return min(max(delay, 0.0), API_RETRY_MAX_DELAY)
     
     def get_historical_weather(
         self,
@@ -155,93 +277,241 @@ class WeatherService:
             end_date: 结束日期 (YYYY-MM-DD)
             fields: 需要获取的数据字段列表
             timezone: 时区
+            city_id: 城市ID，提供时优先使用本地数据库，只下载缺失部分
+            force_refresh: 是否跳过本地数据库直接请求 API
             
         Returns:
             天气数据字典
         """
-        # 如果提供了city_id，为了保证数据库的完整性，我们总是获取所有可用字段 (Item 2)
-        request_fields = fields
         if city_id and not force_refresh:
-            # 策略：本地数据库优先
+            # 策略：本地数据库优先，只向 API 请求本地缺失的 (日期范围 × 字段) 区块
             try:
-                # 1. 尝试从本地持久化表 weather_data 获取数据
+                plan = self.fetch_planner.plan(city_id, start_date, end_date, fields)
+            except Exception as e:
+                logger.warning(f"本地数据库预查失败: {e}")
+                plan = None
+
+            if plan is not None:
+                self._fill_gaps(city_id, longitude, latitude, plan, timezone)
+
                 db_data = self.db_manager.get_weather_data({
                     'city_id': city_id,
                     'start_date': f"{start_date}T00:00",
                     'end_date': f"{end_date}T23:59"
                 })
-                
-                # 2. 检查本地数据是否完整
-                # 计算期望的记录数 (15分钟级 = 24 * 4 = 96条/天)
-                d1 = datetime.strptime(start_date, '%Y-%m-%d')
-                d2 = datetime.strptime(end_date, '%Y-%m-%d')
-                expected_records = ((d2 - d1).days + 1) * 96 
-                
-                # 本地数据量检查 (容许少量缺失, e.g. 95%)
-                if len(db_data) >= expected_records * 0.95:
-                    logger.info(f"本地数据量充足: {len(db_data)}/{expected_records}")
-                    # 3. 检查请求的字段在本地数据中是否均有数值 (Item 3 & 44 改进)
-                    # 只要有一个用户请求的字段在所有记录中都为 None，就认为该字段可能未曾下载，需要触发 API 请求
-                    is_complete = True
-                    if fields:
-                        for f in fields:
-                            if f in ['city', 'date', 'time', 'datetime']:
-                                continue
-                            # 如果该字段在本地数据中全部为 None，说明需要“增肥” (Item 4)
-                            # 注意: 对于15分钟数据，数据量较大，这里优化检查逻辑
-                            # 采样检查或只检查非零字段可能更高效，但为了准确仍全量检查
-                            if all(rec.get(f) is None for rec in db_data):
-                                logger.info(f"本地数据库虽然时间点足够({len(db_data)})，但缺失关键字段: {f}")
-                                is_complete = False
-                                break
-                    
-                    if is_complete:
-                        logger.info(f"本地数据库命中: 找到 {len(db_data)} 条记录，字段完整，满足期望")
-                        # 格式化输出，保持与 API 响应一致
-                        return {
-                            'latitude': latitude,
-                            'longitude': longitude,
-                            'timezone': timezone,
-                            'hourly_data': db_data
-                        }
-                        logger.info("本地数据库字段不全，将触发 API 请求以补全（增肥）缺失字段")
-                else:
-                    logger.info(f"本地数据量不足，将触发API更新: found={len(db_data)}, expected={expected_records}")
+                logger.info(f"从本地数据库返回 {len(db_data)} 条记录 (补缺请求 {len(plan)} 次)")
+                # 格式化输出，保持与 API 响应一致
+                return {
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'timezone': timezone,
+                    'hourly_data': db_data
+                }
+
+        # 无法规划补缺时整段请求；关联城市时请求所有字段以填补本地库
+        request_fields = fields
+        if city_id and not force_refresh:
+            request_fields = list(set(fields) | set(FIELD_REGISTRY.fields))
+
+        parsed_data = self.fetch_range(
+            longitude, latitude, start_date, end_date, request_fields, timezone
+        )
+
+        # 如果提供了city_id，同时存入永久数据库
+        if city_id:
+            try:
+                self.save_to_database(city_id, parsed_data, merge=True)
+                logger.info(f"同时将数据保存到永久数据库: 城市ID={city_id}")
             except Exception as e:
-                logger.warning(f"本地数据库预查失败: {e}")
+                logger.warning(f"保存到永久数据库失败(非致命): {e}")
+
+        # 转换为逐条记录返回；实际请求的字段多于用户请求时，只返回用户请求的部分
+        result = {k: v for k, v in parsed_data.items() if k != 'columns'}
+        result['hourly_data'] = columns_to_records(
+            parsed_data['columns'], fields if request_fields != fields else None
+        )
+        return result
 
-            # 如果本地不完整，准备向 API 请求所有字段以填补本地库
-            all_fields = []
-            for cat in AVAILABLE_FIELDS.values():
-                all_fields.extend(cat.keys())
-            request_fields = list(set(fields + all_fields))
+    def get_historical_columns(
+        self,
+        longitude: float,
+        latitude: float,
+        start_date: str,
+        end_date: str,
+        fields: List[str],
+        timezone: str = 'Asia/Shanghai',
+        city_id: Optional[int] = None,
+        force_refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取历史天气数据（列式），供列式 JSON / Arrow 响应使用
+        与 get_historical_weather 取数策略一致，但不构造逐条记录字典
+
+        Args:
+            同 get_historical_weather
+
+        Returns:
+            {'latitude', 'longitude', 'timezone', 'columns': {'datetime': [...], 字段: 数组}}；
+            本地数据库路径下字段列为 float32 NumPy 数组（缺失为 NaN），且只包含请求的字段
+        """
+        if city_id and not force_refresh:
+            try:
+                self.sync_local_data(city_id, longitude, latitude, start_date, end_date, fields, timezone)
+                frame = self.db_manager.get_weather_frame({
+                    'city_id': city_id,
+                    'start_date': f"{start_date}T00:00",
+                    'end_date': f"{end_date}T23:59"
+                }, fields)
+                columns = {'datetime': frame['datetime'].to_numpy()}
+                for field in fields:
+                    if field in frame.columns:
+                        columns[field] = np.ascontiguousarray(frame[field].to_numpy())
+                logger.info(f"从本地列式存储返回 {len(frame)} 条记录")
+                return {
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'timezone': timezone,
+                    'columns': columns
+                }
+            except Exception as e:
+                logger.warning(f"本地列式读取失败，改为直接请求 API: {e}")
+
+        parsed_data = self.fetch_range(longitude, latitude, start_date, end_date, fields, timezone)
+        if city_id:
+            try:
+                self.save_to_database(city_id, parsed_data, merge=True)
+            except Exception as e:
+                logger.warning(f"保存到永久数据库失败(非致命): {e}")
+
+        result = {k: v for k, v in parsed_data.items() if k != 'columns'}
+        result['columns'] = {
+            name: values for name, values in parsed_data['columns'].items()
+            if name == 'datetime' or name in fields
+        }
+        return result
+
+    def sync_local_data(
+        self,
+        city_id: int,
+        longitude: float,
+        latitude: float,
+        start_date: str,
+        end_date: str,
+        fields: List[str],
+        timezone: str = 'Asia/Shanghai'
+    ) -> int:
+        """
+        确保本地数据库包含指定范围与字段的数据，只下载缺失部分，不返回数据本身
+        供导出等需要随后流式读取数据库的场景使用
+        
+        Args:
+            city_id: 城市ID
+            longitude: 经度
+            latitude: 纬度
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 需要的数据字段列表
+            timezone: 时区
             
-        # 生成缓存键 (包含请求的所有字段)
-        cache_params = {
+        Returns:
+            实际发起的补缺请求次数
+        """
+        plan = self.fetch_planner.plan(city_id, start_date, end_date, fields)
+        self._fill_gaps(city_id, longitude, latitude, plan, timezone)
+        return len(plan)
+
+    def _fill_gaps(
+        self,
+        city_id: int,
+        longitude: float,
+        latitude: float,
+        plan: List[Dict[str, Any]],
+        timezone: str
+    ):
+        """按补缺计划逐段请求 API 并合并写入数据库"""
+        if not plan:
+            logger.info("本地数据库命中: 记录与字段完整，无需请求 API")
+        for call in plan:
+            # 补缺请求的字段可能少于全部字段，使用合并写入避免覆盖已有字段
+            call_data = self.fetch_range(
+                longitude, latitude, call['start'], call['end'], call['fields'], timezone
+            )
+            self.save_to_database(city_id, call_data, merge=True)
+
+    def fetch_range(
+        self,
+        longitude: float,
+        latitude: float,
+        start_date: str,
+        end_date: str,
+        request_fields: List[str],
+        timezone: str = 'Asia/Shanghai',
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        从快照缓存或 Open-Meteo API 获取一段日期范围的数据
+
+        Args:
+            longitude: 经度
+            latitude: 纬度
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            request_fields: 请求的字段列表
+            timezone: 时区
+            use_cache: 是否读取快照缓存；为 False 时总是请求上游（如上游可能已补齐的最近数据）
+
+        Returns:
+            解析后的数据字典（列式，见 _parse_response）
+        """
+        cache_key = self._range_cache_key(longitude, latitude, start_date, end_date, request_fields, timezone)
+        
+        # 检查缓存 (快照缓存)
+        cached_data = self.cache.get(cache_key) if use_cache else None
+        if cached_data:
+            logger.info(f"从快照缓存获取数据: {start_date} 至 {end_date}")
+            return cached_data
+
+        # 相同请求（同一缓存键）正在进行时等待其结果，不再重复调用上游
+        return self.single_flight.do(
+            cache_key,
+            lambda: self._request_range(
+                cache_key, longitude, latitude, start_date, end_date, request_fields, timezone
+            )
+        )
+
+    def _range_cache_key(
+        self,
+        longitude: float,
+        latitude: float,
+        start_date: str,
+        end_date: str,
+        request_fields: List[str],
+        timezone: str
+    ) -> str:
+        """生成单个坐标、日期范围的快照缓存键 (包含请求的所有字段)"""
+        return self.cache.generate_cache_key({
             'lon': longitude,
             'lat': latitude,
             'start': start_date,
             'end': end_date,
             'fields': sorted(request_fields),
             'tz': timezone,
-            'resolution': '15min_v2' # Force new cache for 15-min precision upgrade and debugging
-        }
-        cache_key = self.cache.generate_cache_key(cache_params)
-        
-        # 检查缓存 (快照缓存)
-        cached_data = self.cache.get(cache_key)
-        if cached_data:
-            logger.info(f"从快照缓存获取数据: {start_date} 至 {end_date}")
-            # 如果请求的字段被缓存，则提取原本请求的部分返回
-            if request_fields != fields:
-                filtered_hourly = []
-                for rec in cached_data.get('hourly_data', []):
-                    filtered_rec = {k: v for k, v in rec.items() if k in fields or k == 'datetime'}
-                    filtered_hourly.append(filtered_rec)
-                
-                return {**cached_data, 'hourly_data': filtered_hourly}
-            return cached_data
-        
+            'resolution': '15min_columns'  # 缓存内容为列式解析结果
+        })
+
+    def _range_url(
+        self,
+        longitude: Any,
+        latitude: Any,
+        start_date: str,
+        end_date: str,
+        request_fields: List[str],
+        timezone: str
+    ) -> str:
+        """
+        根据日期选择 Archive API 或 Forecast API 并构建 URL
+        多坐标请求时 longitude/latitude 为逗号分隔的字符串
+        """
         # 策略: 根据日期判断使用 Archive API 还是 Forecast API
         # Open-Meteo Archive API 通常有 2-5 天延迟。对于近期(昨天/前天)数据，应使用 Forecast API 的 past_days 功能或直接指定 dates。
         # 这里的 "Forecast API" 指的是 https://api.open-meteo.com/v1/forecast
@@ -265,11 +535,34 @@ class WeatherService:
                 longitude, latitude, start_date, end_date, request_fields, timezone
             )
             logger.info(f"查询日期较远({days_diff}天前)，使用 Archive API")
+        return api_url
+
+    def _request_range(
+        self,
+        cache_key: str,
+        longitude: float,
+        latitude: float,
+        start_date: str,
+        end_date: str,
+        request_fields: List[str],
+        timezone: str
+    ) -> Dict[str, Any]:
+        """
+        调用 Open-Meteo API 获取一段日期范围的数据并写入快照缓存
+
+        Args:
+            cache_key: 快照缓存键
+            其余参数同 fetch_range
+
+        Returns:
+            解析后的数据字典
+        """
+        api_url = self._range_url(longitude, latitude, start_date, end_date, request_fields, timezone)
         
         try:
             # 调用API
             logger.info(f"调用Open-Meteo API: {start_date} 至 {end_date}, 字段数: {len(request_fields)}")
-            response = self.session.get(api_url, timeout=30)
+            response = self._get(api_url, timeout=30)
             response.raise_for_status()
             
             # 解析响应 (使用实际请求的字段)
@@ -279,25 +572,7 @@ class WeatherService:
             # 存入缓存
             self.cache.set(cache_key, parsed_data)
             
-            # 如果提供了city_id，同时存入永久数据库
-            if city_id:
-                try:
-                    self.save_to_database(city_id, parsed_data)
-                    logger.info(f"同时将数据保存到永久数据库: 城市ID={city_id}")
-                except Exception as e:
-                    logger.warning(f"保存到永久数据库失败(非致命): {e}")
-            
-            logger.info(f"获取天气数据成功，共 {len(parsed_data.get('hourly_data', []))} 条记录")
-            
-            # 如果实际请求的字段多于用户请求，只向用户返回用户请求的部分
-            if request_fields != fields:
-                filtered_hourly = []
-                for rec in parsed_data.get('hourly_data', []):
-                    filtered_rec = {k: v for k, v in rec.items() if k in fields or k == 'datetime'}
-                    filtered_hourly.append(filtered_rec)
-                
-                return {**parsed_data, 'hourly_data': filtered_hourly}
-                
+            logger.info(f"获取天气数据成功，共 {count_records(parsed_data)} 条记录")
             return parsed_data
             
         except requests.exceptions.RequestException as e:
@@ -308,6 +583,111 @@ class WeatherService:
             logger.error(f"处理天气数据失败: {e}")
             raise
     
+    def fetch_range_batch(
+        self,
+        locations: List[Tuple[float, float]],
+        start_date: str,
+        end_date: str,
+        request_fields: List[str],
+        timezone: str = 'Asia/Shanghai'
+    ) -> List[Dict[str, Any]]:
+        """
+        批量获取多个坐标同一日期范围、同一组字段的数据
+        逐个坐标先查快照缓存（与 fetch_range 共用缓存键），未命中的坐标每 batch_size 个
+        合并为一次多坐标请求，响应按坐标拆分后分别缓存
+
+        Args:
+            locations: (经度, 纬度) 列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            request_fields: 请求的字段列表
+            timezone: 时区
+
+        Returns:
+            与 locations 顺序一致的解析结果列表（同 fetch_range）
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(locations)
+        missing = []
+        for i, (longitude, latitude) in enumerate(locations):
+            cache_key = self._range_cache_key(longitude, latitude, start_date, end_date, request_fields, timezone)
+            cached_data = self.cache.get(cache_key)
+            if cached_data:
+                results[i] = cached_data
+            else:
+                missing.append((i, cache_key))
+
+        if len(missing) == 1:
+            # 只有一个坐标时沿用单坐标路径（可与并发的相同请求合并）
+            i, _ = missing[0]
+            results[i] = self.fetch_range(*locations[i], start_date, end_date, request_fields, timezone)
+            return results
+
+        for offset in range(0, len(missing), self.batch_size):
+            group = missing[offset:offset + self.batch_size]
+            api_url = self._range_url(
+                ','.join(str(locations[i][0]) for i, _ in group),
+                ','.join(str(locations[i][1]) for i, _ in group),
+                start_date, end_date, request_fields, timezone
+            )
+            logger.info(f"调用Open-Meteo API (多坐标 {len(group)} 个): {start_date} 至 {end_date}")
+            try:
+                response = self._get(api_url, timeout=60)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"API请求失败: {e}")
+                self._handle_api_error(e)
+                raise
+
+            data = response.json()
+            # 多坐标请求返回列表，顺序与请求的坐标一致
+            items = data if isinstance(data, list) else [data]
+            if len(items) != len(group):
+                raise ValueError(f"多坐标响应数量不符: 请求 {len(group)} 个, 返回 {len(items)} 个")
+            for (i, cache_key), item in zip(group, items):
+                parsed_data = self._parse_response(item, request_fields)
+                self.cache.set(cache_key, parsed_data)
+                results[i] = parsed_data
+        return results
+
+    def sync_cities_local_data(
+        self,
+        cities: List[Dict[str, Any]],
+        start_date: str,
+        end_date: str,
+        fields: List[str],
+        timezone: str = 'Asia/Shanghai'
+    ) -> int:
+        """
+        为多个城市补齐本地数据库缺失的数据
+        各城市的补缺计划中 (日期范围, 字段) 相同的请求合并为多坐标请求
+
+        Args:
+            cities: 城市信息列表（包含 id、longitude、latitude）
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 需要的数据字段列表
+            timezone: 时区
+
+        Returns:
+            需要补缺的 (日期范围, 字段) 组数
+        """
+        groups: Dict[Tuple[str, str, Tuple[str, ...]], List[Dict[str, Any]]] = {}
+        for city in cities:
+            for call in self.fetch_planner.plan(city['id'], start_date, end_date, fields):
+                key = (call['start'], call['end'], tuple(call['fields']))
+                groups.setdefault(key, []).append(city)
+
+        for (call_start, call_end, call_fields), members in groups.items():
+            parsed = self.fetch_range_batch(
+                [(city['longitude'], city['latitude']) for city in members],
+                call_start, call_end, list(call_fields), timezone
+            )
+            for city, call_data in zip(members, parsed):
+                # 补缺请求的字段可能少于全部字段，使用合并写入避免覆盖已有字段
+                self.save_to_database(city['id'], call_data, merge=True)
+        logger.info(f"多城市补缺完成: {len(cities)} 个城市, {len(groups)} 组请求")
+        return len(groups)
+
     def batch_query_cities(
         self,
         city_ids: List[int],
@@ -329,6 +709,13 @@ class WeatherService:
         """
         results = []
         
+        # 先按相同的补缺范围合并为多坐标请求，之后各城市直接从本地数据库读取
+        cities = [city for city in (self.city_manager.get_city_by_id(cid) for cid in city_ids) if city]
+        try:
+            self.sync_cities_local_data(cities, start_date, end_date, fields)
+        except Exception as e:
+            logger.warning(f"多城市批量补缺失败，改为逐城市请求: {e}")
+        
         for city_id in city_ids:
             try:
                 # 获取城市坐标
@@ -340,9 +727,9 @@ class WeatherService:
                 longitude, latitude = coordinates
                 city_info = self.city_manager.get_city_by_id(city_id)
                 
-                # 获取天气数据
+                # 获取天气数据（本地数据库优先，只下载缺失部分）
                 weather_data = self.get_historical_weather(
-                    longitude, latitude, start_date, end_date, fields
+                    longitude, latitude, start_date, end_date, fields, city_id=city_id
                 )
                 
                 # 添加城市信息
@@ -381,26 +768,8 @@ class WeatherService:
         Returns:
             完整的API URL
         """
-        # 将字段列表转换为逗号分隔的字符串，考虑 API 参数映射 (Item 2)
-        # 策略: 将所有字段都放入 hourly 以作为兜底 (Fallback)，同时将支持高精度的字段放入 minutely_15
-        all_api_fields = []
-        minutely_15_fields = []
-        
-        for f in fields:
-            f = f.strip()
-            # 查找字段对应的 API 参数名
-            api_param = f
-            for group in AVAILABLE_FIELDS.values():
-                if f in group:
-                    api_param = group[f].get('api_param', f)
-                    break
-            
-            # 加入全量列表 (用于 hourly)
-            all_api_fields.append(api_param)
-            
-            # 如果支持15分钟精度，加入高精度列表
-            if api_param in self.fields_15_min:
-                minutely_15_fields.append(api_param)
+        # 所有字段都放入 hourly 以作为兜底 (Fallback)，支持高精度的字段同时放入 minutely_15
+        all_api_fields, minutely_15_fields = FIELD_REGISTRY.split_api_params(fields)
         
         # 构建URL参数
         params = {
@@ -436,19 +805,7 @@ class WeatherService:
         构建 Forecast API URL (用于查询近期历史)
         """
         # 字段映射逻辑与 Archive 类似，但直接使用 forecast endpoint
-        all_api_fields = []
-        minutely_15_fields = []
-        
-        for f in fields:
-            f = f.strip()
-            api_param = f
-            for group in AVAILABLE_FIELDS.values():
-                if f in group:
-                    api_param = group[f].get('api_param', f)
-                    break
-            all_api_fields.append(api_param)
-            if api_param in self.fields_15_min:
-                minutely_15_fields.append(api_param)
+        all_api_fields, minutely_15_fields = FIELD_REGISTRY.split_api_params(fields)
         
         params = {
             'latitude': latitude,
@@ -479,79 +836,20 @@ class WeatherService:
             fields: 请求的字段列表
             
         Returns:
-            解析后的数据字典
+            解析后的数据字典，数据以列式保存在 columns 中
         """
         try:
-            # 提取基本信息
-            parsed_data = {
+            columns = parse_columns(response, fields)
+            logger.debug(f"解析响应成功，共 {len(columns.get('datetime', []))} 条记录")
+            return {
                 'latitude': response.get('latitude'),
                 'longitude': response.get('longitude'),
                 'elevation': response.get('elevation'),
                 'timezone': response.get('timezone'),
                 'timezone_abbreviation': response.get('timezone_abbreviation'),
-                'hourly_data': []
+                'columns': columns
             }
             
-            # 数据源
-            minutely_15 = response.get('minutely_15', {})
-            hourly = response.get('hourly', {})
-            
-            # 确定主时间轴 (优先使用 15 分钟)
-            times = minutely_15.get('time', [])
-            is_15min_source = True
-            
-            if not times:
-                # Fallback to hourly if no 15 min data requested/available
-                times = hourly.get('time', [])
-                is_15min_source = False
-                
-            if not times:
-                return parsed_data
-
-            logger.info(f"解析响应: 时间点数量={len(times)}, 精度={'15分钟' if is_15min_source else '1小时'}")
-
-            # 构建数据记录
-            for i, time_str in enumerate(times):
-                record = {'datetime': time_str}
-                
-                # 遍历用户请求的所有字段
-                for field in fields:
-                    # 获取 API 参数名
-                    api_key = field
-                    for group in AVAILABLE_FIELDS.values():
-                        if field in group:
-                            api_key = group[field].get('api_param', field)
-                            break
-                    
-                    value = None
-                    
-                    # 1. 尝试从 15 分钟数据获取
-                    if api_key in minutely_15 and i < len(minutely_15[api_key]):
-                         val = minutely_15[api_key][i]
-                         if val is not None:
-                             value = val
-                    
-                    # 2. 如果 15 分钟里没有，或者是 hourly 字段，则从 hourly 获取并填充
-                    if value is None:
-                        if is_15min_source:
-                            # 15分钟精度下，Hourly 数据每 4 个点对齐一次
-                            # Open-Meteo 15-min time usually starts same as hourly. 
-                            # index mapping: hourly_index = i // 4
-                            hourly_idx = i // 4
-                            if api_key in hourly and hourly_idx < len(hourly[api_key]):
-                                value = hourly[api_key][hourly_idx]
-                        else:
-                            # 纯小时精度
-                            if api_key in hourly and i < len(hourly[api_key]):
-                                value = hourly[api_key][i]
-                    
-                    record[field] = value
-                
-                parsed_data['hourly_data'].append(record)
-            
-            logger.debug(f"解析响应成功，共 {len(parsed_data['hourly_data'])} 条记录")
-            return parsed_data
-            
         except Exception as e:
             logger.error(f"解析API响应失败: {e}")
             raise
@@ -572,18 +870,28 @@ class WeatherService:
         else:
             logger.error(f"未知API错误: {error}")
     
-    def save_to_database(self, city_id: int, weather_data: Dict[str, Any]) -> int:
+    def save_to_database(self, city_id: int, weather_data: Dict[str, Any], merge: bool = False) -> int:
         """
         将天气数据保存到数据库
         
         Args:
             city_id: 城市ID
             weather_data: 天气数据字典
+            merge: 是否合并写入（只更新本次提供的非空字段，不覆盖已有字段）
             
         Returns:
             保存的记录数
         """
         try:
+            columns = weather_data.get('columns')
+            if columns is not None:
+                # 列式数据直接按列写入，不构造逐条字典
+                if not columns.get('datetime'):
+                    return 0
+                inserted = self.db_manager.write_weather_columns(city_id, columns, merge=merge)
+                logger.info(f"保存天气数据到数据库成功，插入 {inserted} 条记录")
+                return inserted
+            
             hourly_data = weather_data.get('hourly_data', [])
             
             # 准备批量插入的数据
@@ -602,7 +910,10 @@ class WeatherService:
             
             # 批量插入
             if records:
-                inserted = self.db_manager.bulk_insert('weather_data', records)
+                if merge:
+                    inserted = self.db_manager.upsert_weather_data(records)
+                else:
+                    inserted = self.db_manager.bulk_insert('weather_data', records)
                 logger.info(f"保存天气数据到数据库成功，插入 {inserted} 条记录")
                 return inserted
             
@@ -612,6 +923,94 @@ class WeatherService:
             logger.error(f"保存天气数据到数据库失败: {e}")
             raise
 
+    # 实时天气与预报请求的参数（多坐标请求时与预报合并为一次调用）
+    CURRENT_PARAMS = 'temperature_2m,wind_speed_10m,weather_code,shortwave_radiation'
+    FORECAST_DAILY_PARAMS = 'weather_code,temperature_2m_max,temperature_2m_min'
+    FORECAST_HOURLY_PARAMS = 'temperature_2m,relative_humidity_2m,precipitation_probability,wind_speed_10m,shortwave_radiation'
+    FORECAST_MINUTELY_PARAMS = 'temperature_2m,precipitation_probability,wind_speed_10m,shortwave_radiation'
+
+    def _parse_current(self, data: Dict[str, Any], city_name: str) -> Dict[str, Any]:
+        """解析实时天气 (new format 'current' object)"""
+        current = data.get('current', {})
+        code = int(current.get('weather_code', 0))
+        
+        return {
+            'city_name': city_name,
+            'temperature': current.get('temperature_2m'),
+            'wind_speed': current.get('wind_speed_10m'),
+            'radiation': current.get('shortwave_radiation', 0), # 新增辐照度
+            'weather_code': code,
+            'weather_name': self.weather_code_map.get(code, f"未知({code})"),
+            'update_time': current.get('time', '').replace('T', ' ')
+        }
+
+    def _parse_forecast(self, data: Dict[str, Any], city_name: str) -> Dict[str, Any]:
+        """解析每日、每小时与15分钟预报"""
+        daily = data.get('daily', {})
+        hourly = data.get('hourly', {})
+        minutely = data.get('minutely_15', {})
+        
+        # --- 处理每日预报 (7天) ---
+        forecast_list = []
+        dates = daily.get('time', [])
+        codes = daily.get('weather_code', [])
+        max_temps = daily.get('temperature_2m_max', [])
+        min_temps = daily.get('temperature_2m_min', [])
+        
+        for i in range(len(dates)):
+            code = int(codes[i])
+            forecast_list.append({
+                'date': dates[i],
+                'weather_code': code,
+                'weather_name': self.weather_code_map.get(code, f"未知({code})"),
+                'temp_max': max_temps[i],
+                'temp_min': min_temps[i]
+            })
+
+        # --- 处理每小时预报 (全部) ---
+        hourly_list = [
+            {'time': t, 'temp': temp, 'humidity': humidity, 'pop': pop, 'wind': wind, 'radiation': rad}
+            for t, temp, humidity, pop, wind, rad in zip(
+                hourly.get('time', []),
+                hourly.get('temperature_2m', []),
+                hourly.get('relative_humidity_2m', []),
+                hourly.get('precipitation_probability', []),
+                hourly.get('wind_speed_10m', []),
+                hourly.get('shortwave_radiation', [])
+            )
+        ]
+
+        # --- 处理15分钟预报 (高精度数据) ---
+        minutely_list = [
+            {'time': t, 'temp': temp, 'pop': pop, 'wind': wind, 'radiation': rad}
+            for t, temp, pop, wind, rad in zip(
+                minutely.get('time', []),
+                minutely.get('temperature_2m', []),
+                minutely.get('precipitation_probability', []),
+                minutely.get('wind_speed_10m', []),
+                minutely.get('shortwave_radiation', [])
+            )
+        ]
+
+        return {
+            'city_name': city_name,
+            'daily_forecast': forecast_list,
+            'hourly_forecast': hourly_list,
+            'minutely_15_forecast': minutely_list
+        }
+
+    def _forecast_url(self, latitude: Any, longitude: Any, days: int, include_current: bool) -> str:
+        """构建预报 URL，多坐标请求时经纬度为逗号分隔的字符串"""
+        url = (
+            f"{self.forecast_url}?latitude={latitude}&longitude={longitude}"
+            f"&daily={self.FORECAST_DAILY_PARAMS}&hourly={self.FORECAST_HOURLY_PARAMS}"
+            f"&minutely_15={self.FORECAST_MINUTELY_PARAMS}&forecast_days={days}"
+            f"&timezone=Asia/Shanghai&wind_speed_unit=ms"
+        )
+        if include_current:
+            url += f"&current={self.CURRENT_PARAMS}"
+        return url
+
     def get_current_weather(self, city_id: int) -> Dict[str, Any]:
         """
         获取实时天气 (包含辐照度)
@@ -624,27 +1023,12 @@ class WeatherService:
         city_info = self.city_manager.get_city_by_id(city_id)
         
         # 使用新的 API 参数格式以获取更多数据 (如辐射)
-        # current=temperature_2m,wind_speed_10m,weather_code,shortwave_radiation
-        url = f"{self.forecast_url}?latitude={lat}&longitude={lon}&current=temperature_2m,wind_speed_10m,weather_code,shortwave_radiation&timezone=Asia/Shanghai&wind_speed_unit=ms"
+        url = f"{self.forecast_url}?latitude={lat}&longitude={lon}&current={self.CURRENT_PARAMS}&timezone=Asia/Shanghai&wind_speed_unit=ms"
         
         try:
-            response = self.session.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             response.raise_for_status()
-            data = response.json()
-            
-            # 解析 new format 'current' object
-            current = data.get('current', {})
-            code = int(current.get('weather_code', 0))
-            
-            return {
-                'city_name': city_info['city_name'],
-                'temperature': current.get('temperature_2m'),
-                'wind_speed': current.get('wind_speed_10m'),
-                'radiation': current.get('shortwave_radiation', 0), # 新增辐照度
-                'weather_code': code,
-                'weather_name': self.weather_code_map.get(code, f"未知({code})"),
-                'update_time': current.get('time', '').replace('T', ' ')
-            }
+            return self._parse_current(response.json(), city_info['city_name'])
         except Exception as e:
             logger.error(f"获取实时天气失败: {e}")
             raise
@@ -661,79 +1045,67 @@ class WeatherService:
         city_info = self.city_manager.get_city_by_id(city_id)
         
         # 请求每日、每小时以及15分钟高精度数据
-        # hourly=...
-        # minutely_15=temperature_2m,precipitation_probability,wind_speed_10m,shortwave_radiation
-        url = f"{self.forecast_url}?latitude={lat}&longitude={lon}&daily=weather_code,temperature_2m_max,temperature_2m_min&hourly=temperature_2m,relative_humidity_2m,precipitation_probability,wind_speed_10m,shortwave_radiation&minutely_15=temperature_2m,precipitation_probability,wind_speed_10m,shortwave_radiation&forecast_days={days}&timezone=Asia/Shanghai&wind_speed_unit=ms"
+        url = self._forecast_url(lat, lon, days, include_current=False)
         
         try:
-            response = self.session.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             response.raise_for_status()
-            data = response.json()
-            
-            daily = data.get('daily', {})
-            hourly = data.get('hourly', {})
-            minutely = data.get('minutely_15', {})
-            
-            # --- 处理每日预报 (7天) ---
-            forecast_list = []
-            dates = daily.get('time', [])
-            codes = daily.get('weather_code', [])
-            max_temps = daily.get('temperature_2m_max', [])
-            min_temps = daily.get('temperature_2m_min', [])
-            
-            for i in range(len(dates)):
-                code = int(codes[i])
-                forecast_list.append({
-                    'date': dates[i],
-                    'weather_code': code,
-                    'weather_name': self.weather_code_map.get(code, f"未知({code})"),
-                    'temp_max': max_temps[i],
-                    'temp_min': min_temps[i]
-                })
-
-            # --- 处理每小时预报 (全部) ---
-            hourly_list = []
-            h_times = hourly.get('time', [])
-            h_temps = hourly.get('temperature_2m', [])
-            h_humidity = hourly.get('relative_humidity_2m', [])
-            h_precip = hourly.get('precipitation_probability', [])
-            h_wind = hourly.get('wind_speed_10m', [])
-            h_rad = hourly.get('shortwave_radiation', [])
-            
-            for i in range(len(h_times)):
-                hourly_list.append({
-                    'time': h_times[i],
-                    'temp': h_temps[i],
-                    'humidity': h_humidity[i],
-                    'pop': h_precip[i],
-                    'wind': h_wind[i],
-                    'radiation': h_rad[i]
-                })
-
-            # --- 处理15分钟预报 (高精度数据) ---
-            minutely_list = []
-            m_times = minutely.get('time', [])
-            m_temps = minutely.get('temperature_2m', [])
-            m_precip = minutely.get('precipitation_probability', [])
-            m_wind = minutely.get('wind_speed_10m', [])
-            m_rad = minutely.get('shortwave_radiation', [])
-
-            for i in range(len(m_times)):
-                minutely_list.append({
-                    'time': m_times[i],
-                    'temp': m_temps[i],
-                    'pop': m_precip[i],
-                    'wind': m_wind[i],
-                    'radiation': m_rad[i]
-                })
-
-            return {
-                'city_name': city_info['city_name'],
-                'daily_forecast': forecast_list,
-                'hourly_forecast': hourly_list,
-                'minutely_15_forecast': minutely_list
-            }
+            return self._parse_forecast(response.json(), city_info['city_name'])
         except Exception as e:
             logger.error(f"获取天气预报失败: {e}")
             raise
 
+    def get_forecast_batch(self, cities: List[Dict[str, Any]], days: int = 7) -> Dict[int, Dict[str, Any]]:
+        """
+        批量获取多个城市的预报与实时天气
+        每个城市的结果缓存 FORECAST_CACHE_MINUTES 分钟；未命中的城市每 batch_size 个合并为
+        一次多坐标请求，预报与实时天气在同一次请求中返回
+
+        Args:
+            cities: 城市信息列表（包含 id、city_name、longitude、latitude）
+            days: 预报天数
+
+        Returns:
+            {city_id: {'forecast': 预报（同 get_forecast）, 'current': 实时天气（同 get_current_weather）}}
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+        missing = []
+        for city in cities:
+            cache_key = self.cache.generate_cache_key({
+                'forecast': days, 'lon': city['longitude'], 'lat': city['latitude']
+            })
+            cached = self.cache.get(cache_key)
+            if cached:
+                results[city['id']] = cached
+            else:
+                missing.append((city, cache_key))
+
+        for offset in range(0, len(missing), self.batch_size):
+            group = missing[offset:offset + self.batch_size]
+            url = self._forecast_url(
+                ','.join(str(city['latitude']) for city, _ in group),
+                ','.join(str(city['longitude']) for city, _ in group),
+                days,
+                include_current=True
+            )
+            logger.info(f"调用Open-Meteo预报API (多坐标 {len(group)} 个)")
+            try:
+                response = self._get(url, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                logger.error(f"批量获取天气预报失败: {e}")
+                raise
+
+            # 多坐标请求返回列表，顺序与请求的坐标一致
+            items = data if isinstance(data, list) else [data]
+            if len(items) != len(group):
+                raise ValueError(f"多坐标响应数量不符: 请求 {len(group)} 个, 返回 {len(items)} 个")
+            for (city, cache_key), item in zip(group, items):
+                entry = {
+                    'forecast': self._parse_forecast(item, city['city_name']),
+                    'current': self._parse_current(item, city['city_name']) if item.get('current') else None
+                }
+                self.cache.set(cache_key, entry, expire_hours=FORECAST_CACHE_MINUTES / 60)
+                results[city['id']] = entry
+        return results
@@ -93,6 +93,34 @@ class APIClient {
         return this.post('/weather/query', params);
     }
 
+    /**
+     * 以列式格式查询天气数据（字段名只传输一次，响应体积远小于逐条记录）
+     * @param {object} params - 查询参数
+     * @returns {Promise} 天气数据，data.columns 为 {datetime: [...], 字段: [...]}
+     */
+    async queryWeatherColumns(params) {
+        return this.post('/weather/query', { ...params, format: 'columns' });
+    }
+
+    /**
+     * 将列式数据转换为逐条记录（供表格、筛选等按行处理的组件使用）
+     * @param {object} columns - {datetime: [...], 字段: [...]}
+     * @returns {array} 记录数组
+     */
+    static columnsToRecords(columns) {
+        const names = Object.keys(columns || {});
+        const length = names.length ? columns[names[0]].length : 0;
+        const records = new Array(length);
+        for (let i = 0; i < length; i++) {
+            const record = {};
+            for (const name of names) {
+                record[name] = columns[name][i];
+            }
+            records[i] = record;
+        }
+        return records;
+    }
+
     /**
      * 获取实时天气
      * @param {number} cityId - 城市ID
@@ -200,16 +228,15 @@ class APIClient {
      * @param {string} format - 导出格式 (excel/csv)
      */
     async bulkExport(params, format = 'excel') {
-        const url = `${this.baseUrl}/data/export-bulk`;
-
         try {
-            const response = await fetch(url, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ ...params, format }),
-            });
+            // 导出在后台任务中生成文件，完成后再下载
+            const submitted = await this.post('/data/export-bulk', { ...params, format });
+            const job = await this.waitForJob(submitted.data.id);
+            if (job.status !== 'succeeded') {
+                throw new Error(job.error || '导出失败');
+            }
+
+            const response = await fetch(`${this.baseUrl}/jobs/${job.id}/download`);
 
             if (!response.ok) {
                 const data = await response.json();
@@ -333,7 +360,42 @@ class APIClient {
      * @param {object} params - {city_id, start_date, end_date, fields}
      */
     async batchDownload(params) {
-        return this.post('/data/batch-download', params);
+        const submitted = await this.post('/data/batch-download', params);
+        const job = await this.waitForJob(submitted.data.id);
+        return {
+            code: job.status === 'succeeded' ? 200 : 500,
+            message: job.status === 'succeeded' ? job.result.message : (job.error || '下载失败'),
+            data: job.result,
+        };
+    }
+
+    /**
+     * 轮询后台任务直到结束
+     * @param {string} jobId - 任务ID
+     * @param {function} onProgress - 进度回调 (可选)
+     * @param {number} interval - 轮询间隔 (毫秒)
+     * @returns {Promise} 结束时的任务信息
+     */
+    async waitForJob(jobId, onProgress = null, interval = 1000) {
+        while (true) {
+            const response = await this.get(`/jobs/${jobId}`);
+            const job = response.data;
+            if (onProgress && job.progress) {
+                onProgress(job.progress);
+            }
+            if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+                return job;
+            }
+            await new Promise((resolve) => setTimeout(resolve, interval));
+        }
+    }
+
+    /**
+     * 取消后台任务
+     * @param {string} jobId - 任务ID
+     */
+    async cancelJob(jobId) {
+        return this.post(`/jobs/${jobId}/cancel`, {});
     }
 
     /**
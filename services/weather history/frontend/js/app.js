@@ -535,13 +535,15 @@ async function handleQuery() {
     } else {
       // 单城市模式
       const cityId = appState.selectedCities[0];
-      const response = await api.queryWeather({
+      const response = await api.queryWeatherColumns({
         city_id: cityId,
         start_date: startDate,
         end_date: endDate,
         fields: appState.selectedFields,
       });
 
+      // 列式响应在本地展开为记录，供图表、表格与筛选使用
+      response.data.records = APIClient.columnsToRecords(response.data.columns);
       appState.currentData = response.data;
 
       const cityName =
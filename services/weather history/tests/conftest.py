@@ -30,6 +30,7 @@ def db_manager(test_db_path):
     yield db
     
     # 测试结束后清理
+    db.close()
     if os.path.exists(test_db_path):
         os.remove(test_db_path)
 
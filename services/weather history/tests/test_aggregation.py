@@ -0,0 +1,147 @@
+"""
+聚合查询单元测试
+测试日/月汇总表的增量维护，以及汇总统计与内存统计结果一致
+"""
+import unittest
+import sys
+import os
+import shutil
+import datetime
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.services.aggregation import WeatherAggregator, full_month_span
+from backend.services.data_analyzer import DataAnalyzer
+from backend.services.data_manager import DataManager
+
+
+class TestAggregation(unittest.TestCase):
+    """聚合查询测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """准备两个城市两天的逐15分钟数据"""
+        cls.test_db_path = 'data/test_aggregation.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+        cls.records = {1: [], 2: []}
+        for city_id in (1, 2):
+            for day in (1, 2):
+                for step in range(96):
+                    cls.records[city_id].append({
+                        'city_id': city_id,
+                        'datetime': f"2024-01-{day:02d}T{step // 4:02d}:{step % 4 * 15:02d}",
+                        'temperature_2m': 10.0 * city_id + step * 0.1 + day,
+                        'precipitation': 0.5 if step % 10 == 0 else 0.0,
+                        'shortwave_radiation': float(max(0, 48 - abs(step - 48)) * 10),
+                        'weather_code': 61.0 if step < 30 else 3.0,
+                        'surface_pressure': None
+                    })
+            cls.db_manager.upsert_weather_data(cls.records[city_id])
+        cls.analyzer = DataAnalyzer(WeatherAggregator(cls.db_manager))
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def test_summary_matches_in_memory(self):
+        """测试SQL统计摘要与pandas计算结果一致"""
+        summaries = self.analyzer.summarize_cities([1, 2, 3], '2024-01-01', '2024-01-02')
+        for city_id in (1, 2):
+            expected = self.analyzer.calculate_summary(self.records[city_id])
+            self.assertEqual(summaries[city_id], expected)
+        self.assertEqual(summaries[1]['weather']['most_frequent'], 3)
+        self.assertNotIn('pressure', summaries[1])
+        self.assertEqual(summaries[3], {})
+
+    def test_summary_limited_to_fields(self):
+        """测试统计摘要只包含请求的字段，与对查询结果计算的摘要一致"""
+        fields = ['temperature_2m', 'precipitation']
+        summary = self.analyzer.summarize_cities([1], '2024-01-01', '2024-01-02', fields)[1]
+        rows = [{k: r[k] for k in ['datetime'] + fields} for r in self.records[1]]
+        self.assertEqual(summary, self.analyzer.calculate_summary(rows))
+        self.assertEqual(set(summary), {'temperature', 'precipitation'})
+
+    def test_daily_stats(self):
+        """测试按城市和日期分组统计"""
+        rows = self.analyzer.calculate_daily_stats([1, 2], '2024-01-02', '2024-01-02', ['temperature_2m', 'bogus'])
+        self.assertEqual([(r['city_id'], r['date']) for r in rows], [(1, '2024-01-02'), (2, '2024-01-02')])
+
+        temps = [r['temperature_2m'] for r in self.records[2] if r['datetime'].startswith('2024-01-02')]
+        stats = rows[1]['temperature_2m']
+        self.assertEqual(stats['count'], 96)
+        self.assertAlmostEqual(stats['avg'], sum(temps) / len(temps))
+        self.assertAlmostEqual(stats['max'], max(temps))
+        self.assertNotIn('bogus', rows[0])
+
+    def test_city_record_stats(self):
+        """测试一次查询获取所有城市的记录范围"""
+        stats = self.db_manager.get_city_record_stats()
+        self.assertEqual(stats[1]['count'], 192)
+        self.assertEqual(stats[2]['earliest'], '2024-01-01T00:00')
+        self.assertEqual(stats[2]['latest'], '2024-01-02T23:45')
+
+    def test_full_month_span(self):
+        """测试完整月份范围的计算"""
+        self.assertEqual(full_month_span('2024-01-01', '2024-03-31'), ('2024-01', '2024-03'))
+        self.assertEqual(full_month_span('2024-01-15', '2024-03-10'), ('2024-02', '2024-02'))
+        self.assertEqual(full_month_span('2024-02-01', '2024-02-29'), ('2024-02', '2024-02'))
+        self.assertIsNone(full_month_span('2024-01-02', '2024-01-31'))
+
+    def test_rollups_follow_writes_and_deletes(self):
+        """测试写入与删除后日/月汇总同步更新，跨月统计与内存计算一致"""
+        city_id = 7
+        records = []
+        for day in range(60):
+            date = (datetime.date(2024, 1, 1) + datetime.timedelta(days=day)).isoformat()
+            for hour in (0, 12):
+                records.append({
+                    'city_id': city_id, 'datetime': f"{date}T{hour:02d}:00",
+                    'temperature_2m': float(day + hour)
+                })
+        self.db_manager.upsert_weather_data(records)
+
+        months = self.analyzer.calculate_monthly_stats([city_id], '2024-01', '2024-02', ['temperature_2m'])
+        self.assertEqual([m['month'] for m in months], ['2024-01', '2024-02'])
+        self.assertEqual(months[0]['record_count'], 62)
+        self.assertEqual(months[1]['temperature_2m']['max'], 59.0 + 12)
+
+        # 1月整月走月汇总，2月前几天走日汇总
+        summary = self.analyzer.summarize_cities([city_id], '2024-01-01', '2024-02-05')[city_id]
+        in_range = [r for r in records if r['datetime'] <= '2024-02-05T23:59']
+        self.assertEqual(summary, self.analyzer.calculate_summary(in_range))
+
+        self.db_manager.delete_weather_data({
+            'city_id': city_id, 'start_date': '2024-02-01', 'end_date': '2024-02-29T23:59'
+        })
+        months = self.analyzer.calculate_monthly_stats([city_id], '2024-01', '2024-02', ['temperature_2m'])
+        self.assertEqual([m['month'] for m in months], ['2024-01'])
+        self.assertEqual(self.db_manager.get_daily_record_counts(city_id, '2024-01-30', '2024-02-02'), {
+            '2024-01-30': 2, '2024-01-31': 2
+        })
+
+    def test_completeness_reads_coverage(self):
+        """测试完整性检查基于覆盖位图计算缺失日期"""
+        city_manager = CityManager(self.db_manager)
+        city_id = city_manager.add_city('汇总测试城', 108.0, 22.0)
+        self.db_manager.upsert_weather_data([
+            {'city_id': city_id, 'datetime': f"2024-03-0{day}T{step // 4:02d}:{step % 4 * 15:02d}", 'temperature_2m': 1.0}
+            for day in (1, 3) for step in range(96)
+        ])
+
+        manager = DataManager(None, self.db_manager, city_manager)
+        result = manager.check_data_completeness(city_id, '2024-03-01', '2024-03-04')
+        self.assertEqual(result['missing_dates'], ['2024-03-02', '2024-03-04'])
+        self.assertEqual(result['total_hours'], 96)
+        self.assertEqual(result['completeness_rate'], 50.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
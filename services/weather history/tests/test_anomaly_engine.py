@@ -0,0 +1,120 @@
+"""
+异常检测引擎单元测试
+测试滚动/同时段/MAD 分数、趋势斜率与多城市对齐
+"""
+import unittest
+import sys
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.services.anomaly_engine import (
+    AnomalyEngine, rolling_zscores, seasonal_zscores, mad_scores, trend_slopes
+)
+from backend.services.data_analyzer import DataAnalyzer
+
+
+def hourly_times(days):
+    """生成逐小时时间轴"""
+    return np.datetime64('2024-01-01T00:00') + np.arange(days * 24) * np.timedelta64(60, 'm')
+
+
+class TestAnomalyScores(unittest.TestCase):
+    """分数计算测试类"""
+
+    def test_rolling_matches_pandas(self):
+        """测试滚动 z 分数与 pandas 的前 window 点统计一致"""
+        rng = np.random.default_rng(1)
+        series = rng.normal(20, 2, 200)
+        series[[10, 50]] = np.nan
+        values = np.stack([series, series * 2], axis=1)[None, :, :]
+
+        scores = rolling_zscores(values, window=24, min_periods=6)
+        shifted = pd.Series(series).shift(1).rolling(24, min_periods=6)
+        expected = (pd.Series(series) - shifted.mean()) / shifted.std()
+        np.testing.assert_allclose(scores[0, :, 0], expected.to_numpy(), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(scores[0, :, 1], expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+    def test_seasonal_and_mad_flag_spike(self):
+        """测试同时段基线与 MAD 能识别叠加在日变化上的尖峰"""
+        times = hourly_times(20)
+        hours = np.arange(len(times)) % 24
+        rng = np.random.default_rng(2)
+        series = 20 + 8 * np.sin(hours / 24 * 2 * np.pi) + rng.normal(0, 0.3, len(times))
+        series[100] += 5
+        values = series[None, :, None]
+
+        seasonal = seasonal_zscores(values, times)
+        self.assertEqual(int(np.nanargmax(np.abs(seasonal[0, :, 0]))), 100)
+        self.assertGreater(abs(seasonal[0, 100, 0]), 3)
+
+        robust = mad_scores(np.array([1.0, 2.0, 3.0, 2.0, 100.0])[None, :, None])
+        self.assertGreater(robust[0, 4, 0], 3)
+        self.assertLess(abs(robust[0, 1, 0]), 1)
+
+    def test_trend_slopes_match_polyfit(self):
+        """测试趋势斜率与 polyfit 一致（单位：每天）"""
+        times = hourly_times(10)
+        days = np.arange(len(times)) / 24
+        series = 0.5 * days + 3
+        series[5] = np.nan
+        values = np.stack([series, np.full(len(times), np.nan)], axis=1)[None, :, :]
+        slopes = trend_slopes(values, times)
+        valid = ~np.isnan(series)
+        self.assertAlmostEqual(slopes[0, 0], np.polyfit(days[valid], series[valid], 1)[0], places=9)
+        self.assertTrue(np.isnan(slopes[0, 1]))
+
+
+class TestAnomalyEngine(unittest.TestCase):
+    """多城市扫描测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_anomaly_engine.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def test_scan_aligns_cities(self):
+        """测试多城市按时间对齐后一次扫描"""
+        records = []
+        for city_id, offset in ((1, 0), (2, 12)):
+            for i in range(offset, 72):
+                day, hour = divmod(i, 24)
+                value = 10.0 + (city_id * 0.01 * i) + (30.0 if (city_id, i) == (2, 40) else 0.0)
+                records.append({'city_id': city_id, 'datetime': f"2024-03-0{day + 1}T{hour:02d}:00", 'temperature_2m': value})
+        self.db_manager.bulk_insert('weather_data', records)
+
+        engine = AnomalyEngine(self.db_manager)
+        cube = engine.load_cube([1, 2], '2024-03-01', '2024-03-03', ['temperature_2m'])
+        self.assertEqual(cube.values.shape, (2, 72, 1))
+        self.assertTrue(np.isnan(cube.values[1, :12, 0]).all())
+
+        analyzer = DataAnalyzer(engine=engine)
+        items = list(analyzer.scan_anomalies([1, 2], '2024-03-01', '2024-03-03', ['temperature_2m'], method='mad'))
+        trends = [item for item in items if item['type'] == 'trend']
+        anomalies = [item for item in items if item['type'] == 'anomaly']
+        self.assertEqual([t['city_id'] for t in trends], [1, 2])
+        self.assertAlmostEqual(trends[0]['slopes']['temperature_2m'], 0.24, places=6)
+        self.assertEqual([(a['city_id'], a['datetime']) for a in anomalies], [(2, '2024-03-02T16:00')])
+
+        with self.assertRaises(ValueError):
+            analyzer.scan_anomalies([1], '2024-03-01', '2024-03-03', ['temperature_2m'], method='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -85,6 +85,23 @@ class TestAPI(unittest.TestCase):
         # 应该返回错误
         self.assertIn(response.status_code, [400, 500])
     
+    def test_query_weather_invalid_format(self):
+        """测试查询天气API不支持的响应格式"""
+        request_data = {
+            'city_id': 1,
+            'start_date': '2024-01-01',
+            'end_date': '2024-01-02',
+            'format': 'xml'
+        }
+
+        response = self.client.post(
+            '/api/weather/query',
+            data=json.dumps(request_data),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
     def test_query_weather_valid_params(self):
         """测试查询天气API有效参数"""
         request_data = {
@@ -107,6 +124,27 @@ class TestAPI(unittest.TestCase):
             data = json.loads(response.data)
             self.assertEqual(data['code'], 200)
             self.assertIn('data', data)
+    
+    def test_batch_download_returns_job(self):
+        """测试批量下载立即返回任务ID"""
+        response = self.client.post(
+            '/api/data/batch-download',
+            data=json.dumps({'city_id': 999999, 'start_date': '2024-01-01', 'end_date': '2024-01-02'}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.data)['data']['id']
+        
+        response = self.client.get(f'/api/jobs/{job_id}')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['data']['job_type'], 'batch_download')
+    
+    def test_get_missing_job(self):
+        """测试查询不存在的任务"""
+        response = self.client.get('/api/jobs/not-a-job')
+        self.assertEqual(response.status_code, 404)
 
 
 if __name__ == '__main__':
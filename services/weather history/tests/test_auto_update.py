@@ -0,0 +1,176 @@
+"""
+定时增量更新单元测试
+测试 cron 解析、完整性水位计算、按水位增量下载与调度运行指标
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+from datetime import datetime, timedelta
+from unittest import mock
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.services.cache_manager import CacheManager
+from backend.services.weather_service import WeatherService
+from backend.services.data_manager import DataManager, complete_through
+from backend.services.auto_update_scheduler import CronSchedule, AutoUpdateScheduler
+
+
+def day_columns(start, days, fields, missing_from=None):
+    """生成 days 天的 15 分钟列式数据，missing_from 之后（含）的时间点为空"""
+    first = datetime.strptime(start, '%Y-%m-%d')
+    times = [
+        (first + timedelta(minutes=15 * i)).strftime('%Y-%m-%dT%H:%M') for i in range(96 * days)
+    ]
+    columns = {'datetime': times}
+    for field in fields:
+        columns[field] = [
+            None if missing_from and t >= missing_from else 1.0 for t in times
+        ]
+    return columns
+
+
+class TestCronSchedule(unittest.TestCase):
+    """cron 表达式测试类"""
+
+    def test_daily(self):
+        """测试每天固定时间"""
+        schedule = CronSchedule('30 3 * * *')
+        self.assertEqual(schedule.next_after(datetime(2024, 5, 1, 2, 0)), datetime(2024, 5, 1, 3, 30))
+        self.assertEqual(schedule.next_after(datetime(2024, 5, 1, 3, 30)), datetime(2024, 5, 2, 3, 30))
+        self.assertEqual(schedule.next_after(datetime(2024, 12, 31, 4, 0)), datetime(2025, 1, 1, 3, 30))
+
+    def test_steps_and_weekdays(self):
+        """测试步长、列表与星期（2024-05-01 为周三）"""
+        self.assertEqual(
+            CronSchedule('0 */6 * * *').next_after(datetime(2024, 5, 1, 7, 10)), datetime(2024, 5, 1, 12, 0)
+        )
+        self.assertEqual(
+            CronSchedule('15 2 * * 0,6').next_after(datetime(2024, 5, 1, 0, 0)), datetime(2024, 5, 4, 2, 15)
+        )
+
+    def test_invalid(self):
+        """测试非法表达式"""
+        for expression in ('* * * *', '60 * * * *', '0 0 30 2 *'):
+            with self.assertRaises(ValueError):
+                CronSchedule(expression).next_after(datetime(2024, 1, 1))
+
+
+class TestCompleteThrough(unittest.TestCase):
+    """完整性水位计算测试类"""
+
+    def test_tail_missing(self):
+        """测试尾部未发布的数据不推进水位"""
+        columns = day_columns('2024-01-01', 3, ['a', 'b'], missing_from='2024-01-03T12:00')
+        self.assertEqual(complete_through(columns, ['a', 'b']), {'a': '2024-01-02', 'b': '2024-01-02'})
+
+    def test_unsupported_field(self):
+        """测试上游不提供的字段随其他字段推进，全部为空时不推进"""
+        columns = day_columns('2024-01-01', 2, ['a'])
+        columns['b'] = [None] * len(columns['datetime'])
+        self.assertEqual(complete_through(columns, ['a', 'b']), {'a': '2024-01-02', 'b': '2024-01-02'})
+
+        columns = day_columns('2024-01-01', 2, ['a'], missing_from='2024-01-01T00:00')
+        self.assertEqual(complete_through(columns, ['a']), {'a': None})
+
+
+class TestIncrementalUpdate(unittest.TestCase):
+    """按水位增量更新测试类"""
+
+    def setUp(self):
+        """每个测试使用独立数据库"""
+        self.test_db_path = 'data/test_auto_update.db'
+        self.db_manager = DatabaseManager(self.test_db_path)
+        self.db_manager.init_database()
+        self.city_manager = CityManager(self.db_manager)
+        self.city_ids = [self.city_manager.add_city(f'增量城{i}', 108.0 + i, 22.0 + i) for i in range(2)]
+        self.weather_service = WeatherService(
+            'https://archive-api.open-meteo.com/v1/archive',
+            CacheManager(self.db_manager, expire_hours=1),
+            self.city_manager,
+            self.db_manager
+        )
+        self.data_manager = DataManager(self.weather_service, self.db_manager, self.city_manager)
+        # 上游只发布到 published 当天 12:00
+        self.published = '2024-03-10T12:00'
+        self.calls = []
+
+        def fake_fetch(longitude, latitude, start, end, fields, timezone='Asia/Shanghai', use_cache=True):
+            self.calls.append((start, end, tuple(fields), use_cache))
+            days = (datetime.strptime(end, '%Y-%m-%d') - datetime.strptime(start, '%Y-%m-%d')).days + 1
+            return {'columns': day_columns(start, days, fields, missing_from=self.published)}
+
+        patcher = mock.patch.object(self.weather_service, 'fetch_range', side_effect=fake_fetch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """测试清理"""
+        self.db_manager.close()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        shutil.rmtree(self.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def test_fetches_only_past_watermark(self):
+        """测试首次按追溯天数下载，之后只请求水位之后的数据"""
+        city_id = self.city_ids[0]
+        fields = ['temperature_2m', 'wind_speed_10m']
+        result = self.data_manager.update_incremental(city_id, fields, initial_days=5, target_end='2024-03-10')
+        self.assertEqual(self.calls, [('2024-03-06', '2024-03-10', tuple(fields), False)])
+        self.assertEqual(result['watermarks'], {f: '2024-03-09' for f in fields})
+        self.assertEqual(result['lagging_fields'], fields)
+
+        # 上游补齐后只重新请求未完整的最后一天
+        self.published = None
+        result = self.data_manager.update_incremental(city_id, fields, initial_days=5, target_end='2024-03-10')
+        self.assertEqual(self.calls[-1][:2], ('2024-03-10', '2024-03-10'))
+        self.assertEqual(result['lagging_fields'], [])
+
+        # 已是最新时不请求
+        result = self.data_manager.update_incremental(city_id, fields, target_end='2024-03-10')
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(result['requests'], 0)
+
+    def test_watermark_bootstrap_and_rewind(self):
+        """测试没有水位时按已有数据推断，删除数据后回退水位"""
+        city_id = self.city_ids[0]
+        self.db_manager.write_weather_columns(
+            city_id, day_columns('2024-03-01', 3, ['temperature_2m'], missing_from='2024-03-03T06:00')
+        )
+        marks = self.db_manager.get_watermarks(city_id, ['temperature_2m', 'wind_speed_10m'])
+        self.assertEqual(marks, {'temperature_2m': '2024-03-02', 'wind_speed_10m': None})
+
+        self.db_manager.set_watermarks(city_id, {'temperature_2m': '2024-03-02'})
+        self.db_manager.delete_weather_data({'city_id': city_id, 'start_date': '2024-03-02T00:00'})
+        self.assertEqual(
+            self.db_manager.get_watermarks(city_id, ['temperature_2m'])['temperature_2m'], '2024-03-01'
+        )
+
+    def test_scheduler_run_records_metrics(self):
+        """测试一轮调度覆盖所有城市并记录运行指标"""
+        self.published = None
+        scheduler = AutoUpdateScheduler(
+            self.data_manager, self.db_manager, self.city_manager, '30 3 * * *', ['temperature_2m'],
+            spread_minutes=0, initial_days=2
+        )
+        with mock.patch.object(self.db_manager, 'log_event') as log_event:
+            metrics = scheduler.run_once()
+        cities = len(self.city_manager.get_all_cities())
+        self.assertEqual(metrics['total_cities'], cities)
+        self.assertEqual(metrics['updated_cities'], cities)
+        self.assertEqual(metrics['requests'], cities)
+        self.assertEqual(metrics['saved_records'], cities * 2 * 96)
+
+        level, source, _, details = log_event.call_args[0]
+        self.assertEqual((level, source), ('INFO', 'AUTO_UPDATE'))
+        self.assertEqual(json.loads(details)['requests'], cities)
+        self.assertEqual(scheduler.status()['last_run'], metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
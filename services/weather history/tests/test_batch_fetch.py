@@ -0,0 +1,134 @@
+"""
+多坐标批量请求单元测试
+测试历史数据与预报的多城市合并请求、响应拆分与按城市缓存
+"""
+import unittest
+import sys
+import os
+import shutil
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.services.cache_manager import CacheManager
+from backend.services.throttle import HostThrottle
+from backend.services.weather_service import WeatherService
+
+
+def fake_get(url, timeout=None):
+    """按请求中的坐标数量返回多坐标响应，温度等于纬度"""
+    query = parse_qs(urlparse(url).query)
+    latitudes = [float(v) for v in query['latitude'][0].split(',')]
+    items = []
+    for lat in latitudes:
+        if 'start_date' in query:
+            day = query['start_date'][0]
+            times = [f"{day}T{i // 4:02d}:{(i % 4) * 15:02d}" for i in range(96)]
+            items.append({
+                'latitude': lat,
+                'minutely_15': {'time': times, 'temperature_2m': [lat] * 96},
+                'hourly': {'time': times[::4]},
+            })
+        else:
+            items.append({
+                'latitude': lat,
+                'current': {'time': '2024-06-01T12:00', 'temperature_2m': lat, 'weather_code': 1},
+                'daily': {'time': ['2024-06-01'], 'weather_code': [3], 'temperature_2m_max': [30], 'temperature_2m_min': [20]},
+                'minutely_15': {'time': ['2024-06-01T00:00'], 'temperature_2m': [lat]},
+            })
+    response = mock.Mock()
+    response.json.return_value = items if len(items) > 1 else items[0]
+    return response
+
+
+class TestBatchFetch(unittest.TestCase):
+    """多坐标批量请求测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_batch_fetch.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+        cls.city_manager = CityManager(cls.db_manager)
+        cls.city_ids = [
+            cls.city_manager.add_city(f'批量城{i}', 108.0 + i, 22.0 + i) for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def _service(self, batch_size=20, throttle=None):
+        """创建天气服务"""
+        return WeatherService(
+            'https://archive-api.open-meteo.com/v1/archive',
+            CacheManager(self.db_manager, expire_hours=1),
+            self.city_manager,
+            self.db_manager,
+            throttle=throttle,
+            batch_size=batch_size
+        )
+
+    def test_history_batch_split_per_city(self):
+        """测试多城市历史查询合并为一次请求并按城市写入"""
+        service = self._service()
+        with mock.patch.object(service.session, 'get', side_effect=fake_get) as get:
+            results = service.batch_query_cities(self.city_ids, '2020-03-01', '2020-03-01', ['temperature_2m'])
+            self.assertEqual(get.call_count, 1)
+            self.assertEqual(len(results), 3)
+            for i, result in enumerate(results):
+                self.assertEqual(len(result['hourly_data']), 96)
+                self.assertEqual(result['hourly_data'][0]['temperature_2m'], 22.0 + i)
+
+            # 数据已写入本地库，再次查询不请求 API
+            service.batch_query_cities(self.city_ids, '2020-03-01', '2020-03-01', ['temperature_2m'])
+            self.assertEqual(get.call_count, 1)
+
+    def test_forecast_batch_and_cache(self):
+        """测试预报按批大小分组请求，结果按城市缓存"""
+        service = self._service(batch_size=2)
+        cities = [self.city_manager.get_city_by_id(cid) for cid in self.city_ids]
+        with mock.patch.object(service.session, 'get', side_effect=fake_get) as get:
+            batch = service.get_forecast_batch(cities, days=3)
+            self.assertEqual(get.call_count, 2)
+            for i, city_id in enumerate(self.city_ids):
+                self.assertEqual(batch[city_id]['current']['temperature'], 22.0 + i)
+                self.assertEqual(batch[city_id]['forecast']['daily_forecast'][0]['weather_name'], '阴天')
+
+            service.get_forecast_batch(cities, days=3)
+            self.assertEqual(get.call_count, 2)
+
+
+    def test_throttled_retry_takes_slot_per_attempt(self):
+        """测试受节流时 429 重试在 Python 层进行，每次尝试都经过节流器并遵守 Retry-After"""
+        throttle = HostThrottle(rate_per_minute=6000, burst=10, max_concurrency_per_host=2)
+        service = self._service(throttle=throttle)
+        adapter = service.session.get_adapter('https://archive-api.open-meteo.com/v1/archive')
+        self.assertEqual(adapter.max_retries.total, 0)
+
+        limited = mock.Mock(status_code=429, headers={'Retry-After': '3'})
+        responses = [limited, limited]
+
+        def get(url, timeout=None):
+            return responses.pop(0) if responses else fake_get(url, timeout)
+
+        city = self.city_manager.get_city_by_id(self.city_ids[0])
+        with mock.patch.object(service.session, 'get', side_effect=get) as session_get, \
+                mock.patch('backend.services.weather_service.time.sleep') as sleep:
+            service.get_forecast_batch([city], days=2)
+        self.assertEqual(session_get.call_count, 3)
+        self.assertEqual(throttle.stats()['requests'], 3)
+        sleep.assert_has_calls([mock.call(3.0), mock.call(3.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 缓存管理器单元测试
 测试CacheManager类的缓存功能
 """
+import json
 import unittest
 import sys
 import os
@@ -11,7 +12,7 @@ from datetime import datetime, timedelta
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.models.database import DatabaseManager
-from backend.services.cache_manager import CacheManager
+from backend.services.cache_manager import CacheManager, decompress_payload
 
 
 class TestCacheManager(unittest.TestCase):
@@ -33,6 +34,7 @@ class TestCacheManager(unittest.TestCase):
     def tearDownClass(cls):
         """测试类清理"""
         # 删除测试数据库
+        cls.db_manager.close()
         if os.path.exists(cls.test_db_path):
             os.remove(cls.test_db_path)
     
@@ -102,6 +104,73 @@ class TestCacheManager(unittest.TestCase):
         self.assertIsNotNone(result1)
         self.assertIsNotNone(result2)
 
+    def test_memory_tier_hit(self):
+        """测试内存层命中时不访问SQLite"""
+        self.cache_manager.set('key_memory', {'data': [1, 2, 3]})
+        
+        # 删除SQLite中的记录，内存层仍然命中
+        self.db_manager.execute_update("DELETE FROM api_cache WHERE cache_key = ?", ('key_memory',))
+        result = self.cache_manager.get('key_memory')
+        self.assertEqual(result, {'data': [1, 2, 3]})
+        
+        stats = self.cache_manager.get_cache_stats()
+        self.assertGreater(stats['tiers']['memory']['hits'], 0)
+    
+    def test_disk_tier_compressed(self):
+        """测试SQLite层以压缩格式存储并可回填内存层"""
+        value = {'hourly_data': [{'datetime': '2024-01-01T00:00', 'temperature_2m': 20.5}] * 100}
+        self.cache_manager.set('key_disk', value)
+        
+        rows = self.db_manager.execute_query(
+            "SELECT response_data FROM api_cache WHERE cache_key = ?", ('key_disk',)
+        )
+        raw = rows[0]['response_data']
+        self.assertIsInstance(raw, bytes)
+        self.assertEqual(decompress_payload(raw), value)
+        
+        # 清空内存层后从SQLite读取
+        self.cache_manager.memory.clear()
+        self.assertEqual(self.cache_manager.get('key_disk'), value)
+        self.assertEqual(self.cache_manager.memory.stats()['entries'], 1)
+    
+    def test_legacy_text_entry(self):
+        """测试兼容旧版本未压缩的JSON文本缓存"""
+        expired_at = (datetime.now() + timedelta(hours=1)).isoformat()
+        self.db_manager.bulk_insert('api_cache', [{
+            'cache_key': 'key_legacy',
+            'response_data': '{"data": "legacy"}',
+            'expired_at': expired_at
+        }])
+        self.assertEqual(self.cache_manager.get('key_legacy'), {'data': 'legacy'})
+    
+    def test_memory_lru_eviction(self):
+        """测试内存层超出容量时淘汰最久未使用的条目"""
+        cache_manager = CacheManager(self.db_manager, expire_hours=1, memory_max_bytes=6000)
+        for i in range(10):
+            cache_manager.set(f'key_lru_{i}', {'data': 'x' * 200, 'index': i})
+        
+        stats = cache_manager.memory.stats()
+        self.assertLessEqual(stats['bytes'], 6000)
+        self.assertGreater(stats['evictions'], 0)
+        
+        # 被淘汰的条目仍可从SQLite读取
+        self.assertEqual(cache_manager.get('key_lru_0')['index'], 0)
+
+    
+    def test_is_expired_does_not_count_hit(self):
+        """测试检查过期状态不计入内存层命中统计"""
+        self.cache_manager.set('key_peek', {'data': 1})
+        hits = self.cache_manager.memory.stats()['hits']
+        self.assertFalse(self.cache_manager.is_expired('key_peek'))
+        self.assertEqual(self.cache_manager.memory.stats()['hits'], hits)
+    
+    def test_memory_size_tracks_uncompressed_json(self):
+        """测试内存层按未压缩 JSON 长度估算大小，高压缩率数据不会被低估"""
+        value = {'shortwave_radiation': [0.0] * 10000}
+        self.cache_manager.set('key_zeros', value)
+        raw_len = len(json.dumps(value, separators=(',', ':')))
+        self.assertGreaterEqual(self.cache_manager.memory.stats()['bytes'], raw_len * 4)
+
 
 if __name__ == '__main__':
     unittest.main()
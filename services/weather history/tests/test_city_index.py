@@ -0,0 +1,109 @@
+"""
+城市搜索索引单元测试
+测试名称子串检索排序、最近站点查询与地名解析缓存
+"""
+import unittest
+import sys
+import os
+import random
+import shutil
+from unittest import mock
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.city_index import CitySearchIndex, haversine_km
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.services.cache_manager import CacheManager
+from backend.services.weather_service import WeatherService
+
+CITIES = [
+    {'id': 1, 'city_name': '贵港', 'longitude': 109.5986, 'latitude': 23.1115, 'region': '广西'},
+    {'id': 2, 'city_name': '南宁', 'longitude': 108.3661, 'latitude': 22.8172, 'region': '广西'},
+    {'id': 3, 'city_name': '宁明', 'longitude': 107.07, 'latitude': 22.14, 'region': '广西'},
+    {'id': 4, 'city_name': '南宁东站', 'longitude': 108.46, 'latitude': 22.85, 'region': '自定义场站'},
+    {'id': 5, 'city_name': '寨安', 'longitude': 107.0092, 'latitude': 22.0386, 'region': '自定义场站'},
+]
+
+
+class TestCitySearchIndex(unittest.TestCase):
+    """城市搜索索引测试类"""
+
+    def test_search_ranking(self):
+        """测试完全匹配、前缀匹配、子串匹配的排序"""
+        index = CitySearchIndex(CITIES)
+        self.assertEqual([c['city_name'] for c in index.search('南宁')], ['南宁', '南宁东站'])
+        self.assertEqual([c['city_name'] for c in index.search('宁')], ['宁明', '南宁', '南宁东站'])
+        self.assertEqual([c['city_name'] for c in index.search(' 东站 ')], ['南宁东站'])
+        self.assertEqual(index.search('北京'), [])
+        self.assertEqual(len(index.search('宁', limit=1)), 1)
+
+    def test_nearest_matches_brute_force(self):
+        """测试网格最近站点查询与逐个计算距离的结果一致"""
+        rng = random.Random(7)
+        cities = [
+            {'id': i, 'city_name': f'站{i}', 'latitude': rng.uniform(20, 26), 'longitude': rng.uniform(104, 112)}
+            for i in range(200)
+        ]
+        index = CitySearchIndex(cities)
+        for _ in range(20):
+            lat, lon = rng.uniform(18, 28), rng.uniform(100, 115)
+            expected = sorted(cities, key=lambda c: haversine_km(lat, lon, c['latitude'], c['longitude']))[:5]
+            self.assertEqual([c['id'] for c in index.nearest(lat, lon, 5)], [c['id'] for c in expected])
+
+        nearest = index.nearest(22.0, 108.0, 3, max_km=1.0)
+        self.assertTrue(all(c['distance_km'] <= 1.0 for c in nearest))
+
+
+class TestCitySearchService(unittest.TestCase):
+    """城市搜索服务测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_city_index.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def test_index_rebuilt_after_add_and_geocode_cached(self):
+        """测试新增城市后索引重建、地名解析结果被缓存"""
+        city_manager = CityManager(self.db_manager)
+        service = WeatherService(
+            'https://archive-api.open-meteo.com/v1/archive',
+            CacheManager(self.db_manager, expire_hours=1),
+            city_manager,
+            self.db_manager
+        )
+        response = mock.Mock()
+        response.json.return_value = {'results': [
+            {'name': '索引测试镇', 'latitude': 23.0, 'longitude': 108.0, 'country': '中国', 'admin1': '广西'}
+        ]}
+
+        with mock.patch.object(service.session, 'get', return_value=response) as get:
+            first = service.search_city('索引测试')
+            second = service.search_city('索引测试')
+            self.assertEqual(get.call_count, 1)
+            self.assertEqual(first, second)
+            self.assertEqual(first[0]['region'], '中国 > 广西')
+
+            # 单字关键词只查询本地索引
+            service.search_city('索')
+            self.assertEqual(get.call_count, 1)
+
+        city_manager.add_city('索引测试城', 108.1, 23.1)
+        results = service.search_city('索引测试')
+        self.assertEqual(results[0]['name'], '索引测试城')
+        self.assertEqual(service.nearest_cities(23.1, 108.1, 1)[0]['city_name'], '索引测试城')
+
+
+if __name__ == '__main__':
+    unittest.main()
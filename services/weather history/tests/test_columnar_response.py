@@ -0,0 +1,138 @@
+"""
+列式查询响应单元测试
+测试列式 JSON / Arrow 编码、gzip 协商与列式取数
+"""
+import unittest
+import sys
+import os
+import gzip
+import json
+import shutil
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.services.cache_manager import CacheManager
+from backend.services.weather_service import WeatherService
+from backend.services import columnar_response
+from backend.services.columnar_response import (
+    dumps_json, encode_columns, encode_arrow, accepts_gzip, maybe_gzip, arrow_available
+)
+
+
+class TestColumnarEncoding(unittest.TestCase):
+    """列式编码测试类"""
+
+    def setUp(self):
+        """准备列数据"""
+        self.columns = {
+            'datetime': np.array(['2024-01-01T00:00', '2024-01-01T00:15'], dtype='U19'),
+            'temperature_2m': np.array([12.8, np.nan], dtype=np.float32),
+        }
+
+    def test_columns_json(self):
+        """测试 NumPy 列序列化：float32 保留原始小数，NaN 输出为 null"""
+        body = dumps_json({'columns': encode_columns(self.columns)})
+        self.assertEqual(json.loads(body)['columns'], {
+            'datetime': ['2024-01-01T00:00', '2024-01-01T00:15'],
+            'temperature_2m': [12.8, None],
+        })
+
+    def test_columns_json_without_orjson(self):
+        """测试未安装 orjson 时标准库回退的输出一致"""
+        expected = json.loads(dumps_json({'columns': encode_columns(self.columns)}))
+        with mock.patch.object(columnar_response, 'orjson', None):
+            body = dumps_json({'columns': encode_columns(self.columns)})
+        self.assertEqual(json.loads(body), expected)
+
+    def test_accepts_gzip(self):
+        """测试 Accept-Encoding 解析"""
+        self.assertTrue(accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(accepts_gzip('br;q=1.0, gzip;q=0.8'))
+        self.assertFalse(accepts_gzip('gzip;q=0'))
+        self.assertFalse(accepts_gzip('br'))
+        self.assertFalse(accepts_gzip(None))
+
+    def test_maybe_gzip(self):
+        """测试只在客户端支持且超过阈值时压缩"""
+        body = b'{"a":' + b'1' * 4096 + b'}'
+        compressed, encoding = maybe_gzip(body, 'gzip', min_bytes=1024)
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(gzip.decompress(compressed), body)
+
+        self.assertEqual(maybe_gzip(body, 'br', min_bytes=1024), (body, None))
+        self.assertEqual(maybe_gzip(b'{}', 'gzip', min_bytes=1024), (b'{}', None))
+
+    @unittest.skipUnless(arrow_available(), "未安装 pyarrow")
+    def test_arrow_roundtrip(self):
+        """测试 Arrow IPC 编码与元数据"""
+        import pyarrow
+        body = encode_arrow(self.columns, {'city_id': 1})
+        table = pyarrow.ipc.open_stream(body).read_all()
+        self.assertEqual(table.column('temperature_2m').to_pylist()[1], None)
+        self.assertEqual(json.loads(table.schema.metadata[b'weather_meta']), {'city_id': 1})
+
+    def test_arrow_unavailable(self):
+        """测试未安装 pyarrow 时给出明确错误"""
+        with mock.patch.object(columnar_response, 'pyarrow', None):
+            with self.assertRaises(RuntimeError):
+                encode_arrow(self.columns)
+
+
+class TestHistoricalColumns(unittest.TestCase):
+    """列式取数测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_columnar_response.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+        cls.city_manager = CityManager(cls.db_manager)
+        cls.city_id = cls.city_manager.add_city('列式城', 108.3, 22.8)
+        times = [f"2024-01-01T{i // 4:02d}:{(i % 4) * 15:02d}" for i in range(96)]
+        cls.db_manager.write_weather_columns(cls.city_id, {
+            'datetime': times,
+            'temperature_2m': [float(i) for i in range(96)],
+            'wind_speed_10m': [None] * 96,
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def test_local_columns(self):
+        """测试本地数据只返回请求字段的列数组"""
+        service = WeatherService(
+            'https://archive-api.open-meteo.com/v1/archive',
+            CacheManager(self.db_manager, expire_hours=1),
+            self.city_manager,
+            self.db_manager
+        )
+        with mock.patch.object(service, 'sync_local_data', return_value=0):
+            result = service.get_historical_columns(
+                108.3, 22.8, '2024-01-01', '2024-01-01', ['temperature_2m', 'wind_speed_10m'],
+                city_id=self.city_id
+            )
+        columns = result['columns']
+        self.assertEqual(list(columns), ['datetime', 'temperature_2m', 'wind_speed_10m'])
+        self.assertEqual(len(columns['datetime']), 96)
+        self.assertEqual(float(columns['temperature_2m'][95]), 95.0)
+        self.assertTrue(np.isnan(columns['wind_speed_10m']).all())
+
+        payload = json.loads(dumps_json(encode_columns(columns)))
+        self.assertEqual(payload['datetime'][0], '2024-01-01T00:00')
+        self.assertIsNone(payload['wind_speed_10m'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+列式存储单元测试
+测试ColumnarStore与DatabaseManager.get_weather_frame
+"""
+import unittest
+import sys
+import os
+import shutil
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+
+
+class TestColumnarStore(unittest.TestCase):
+    """列式存储测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_columnar.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def setUp(self):
+        """每个测试前清理数据"""
+        self.db_manager.execute_update("DELETE FROM weather_data")
+        self.db_manager.columnar.invalidate_city(1)
+
+    def _records(self, day, count=96):
+        """生成一天的15分钟数据"""
+        records = []
+        for i in range(count):
+            records.append({
+                'city_id': 1,
+                'datetime': f"{day}T{i // 4:02d}:{(i % 4) * 15:02d}",
+                'temperature_2m': 20.0 + i * 0.25,
+                'precipitation': None,
+            })
+        return records
+
+    def test_frame_matches_rows(self):
+        """测试列式读取与逐行查询结果一致"""
+        self.db_manager.bulk_insert('weather_data', self._records('2024-01-31') + self._records('2024-02-01'))
+
+        filters = {'city_id': 1, 'start_date': '2024-01-31T12:00', 'end_date': '2024-02-01T23:59'}
+        rows = self.db_manager.get_weather_data(filters)
+        frame = self.db_manager.get_weather_frame(filters, ['temperature_2m', 'precipitation'])
+
+        self.assertEqual(len(frame), len(rows))
+        self.assertEqual(list(frame['datetime']), [r['datetime'] for r in rows])
+        self.assertAlmostEqual(float(frame['temperature_2m'].iloc[0]), rows[0]['temperature_2m'], places=4)
+        self.assertFalse(frame['precipitation'].notna().any())
+
+    def test_write_invalidates_chunk(self):
+        """测试写入后分块失效并重新构建"""
+        self.db_manager.bulk_insert('weather_data', self._records('2024-03-01', count=4))
+        filters = {'city_id': 1, 'start_date': '2024-03-01T00:00', 'end_date': '2024-03-01T23:59'}
+        self.assertEqual(len(self.db_manager.get_weather_frame(filters)), 4)
+
+        self.db_manager.bulk_insert('weather_data', self._records('2024-03-01'))
+        self.assertEqual(len(self.db_manager.get_weather_frame(filters)), 96)
+
+        self.db_manager.delete_weather_data({'city_id': 1})
+        self.assertEqual(len(self.db_manager.get_weather_frame(filters)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+数据覆盖位图单元测试
+测试位图随写入/删除增量维护、字段组判定、跨月范围查询与旧库全量构建
+"""
+import unittest
+import sys
+import os
+import shutil
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.models.coverage_store import CoverageStore
+from backend.services.data_manager import DataManager
+
+
+def day_records(city_id, day, steps=range(96), **values):
+    """生成某天指定时间点的记录"""
+    return [
+        {'city_id': city_id, 'datetime': f"{day}T{step // 4:02d}:{step % 4 * 15:02d}", **values}
+        for step in steps
+    ]
+
+
+class TestCoverageStore(unittest.TestCase):
+    """覆盖位图测试类"""
+
+    def setUp(self):
+        """每个测试使用独立数据库"""
+        self.test_db_path = 'data/test_coverage_store.db'
+        self.db_manager = DatabaseManager(self.test_db_path)
+        self.db_manager.init_database()
+        self.coverage = self.db_manager.coverage
+
+    def tearDown(self):
+        """测试清理"""
+        self.db_manager.close()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        shutil.rmtree(self.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def test_groups_and_partial_days(self):
+        """测试记录存在与字段组完整分别计位"""
+        self.db_manager.upsert_weather_data(
+            day_records(1, '2024-01-31', range(48), temperature_2m=1.0, wind_speed_10m=2.0)
+            + day_records(1, '2024-02-01', temperature_2m=1.0)
+        )
+        counts = self.coverage.daily_counts(1, '2024-01-30', '2024-02-02')
+        self.assertEqual(counts.tolist(), [0, 48, 96, 0])
+
+        slots = self.coverage.slots(1, '2024-01-31', '2024-01-31')
+        self.assertTrue(slots[:48].all())
+        self.assertFalse(slots[48:].any())
+
+        # wind 组要求组内所有字段非空，只写入风速时不完整
+        self.assertEqual(self.coverage.daily_counts(1, '2024-01-31', '2024-02-01', 'wind').tolist(), [0, 0])
+        with self.assertRaises(ValueError):
+            self.coverage.slots(1, '2024-01-31', '2024-02-01', 'unknown')
+
+    def test_maintained_on_merge_and_delete(self):
+        """测试合并写入补齐字段与删除数据后位图同步更新"""
+        group = {'rows': [], 'pair': ['temperature_2m', 'wind_speed_10m']}
+        self.db_manager.coverage = self.coverage = CoverageStore(self.db_manager, group)
+
+        self.db_manager.upsert_weather_data(day_records(1, '2024-03-01', temperature_2m=1.0))
+        self.assertEqual(self.coverage.daily_counts(1, '2024-03-01', '2024-03-01', 'pair').tolist(), [0])
+        self.db_manager.upsert_weather_data(day_records(1, '2024-03-01', range(10), wind_speed_10m=3.0))
+        self.assertEqual(self.coverage.daily_counts(1, '2024-03-01', '2024-03-01', 'pair').tolist(), [10])
+
+        self.db_manager.delete_weather_data({'city_id': 1, 'start_date': '2024-03-01T02:00'})
+        self.assertEqual(self.coverage.daily_counts(1, '2024-03-01', '2024-03-01').tolist(), [8])
+        self.db_manager.delete_weather_data({'city_id': 1})
+        self.assertEqual(self.db_manager.execute_query(f"SELECT COUNT(*) AS n FROM {CoverageStore.TABLE}")[0]['n'], 0)
+
+    def test_rebuild_if_empty(self):
+        """测试旧数据库升级时全量构建位图"""
+        self.db_manager.upsert_weather_data(day_records(2, '2023-12-31') + day_records(2, '2024-01-02'))
+        self.db_manager.execute_update(f"DELETE FROM {CoverageStore.TABLE}")
+        self.coverage.rebuild_if_empty()
+        self.assertEqual(self.coverage.daily_counts(2, '2023-12-31', '2024-01-02').tolist(), [96, 0, 96])
+
+    def test_multi_year_heatmap(self):
+        """测试多年范围的完整性与热力图只依赖位图"""
+        city_manager = CityManager(self.db_manager)
+        city_id = city_manager.add_city('位图城', 108.0, 22.0)
+        self.db_manager.upsert_weather_data(day_records(city_id, '2021-06-15') + day_records(city_id, '2023-02-28'))
+
+        manager = DataManager(None, self.db_manager, city_manager)
+        result = manager.check_data_completeness(city_id, '2020-01-01', '2024-12-31')
+        self.assertEqual(result['existing_dates'], ['2021-06-15', '2023-02-28'])
+        self.assertEqual(result['missing_ranges'][0], {'start': '2020-01-01', 'end': '2021-06-14', 'days': 531})
+        self.assertEqual(result['total_days'], 1827)
+
+        heatmap = manager.coverage_heatmap([city_id], '2023-02-27', '2023-03-01')
+        self.assertEqual(heatmap['dates'], ['2023-02-27', '2023-02-28', '2023-03-01'])
+        self.assertEqual(heatmap['cities'][0]['coverage'], [0.0, 1.0, 0.0])
+        self.assertTrue(np.isclose(heatmap['cities'][0]['completeness_rate'], 33.33))
+
+
+if __name__ == '__main__':
+    unittest.main()
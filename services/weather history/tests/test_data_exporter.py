@@ -0,0 +1,79 @@
+"""
+数据导出服务单元测试
+测试CSV流式输出、Excel write_only 写入与每日汇总
+"""
+import unittest
+import sys
+import os
+import csv
+from io import BytesIO, StringIO
+
+from openpyxl import load_workbook
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.data_exporter import DataExporter
+
+
+def make_records(days=2):
+    """生成逐小时测试记录"""
+    for day in range(1, days + 1):
+        for hour in range(24):
+            yield {
+                'datetime': f"2024-01-{day:02d}T{hour:02d}:00",
+                'temperature_2m': 10.0 + hour,
+                'shortwave_radiation': 100.0,
+                'weather_code': 3 if hour < 20 else 61
+            }
+
+
+class TestDataExporter(unittest.TestCase):
+    """数据导出服务测试类"""
+
+    def setUp(self):
+        """创建导出服务"""
+        self.exporter = DataExporter()
+
+    def test_stream_csv_chunks(self):
+        """测试CSV按块输出，内容与行数正确"""
+        chunks = list(self.exporter.stream_csv(
+            make_records(), ['temperature_2m'], city_name='南宁', chunk_rows=10
+        ))
+        self.assertGreater(len(chunks), 1)
+
+        text = b''.join(chunks).decode('utf-8')
+        self.assertTrue(text.startswith('\ufeff'))
+        rows = list(csv.reader(StringIO(text.lstrip('\ufeff'))))
+        self.assertEqual(len(rows), 49)
+        self.assertEqual(rows[1][0], '南宁')
+        self.assertEqual(rows[1][1:3], ['2024-01-01', '00:00'])
+
+    def test_write_excel_with_summary(self):
+        """测试Excel数据表与每日汇总表"""
+        output = BytesIO()
+        count = self.exporter.write_excel(
+            make_records(), output, ['temperature_2m', 'shortwave_radiation', 'weather_code']
+        )
+        self.assertEqual(count, 48)
+
+        wb = load_workbook(BytesIO(output.getvalue()), read_only=True)
+        self.assertEqual(wb.sheetnames, ['天气数据', '每日汇总'])
+        self.assertEqual(sum(1 for _ in wb['天气数据'].iter_rows()), 49)
+
+        summary = list(wb['每日汇总'].iter_rows(values_only=True))
+        header = list(summary[0])
+        self.assertEqual(len(summary), 3)
+        self.assertEqual(summary[1][header.index('主要天气')], '3 (阴天)')
+        self.assertAlmostEqual(summary[1][header.index('日辐照量(MJ/m²)')], 8.64)
+
+    def test_empty_records(self):
+        """测试没有记录时也能生成文件"""
+        output = BytesIO()
+        self.assertEqual(self.exporter.write_excel(iter([]), output), 0)
+        self.assertTrue(output.getvalue())
+        self.assertEqual(b''.join(self.exporter.stream_csv([])).decode('utf-8').strip('\ufeff\n'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
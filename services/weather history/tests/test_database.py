@@ -0,0 +1,88 @@
+"""
+数据库管理器单元测试
+测试连接池复用、WAL模式与事务语义
+"""
+import unittest
+import sys
+import os
+import threading
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+
+
+class TestDatabaseManager(unittest.TestCase):
+    """数据库管理器测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_database.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path, pool_size=2)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+
+    def test_wal_mode(self):
+        """测试连接启用WAL日志模式"""
+        result = self.db_manager.execute_query("PRAGMA journal_mode")
+        self.assertEqual(list(result[0].values())[0].lower(), 'wal')
+
+    def test_connections_are_reused(self):
+        """测试连接池复用连接且不超过上限"""
+        for _ in range(20):
+            self.db_manager.execute_query("SELECT 1 as one")
+
+        threads = [
+            threading.Thread(target=self.db_manager.execute_query, args=("SELECT 1 as one",))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = self.db_manager.get_pool_stats()
+        self.assertLessEqual(stats['created'], 2)
+        self.assertEqual(stats['in_use'], 0)
+        self.assertGreaterEqual(stats['acquired'], 28)
+
+    def test_uncommitted_query_is_rolled_back(self):
+        """测试execute_query中未提交的修改在归还连接时回滚"""
+        self.db_manager.execute_update(
+            "INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, ?)", ('pool_test', '1')
+        )
+        self.db_manager.execute_query("DELETE FROM system_settings WHERE key = ?", ('pool_test',))
+
+        result = self.db_manager.execute_query(
+            "SELECT value FROM system_settings WHERE key = ?", ('pool_test',)
+        )
+        self.assertEqual(len(result), 1)
+
+    def test_iter_weather_records_pages(self):
+        """测试按时间分批读取天气数据，边界包含起止时间"""
+        self.db_manager.execute_update("DELETE FROM weather_data WHERE city_id = 99")
+        self.db_manager.upsert_weather_data([
+            {'city_id': 99, 'datetime': f"2024-01-{day:02d}T{hour:02d}:00", 'temperature_2m': float(hour)}
+            for day in range(1, 16) for hour in range(24)
+        ])
+
+        records = list(self.db_manager.iter_weather_records(
+            99, '2024-01-12T00:00', '2024-01-13T23:59', columns=['temperature_2m', 'bogus'], batch_size=7
+        ))
+        self.assertEqual(len(records), 48)
+        self.assertEqual(records[0]['datetime'], '2024-01-12T00:00')
+        self.assertEqual(records[-1]['datetime'], '2024-01-13T23:00')
+        self.assertEqual(set(records[0]), {'datetime', 'temperature_2m'})
+        self.assertEqual(self.db_manager.get_pool_stats()['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
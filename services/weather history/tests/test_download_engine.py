@@ -0,0 +1,111 @@
+"""
+并发下载引擎单元测试
+测试月度切分、令牌桶节流与DownloadEngine的调度
+"""
+import unittest
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.download_engine import DownloadEngine, split_by_month
+from backend.services.throttle import TokenBucket, HostThrottle
+
+
+class FakeWeatherService:
+    """记录调用的天气服务替身"""
+
+    def __init__(self, fail_city=None):
+        self.fail_city = fail_city
+        self.saved = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def fetch_range(self, longitude, latitude, start_date, end_date, fields):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        if longitude == self.fail_city:
+            raise RuntimeError('API error')
+        return {'columns': {'datetime': [f"{start_date}T00:00", f"{end_date}T00:00"]}}
+
+    def save_to_database(self, city_id, weather_data, merge=False):
+        self.saved.append((city_id, weather_data['columns']['datetime'][0], merge))
+        return len(weather_data['columns']['datetime'])
+
+
+class TestDownloadEngine(unittest.TestCase):
+    """并发下载引擎测试类"""
+
+    def test_split_by_month(self):
+        """测试按自然月切分日期范围"""
+        self.assertEqual(split_by_month('2024-01-15', '2024-03-10'), [
+            ('2024-01-15', '2024-01-31'),
+            ('2024-02-01', '2024-02-29'),
+            ('2024-03-01', '2024-03-10'),
+        ])
+        self.assertEqual(split_by_month('2024-12-31', '2024-12-31'), [('2024-12-31', '2024-12-31')])
+
+    def test_token_bucket(self):
+        """测试令牌桶限制突发请求"""
+        bucket = TokenBucket(rate=1000.0, capacity=2)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        bucket.acquire()
+
+    def test_host_throttle_limits_concurrency(self):
+        """测试节流器限制单主机并发"""
+        throttle = HostThrottle(rate_per_minute=60000, burst=100, max_concurrency_per_host=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def request():
+            with throttle.slot('https://archive-api.open-meteo.com/v1/archive?x=1'):
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.02)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(throttle.stats()['requests'], 6)
+
+    def test_run_reports_progress(self):
+        """测试多城市并发下载与进度回调"""
+        service = FakeWeatherService(fail_city=2.0)
+        engine = DownloadEngine(service, max_workers=4)
+        cities = [
+            {'id': 1, 'city_name': 'A', 'longitude': 1.0, 'latitude': 1.0},
+            {'id': 2, 'city_name': 'B', 'longitude': 2.0, 'latitude': 2.0},
+        ]
+        snapshots = []
+
+        results = engine.run(cities, '2024-01-01', '2024-03-31', ['temperature_2m'], progress_callback=snapshots.append)
+
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(results[0]['saved_records'], 6)
+        self.assertFalse(results[1]['success'])
+        self.assertEqual(results[1]['failed_chunks'], 3)
+        self.assertEqual(len(service.saved), 3)
+        self.assertTrue(all(merge for _, _, merge in service.saved))
+        self.assertGreater(service.max_active, 1)
+        self.assertEqual(sum(p['done_chunks'] for p in snapshots[-1]), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+补缺规划器单元测试
+测试FetchPlanner的缺口查找、请求合并以及WeatherService的增量补缺
+"""
+import unittest
+import sys
+import os
+import shutil
+from unittest import mock
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.city import CityManager
+from backend.services.cache_manager import CacheManager
+from backend.services.fetch_planner import FetchPlanner, group_consecutive_dates
+from backend.services.weather_service import WeatherService
+
+
+class TestFetchPlanner(unittest.TestCase):
+    """补缺规划器测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_fetch_planner.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+        cls.planner = FetchPlanner(cls.db_manager, merge_gap_days=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def setUp(self):
+        """每个测试前清理数据"""
+        self.db_manager.execute_update("DELETE FROM weather_data")
+        self.db_manager.execute_update("DELETE FROM api_cache")
+
+    def _day(self, day, **values):
+        """生成一天的15分钟数据"""
+        return [
+            {'city_id': 1, 'datetime': f"{day}T{i // 4:02d}:{(i % 4) * 15:02d}", **values}
+            for i in range(96)
+        ]
+
+    def test_group_consecutive_dates(self):
+        """测试连续日期分组"""
+        ranges = group_consecutive_dates(['2024-01-01', '2024-01-02', '2024-01-05'])
+        self.assertEqual(ranges, [
+            {'start': '2024-01-01', 'end': '2024-01-02', 'days': 2},
+            {'start': '2024-01-05', 'end': '2024-01-05', 'days': 1},
+        ])
+
+    def test_find_gaps(self):
+        """测试按天找出缺失记录与缺失字段"""
+        records = []
+        records += self._day('2024-01-01', temperature_2m=20.0, precipitation=0.0)
+        records += self._day('2024-01-02', temperature_2m=20.0, precipitation=None)
+        records += self._day('2024-01-04', temperature_2m=20.0, precipitation=0.0)
+        self.db_manager.bulk_insert('weather_data', records)
+
+        gaps = self.planner.find_gaps(1, '2024-01-01', '2024-01-04', ['temperature_2m', 'precipitation'])
+
+        self.assertEqual(len(gaps), 2)
+        self.assertEqual((gaps[0]['start'], gaps[0]['end']), ('2024-01-02', '2024-01-02'))
+        self.assertEqual(gaps[0]['fields'], ['precipitation'])
+        self.assertEqual((gaps[1]['start'], gaps[1]['end']), ('2024-01-03', '2024-01-03'))
+        self.assertIn('temperature_2m', gaps[1]['fields'])
+        self.assertIn('shortwave_radiation', gaps[1]['fields'])
+
+    def test_merge_gaps(self):
+        """测试相邻缺口合并、远距离缺口分开、超长缺口切分"""
+        gaps = [
+            {'start': '2024-01-01', 'end': '2024-01-02', 'days': 2, 'fields': ['rain']},
+            {'start': '2024-01-04', 'end': '2024-01-04', 'days': 1, 'fields': ['precipitation']},
+            {'start': '2024-03-01', 'end': '2024-03-01', 'days': 1, 'fields': ['rain']},
+        ]
+        calls = self.planner.merge_gaps(gaps)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((calls[0]['start'], calls[0]['end']), ('2024-01-01', '2024-01-04'))
+        self.assertEqual(calls[0]['fields'], ['precipitation', 'rain'])
+
+        planner = FetchPlanner(self.db_manager, max_days_per_call=10)
+        calls = planner.merge_gaps([{'start': '2024-01-01', 'end': '2024-01-25', 'days': 25, 'fields': ['rain']}])
+        self.assertEqual([c['days'] for c in calls], [10, 10, 5])
+
+    def test_weather_service_fetches_only_gaps(self):
+        """测试WeatherService只请求缺失部分并合并写入"""
+        self.db_manager.bulk_insert('weather_data', self._day('2020-05-01', temperature_2m=25.0, precipitation=1.0))
+
+        service = WeatherService(
+            'https://archive-api.open-meteo.com/v1/archive',
+            CacheManager(self.db_manager, expire_hours=1),
+            CityManager(self.db_manager),
+            self.db_manager
+        )
+        times = [f"2020-05-02T{i // 4:02d}:{(i % 4) * 15:02d}" for i in range(96)]
+        response = mock.Mock()
+        response.json.return_value = {
+            'latitude': 22.8, 'longitude': 108.3,
+            'minutely_15': {'time': times, 'temperature_2m': [26.0] * 96},
+            'hourly': {'time': times[::4], 'precipitation': [0.5] * 24},
+        }
+
+        with mock.patch.object(service.session, 'get', return_value=response) as get:
+            result = service.get_historical_weather(
+                108.3, 22.8, '2020-05-01', '2020-05-02', ['temperature_2m', 'precipitation'], city_id=1
+            )
+
+        self.assertEqual(get.call_count, 1)
+        url = get.call_args[0][0]
+        self.assertIn('start_date=2020-05-02', url)
+        self.assertIn('end_date=2020-05-02', url)
+        self.assertEqual(len(result['hourly_data']), 192)
+        self.assertEqual(result['hourly_data'][0]['precipitation'], 1.0)
+        self.assertEqual(result['hourly_data'][-1]['temperature_2m'], 26.0)
+
+        # 本地已完整，不再请求API
+        with mock.patch.object(service.session, 'get') as get:
+            service.get_historical_weather(
+                108.3, 22.8, '2020-05-01', '2020-05-02', ['temperature_2m', 'precipitation'], city_id=1
+            )
+        get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
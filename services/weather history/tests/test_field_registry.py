@@ -0,0 +1,48 @@
+"""
+字段注册表单元测试
+"""
+import unittest
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import AVAILABLE_FIELDS
+from backend.models.columnar_store import WEATHER_VALUE_COLUMNS
+from backend.services.field_registry import FIELD_REGISTRY
+
+
+class TestFieldRegistry(unittest.TestCase):
+    """字段注册表测试类"""
+
+    def test_lookups(self):
+        """测试字段名与 API 参数的双向映射及精度判断"""
+        self.assertEqual(FIELD_REGISTRY.api_param('evapotranspiration'), 'et0_fao_evapotranspiration')
+        self.assertEqual(FIELD_REGISTRY.field_for_param('et0_fao_evapotranspiration'), 'evapotranspiration')
+        self.assertEqual(FIELD_REGISTRY.api_param('unknown'), 'unknown')
+        self.assertTrue(FIELD_REGISTRY.supports_15min('temperature_2m'))
+        self.assertFalse(FIELD_REGISTRY.supports_15min('soil_moisture_0_to_7cm'))
+        self.assertEqual(
+            FIELD_REGISTRY.storage_index('weather_code'), WEATHER_VALUE_COLUMNS.index('weather_code')
+        )
+        self.assertEqual(
+            len(FIELD_REGISTRY.fields), sum(len(group) for group in AVAILABLE_FIELDS.values())
+        )
+
+    def test_labels_and_split(self):
+        """测试中文列名与请求参数拆分"""
+        self.assertEqual(FIELD_REGISTRY.label('temperature_2m'), '温度(°C)')
+        self.assertEqual(FIELD_REGISTRY.label('weather_code'), '天气代码')
+        self.assertEqual(FIELD_REGISTRY.label('datetime'), '日期时间')
+
+        hourly, minutely_15 = FIELD_REGISTRY.split_api_params([' temperature_2m', 'evapotranspiration'])
+        self.assertEqual(hourly, ['temperature_2m', 'et0_fao_evapotranspiration'])
+        self.assertEqual(minutely_15, ['temperature_2m'])
+
+        with self.assertRaises(TypeError):
+            FIELD_REGISTRY.api_params['rain'] = 'x'
+
+
+if __name__ == '__main__':
+    unittest.main()
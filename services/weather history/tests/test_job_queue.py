@@ -0,0 +1,148 @@
+"""
+后台任务队列单元测试
+测试JobQueue的提交、进度、取消、失败与重启恢复
+"""
+import unittest
+import sys
+import os
+import shutil
+import threading
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.services.job_queue import JobQueue
+
+
+class TestJobQueue(unittest.TestCase):
+    """后台任务队列测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_jobs.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def setUp(self):
+        """每个测试前清理任务表"""
+        self.db_manager.execute_update("DELETE FROM jobs")
+        self.queue = JobQueue(self.db_manager, workers=1, progress_interval=0)
+
+    def tearDown(self):
+        """停止工作线程"""
+        self.queue.stop()
+
+    def _wait(self, job_id, timeout=5.0):
+        """等待任务结束"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get(job_id)
+            if job['status'] in ('succeeded', 'failed', 'cancelled'):
+                return job
+            time.sleep(0.02)
+        self.fail(f"任务未在 {timeout}s 内结束")
+
+    def test_submit_and_progress(self):
+        """测试任务执行、进度与结果"""
+        def handler(params, ctx):
+            ctx.update_progress({'done': 1, 'total': 2})
+            return {'sum': params['a'] + params['b']}
+
+        self.queue.register('add', handler)
+        self.queue.start()
+        job = self.queue.submit('add', {'a': 1, 'b': 2})
+        self.assertIn(job['status'], ('pending', 'running', 'succeeded'))
+
+        job = self._wait(job['id'])
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result'], {'sum': 3})
+        self.assertEqual(job['progress'], {'done': 1, 'total': 2})
+
+    def test_failure_recorded(self):
+        """测试任务异常时记录失败原因"""
+        def handler(params, ctx):
+            raise ValueError('boom')
+
+        self.queue.register('fail', handler)
+        self.queue.start()
+        job = self._wait(self.queue.submit('fail', {})['id'])
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'boom')
+
+    def test_cancel_running_job(self):
+        """测试取消运行中的任务"""
+        started = threading.Event()
+
+        def handler(params, ctx):
+            started.set()
+            while True:
+                ctx.check_cancelled()
+                time.sleep(0.01)
+
+        self.queue.register('loop', handler)
+        self.queue.start()
+        job = self.queue.submit('loop', {})
+        self.assertTrue(started.wait(5))
+        self.queue.cancel(job['id'])
+        self.assertEqual(self._wait(job['id'])['status'], 'cancelled')
+
+    def test_recover_after_restart(self):
+        """测试重启后恢复未完成的任务"""
+        self.queue.register('noop', lambda params, ctx: {'ok': True})
+        job = self.queue.submit('noop', {})
+        # 模拟上次退出时任务正在运行
+        self.db_manager.execute_update("UPDATE jobs SET status = 'running' WHERE id = ?", (job['id'],))
+
+        restarted = JobQueue(self.db_manager, workers=1)
+        restarted.register('noop', lambda params, ctx: {'ok': True})
+        restarted.start()
+        try:
+            self.queue = restarted
+            self.assertEqual(self._wait(job['id'])['result'], {'ok': True})
+        finally:
+            restarted.stop()
+
+    def test_recover_skips_live_owner(self):
+        """测试其他存活进程正在执行的任务不会被重新排队"""
+        self.queue.register('noop', lambda params, ctx: {'ok': True})
+        job = self.queue.submit('noop', {})
+        # 父进程 PID 必然存活，模拟另一个进程正在执行该任务
+        self.db_manager.execute_update(
+            "UPDATE jobs SET status = 'running', owner_pid = ? WHERE id = ?", (os.getppid(), job['id'])
+        )
+
+        other = JobQueue(self.db_manager, workers=1)
+        self.assertEqual(other.recover(), 0)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'running')
+
+    def test_recover_reclaims_dead_owner(self):
+        """测试执行进程已退出的任务会被重新排队"""
+        self.queue.register('noop', lambda params, ctx: {'ok': True})
+        job = self.queue.submit('noop', {})
+        self.db_manager.execute_update(
+            "UPDATE jobs SET status = 'running', owner_pid = ? WHERE id = ?", (2 ** 22 + 1, job['id'])
+        )
+
+        other = JobQueue(self.db_manager, workers=1)
+        self.assertEqual(other.recover(), 1)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'pending')
+
+    def test_unknown_job_type(self):
+        """测试提交未注册的任务类型"""
+        with self.assertRaises(ValueError):
+            self.queue.submit('unknown', {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+异步日志写入器单元测试
+测试LogSink的批量写入、丢弃计数与关闭时落盘
+"""
+import unittest
+import sys
+import os
+import threading
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.models.log_sink import LogSink
+
+
+class TestLogSink(unittest.TestCase):
+    """异步日志写入器测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_log_sink.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+
+    def setUp(self):
+        """每个测试前清理日志表"""
+        self.db_manager.execute_update("DELETE FROM system_logs")
+        self.db_manager.execute_update("DELETE FROM event_logs")
+
+    def _count(self, table):
+        return self.db_manager.execute_query(f"SELECT COUNT(*) as n FROM {table}")[0]['n']
+
+    def test_logs_are_batched_and_flushed_on_stop(self):
+        """测试挂载写入器后日志入队，停止时全部写入"""
+        sink = LogSink(self.db_manager, batch_size=50, flush_interval_ms=10000)
+        sink.start()
+        self.db_manager.attach_log_sink(sink)
+        try:
+            for i in range(120):
+                self.db_manager.log_request('127.0.0.1', 'ua', f'/api/{i}', 'GET', 200, 1.0)
+            self.db_manager.log_event('WARNING', 'TEST', 'message')
+        finally:
+            sink.stop()
+            self.db_manager.log_sink = None
+
+        self.assertEqual(self._count('system_logs'), 120)
+        self.assertEqual(self._count('event_logs'), 1)
+        self.assertEqual(sink.stats()['written'], 121)
+
+    def test_full_queue_drops(self):
+        """测试队列满时丢弃并计数"""
+        sink = LogSink(self.db_manager, max_queue=5)
+        for i in range(8):
+            sink.submit('event_logs', ('INFO', 'TEST', f'm{i}', None))
+
+        self.assertEqual(sink.stats()['dropped'], 3)
+        self.assertEqual(sink.flush(), 5)
+        self.assertEqual(self._count('event_logs'), 5)
+
+    def test_concurrent_submit_counts(self):
+        """测试多线程同时提交时入队/丢弃计数不丢失"""
+        sink = LogSink(self.db_manager, max_queue=2000)
+
+        def submit_many():
+            for i in range(500):
+                sink.submit('event_logs', ('INFO', 'TEST', 'm', None))
+
+        threads = [threading.Thread(target=submit_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = sink.stats()
+        self.assertEqual(stats['enqueued'], 2000)
+        self.assertEqual(stats['dropped'], 2000)
+        self.assertEqual(sink.flush(), 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+API 频率限制单元测试
+测试 GCRA 限额、突发、空闲清理、设置缓存失效与 SQLite 共享状态
+"""
+import unittest
+import sys
+import os
+import shutil
+from unittest import mock
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import DatabaseManager
+from backend.services.rate_limiter import RateLimiter, MemoryRateStore, SqliteRateStore
+
+
+class TestRateLimiter(unittest.TestCase):
+    """频率限制测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """测试类初始化"""
+        cls.test_db_path = 'data/test_rate_limiter.db'
+        cls.db_manager = DatabaseManager(cls.test_db_path, pool_size=2, settings_ttl=3600)
+        cls.db_manager.init_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        """测试类清理"""
+        cls.db_manager.close()
+        if os.path.exists(cls.test_db_path):
+            os.remove(cls.test_db_path)
+        shutil.rmtree(cls.db_manager.columnar.store_dir, ignore_errors=True)
+
+    def setUp(self):
+        """每个测试前设置限额为每分钟 3 次"""
+        self.db_manager.update_settings({'api_rate_limit': 3})
+
+    def _run(self, limiter, ip, times):
+        """在指定时间点依次请求"""
+        results = []
+        for now in times:
+            with mock.patch('backend.services.rate_limiter.time.time', return_value=now):
+                results.append(limiter.is_allowed(ip))
+        return results
+
+    def test_burst_then_refill(self):
+        """测试周期内用完限额后被拒绝，按速率恢复"""
+        limiter = RateLimiter(self.db_manager)
+        results = self._run(limiter, '1.1.1.1', [1000, 1000, 1000, 1000, 1020])
+        self.assertEqual(results, [(True, 2), (True, 1), (True, 0), (False, 0), (True, 0)])
+        # 其他客户端不受影响
+        self.assertEqual(self._run(limiter, '2.2.2.2', [1000]), [(True, 2)])
+
+    def test_settings_cache_invalidation(self):
+        """测试修改设置后立即生效"""
+        limiter = RateLimiter(self.db_manager)
+        self.assertEqual(limiter.get_limit_config(), 3)
+        self.db_manager.update_settings({'api_rate_limit': 100})
+        self.assertEqual(limiter.get_limit_config(), 100)
+
+    def test_idle_keys_evicted(self):
+        """测试空闲客户端被定期清理"""
+        store = MemoryRateStore()
+        limiter = RateLimiter(self.db_manager, store=store, evict_interval=100)
+        limiter._next_evict = 1000
+        self._run(limiter, 'a', [1000])
+        self._run(limiter, 'b', [1050])
+        self.assertEqual(len(store), 2)
+        limiter._next_evict = 0
+        self._run(limiter, 'c', [1100])
+        # a、b 已完全恢复被清理，只剩本次请求的 c
+        self.assertEqual(len(store), 1)
+
+    def test_sqlite_store_shared(self):
+        """测试两个限制器共享 SQLite 状态时合计限额"""
+        first = RateLimiter(self.db_manager, store=SqliteRateStore(self.db_manager))
+        second = RateLimiter(self.db_manager, store=SqliteRateStore(self.db_manager))
+        allowed = [
+            self._run(limiter, '3.3.3.3', [2000])[0][0]
+            for limiter in (first, second, first, second)
+        ]
+        self.assertEqual(allowed, [True, True, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Open-Meteo响应解析单元测试
+测试列式解析、15分钟缺口补齐与记录转换
+"""
+import unittest
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.response_parser import parse_columns, columns_to_records, count_records
+
+
+def quarter_times(hours):
+    """生成逐15分钟时间轴"""
+    return [f"2024-01-01T{i // 4:02d}:{(i % 4) * 15:02d}" for i in range(hours * 4)]
+
+
+class TestResponseParser(unittest.TestCase):
+    """响应解析测试类"""
+
+    def test_minutely_with_hourly_fallback(self):
+        """测试15分钟数据优先，缺失处用对应小时值补齐"""
+        times = quarter_times(3)
+        response = {
+            'minutely_15': {
+                'time': times,
+                'temperature_2m': [float(i) for i in range(12)],
+                'shortwave_radiation': [None] * 4 + [100.0] * 8,
+            },
+            'hourly': {
+                'time': times[::4],
+                'shortwave_radiation': [50.0, 60.0, 70.0],
+                'weather_code': [3, None, 61],
+                'wind_speed_100m': [1.0],
+            },
+        }
+        columns = parse_columns(response, ['temperature_2m', 'shortwave_radiation', 'weather_code', 'wind_speed_100m'])
+
+        self.assertEqual(columns['datetime'], times)
+        self.assertEqual(columns['temperature_2m'][11], 11.0)
+        self.assertEqual(columns['shortwave_radiation'][:5], [50.0, 50.0, 50.0, 50.0, 100.0])
+        self.assertEqual(columns['weather_code'], [3.0] * 4 + [None] * 4 + [61.0] * 4)
+        # 小时数据比时间轴短时，剩余部分为 None
+        self.assertEqual(columns['wind_speed_100m'], [1.0] * 4 + [None] * 8)
+
+    def test_hourly_only(self):
+        """测试没有15分钟数据时使用小时时间轴"""
+        response = {'hourly': {'time': ['2024-01-01T00:00', '2024-01-01T01:00'], 'precipitation': [0.0, 1.5]}}
+        columns = parse_columns(response, ['precipitation', 'rain'])
+        self.assertEqual(columns['precipitation'], [0.0, 1.5])
+        self.assertEqual(columns['rain'], [None, None])
+        self.assertEqual(parse_columns({}, ['rain']), {})
+
+    def test_columns_to_records(self):
+        """测试列式数据转换为记录并筛选字段"""
+        columns = {'datetime': ['a', 'b'], 'rain': [1.0, None], 'snowfall': [0.0, 0.0]}
+        self.assertEqual(columns_to_records(columns, ['rain']), [
+            {'datetime': 'a', 'rain': 1.0}, {'datetime': 'b', 'rain': None}
+        ])
+        self.assertEqual(len(columns_to_records(columns)[0]), 3)
+        self.assertEqual(count_records({'columns': columns}), 2)
+        self.assertEqual(count_records({'hourly_data': [{}]}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+请求合并单元测试
+测试并发相同请求只执行一次、异常共享与统计
+"""
+import unittest
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """请求合并测试类"""
+
+    def _run_concurrently(self, flight, key, fn, count=5):
+        """并发调用并收集结果或异常"""
+        results = [None] * count
+
+        def worker(index):
+            try:
+                results[index] = flight.do(key, fn)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        """测试并发相同键只执行一次"""
+        flight = SingleFlight()
+        executions = []
+
+        def fetch():
+            executions.append(1)
+            time.sleep(0.2)
+            return {'columns': {'datetime': []}}
+
+        results = self._run_concurrently(flight, 'key', fetch)
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        stats = flight.stats()
+        self.assertEqual(stats['calls'], 5)
+        self.assertEqual(stats['executions'], 1)
+        self.assertEqual(stats['coalesced'], 4)
+        self.assertEqual(stats['in_flight'], 0)
+
+        # 完成后再次调用会重新执行
+        flight.do('key', fetch)
+        self.assertEqual(len(executions), 2)
+
+    def test_error_shared_with_waiters(self):
+        """测试异常传递给所有等待者"""
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.2)
+            raise RuntimeError('429')
+
+        results = self._run_concurrently(flight, 'key', fail, count=3)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(flight.stats()['executions'], 1)
+        self.assertEqual(flight.stats()['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -42,6 +42,7 @@ class TestWeatherService(unittest.TestCase):
     def tearDownClass(cls):
         """测试类清理"""
         # 删除测试数据库
+        cls.db_manager.close()
         if os.path.exists(cls.test_db_path):
             os.remove(cls.test_db_path)
     